@@ -22,6 +22,10 @@ If the size parameter is known, then use::
 
     mie.efficiencies_mx(m, x)
 
+Efficiencies over a range of wavelengths, sampled more densely near resonances::
+
+    spec = mie.spectrum(m_of_lambda, d, lambda_min, lambda_max, tol=1e-3)
+
 Mie scattering amplitudes S1 and S2 (complex numbers):
 
     mie.S1_S2(m, x, mu)
@@ -65,11 +69,19 @@ explicitly instead::
     import miepython.monte_carlo as mc
     mu, cdf = mc.mu_with_uniform_cdf(m, x, 100)
 
-Near-field calculations are provided by the ``miepython.field`` module::
+Sweeps over very large populations can be spread over worker processes that
+share their inputs and outputs through shared memory.  That module is not imported
+with the package either, because shared memory is missing on some platforms::
+
+    import miepython.parallel as mp
+    qext, qsca, qback, g = mp.efficiencies_mx(m, x, workers=8)
+
+Near-field calculations are provided by the ``miepython.field`` module, which
+needs only NumPy::
 
     from miepython.field import e_near, h_near, eh_near
     from miepython.field import e_near_cartesian, h_near_cartesian, eh_near_cartesian
-    from miepython.field import e_far
+    from miepython.field import eh_near_grid, e_far
 
 Example near-field usage::
 
@@ -90,59 +102,23 @@ from ._backend import single_sphere, small_conducting_sphere, small_sphere
 
 from .core import efficiencies, intensities, i_par, i_per, i_unpolarized
 from .core import efficiencies_mx, S1_S2, phase_matrix, coefficients
+from .core import enable_coefficient_cache, disable_coefficient_cache, coefficient_cache_info
+from .angular import AngularTable
+from .spectral import spectrum
 
-from . import rayleigh
-
-_FIELD_IMPORT_ERROR = None
-
-
-def _raise_field_import_error():
-    """Raise a consistent error when optional near-field dependencies are missing."""
-    raise ModuleNotFoundError(
-        "Near-field functions require the optional dependency 'scipy'. "
-        "Install miepython with SciPy support to use e_far/e_near/h_near/eh_near."
-    ) from _FIELD_IMPORT_ERROR
-
-
-def _missing_field_function(name):
-    """Create a placeholder near-field function when SciPy is unavailable."""
-
-    def _missing(*_args, **_kwargs):
-        _raise_field_import_error()
-
-    _missing.__name__ = name
-    _missing.__qualname__ = name
-    _missing.__doc__ = f"{name} requires the optional dependency 'scipy'."
-    return _missing
+from .field import e_far, e_near, h_near, eh_near
+from .field import e_near_cartesian, h_near_cartesian, eh_near_cartesian, eh_near_grid
 
+from . import rayleigh
 
 try:
-    from . import field as _field
     from . import vsh  # noqa: F401  reachable as miepython.vsh; needs scipy, so guarded here
 except ModuleNotFoundError as exc:
-    missing_module = str(getattr(exc, "name", "") or "")
-    if missing_module.startswith("scipy"):
-        _FIELD_IMPORT_ERROR = exc
-        # ``miepython.vsh`` is left unbound rather than stubbed out.  It is a
-        # reference implementation used for development and cross-checking, not part
-        # of the public surface, and every one of its functions needs scipy.
-        e_far = _missing_field_function("e_far")
-        e_near = _missing_field_function("e_near")
-        h_near = _missing_field_function("h_near")
-        eh_near = _missing_field_function("eh_near")
-        e_near_cartesian = _missing_field_function("e_near_cartesian")
-        h_near_cartesian = _missing_field_function("h_near_cartesian")
-        eh_near_cartesian = _missing_field_function("eh_near_cartesian")
-    else:
+    # ``miepython.vsh`` is left unbound rather than stubbed out.  It is a reference
+    # implementation used for development and cross-checking, not part of the public
+    # surface, and every one of its functions needs scipy.
+    if not str(getattr(exc, "name", "") or "").startswith("scipy"):
         raise
-else:
-    e_far = _field.e_far
-    e_near = _field.e_near
-    h_near = _field.h_near
-    eh_near = _field.eh_near
-    e_near_cartesian = _field.e_near_cartesian
-    h_near_cartesian = _field.h_near_cartesian
-    eh_near_cartesian = _field.eh_near_cartesian
 
 # Names exposed to the user.  ``vsh`` is deliberately absent: it is bound only when
 # scipy is installed, and a star-import must not depend on that.
@@ -156,6 +132,7 @@ __all__ = (
     "coefficients",
     "efficiencies",
     "efficiencies_mx",
+    "spectrum",
     "e_far",
     "e_near",
     "h_near",
@@ -163,9 +140,14 @@ __all__ = (
     "e_near_cartesian",
     "h_near_cartesian",
     "eh_near_cartesian",
+    "eh_near_grid",
     "an_bn",
     "cn_dn",
     "S1_S2",
+    "AngularTable",
+    "enable_coefficient_cache",
+    "disable_coefficient_cache",
+    "coefficient_cache_info",
     "single_sphere",
     "small_sphere",
     "small_conducting_sphere",
@@ -2,9 +2,48 @@
 
 This module centralizes JIT vs no-JIT backend selection so other modules can
 import backend callables without importing ``miepython`` package root.
+
+The thread count for batch calculations is settled here too.  It comes from the
+``threads`` argument of the calling function or, when that is omitted, from the
+``MIEPYTHON_NUM_THREADS`` environment variable, and defaults to one thread.  Only
+the numba backend can use more than one.
+
+Without numba, array sweeps do not go through the scalar ``mie_nojit`` kernels one
+sphere at a time: ``efficiencies_batch`` is bound to the NumPy version in
+``mie_vector``, which works on whole blocks of spheres at once.  For the same
+reason ``_S1_S2_efficiencies`` sums the amplitudes with the dense matrix products
+of ``mie_vector`` rather than one angle at a time.  Either backend can ask for
+those products explicitly through ``S1_S2_dense``.
+
+The near fields work the other way round.  ``near_field`` sums the series one point
+at a time, which only pays when it is compiled, so ``miepython.field`` calls it
+with numba and keeps its own NumPy evaluation over whole arrays of points without.
+The pure-python ``near_field`` is there to hold the numba one to account.  That
+NumPy evaluation takes its Bessel functions from ``spherical_bessel_table``, which
+runs the recurrences of ``mie_vector`` over all the points and orders at once.
+``an_bn_block`` likewise finds a_n and b_n for a whole block of spheres at once on
+either backend, for callers that need the coefficients of many spheres and not
+only their efficiencies.
+
+The Mie coefficients can be kept between calls.  ``cached_an_bn`` and
+``cached_cn_dn`` stand in for ``an_bn`` and ``cn_dn`` wherever a whole series is
+needed from Python; they compute afresh until a ``CoefficientCache`` is installed
+with ``set_coefficient_cache``, which ``miepython.enable_coefficient_cache`` does.
+
+The series buffers can be kept between calls too.  A ``MieWorkspace`` holds the
+arrays that ``an_bn_into`` and ``single_sphere_ws`` write into and grows them on
+demand.  The batch kernels size one workspace per sweep themselves, so they make
+no allocations per sphere.  One sphere at a time from Python still goes through
+``single_sphere``: a numba kernel allocates its buffers faster than it can be
+handed four arrays across the dispatcher, and the pure-python kernel gains
+nothing measurable from keeping them.
 """
 
 import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
 
 USE_JIT = os.environ.get("MIEPYTHON_USE_JIT", "0") == "1"
 
@@ -13,37 +52,405 @@ if USE_JIT:
     from .mie_jit import _D_downwards
     from .mie_jit import _D_upwards
     from .mie_jit import _Lentz_Dn
+    from .mie_jit import _S1_S2_batch_nb as _S1_S2_batch
+    from .mie_jit import _S1_S2_efficiencies_nb as _S1_S2_efficiencies
+    from .mie_jit import _S1_S2_from_ab_nb as S1_S2_from_ab
     from .mie_jit import _S1_S2_nb as _S1_S2
+    from .mie_jit import _an_bn_into_nb as an_bn_into
     from .mie_jit import _an_bn_nb as an_bn
     from .mie_jit import _cn_dn_nb as cn_dn
+    from .mie_jit import _efficiencies_batch_nb as efficiencies_batch
+    from .mie_jit import _efficiencies_from_ab_nb as efficiencies_from_ab
+    from .mie_jit import _efficiencies_parallel_nb as _efficiencies_parallel
+    from .mie_jit import _near_field_nb as near_field
     from .mie_jit import _pi_tau_nb as pi_tau
+    from .mie_jit import _pi_tau_table_nb as pi_tau_table
+    from .mie_jit import _qext_qsca_from_ab_nb as qext_qsca_from_ab
+    from .mie_jit import _series_terms_nb as series_terms
     from .mie_jit import _single_sphere_nb as single_sphere
+    from .mie_jit import _single_sphere_ws_nb as single_sphere_ws
     from .mie_jit import _small_conducting_sphere_nb as small_conducting_sphere
     from .mie_jit import _small_sphere_nb as small_sphere
+    from .mie_jit import _workspace_nb as workspace
+    from .mie_jit import _workspace_order_nb as workspace_order
 else:
     from .mie_nojit import _D_calc_py as D_calc
     from .mie_nojit import _D_downwards
     from .mie_nojit import _D_upwards
     from .mie_nojit import _Lentz_Dn
+    from .mie_nojit import _S1_S2_batch_py as _S1_S2_batch
     from .mie_nojit import _S1_S2_py as _S1_S2
+    from .mie_nojit import _an_bn_into_py as an_bn_into
     from .mie_nojit import _an_bn_py as an_bn
     from .mie_nojit import _cn_dn_py as cn_dn
+    from .mie_nojit import _efficiencies_from_ab_py as efficiencies_from_ab
+    from .mie_nojit import _efficiencies_parallel_py as _efficiencies_parallel
+    from .mie_nojit import _near_field_py as near_field
     from .mie_nojit import _pi_tau_py as pi_tau
+    from .mie_nojit import _pi_tau_table_py as pi_tau_table
+    from .mie_nojit import _qext_qsca_from_ab_py as qext_qsca_from_ab
+    from .mie_nojit import _series_terms_py as series_terms
     from .mie_nojit import _single_sphere_py as single_sphere
+    from .mie_nojit import _single_sphere_ws_py as single_sphere_ws
     from .mie_nojit import _small_conducting_sphere_py as small_conducting_sphere
     from .mie_nojit import _small_sphere_py as small_sphere
+    from .mie_nojit import _workspace_order_py as workspace_order
+    from .mie_nojit import _workspace_py as workspace
+    from .mie_vector import _S1_S2_efficiencies_vec as _S1_S2_efficiencies
+    from .mie_vector import _S1_S2_from_ab_vec as S1_S2_from_ab
+    from .mie_vector import _efficiencies_batch_vec as efficiencies_batch
+
+from .mie_vector import _S1_S2_from_ab_vec as S1_S2_dense
+from .mie_vector import _an_bn_vec as an_bn_block
+from .mie_vector import _spherical_bessel_table_vec as spherical_bessel_table
 
 __all__ = (
     "USE_JIT",
     "D_calc",
     "an_bn",
+    "an_bn_into",
+    "an_bn_block",
     "cn_dn",
+    "cached_an_bn",
+    "cached_cn_dn",
+    "CacheInfo",
+    "CoefficientCache",
+    "get_coefficient_cache",
+    "set_coefficient_cache",
+    "MieWorkspace",
+    "workspace",
+    "workspace_order",
+    "efficiencies_batch",
+    "efficiencies_from_ab",
+    "efficiencies_threaded",
+    "partition_by_cost",
+    "resolve_threads",
+    "near_field",
     "pi_tau",
+    "pi_tau_table",
+    "qext_qsca_from_ab",
+    "S1_S2_dense",
+    "S1_S2_from_ab",
+    "series_terms",
     "single_sphere",
+    "single_sphere_ws",
+    "spherical_bessel_table",
     "small_sphere",
     "small_conducting_sphere",
     "_S1_S2",
+    "_S1_S2_batch",
+    "_S1_S2_efficiencies",
     "_Lentz_Dn",
     "_D_upwards",
     "_D_downwards",
 )
+
+
+def resolve_threads(threads=None):
+    """
+    Return the number of threads a batch calculation should use.
+
+    Args:
+        threads: requested count; None reads ``MIEPYTHON_NUM_THREADS`` and 0 asks
+            for every thread the backend has
+
+    Returns:
+        a thread count of at least one
+    """
+    if threads is None:
+        threads = os.environ.get("MIEPYTHON_NUM_THREADS", "1")
+
+    try:
+        n_threads = int(threads)
+    except (TypeError, ValueError):
+        raise ValueError("the thread count must be a non-negative integer, not %r" % (threads,)) from None
+
+    if n_threads < 0:
+        raise ValueError("the thread count must be a non-negative integer, not %r" % (threads,))
+
+    if not USE_JIT:
+        return 1
+
+    import numba  # pylint: disable=import-outside-toplevel
+
+    # numba fills in its config module at run time, which pylint cannot follow
+    pool_size = numba.config.NUMBA_NUM_THREADS  # pylint: disable=no-member
+    if n_threads == 0:
+        return pool_size
+    return min(n_threads, pool_size)
+
+
+def partition_by_cost(x, n_chunks):
+    """
+    Deal the spheres out into chunks of roughly equal work.
+
+    The work for one sphere grows with the number of series terms, which
+    Wiscombe's criterion puts at about x, plus a fixed overhead for Miller's
+    recurrence starting some 25 orders higher.  Splitting a log-uniform
+    population into contiguous chunks would hand one thread every large sphere,
+    so the spheres are sorted by that cost and dealt out snake fashion -- 0, 1,
+    ..., n-1, n-1, ..., 1, 0, 0, 1, ... -- which leaves no two chunks more than
+    one sphere's cost apart.
+
+    Args:
+        x: array of size parameters
+        n_chunks: number of chunks to deal into
+
+    Returns:
+        order, bounds: chunk c is made of spheres ``order[bounds[c]:bounds[c+1]]``
+    """
+    # the same expression as core.wiscombe_terms, evaluated for a whole array
+    x_pos = np.maximum(x, 0.0)
+    cost = np.floor(x_pos + 4.05 * x_pos**0.33333 + 2.0) + 25.0
+
+    by_cost = np.argsort(-cost, kind="stable")
+    position = np.arange(len(x), dtype=np.int64)
+    lap, seat = np.divmod(position, n_chunks)
+    chunk = np.where(lap % 2 == 0, seat, n_chunks - 1 - seat)
+
+    within = np.argsort(chunk, kind="stable")
+    order = by_cost[within].astype(np.int64)
+    bounds = np.zeros(n_chunks + 1, dtype=np.int64)
+    bounds[1:] = np.cumsum(np.bincount(chunk, minlength=n_chunks))
+    return order, bounds
+
+
+def efficiencies_threaded(m, x, n_pole, e_field, tol, out, threads):
+    """
+    Fill ``out`` with the efficiencies of every sphere, spread over threads.
+
+    One thread runs the serial batch kernel.  More deal the spheres into one
+    cost-balanced chunk per thread with ``partition_by_cost`` and run the
+    ``prange`` kernel with numba's pool limited to ``threads`` for the length of
+    the call, then put the previous limit back so other numba code in the
+    process is left as it was.
+
+    Args:
+        m: array of complex indices of refraction, one per sphere
+        x: array of size parameters, the same length as m
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects the electric (True) or magnetic (False) multipole
+        tol: the accuracy the full series is summed to, 0 for Wiscombe's count
+        out: gets filled with qext, qsca, qback and g, shape (4, len(x))
+        threads: thread count, already passed through ``resolve_threads``
+    """
+    if threads <= 1:
+        efficiencies_batch(m, x, n_pole, e_field, tol, out)
+        return
+
+    import numba  # pylint: disable=import-outside-toplevel
+
+    order, bounds = partition_by_cost(x, threads)
+    previous = numba.get_num_threads()
+    numba.set_num_threads(threads)
+    try:
+        _efficiencies_parallel(m, x, n_pole, e_field, tol, order, bounds, out)
+    finally:
+        numba.set_num_threads(previous)
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "entries", "nbytes", "max_bytes"])
+
+
+class CoefficientCache:
+    """
+    A least-recently-used store of Mie coefficients, bounded in bytes.
+
+    Entries are keyed by the kind of coefficients, m, x and n_pole.  With a
+    tolerance, m and x are first rounded to the nearest multiple of it and the
+    coefficients are computed for the rounded values, so every sphere that
+    rounds to the same key gets the same coefficients whichever came first.
+    An index with a positive imaginary part is conjugated before rounding, as
+    the kernels would do anyway.
+
+    Attributes:
+        max_bytes: the most the stored arrays may occupy together
+        x_tol: the step x is rounded to, 0 for exact keys
+        m_tol: the step the real and imaginary parts of m are rounded to
+    """
+
+    def __init__(self, max_bytes, x_tol=0.0, m_tol=0.0):
+        """
+        Start an empty cache.
+
+        Args:
+            max_bytes: the most the stored arrays may occupy together
+            x_tol: the step x is rounded to, 0 for exact keys
+            m_tol: the step the real and imaginary parts of m are rounded to
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative, not %r" % (max_bytes,))
+        if x_tol < 0 or m_tol < 0:
+            raise ValueError("the tolerances must not be negative")
+        self.max_bytes = int(max_bytes)
+        self.x_tol = float(x_tol)
+        self.m_tol = float(m_tol)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._nbytes = 0
+
+    def _key(self, m, x):
+        """Return m and x as they are stored: conjugated as needed and rounded."""
+        m = complex(m)
+        if m.imag > 0:
+            m = m.conjugate()
+        x = float(x)
+        if self.m_tol > 0:
+            m = complex(round(m.real / self.m_tol) * self.m_tol, round(m.imag / self.m_tol) * self.m_tol)
+        if self.x_tol > 0:
+            x = round(x / self.x_tol) * self.x_tol
+        # -0.0 and 0.0 are the same key already; this keeps the value passed on tidy
+        return complex(m.real, m.imag + 0.0), x
+
+    def lookup(self, func, m, x, n_pole):
+        """
+        Return ``func(m, x, n_pole)``, from the store when it is there.
+
+        The computation runs outside the lock, so two threads asking for the same
+        missing sphere may both compute it; the second result simply replaces the
+        first.
+
+        Args:
+            func: ``an_bn`` or ``cn_dn``
+            m: the complex index of refraction of the sphere
+            x: the size parameter of the sphere
+            n_pole: the number of terms, 0 for Wiscombe's estimate
+
+        Returns:
+            the pair of coefficient arrays; callers must not modify them
+        """
+        m, x = self._key(m, x)
+        key = (func.__name__, m, x, int(n_pole))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._misses += 1
+
+        entry = func(np.complex128(m), x, int(n_pole))
+        size = entry[0].nbytes + entry[1].nbytes
+        if size > self.max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._nbytes -= previous[0].nbytes + previous[1].nbytes
+            self._entries[key] = entry
+            self._nbytes += size
+            while self._nbytes > self.max_bytes:
+                _, oldest = self._entries.popitem(last=False)
+                self._nbytes -= oldest[0].nbytes + oldest[1].nbytes
+                self._evictions += 1
+        return entry
+
+    def info(self):
+        """Return the hit, miss and eviction counts and the current size."""
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, len(self._entries), self._nbytes, self.max_bytes
+            )
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = self._nbytes = 0
+
+
+_coefficient_cache = None
+
+
+def get_coefficient_cache():
+    """Return the installed ``CoefficientCache``, or None when caching is off."""
+    return _coefficient_cache
+
+
+def set_coefficient_cache(cache):
+    """
+    Install a ``CoefficientCache`` for ``cached_an_bn`` and ``cached_cn_dn``.
+
+    Args:
+        cache: the cache to use, or None to compute every series afresh
+    """
+    global _coefficient_cache  # pylint: disable=global-statement
+    _coefficient_cache = cache
+
+
+def cached_an_bn(m, x, n_pole):
+    """Return ``an_bn(m, x, n_pole)``, through the coefficient cache when one is installed."""
+    cache = _coefficient_cache
+    if cache is None:
+        return an_bn(m, x, n_pole)
+    return cache.lookup(an_bn, m, x, n_pole)
+
+
+def cached_cn_dn(m, x, n_pole):
+    """Return ``cn_dn(m, x, n_pole)``, through the coefficient cache when one is installed."""
+    cache = _coefficient_cache
+    if cache is None:
+        return cn_dn(m, x, n_pole)
+    return cache.lookup(cn_dn, m, x, n_pole)
+
+
+class MieWorkspace:
+    """
+    Buffers for the Mie series, kept between spheres and grown on demand.
+
+    The four arrays are the ones ``workspace`` allocates: psi_n as float64, and
+    D_n, a_n and b_n as complex128.  They are sized for a maximum order, which
+    ``reserve`` raises by at least half again whenever a sphere needs more, so a
+    sweep of growing spheres reallocates only a handful of times.  The buffers
+    are overwritten by every call that uses them, so each thread needs its own.
+
+    Attributes:
+        n_max: the largest ``workspace_order`` the buffers hold
+        psi, D, a, b: the buffers, to pass to the ``*_into`` and ``*_ws`` kernels
+    """
+
+    def __init__(self, n_max=0):
+        """
+        Allocate buffers for spheres up to order n_max.
+
+        Args:
+            n_max: the order to start from; the buffers grow as needed
+        """
+        if n_max < 0:
+            raise ValueError("n_max must not be negative, not %r" % (n_max,))
+        self.n_max = int(n_max)
+        self.psi, self.D, self.a, self.b = workspace(self.n_max)
+
+    def reserve(self, x, n_pole=0):
+        """
+        Make sure the buffers hold a sphere of size x and return them.
+
+        Args:
+            x: the size parameter of the sphere
+            n_pole: the number of terms, 0 for Wiscombe's estimate
+
+        Returns:
+            psi, D, a, b: the buffers, possibly new ones
+        """
+        n_max = workspace_order(float(x), int(n_pole))
+        if n_max > self.n_max:
+            self.n_max = max(n_max, self.n_max + self.n_max // 2)
+            self.psi, self.D, self.a, self.b = workspace(self.n_max)
+        return self.psi, self.D, self.a, self.b
+
+    def single_sphere(self, m, x, n_pole, e_field):
+        """Return ``single_sphere(m, x, n_pole, e_field)``, computed in these buffers."""
+        return single_sphere_ws(m, x, n_pole, e_field, *self.reserve(x, n_pole))
+
+    @property
+    def nbytes(self):
+        """Return the memory the buffers occupy."""
+        return self.psi.nbytes + self.D.nbytes + self.a.nbytes + self.b.nbytes
+
+    def __repr__(self):
+        """Return the size of the workspace."""
+        return "MieWorkspace(n_max=%d, %d bytes)" % (self.n_max, self.nbytes)
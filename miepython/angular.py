@@ -0,0 +1,90 @@
+"""
+Tables of the angular functions pi_n and tau_n, shared between calls.
+
+The scattering amplitudes of every sphere are sums over the orders n of a_n and
+b_n weighted by pi_n(mu) and tau_n(mu).  Those two functions depend only on the
+angle and the order, not on the sphere, so a calculation that revisits the same
+angles -- a sweep over wavelength, a size distribution, a fit -- can compute them
+once and keep them.  An ``AngularTable`` holds them for a grid of mu, and
+``S1_S2``, ``phase_matrix`` and the intensity functions take one through their
+``angles`` argument::
+
+    import numpy as np
+    import miepython as mie
+
+    table = mie.AngularTable(np.linspace(-1, 1, 181), 60)
+    for x in np.linspace(1, 50, 100):
+        s1, s2 = mie.S1_S2(1.5, x, angles=table)
+
+The table grows on demand: a sphere whose series is longer than the orders
+already tabulated extends it before its amplitudes are summed.
+"""
+
+import numpy as np
+
+from ._backend import pi_tau_table
+
+__all__ = ("AngularTable",)
+
+
+class AngularTable:
+    """
+    The angular functions pi_n(mu) and tau_n(mu) on a fixed grid of angles.
+
+    Attributes:
+        mu: the angles, cos(theta), as a read-only float64 array
+        pi: array of shape (len(mu), n_max), row k holding pi_1 .. pi_n_max at mu[k]
+        tau: array of the same shape holding tau_1 .. tau_n_max
+    """
+
+    def __init__(self, mu, n_max):
+        """
+        Tabulate pi_n and tau_n.
+
+        Args:
+            mu: the angles, cos(theta). A scalar, list, tuple or array is
+                accepted; a scalar is treated as one angle.
+            n_max: the highest order to tabulate now, at least one
+
+        Examples:
+            >>> import numpy as np
+            >>> import miepython as mie
+            >>> table = mie.AngularTable(np.array([1.0, 0.0, -1.0]), 3)
+            >>> table.pi
+            array([[ 1. ,  3. ,  6. ],
+                   [ 1. ,  0. , -1.5],
+                   [ 1. , -3. ,  6. ]])
+        """
+        self.mu = np.atleast_1d(np.asarray(mu, dtype=np.float64)).copy()
+        if self.mu.ndim != 1:
+            raise ValueError("the angles of an AngularTable must be a scalar or a one-dimensional array")
+        self.mu.flags.writeable = False
+        self.pi = np.empty((self.mu.size, 0))
+        self.tau = np.empty((self.mu.size, 0))
+        self.extend(n_max)
+
+    @property
+    def n_max(self):
+        """The number of orders tabulated so far."""
+        return self.pi.shape[1]
+
+    def extend(self, n_max):
+        """
+        Make sure orders 1 through n_max are tabulated.
+
+        The recurrence is rerun from the start, which costs no more than
+        continuing it and keeps every entry identical to what ``pi_tau`` gives.
+
+        Args:
+            n_max: the highest order needed
+        """
+        n_max = int(n_max)
+        if n_max < 1:
+            raise ValueError("an AngularTable needs at least one order, not %d" % n_max)
+        if n_max > self.n_max:
+            # the numba kernel is declared for a writeable array, so it gets a copy
+            self.pi, self.tau = pi_tau_table(self.mu.copy(), n_max)
+
+    def __repr__(self):
+        """Describe the grid and how many orders it holds."""
+        return "AngularTable(%d angles, n_max=%d)" % (self.mu.size, self.n_max)
@@ -31,10 +31,32 @@ Normalized Mie scattering intensities for angles mu=cos(theta)::
     mie.i_per(m, x, mu)
     mie.i_par(m, x, mu)
     mie.i_unpolarized(m, x, mu)
+
+Programs that keep returning to the same spheres can keep their Mie coefficients
+between calls::
+
+    mie.enable_coefficient_cache(max_bytes=2**26, x_tol=1e-9)
+    mie.coefficient_cache_info()
 """
 
 import numpy as np
-from ._backend import _S1_S2, an_bn, cn_dn, single_sphere
+from .angular import AngularTable
+from ._backend import (
+    S1_S2_dense,
+    _S1_S2_batch,
+    _S1_S2_efficiencies,
+    CoefficientCache,
+    S1_S2_from_ab,
+    cached_an_bn,
+    cached_cn_dn,
+    get_coefficient_cache,
+    set_coefficient_cache,
+    efficiencies_threaded,
+    qext_qsca_from_ab,
+    resolve_threads,
+    series_terms as _series_terms,
+    single_sphere,
+)
 
 # not really needed but included for clarity
 __all__ = (
@@ -48,7 +70,11 @@ __all__ = (
     "phase_matrix",
     "coefficients",
     "wiscombe_terms",
+    "series_terms",
     "normalization_factor",
+    "enable_coefficient_cache",
+    "disable_coefficient_cache",
+    "coefficient_cache_info",
 )
 
 
@@ -69,6 +95,41 @@ def wiscombe_terms(x):
     return int(x + 4.05 * x**0.33333 + 2.0)
 
 
+def series_terms(x, tol=None):
+    """
+    Return the number of Mie series terms that sum to within a tolerance.
+
+    Beyond order x the terms fall off faster than exponentially, over a band of
+    orders whose width grows like x**(1/3).  The count keeps the form of
+    Wiscombe's criterion, x + c * x**(1/3) + 2, with c = 1.6 * sqrt(ln(1/tol))
+    fitted, with a margin, to the order past which qext, qsca, qback and g of
+    random spheres up to x = 2000 changed by less than tol.  A tolerance of 1e-2
+    needs fewer terms than Wiscombe's criterion and 1e-6 or less needs more.
+
+    Below about 1e-10 rounding in the sums, rather than the truncation, sets the
+    accuracy of qback for large spheres, so more terms stop helping.
+
+    Args:
+        x: the size parameter of the sphere
+        tol: (optional) the accuracy wanted; None gives Wiscombe's criterion
+
+    Returns:
+        number of terms, so orders 1 through the returned value
+    """
+    return int(_series_terms(float(x), _tolerance(tol)))
+
+
+def _tolerance(tol, n_pole=0):
+    """Return tol as the float the kernels take, 0 for none, after checking it."""
+    if tol is None:
+        return 0.0
+    if not 0 < tol < 1:
+        raise ValueError("tol must be between 0 and 1, not %r" % (tol,))
+    if n_pole != 0:
+        raise ValueError("tol sets the length of the whole series; it cannot be combined with n_pole")
+    return float(tol)
+
+
 def coefficients(m, x, n_pole=0, internal=False):
     """
     Computes the Mie coefficients for a sphere.
@@ -127,9 +188,9 @@ def coefficients(m, x, n_pole=0, internal=False):
     xlen = np.size(x) if np.ndim(x) > 0 else 0
 
     if mlen == 0 and xlen == 0:
-        a, b = an_bn(m, x, n_pole)
+        a, b = cached_an_bn(m, x, n_pole)
         if internal:
-            c, d = cn_dn(m, x, n_pole)
+            c, d = cached_cn_dn(m, x, n_pole)
 
     else:
         if xlen > 0 and mlen > 0 and xlen != mlen:
@@ -150,16 +211,16 @@ def coefficients(m, x, n_pole=0, internal=False):
             mm = m[i] if mlen > 0 else m
             xx = x[i] if xlen > 0 else x
 
-            a[i], b[i] = an_bn(mm, xx, n_pole)
+            a[i], b[i] = cached_an_bn(mm, xx, n_pole)
             if internal:
-                c[i], d[i] = cn_dn(mm, xx, n_pole)
+                c[i], d[i] = cached_cn_dn(mm, xx, n_pole)
 
     if internal:
         return np.array([a, b, c, d])
     return np.array([a, b])
 
 
-def efficiencies_mx(m, x, n_pole=0, e_field=True):
+def efficiencies_mx(m, x, n_pole=0, e_field=True, threads=None, tol=None):
     """
     Computes scattering and extinction efficiencies for a spherical particle using Mie theory.
 
@@ -184,6 +245,18 @@ def efficiencies_mx(m, x, n_pole=0, e_field=True):
             True gives the electric multipole a_n, False the magnetic
             multipole b_n. The two add up to the full order-n_pole
             contribution for qext and qsca. Ignored when n_pole is 0.
+        threads (int, optional):
+            Number of threads for array input.  None (the default) reads the
+            ``MIEPYTHON_NUM_THREADS`` environment variable, which defaults to one,
+            and 0 uses every thread numba has.  Only the numba backend runs more
+            than one thread; the pure-python backend ignores this.
+        tol (float, optional):
+            Accuracy wanted in the efficiencies.  The series of each sphere is
+            cut after ``series_terms(x, tol)`` orders, fewer than Wiscombe's
+            criterion for a loose tolerance and more for a tight one, and small
+            dielectric spheres are summed rather than given the small-sphere
+            formula.  None (the default) keeps Wiscombe's criterion, good to
+            about 1e-6.  It cannot be combined with n_pole.
 
     Returns:
         tuple:
@@ -234,6 +307,8 @@ def efficiencies_mx(m, x, n_pole=0, e_field=True):
     else:
         m = np.where(np.imag(m) > 0, np.conj(m), m)
 
+    tol = _tolerance(tol, n_pole)
+
     mlen = 0
     if hasattr(m, "__len__"):
         mlen = len(m)
@@ -242,29 +317,28 @@ def efficiencies_mx(m, x, n_pole=0, e_field=True):
     if hasattr(x, "__len__"):
         xlen = len(x)
 
-    if mlen == 0 and xlen == 0:
+    if mlen == 0 and xlen == 0 and tol == 0:
         return single_sphere(m, x, n_pole, e_field)
 
     if xlen > 0 and mlen > 0 and xlen != mlen:
         raise RuntimeError("m and x arrays to mie must be same length")
 
-    thelen = max(xlen, mlen)
-    qext = np.empty(thelen, dtype=np.float64)
-    qsca = np.empty(thelen, dtype=np.float64)
-    qback = np.empty(thelen, dtype=np.float64)
-    g = np.empty(thelen, dtype=np.float64)
-
-    mm = m
-    xx = x
-    for i in range(thelen):
-        if mlen > 0:
-            mm = m[i]
-
-        if xlen > 0:
-            xx = x[i]
+    # The whole sweep goes to the backend in one call, which for numba means the
+    # loop over spheres is compiled too.  The kernel is declared for contiguous
+    # complex128 and float64 arrays, writeable ones at that, so both inputs are
+    # copied into fresh buffers and a scalar partner is broadcast out here.
+    thelen = max(xlen, mlen, 1)
+    m_array = np.empty(thelen, dtype=np.complex128)
+    x_array = np.empty(thelen, dtype=np.float64)
+    m_array[:] = m
+    x_array[:] = x
 
-        qext[i], qsca[i], qback[i], g[i] = single_sphere(mm, xx, n_pole, e_field)
+    out = np.empty((4, thelen), dtype=np.float64)
+    efficiencies_threaded(m_array, x_array, int(n_pole), bool(e_field), tol, out, resolve_threads(threads))
 
+    qext, qsca, qback, g = out
+    if mlen == 0 and xlen == 0:
+        return float(qext[0]), float(qsca[0]), float(qback[0]), float(g[0])
     return qext, qsca, qback, g
 
 
@@ -332,7 +406,7 @@ def normalization_factor(m, x, norm_str, efficiency_source=_mie_efficiencies):
     return factor
 
 
-def S1_S2(m, x, mu, norm="albedo", n_pole=0):
+def S1_S2(m, x, mu=None, norm="albedo", n_pole=0, angles=None, max_memory=None, tol=None):
     """
     Calculate the scattering amplitude functions for spheres.
 
@@ -346,9 +420,22 @@ def S1_S2(m, x, mu, norm="albedo", n_pole=0):
 
     The units are weird, sr**(-0.5)
 
+    A population of spheres sharing one set of angles is handled in a single
+    call by passing arrays for m or x (or both, of the same length).  The
+    angular functions are then computed once for the whole population, and S1
+    and S2 come back with one row per sphere.  Calls that keep returning to the
+    same angles can pass an ``AngularTable`` as ``angles`` instead of ``mu``,
+    and those functions are then not recomputed at all.
+
+    Very many angles are better summed as dense matrix products, which NumPy
+    hands to BLAS (and so to as many cores as BLAS uses).  Giving ``max_memory``
+    asks for that: pi_n and tau_n are tabulated for blocks of angles small enough
+    that the tables fit in that many bytes.  Without numba this is how the
+    amplitudes are always summed, with a budget of 64 MiB.
+
     Args:
-        m: the complex index of refraction of the sphere
-        x: the size parameter of the sphere
+        m: the complex index of refraction of the sphere, or an array of them
+        x: the size parameter of the sphere, or an array of them
         mu: the angles, cos(theta), to calculate scattering amplitudes. A scalar,
             list, tuple or array is accepted; a scalar is treated as one angle,
             so the returned amplitudes are still length-one arrays.
@@ -358,33 +445,186 @@ def S1_S2(m, x, mu, norm="albedo", n_pole=0):
             every order reproduces the full series, so n_pole uses the same
             convention as `efficiencies_mx`. Orders beyond the truncated
             series raise a ValueError.
+        angles: (optional) an ``AngularTable`` to use in place of ``mu``; it is
+            extended if the series needs more orders than it holds
+        max_memory: (optional) bytes for the tables of pi_n and tau_n.  For one
+            sphere this selects the dense matrix products; for arrays of m or x
+            it caps the shared table by working through the angles in blocks.
+            It has no effect when ``angles`` is given, since that table exists.
+        tol: (optional) accuracy wanted in the amplitudes relative to the largest
+            of them.  The series is cut after ``series_terms(x, tol)`` orders, as
+            in `efficiencies_mx`, whose series with the same tol normalizes the
+            amplitudes.  None (the default) keeps Wiscombe's criterion.  It
+            cannot be combined with n_pole.
 
     Returns:
-        S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)]
+        S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)], with
+        shape (len(m or x), len(mu)) when m or x is an array
     """
+    mu_array = _angles_or_mu(mu, angles)
+    tol = _tolerance(tol, n_pole)
+
+    # a tolerance goes through the batch kernel even for one sphere, which sizes
+    # the series per sphere; the single-sphere kernels only know Wiscombe's count
+    if angles is not None or np.ndim(m) > 0 or np.ndim(x) > 0 or tol > 0:
+        S1, S2 = _S1_S2_spheres(m, x, mu_array, norm, n_pole, angles, max_memory, tol)
+        if np.ndim(m) == 0 and np.ndim(x) == 0:
+            return S1[0], S2[0]
+        return S1, S2
+
     if np.imag(m) > 0:  # ensure imaginary part of refractive index is negative
         m = np.conj(m)
 
+    # one call finds a_n and b_n and sums both the amplitudes and the
+    # efficiencies that normalize them, rather than solving the sphere twice;
+    # with the coefficient cache on, a_n and b_n may already be known
+    if max_memory is None and get_coefficient_cache() is None:
+        S1, S2, qext, qsca = _S1_S2_efficiencies(m, x, mu_array, n_pole)
+    else:
+        m = np.complex128(m)
+        a, b = cached_an_bn(m, x, 0)
+        if max_memory is None:
+            S1, S2 = S1_S2_from_ab(a, b, mu_array, n_pole)
+        else:
+            S1, S2 = S1_S2_dense(a, b, mu_array, n_pole, max_memory)
+        qext, qsca = qext_qsca_from_ab(m, x, a, b)
+
+    normalization = normalization_factor(m, x, norm, efficiency_source=lambda _m, _x: (qext, qsca, None, None))
+
+    S1 /= normalization
+    S2 /= normalization
+
+    return S1, S2
+
+
+def enable_coefficient_cache(max_bytes=64 * 2**20, x_tol=0.0, m_tol=0.0):
+    """
+    Keep Mie coefficients between calls, up to a memory budget.
+
+    Once enabled, ``coefficients``, the near fields built on it and ``S1_S2``
+    for a single sphere (and so ``phase_matrix`` and the intensities) look up
+    a_n, b_n, c_n and d_n before computing them.  The least recently used
+    series are dropped once the stored arrays exceed ``max_bytes``.  Array
+    sweeps of ``efficiencies_mx`` and ``S1_S2`` stay in the compiled batch
+    kernels and do not use the cache.
+
+    With a tolerance, x and the real and imaginary parts of m are rounded to a
+    multiple of it before the lookup, and the coefficients are those of the
+    rounded sphere.  Spheres that differ by less than the tolerance then share
+    one entry, at the price of an error of that order.
+
+    Calling this again replaces the cache with an empty one.
+
+    Args:
+        max_bytes: (optional) the most the cached arrays may occupy, 64 MiB by default
+        x_tol: (optional) step that x is rounded to; 0 keys on the exact value
+        m_tol: (optional) step that m is rounded to; 0 keys on the exact value
+
+    Examples:
+        >>> import miepython as mie
+        >>> mie.enable_coefficient_cache(x_tol=1e-6)
+        >>> a, b = mie.coefficients(1.33, 10.0)
+        >>> a, b = mie.coefficients(1.33, 10.0000001)
+        >>> info = mie.coefficient_cache_info()
+        >>> info.hits, info.misses
+        (1, 1)
+        >>> mie.disable_coefficient_cache()
+    """
+    set_coefficient_cache(CoefficientCache(max_bytes, x_tol, m_tol))
+
+
+def disable_coefficient_cache():
+    """Stop caching Mie coefficients and free the cached arrays."""
+    set_coefficient_cache(None)
+
+
+def coefficient_cache_info():
+    """
+    Report how well the coefficient cache is doing.
+
+    Returns:
+        a named tuple of ``hits``, ``misses``, ``evictions``, ``entries``,
+        ``nbytes`` and ``max_bytes``, or None when the cache is disabled
+    """
+    cache = get_coefficient_cache()
+    if cache is None:
+        return None
+    return cache.info()
+
+
+def _angles_or_mu(mu, angles):
+    """Return the angles as a float64 array, whichever way they were given."""
+    if angles is not None:
+        if mu is not None:
+            raise ValueError("give the angles either as mu or as an AngularTable through angles, not both")
+        return angles.mu
+
+    if mu is None:
+        raise TypeError("the angles are missing: pass mu, or an AngularTable through angles")
+
     # The numba kernel is declared for float64[:], so a list or an integer array
     # would be rejected there while numpy accepted it.  Coercing here keeps both
     # backends callable with exactly the same arguments.
-    mu_array = np.atleast_1d(np.asarray(mu, dtype=float))
-    S1, S2 = _S1_S2(m, x, mu_array, n_pole)
+    return np.atleast_1d(np.asarray(mu, dtype=float))
 
-    normalization = normalization_factor(m, x, norm)
 
-    S1 /= normalization
-    S2 /= normalization
+def _S1_S2_spheres(m, x, mu_array, norm, n_pole, angles, max_memory, tol):
+    """Return S1_S2 for arrays of m and x, one row of amplitudes per sphere."""
+    m_flat = np.atleast_1d(m)
+    x_flat = np.atleast_1d(x)
+    if m_flat.ndim > 1 or x_flat.ndim > 1:
+        raise ValueError("m and x must be scalars or one-dimensional arrays")
+    if m_flat.size > 1 and x_flat.size > 1 and m_flat.size != x_flat.size:
+        raise RuntimeError("m and x arrays to mie must be same length")
+
+    # fresh contiguous buffers of the types the numba kernel is declared for
+    n_spheres = max(m_flat.size, x_flat.size)
+    m_array = np.empty(n_spheres, dtype=np.complex128)
+    x_array = np.empty(n_spheres, dtype=np.float64)
+    m_array[:] = m_flat
+    x_array[:] = x_flat
+    m_array = np.where(m_array.imag > 0, np.conj(m_array), m_array)
+
+    S1 = np.empty((n_spheres, len(mu_array)), dtype=np.complex128)
+    S2 = np.empty((n_spheres, len(mu_array)), dtype=np.complex128)
+    q = np.empty((4, n_spheres), dtype=np.float64)
+
+    # series_terms grows with x, so the largest sphere has the longest series
+    n_needed = int(_series_terms(x_array.max(), tol)) if np.any(x_array > 0) else 1
+    if angles is not None:
+        angles.extend(n_needed)
+        _S1_S2_batch(m_array, x_array, angles.pi, angles.tau, int(n_pole), tol, S1, S2, q)
+    else:
+        # two float64 tables of n_needed orders for each angle in a block; the
+        # coefficients are found again for every block, but that is O(n) work
+        # against the O(n * angles) of the sums
+        block = len(mu_array) if max_memory is None else int(max_memory) // (16 * n_needed)
+        block = max(block, 1)
+        for start in range(0, max(len(mu_array), 1), block):
+            table = AngularTable(mu_array[start : start + block], n_needed)
+            stop = start + len(table.mu)
+            S1_block = S1[:, start:stop]
+            S2_block = S2[:, start:stop]
+            _S1_S2_batch(m_array, x_array, table.pi, table.tau, int(n_pole), tol, S1_block, S2_block, q)
+
+    for i in range(n_spheres):
+        qext, qsca = q[0, i], q[1, i]
+        normalization = normalization_factor(
+            m_array[i], x_array[i], norm, efficiency_source=lambda _m, _x, qe=qext, qs=qsca: (qe, qs, None, None)
+        )
+        S1[i] /= normalization
+        S2[i] /= normalization
 
     return S1, S2
 
 
-def phase_matrix(m, x, mu, norm="albedo", n_pole=0):
+def phase_matrix(m, x, mu=None, norm="albedo", n_pole=0, angles=None):
     """
     Calculate the scattering (Mueller) matrix.
 
     If mu has length N, then the returned matrix is 4x4xN.  If mu is a scalar
-    then the matrix is 4x4
+    then the matrix is 4x4.  Arrays of m or x give one such matrix per sphere,
+    stacked along a new first axis.
 
     The phase scattering matrix is computed from the scattering amplitude
     functions, according to equations 5.2.105-6 in K. N. Liou (**2002**) -
@@ -401,19 +641,20 @@ def phase_matrix(m, x, mu, norm="albedo", n_pole=0):
     function over all 4𝜋 steradians.
 
     Args:
-        m: the complex index of refraction of the sphere
-        x: the size parameter of the sphere
+        m: the complex index of refraction of the sphere, or an array of them
+        x: the size parameter of the sphere, or an array of them
         mu: the angles, cos(theta), of the phase scattering matrix. Unlike the
             other angular functions this one squeezes a single angle away, so a
             scalar gives a bare 4x4 matrix rather than 4x4x1.
         n_pole: return n_pole term from series (default=0 means include all terms)
         norm: (optional) string describing scattering function normalization
+        angles: (optional) an ``AngularTable`` to use in place of ``mu``
 
     Returns:
         p: the phase scattering matrix [sr**(-1.0)]
     """
-    mu = np.atleast_1d(mu)
-    s1, s2 = S1_S2(m=m, x=x, mu=mu, norm=norm, n_pole=n_pole)
+    s1, s2 = S1_S2(m=m, x=x, mu=mu, norm=norm, n_pole=n_pole, angles=angles)
+    n_angles = s1.shape[-1]
 
     s1_star = np.conjugate(s1)
     s2_star = np.conjugate(s2)
@@ -421,7 +662,7 @@ def phase_matrix(m, x, mu, norm="albedo", n_pole=0):
     m2 = (s2 * s2_star).real
     s21 = (0.5 * (s1 * s2_star + s2 * s1_star)).real
     d21 = (-0.5j * (s1 * s2_star - s2 * s1_star)).real
-    phase = np.zeros(shape=(4, 4, mu.size))
+    phase = np.zeros(shape=(4, 4) + s1.shape)
     phase[0, 0] = 0.5 * (m2 + m1)
     phase[0, 1] = 0.5 * (m2 - m1)
     phase[1, 0] = phase[0, 1]
@@ -431,10 +672,14 @@ def phase_matrix(m, x, mu, norm="albedo", n_pole=0):
     phase[3, 2] = d21
     phase[3, 3] = s21
 
+    if s1.ndim == 2:
+        phase = np.moveaxis(phase, 2, 0)
+        return phase[..., 0] if n_angles == 1 else phase
+
     return phase.squeeze()
 
 
-def i_per(m, x, mu, norm="albedo", n_pole=0):
+def i_per(m, x, mu=None, norm="albedo", n_pole=0, angles=None):
     """
     Compute the scattered intensity for perpendicular incident light.
 
@@ -456,16 +701,17 @@ def i_per(m, x, mu, norm="albedo", n_pole=0):
         norm (str, optional): Normalization method for the scattered intensity. Default is 'albedo'.
         n_pole (int, optional): If greater than zero, returns only the nth multipole term;
             default is 0, which returns the sum of all terms.
+        angles (AngularTable, optional): tabulated angles to use in place of `mu`.
 
     Returns:
         np.ndarray: Scattered intensity values at each angle specified by `mu`. Units: [1/sr].
     """
-    s1, _ = S1_S2(m, x, mu, norm, n_pole)
+    s1, _ = S1_S2(m, x, mu, norm, n_pole, angles)
     intensity = np.abs(s1) ** 2
     return intensity.astype("float")
 
 
-def i_par(m, x, mu, norm="albedo", n_pole=0):
+def i_par(m, x, mu=None, norm="albedo", n_pole=0, angles=None):
     """
     Compute the scattered intensity for parallel incident light.
 
@@ -487,16 +733,17 @@ def i_par(m, x, mu, norm="albedo", n_pole=0):
         norm (str, optional): Normalization method for the scattered intensity. Default is 'albedo'.
         n_pole (int, optional): If greater than zero, returns only the nth multipole term;
             default is 0, which returns the sum of all terms.
+        angles (AngularTable, optional): tabulated angles to use in place of `mu`.
 
     Returns:
         np.ndarray: Scattered intensity values at each angle specified by `mu`. Units: [1/sr].
     """
-    _, s2 = S1_S2(m, x, mu, norm, n_pole)
+    _, s2 = S1_S2(m, x, mu, norm, n_pole, angles)
     intensity = np.abs(s2) ** 2
     return intensity.astype("float")
 
 
-def i_unpolarized(m, x, mu, norm="albedo", n_pole=0):
+def i_unpolarized(m, x, mu=None, norm="albedo", n_pole=0, angles=None):
     """
     Return the unpolarized scattered intensity at specified angles.
 
@@ -511,31 +758,37 @@ def i_unpolarized(m, x, mu, norm="albedo", n_pole=0):
     ['albedo', 'one', '4pi', 'qext', 'qsca', 'bohren', or 'wiscombe']
 
     Args:
-        m: the complex index of refraction of the sphere
-        x: the size parameter
+        m: the complex index of refraction of the sphere, or an array of them
+        x: the size parameter, or an array of them
         mu: the cos(theta) of each direction desired. A scalar counts as one
             direction and yields a length-one array, not a bare number.
         norm: (optional) string describing scattering function normalization
         n_pole (int, optional): If greater than zero, returns only the nth multipole term;
             default is 0, which returns the sum of all terms.
+        angles: (optional) an ``AngularTable`` to use in place of ``mu``
 
     Returns:
         The unpolarized intensity at each angle in the array mu.  Units [1/sr]
+        Arrays of m or x give one row per sphere, shape (len(m or x), len(mu)).
     """
-    s1, s2 = S1_S2(m, x, mu, norm, n_pole)
+    s1, s2 = S1_S2(m, x, mu, norm, n_pole, angles)
     intensity = (np.abs(s1) ** 2 + np.abs(s2) ** 2) / 2
     return intensity.astype("float")
 
 
-def efficiencies(m, d, lambda0, n_env=1.0):
+def efficiencies(m, d, lambda0, n_env=1.0, threads=None):
     """
     Calculate the efficiencies of a sphere.
 
     Args:
-        m: the complex index of refraction of the sphere [-]
+        m: the complex index of refraction of the sphere [-], or a function
+            called with ``lambda0`` as given here, in the caller's units, that
+            returns it.  The ``miepython.materials`` dispersions all take
+            microns, so with one of them d and lambda0 must be in microns
         d: the diameter of the sphere                    [same units as lambda0]
         lambda0: wavelength in a vacuum                  [same units as d]
         n_env: real index of medium around sphere, optional.
+        threads: number of threads for array input, see `efficiencies_mx`
 
     Returns:
         qext: the total extinction efficiency                  [-]
@@ -543,12 +796,14 @@ def efficiencies(m, d, lambda0, n_env=1.0):
         qback: the backscatter efficiency                      [-]
         g: the average cosine of the scattering phase function [-]
     """
+    if callable(m):
+        m = m(lambda0)
     m_env = m / n_env
     x_env = np.pi * d / (lambda0 / n_env)
-    return efficiencies_mx(m_env, x_env)
+    return efficiencies_mx(m_env, x_env, threads=threads)
 
 
-def intensities(m, d, lambda0, mu, n_env=1.0, norm="albedo", n_pole=0):
+def intensities(m, d, lambda0, mu=None, n_env=1.0, norm="albedo", n_pole=0, angles=None):
     """
     Return the scattered intensities from a sphere.
 
@@ -566,7 +821,10 @@ def intensities(m, d, lambda0, mu, n_env=1.0, norm="albedo", n_pole=0):
     function over all 4𝜋 steradians.
 
     Args:
-        m: the complex index of refraction of the sphere [-]
+        m: the complex index of refraction of the sphere [-], or a function
+            called with ``lambda0`` as given here, in the caller's units, that
+            returns it.  The ``miepython.materials`` dispersions all take
+            microns, so with one of them d and lambda0 must be in microns
         d: the diameter of the sphere                    [same units as lambda0]
         lambda0: wavelength in a vacuum                  [same units as d]
         mu: the cos(theta) of each direction desired     [-]
@@ -574,14 +832,17 @@ def intensities(m, d, lambda0, mu, n_env=1.0, norm="albedo", n_pole=0):
         norm: (optional) string describing scattering function normalization
         n_pole (int, optional): If greater than zero, returns only the nth multipole term;
             default is 0, which returns the sum of all terms.
+        angles: (optional) an ``AngularTable`` to use in place of ``mu``
 
     Returns:
         ipar, iper: scattered intensity in parallel and perpendicular planes [1/sr]
     """
+    if callable(m):
+        m = m(lambda0)
     m_env = m / n_env
     lambda_env = lambda0 / n_env
     x_env = np.pi * d / lambda_env
-    s1, s2 = S1_S2(m_env, x_env, mu, norm, n_pole)
+    s1, s2 = S1_S2(m_env, x_env, mu, norm, n_pole, angles)
     ipar = np.abs(s2) ** 2
     iper = np.abs(s1) ** 2
     Ipar = ipar.astype("float")
@@ -0,0 +1,554 @@
+"""
+Efficiencies and phase matrices averaged over a distribution of sphere sizes.
+
+Aerosols, cloud droplets and measured particle-size distributions are ensembles,
+and what an ensemble presents to light is the number-weighted mean of the cross
+sections of its members.  The functions here integrate over a distribution of
+diameters and return what a single sphere would report::
+
+    import numpy as np
+    import miepython.distribution as md
+
+    fog = md.Gamma(d_eff=10.0, v_eff=0.1)          # diameters in microns
+    qext, qsca, qback, g = md.efficiencies(1.33, fog, 0.55)
+
+    mu = np.linspace(-1, 1, 181)
+    p = md.phase_matrix(1.33, md.LogNormal(0.2, 1.8), 0.55, mu)
+
+``LogNormal`` and ``Gamma`` are the usual analytic forms, ``Tabulated`` takes a
+density sampled at given diameters and ``Histogram`` takes counts in bins.  Any
+other ``SizeDistribution`` subclass works as long as it gives ``pdf`` and
+``breakpoints``.
+
+The integrals are taken in log-diameter, where both the analytic distributions
+and the cross sections are smooth, with an adaptive 7-point Gauss, 15-point
+Kronrod rule.  The two rules share seven nodes, so every interval costs fifteen
+spheres and yields both an estimate and its error.  Integration starts on the
+intervals between the breakpoints.  For the analytic distributions, which have no
+end, an interval the width of the others is added at either end for as long as
+the outermost one still matters.  The intervals that hold most of the error are
+then halved until the sum of the errors is below ``tol``.
+
+Each round of refinement sends all of its new nodes through ``efficiencies_mx``
+(and ``S1_S2``) at once, so the spheres are solved by the batch kernels rather than
+one Python call at a time.  The series for each sphere is cut for an accuracy ten
+times finer than ``tol`` (see ``miepython.core.series_terms``).
+
+The error is measured relative to each quantity: the mean cross sections, the
+mean of qsca times g against the scattering cross section, and each element of
+the phase matrix at each angle.  Elements that can change sign are measured
+against the two intensities they are bounded by.
+"""
+
+import abc
+import math
+
+import numpy as np
+
+from . import core
+from ._backend import _S1_S2_batch
+from .angular import AngularTable
+
+__all__ = (
+    "SizeDistribution",
+    "LogNormal",
+    "Gamma",
+    "Tabulated",
+    "Histogram",
+    "cross_sections",
+    "efficiencies",
+    "phase_matrix",
+)
+
+# the positive nodes of the 15-point Kronrod rule on [-1, 1], largest first;
+# the odd entries are the nodes of the 7-point Gauss rule
+_XK = np.array(
+    [
+        0.991455371120812639206854697526329,
+        0.949107912342758524526189684047851,
+        0.864864423359769072789712788640926,
+        0.741531185599394439863864773280788,
+        0.586087235467691130294144845693013,
+        0.405845151377397166906606412076961,
+        0.207784955007898467600689403773245,
+        0.000000000000000000000000000000000,
+    ]
+)
+_WK = np.array(
+    [
+        0.022935322010529224963732008058970,
+        0.063092092629978553290700663189204,
+        0.104790010322250183839876322541518,
+        0.140653259715525918745189590510238,
+        0.169004726639267902826583426598550,
+        0.190350578064785409913256402421014,
+        0.204432940075298892414161999234649,
+        0.209482141084727828012999174891714,
+    ]
+)
+_WG = np.array(
+    [
+        0.129484966168869693270611432679082,
+        0.279705391489276667901467771423780,
+        0.381830050505118944950369775488975,
+        0.417959183673469387755102040816327,
+    ]
+)
+
+# all fifteen nodes in increasing order, with both sets of weights
+NODES = np.concatenate([-_XK[:-1], _XK[::-1]])
+KRONROD_WEIGHTS = np.concatenate([_WK[:-1], _WK[::-1]])
+GAUSS_WEIGHTS = np.zeros(15)
+GAUSS_WEIGHTS[1:7:2] = _WG[:3]
+GAUSS_WEIGHTS[7] = _WG[3]
+GAUSS_WEIGHTS[9:15:2] = _WG[2::-1]
+
+# how far the analytic distributions are tabulated before integration starts
+_BULK = np.linspace(-4, 4, 9)
+
+
+class SizeDistribution(abc.ABC):
+    """
+    A number distribution of sphere diameters.
+
+    Subclasses must give ``pdf``, the fraction of spheres per unit diameter, which
+    should integrate to one, and ``breakpoints``, the diameters at which
+    integration starts.  Where the density has kinks or steps they belong among
+    the breakpoints.  A distribution that is zero outside its breakpoints sets
+    ``bounded``; otherwise the integration reaches past them for as long as the
+    tails contribute.
+    """
+
+    bounded = False
+
+    @abc.abstractmethod
+    def pdf(self, d):
+        """Return the number of spheres per unit diameter at diameters d."""
+
+    @abc.abstractmethod
+    def breakpoints(self):
+        """Return the increasing diameters that divide the first intervals."""
+
+
+class LogNormal(SizeDistribution):
+    """
+    Diameters whose logarithm is normally distributed.
+
+    Attributes:
+        d_median: the median diameter
+        sigma_g: the geometric standard deviation, greater than one
+    """
+
+    def __init__(self, d_median, sigma_g):
+        """
+        Describe a log-normal distribution.
+
+        Args:
+            d_median: the median diameter            [same units as lambda0]
+            sigma_g: the geometric standard deviation [-]
+        """
+        if d_median <= 0:
+            raise ValueError("d_median must be positive, not %r" % d_median)
+        if sigma_g <= 1:
+            raise ValueError("sigma_g must be greater than one; use miepython.efficiencies for one size")
+        self.d_median = float(d_median)
+        self.sigma_g = float(sigma_g)
+
+    def __repr__(self):
+        """Name the distribution and its parameters."""
+        return "LogNormal(d_median=%g, sigma_g=%g)" % (self.d_median, self.sigma_g)
+
+    def pdf(self, d):
+        """Return the number of spheres per unit diameter at diameters d."""
+        s = math.log(self.sigma_g)
+        t = np.log(d / self.d_median) / s
+        return np.exp(-0.5 * t**2) / (d * s * math.sqrt(2 * np.pi))
+
+    def breakpoints(self):
+        """Return diameters four geometric deviations either side of the median."""
+        return self.d_median * self.sigma_g**_BULK
+
+
+class Gamma(SizeDistribution):
+    """
+    The modified gamma distribution of Hansen and Travis, often used for clouds.
+
+    The number density is proportional to d**((1 - 3 v_eff)/v_eff) exp(-d/(d_eff v_eff)),
+    where d_eff, the ratio of the third moment to the second, is the effective
+    diameter and v_eff the effective variance.
+
+    Attributes:
+        d_eff: the effective diameter
+        v_eff: the effective variance, between zero and one half
+    """
+
+    def __init__(self, d_eff, v_eff):
+        """
+        Describe a gamma distribution.
+
+        Args:
+            d_eff: the effective diameter     [same units as lambda0]
+            v_eff: the effective variance     [-]
+        """
+        if d_eff <= 0:
+            raise ValueError("d_eff must be positive, not %r" % d_eff)
+        if not 0 < v_eff < 0.5:
+            raise ValueError("v_eff must be between 0 and 0.5, not %r" % v_eff)
+        self.d_eff = float(d_eff)
+        self.v_eff = float(v_eff)
+
+    def __repr__(self):
+        """Name the distribution and its parameters."""
+        return "Gamma(d_eff=%g, v_eff=%g)" % (self.d_eff, self.v_eff)
+
+    def _shape_scale(self):
+        """Return the shape and scale of the equivalent gamma distribution."""
+        return 1 / self.v_eff - 2, self.d_eff * self.v_eff
+
+    def pdf(self, d):
+        """Return the number of spheres per unit diameter at diameters d."""
+        k, theta = self._shape_scale()
+        return np.exp((k - 1) * np.log(d) - d / theta - math.lgamma(k) - k * math.log(theta))
+
+    def breakpoints(self):
+        """Return diameters about four deviations of log-diameter either side of the mean."""
+        k, theta = self._shape_scale()
+        return k * theta * np.exp(math.sqrt(1 / k + 1 / k**2) * _BULK)
+
+
+def _positive_increasing(d, name):
+    """Return d as a float array after checking that it is positive and increasing."""
+    d = np.asarray(d, dtype=np.float64)
+    if d.ndim != 1 or len(d) < 2:
+        raise ValueError("%s must list at least two diameters" % name)
+    if d[0] <= 0 or np.any(np.diff(d) <= 0):
+        raise ValueError("%s must be positive and increasing" % name)
+    return d
+
+
+class Tabulated(SizeDistribution):
+    """
+    A number density sampled at given diameters and interpolated linearly.
+
+    The density is zero outside the table and is rescaled to integrate to one.
+
+    Attributes:
+        d: the diameters of the table
+        density: the number of spheres per unit diameter there, normalized
+    """
+
+    bounded = True
+
+    def __init__(self, d, density):
+        """
+        Tabulate a distribution.
+
+        Args:
+            d: increasing diameters             [same units as lambda0]
+            density: the relative number of spheres per unit diameter at each
+        """
+        self.d = _positive_increasing(d, "d")
+        density = np.asarray(density, dtype=np.float64)
+        if density.shape != self.d.shape or np.any(density < 0):
+            raise ValueError("density must hold one non-negative value per diameter")
+        total = np.sum(np.diff(self.d) * (density[1:] + density[:-1]) / 2)
+        if total <= 0:
+            raise ValueError("density must not be zero everywhere")
+        self.density = density / total
+
+    def __repr__(self):
+        """Name the distribution and its range."""
+        return "Tabulated(%d diameters from %g to %g)" % (len(self.d), self.d[0], self.d[-1])
+
+    def pdf(self, d):
+        """Return the number of spheres per unit diameter at diameters d."""
+        return np.interp(d, self.d, self.density, left=0.0, right=0.0)
+
+    def breakpoints(self):
+        """Return the tabulated diameters."""
+        return self.d
+
+
+class Histogram(SizeDistribution):
+    """
+    Counts of spheres in bins of diameter, uniform within each bin.
+
+    Attributes:
+        edges: the edges of the bins
+        density: the fraction of spheres per unit diameter in each bin
+    """
+
+    bounded = True
+
+    def __init__(self, edges, counts):
+        """
+        Describe a measured histogram.
+
+        Args:
+            edges: increasing diameters bounding the bins [same units as lambda0]
+            counts: the number of spheres in each bin, one fewer than edges
+        """
+        self.edges = _positive_increasing(edges, "edges")
+        counts = np.asarray(counts, dtype=np.float64)
+        if counts.shape != (len(self.edges) - 1,) or np.any(counts < 0) or not np.any(counts > 0):
+            raise ValueError("counts must hold one non-negative count per bin, not all zero")
+        self.density = counts / np.sum(counts) / np.diff(self.edges)
+
+    def __repr__(self):
+        """Name the distribution and its range."""
+        return "Histogram(%d bins from %g to %g)" % (len(self.density), self.edges[0], self.edges[-1])
+
+    def pdf(self, d):
+        """Return the number of spheres per unit diameter at diameters d."""
+        d = np.asarray(d, dtype=np.float64)
+        i = np.searchsorted(self.edges, d, side="right") - 1
+        inside = (i >= 0) & (i < len(self.density))
+        return np.where(inside, self.density[np.clip(i, 0, len(self.density) - 1)], 0.0)
+
+    def breakpoints(self):
+        """Return the edges of the bins."""
+        return self.edges
+
+
+def _kronrod(integrand, distribution, a, b):
+    """
+    Apply the Gauss-Kronrod pair over intervals of log-diameter.
+
+    Args:
+        integrand: callable taking diameters and returning an array of shape
+            (len(d), n), one column per quantity
+        distribution: the ``SizeDistribution`` that weights the integrand
+        a: the lower ends of the intervals in log-diameter
+        b: the upper ends of the intervals in log-diameter
+
+    Returns:
+        the Kronrod estimates and the magnitude of their difference from Gauss,
+        both with shape (len(a), n)
+    """
+    half = (b - a) / 2
+    t = (a + half)[:, np.newaxis] + half[:, np.newaxis] * NODES
+    d = np.exp(t).ravel()
+    values = integrand(d) * (distribution.pdf(d) * d)[:, np.newaxis]
+    values = values.reshape(len(a), len(NODES), -1) * half[:, np.newaxis, np.newaxis]
+    kronrod = np.einsum("j,ijk->ik", KRONROD_WEIGHTS, values)
+    gauss = np.einsum("j,ijk->ik", GAUSS_WEIGHTS, values)
+    return kronrod, np.abs(kronrod - gauss)
+
+
+def _integrate(integrand, distribution, scale, tol, max_intervals):
+    """
+    Integrate quantities over a size distribution to a relative accuracy.
+
+    Args:
+        integrand: callable taking diameters and returning an array of shape
+            (len(d), n)
+        distribution: the ``SizeDistribution`` to average over
+        scale: callable taking the n integrals and returning the n magnitudes
+            that their errors are measured against
+        tol: the relative accuracy wanted
+        max_intervals: the most intervals to use before giving up
+
+    Returns:
+        the n integrals
+    """
+    edges = np.log(np.asarray(distribution.breakpoints(), dtype=np.float64))
+    step = (edges[-1] - edges[0]) / (len(edges) - 1)
+    a, b = edges[:-1], edges[1:]
+    estimate, error = _kronrod(integrand, distribution, a, b)
+
+    while True:
+        total = estimate.sum(axis=0)
+        reference = scale(total)
+        reference = np.where(reference > 0, reference, np.inf)
+        weight = np.max((np.abs(estimate) + error) / reference, axis=1)
+
+        # reach into the tails while the outermost stretch still matters
+        new_a, new_b = [], []
+        if not distribution.bounded:
+            low, high = a.min(), b.max()
+            if np.sum(weight[a < low + step]) > tol / 4:
+                new_a.append(low - step)
+                new_b.append(low)
+            if np.sum(weight[b > high - step]) > tol / 4:
+                new_a.append(high)
+                new_b.append(high + step)
+
+        # otherwise halve the intervals that hold most of the error
+        if not new_a:
+            relative = np.max(error / reference, axis=1)
+            excess = relative.sum() - tol
+            if excess <= 0:
+                return total
+            if len(a) >= max_intervals:
+                raise RuntimeError(
+                    "the integral did not reach tol=%g within max_intervals=%d; the size "
+                    "distribution is too broad or the sphere resonances too sharp" % (tol, max_intervals)
+                )
+            worst = np.argsort(relative)[::-1]
+            n_split = np.searchsorted(np.cumsum(relative[worst]), excess + tol / 2) + 1
+            split = worst[:n_split]
+            middle = (a[split] + b[split]) / 2
+            new_a = np.concatenate([a[split], middle])
+            new_b = np.concatenate([middle, b[split]])
+            keep = np.ones(len(a), dtype=bool)
+            keep[split] = False
+            a, b, estimate, error = a[keep], b[keep], estimate[keep], error[keep]
+
+        new_estimate, new_error = _kronrod(integrand, distribution, np.asarray(new_a), np.asarray(new_b))
+        a = np.concatenate([a, new_a])
+        b = np.concatenate([b, new_b])
+        estimate = np.concatenate([estimate, new_estimate])
+        error = np.concatenate([error, new_error])
+
+
+def _check_tol(tol):
+    """Return tol after checking that it is a relative accuracy."""
+    if not 0 < tol < 1:
+        raise ValueError("tol must be between 0 and 1, not %r" % tol)
+    return float(tol)
+
+
+def _efficiency_columns(d, qext, qsca, qback, g):
+    """Return the area and the four cross sections times their weights, one row per sphere."""
+    area = np.pi * d**2 / 4
+    return np.column_stack([area, qext * area, qsca * area, qback * area, qsca * g * area])
+
+
+def _efficiency_scale(total):
+    """Measure the mean of qsca times g against the scattering cross section."""
+    reference = np.abs(total)
+    reference[4] = reference[2]
+    return reference
+
+
+def _mean_cross_sections(m, distribution, lambda0, n_env, tol, max_intervals):
+    """Return the mean area and the mean cext, csca, cback and csca*g per sphere."""
+    tol = _check_tol(tol)
+    k = 2 * np.pi * n_env / lambda0
+    m = complex(m) / n_env
+
+    def integrand(d):
+        return _efficiency_columns(d, *core.efficiencies_mx(np.full(len(d), m), k * d / 2, tol=tol / 10))
+
+    return _integrate(integrand, distribution, _efficiency_scale, tol, max_intervals)
+
+
+def cross_sections(m, distribution, lambda0, n_env=1.0, tol=1e-6, max_intervals=2000):
+    """
+    Calculate the mean cross sections of a distribution of spheres.
+
+    Args:
+        m: the complex index of refraction of the spheres [-]
+        distribution: a ``SizeDistribution`` of their diameters
+        lambda0: wavelength in a vacuum                    [same units as the diameters]
+        n_env: real index of medium around the spheres, optional.
+        tol: (optional) relative accuracy of the integrals
+        max_intervals: (optional) the most quadrature intervals before a RuntimeError
+
+    Returns:
+        cext: the mean extinction cross section per sphere     [square units of the diameters]
+        csca: the mean scattering cross section per sphere     [square units of the diameters]
+        cback: the mean backscattering cross section per sphere [square units of the diameters]
+        g: the average cosine of the ensemble phase function   [-]
+    """
+    _, cext, csca, cback, csca_g = _mean_cross_sections(m, distribution, lambda0, n_env, tol, max_intervals)
+    return float(cext), float(csca), float(cback), float(csca_g / csca) if csca > 0 else 0.0
+
+
+def efficiencies(m, distribution, lambda0, n_env=1.0, tol=1e-6, max_intervals=2000):
+    """
+    Calculate the efficiencies of a distribution of spheres.
+
+    The efficiencies are the mean cross sections divided by the mean geometric
+    cross section, so that a beam loses the same power to them as to the ensemble.
+
+    Args:
+        m: the complex index of refraction of the spheres [-]
+        distribution: a ``SizeDistribution`` of their diameters
+        lambda0: wavelength in a vacuum                    [same units as the diameters]
+        n_env: real index of medium around the spheres, optional.
+        tol: (optional) relative accuracy of the integrals
+        max_intervals: (optional) the most quadrature intervals before a RuntimeError
+
+    Returns:
+        qext: the extinction efficiency                        [-]
+        qsca: the scattering efficiency                        [-]
+        qback: the backscatter efficiency                      [-]
+        g: the average cosine of the ensemble phase function   [-]
+    """
+    area, cext, csca, cback, csca_g = _mean_cross_sections(m, distribution, lambda0, n_env, tol, max_intervals)
+    g = csca_g / csca if csca > 0 else 0.0
+    return float(cext / area), float(csca / area), float(cback / area), float(g)
+
+
+def phase_matrix(m, distribution, lambda0, mu, n_env=1.0, norm="albedo", tol=1e-6, max_intervals=2000):
+    """
+    Calculate the scattering (Mueller) matrix of a distribution of spheres.
+
+    The matrix is the number-weighted mean of the matrices of the spheres, each
+    left unnormalized, and is then normalized as a whole: with the default
+    'albedo' its integral over 4𝜋 steradians is the ensemble's single scattering
+    albedo.  The choices of ``norm`` are those of ``miepython.phase_matrix``.
+
+    Args:
+        m: the complex index of refraction of the spheres [-]
+        distribution: a ``SizeDistribution`` of their diameters
+        lambda0: wavelength in a vacuum                    [same units as the diameters]
+        mu: the angles, cos(theta), of the phase scattering matrix
+        n_env: real index of medium around the spheres, optional.
+        norm: (optional) string describing scattering function normalization
+        tol: (optional) relative accuracy of the integrals, at every angle
+        max_intervals: (optional) the most quadrature intervals before a RuntimeError
+
+    Returns:
+        p: the phase scattering matrix, 4x4xN for N angles or 4x4 for a scalar mu [sr**(-1.0)]
+    """
+    tol = _check_tol(tol)
+    mu = np.atleast_1d(np.asarray(mu, dtype=np.float64))
+    n_mu = len(mu)
+    k = 2 * np.pi * n_env / lambda0
+    m_env = complex(m) / n_env
+    if m_env.imag > 0:
+        m_env = m_env.conjugate()
+    angles = AngularTable(mu, 1)
+
+    def integrand(d):
+        # one solve per sphere gives both the unnormalized amplitudes, which are
+        # those of norm='wiscombe', and the efficiencies
+        x = k * d / 2
+        angles.extend(core.series_terms(x.max(), tol / 10))
+        s1 = np.empty((len(d), n_mu), dtype=np.complex128)
+        s2 = np.empty_like(s1)
+        q = np.empty((4, len(d)))
+        _S1_S2_batch(np.full(len(d), m_env), x, angles.pi, angles.tau, 0, tol / 10, s1, s2, q)
+        s21 = (s1 * np.conjugate(s2)).real
+        d21 = (s1 * np.conjugate(s2)).imag
+        columns = [_efficiency_columns(d, *q), np.abs(s1) ** 2, np.abs(s2) ** 2, s21, d21]
+        return np.concatenate(columns, axis=1)
+
+    def scale(total):
+        reference = _efficiency_scale(total[:5])
+        m1, m2 = np.abs(total[5 : 5 + n_mu]), np.abs(total[5 + n_mu : 5 + 2 * n_mu])
+        return np.concatenate([reference, m1, m2, np.sqrt(m1 * m2), np.sqrt(m1 * m2)])
+
+    total = _integrate(integrand, distribution, scale, tol, max_intervals)
+    area, cext, csca = total[:3]
+    m1, m2, s21, d21 = total[5:].reshape(4, n_mu)
+
+    # the mean matrix acts like one sphere whose area and efficiencies are the ensemble's
+    x_eff = k * np.sqrt(area / np.pi)
+    factor = core.normalization_factor(
+        m_env, x_eff, norm, efficiency_source=lambda _m, _x: (cext / area, csca / area, None, None)
+    )
+    m1, m2, s21, d21 = m1 / factor**2, m2 / factor**2, s21 / factor**2, d21 / factor**2
+
+    phase = np.zeros(shape=(4, 4, n_mu))
+    phase[0, 0] = 0.5 * (m2 + m1)
+    phase[0, 1] = 0.5 * (m2 - m1)
+    phase[1, 0] = phase[0, 1]
+    phase[1, 1] = phase[0, 0]
+    phase[2, 2] = s21
+    phase[2, 3] = -d21
+    phase[3, 2] = d21
+    phase[3, 3] = s21
+    return phase.squeeze()
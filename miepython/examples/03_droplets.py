@@ -9,22 +9,21 @@ The plot shows the cross section as a function of wavelength.
 import numpy as np
 import matplotlib.pyplot as plt
 import miepython as mie
+import miepython.materials as mm
 
 radius = 0.5  # in microns
 lambda0 = np.linspace(0.2, 1.2, 100)  # also in microns
 geometric_cross_section = np.pi * radius**2
 
 # from https://refractiveindex.info/?shelf=main&book=H2O&page=Daimon - 24.0C
-m2 = 1.0
-m2 += 5.666959820e-1 / (1.0 - 5.084151894e-3 / lambda0**2)
-m2 += 1.731900098e-1 / (1.0 - 1.818488474e-2 / lambda0**2)
-m2 += 2.095951857e-2 / (1.0 - 2.625439472e-2 / lambda0**2)
-m2 += 1.125228406e-1 / (1.0 - 1.073842352e1 / lambda0**2)
-m = np.sqrt(m2)
+water = mm.Sellmeier(
+    B=[5.666959820e-1, 1.731900098e-1, 2.095951857e-2, 1.125228406e-1],
+    C=[5.084151894e-3, 1.818488474e-2, 2.625439472e-2, 1.073842352e1],
+)
 
 plt.figure(figsize=(8, 4.5))
 
-qext, qsca, qback, g = mie.efficiencies(m, 2 * radius, lambda0)
+qext, qsca, qback, g = mie.efficiencies(water, 2 * radius, lambda0)
 sigma_sca = qsca * geometric_cross_section
 
 plt.plot(lambda0 * 1000, sigma_sca)
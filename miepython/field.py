@@ -12,6 +12,8 @@ Use these for most workflows:
 - ``eh_near(...)``: both electric and magnetic fields in one call.
 - ``e_near_cartesian(...)`` / ``h_near_cartesian(...)`` / ``eh_near_cartesian(...)``:
   same near-field calculations in Cartesian components ``[Fx, Fy, Fz]``.
+- ``eh_near_grid(...)``: both fields on every combination of given radii, polar
+  angles and azimuths, much faster than listing the same points.
 - ``e_far(...)``: scattered far-field electric components.
 
 Quick examples
@@ -79,10 +81,8 @@ Conventions
 """
 
 import numpy as np
-from scipy.special import factorial2, spherical_jn
-from ._backend import D_calc, pi_tau
-from .bessel import spherical_h1
-from .core import S1_S2, coefficients, wiscombe_terms
+from ._backend import USE_JIT, near_field, pi_tau, spherical_bessel_table
+from .core import S1_S2, coefficients, series_terms
 from .util import cartesian_to_spherical, spherical_vector_to_cartesian
 
 __all__ = (
@@ -92,9 +92,13 @@ __all__ = (
     "e_near_cartesian",
     "h_near_cartesian",
     "eh_near_cartesian",
+    "eh_near_grid",
     "e_far",
 )
 
+# bytes held per point and per multipole order by the NumPy evaluation at its peak
+NEAR_FIELD_BYTES = 320
+
 
 def _sum_two_scaled_terms(scale, coeff1, values1, scale1, coeff2, values2, scale2):
     """Sum ``scale * (scale1*coeff1*values1 + scale2*coeff2*values2)`` over multipoles.
@@ -106,25 +110,15 @@ def _sum_two_scaled_terms(scale, coeff1, values1, scale1, coeff2, values2, scale
     return np.sum(scale * (scale1 * coeff1 * values1 + scale2 * coeff2 * values2), axis=-1)
 
 
-def _vsh_components_base(n_terms, lambda0, m_index, r, theta, inside):
-    """Compute shared VSH base components for a batch of points.
-
-    Every point in one call must lie on the same side of the sphere surface: a single
-    ``inside`` flag chooses the radial function and a single ``m_index`` the medium
-    for the whole batch.  ``_near_fields`` groups the points that way before calling.
+def _angular_functions(n_terms, theta):
+    """Tabulate pi_n and tau_n for orders ``1..n_terms`` at each polar angle.
 
     Args:
         n_terms (int): Number of multipole terms.
-        lambda0 (float): Vacuum wavelength.
-        m_index (complex): Refractive index at the evaluation points.
-        r (ndarray): Radial coordinates, shape ``(n_points,)``.
         theta (ndarray): Polar angles in radians, shape ``(n_points,)``.
-        inside (bool): True when the points lie inside the sphere.
 
     Returns:
-        tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
-            ``(M_theta_base, M_phi_base, N_r_base, N_theta_base, N_phi_base)``, each
-            shaped ``(n_points, n_terms)`` for multipole orders ``1..n_terms``.
+        tuple[ndarray, ndarray]: ``(pi, tau)``, each shaped ``(n_points, n_terms)``.
     """
     mu = np.cos(theta)
     # the Legendre recurrence is 0/0 exactly at the poles, so nudge mu off them --
@@ -132,58 +126,123 @@ def _vsh_components_base(n_terms, lambda0, m_index, r, theta, inside):
     mu = np.where(mu >= 1.0, 0.999999, mu)
     mu = np.where(mu <= -1.0, -0.999999, mu)
 
-    n_points = r.size
+    n_points = theta.size
     pi = np.empty((n_points, n_terms))
     tau = np.empty((n_points, n_terms))
     for k in range(n_points):
         # the kernel writes one point at a time; rows of a C-ordered array are the
         # contiguous 1-D buffers it expects
         pi_tau(float(mu[k]), pi[k], tau[k])
+    return pi, tau
 
-    n_int = np.arange(1, n_terms + 1, dtype=np.int64)
-    n_arr = n_int.astype(np.float64)
-    r_col = r[:, np.newaxis]
-    rho = 2 * np.pi * m_index * r_col / lambda0
-    kr = 2 * np.pi * r_col / lambda0
 
-    if inside:
-        jn = spherical_jn(n_int, rho)
-        m_factor = jn
-
-        n_factor1 = np.empty((n_points, n_terms), dtype=np.complex128)
-        n_factor2 = np.empty((n_points, n_terms), dtype=np.complex128)
-
-        # near the origin jn/rho and D_n both lose their meaning, so those points
-        # take the leading-order series instead; the split is per point
-        small = np.abs(rho[:, 0]) < 0.01
-        if small.any():
-            rho_pow = rho[small] ** np.arange(0, n_terms)
-            denom = factorial2(2 * n_int + 1)
-            n_factor1[small] = rho_pow / denom
-            n_factor2[small] = (n_arr + 1.0) * rho_pow / denom
-
-        large = ~small
-        if large.any():
-            # D_calc is a scalar kernel, so the logarithmic derivative is still one
-            # call per point; only points inside the sphere need it at all
-            d_vals = np.empty((int(np.count_nonzero(large)), n_terms), dtype=np.complex128)
-            for k, kr_k in enumerate(kr[large, 0]):
-                d_vals[k] = D_calc(np.complex128(m_index), float(kr_k), n_terms + 1)[:n_terms]
-            n_factor1[large] = jn[large] / rho[large]
-            n_factor2[large] = jn[large] * d_vals
-    else:
-        # xi'_n needs h1 at orders n-1, n and n+1, so evaluating orders 0..n_terms+1
-        # in one call and slicing costs a quarter of what four separate calls do --
-        # and h1 at order n is then shared instead of computed twice.
-        h_all = spherical_h1(np.arange(0, n_terms + 2, dtype=np.int64), rho)
-        h1 = h_all[:, 1 : n_terms + 1]
-        m_factor = h1
-        n_factor1 = h1 / rho
-        # d_riccati_bessel_h1 written out on the cached values; identical arithmetic,
-        # and tests/test_field.py pins it against that function so the two cannot drift
-        d_xi = 0.5 * (rho * h_all[:, 0:n_terms] + h1 - rho * h_all[:, 2 : n_terms + 2])
-        n_factor2 = d_xi / rho
+def _small_argument_factors(rho, n_terms):
+    """Return the radial factors inside the sphere from the series of j_n about 0.
+
+    ``j_n/rho`` is 0/0 at the centre, so points with ``|rho| < 0.01`` use
+    ``j_n = rho**n / (2n+1)!! * (1 - rho**2/(2(2n+3)) + rho**4/(8(2n+3)(2n+5)))``,
+    whose next term is below 1e-16 of the first there.
+
+    Args:
+        rho (ndarray): Complex arguments ``m k r``, shape ``(n_points,)``.
+        n_terms (int): Number of multipole terms.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: ``(m_factor, n_factor1, n_factor2)`` as
+            in ``_radial_functions``.
+    """
+    n = np.arange(1, n_terms + 1, dtype=np.float64)
+    rho = rho[:, np.newaxis]
+    t1 = -(rho**2) / (2 * (2 * n + 3))
+    t2 = rho**4 / (8 * (2 * n + 3) * (2 * n + 5))
+    # rho**(n-1) / (2n+1)!!, the leading term of j_n / rho
+    lead = rho ** (n - 1) / np.cumprod(2 * n + 1)
+    n_factor1 = lead * (1 + t1 + t2)
+    n_factor2 = lead * ((n + 1) + (n + 3) * t1 + (n + 5) * t2)
+    return rho * n_factor1, n_factor1, n_factor2
+
+
+def _radial_functions(n_terms, lambda0, m_index, r, inside):
+    """Tabulate the radial factors of the vector spherical harmonics at each radius.
+
+    Inside the sphere the radial function z_n is j_n, outside it is h_n.  With
+    ``rho = k r`` the factors are ``z_n``, ``z_n / rho`` and ``(rho z_n)' / rho``.
+    All orders of z_n come from one table of orders ``0..n_terms+1``, filled by the
+    recurrences of ``spherical_bessel_table``, and the derivative is formed from
+    the neighbouring orders.
+
+    Args:
+        n_terms (int): Number of multipole terms.
+        lambda0 (float): Vacuum wavelength.
+        m_index (complex): Refractive index at the evaluation points.
+        r (ndarray): Radial coordinates, all on one side, shape ``(n_points,)``.
+        inside (bool): True when the points lie inside the sphere.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: ``(m_factor, n_factor1, n_factor2)``, each
+            shaped ``(n_points, n_terms)`` for multipole orders ``1..n_terms``.
+    """
+    rho = 2 * np.pi * m_index * r / lambda0
+    if not inside:
+        h_all = spherical_bessel_table(rho.astype(np.float64), n_terms + 1, outgoing=True)
+        return _factors_from_table(h_all, rho, n_terms)
+
+    # near the origin j_n/rho is 0/0, so those points take the series instead
+    factors = [np.empty((r.size, n_terms), dtype=np.complex128) for _ in range(3)]
+    small = np.abs(rho) < 0.01
+    if small.any():
+        for factor, value in zip(factors, _small_argument_factors(rho[small], n_terms)):
+            factor[small] = value
+    if not small.all():
+        j_all = spherical_bessel_table(rho[~small].astype(np.complex128), n_terms + 1)
+        for factor, value in zip(factors, _factors_from_table(j_all, rho[~small], n_terms)):
+            factor[~small] = value
+    return tuple(factors)
+
+
+def _factors_from_table(z_all, rho, n_terms):
+    """Return the radial factors from a table of z_n at orders ``0..n_terms+1``."""
+    rho = rho[:, np.newaxis]
+    z_n = z_all[:, 1 : n_terms + 1]
+    # (rho z_n)' = rho z_n' + z_n, with z_n' the mean of its two recurrences
+    # z_{n-1} - (n+1) z_n / rho and -z_{n+1} + n z_n / rho
+    d_rho_z = 0.5 * (rho * z_all[:, 0:n_terms] + z_n - rho * z_all[:, 2 : n_terms + 2])
+    return z_n, z_n / rho, d_rho_z / rho
+
+
+def _vsh_components_base(n_terms, lambda0, m_index, r, theta, inside):
+    """Compute shared VSH base components for a batch of points.
+
+    Every point in one call must lie on the same side of the sphere surface: a single
+    ``inside`` flag chooses the radial function and a single ``m_index`` the medium
+    for the whole batch.  ``_near_fields`` groups the points that way before calling.
+
+    Points on one spherical shell share their radial functions and points on one
+    cone share pi_n and tau_n, and grids are full of both: a square x-z slice
+    repeats each radius about six times.  So the functions are evaluated once per
+    distinct r and theta and gathered back to the points, which gives the same
+    values as evaluating them point by point.
+
+    Args:
+        n_terms (int): Number of multipole terms.
+        lambda0 (float): Vacuum wavelength.
+        m_index (complex): Refractive index at the evaluation points.
+        r (ndarray): Radial coordinates, shape ``(n_points,)``.
+        theta (ndarray): Polar angles in radians, shape ``(n_points,)``.
+        inside (bool): True when the points lie inside the sphere.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
+            ``(M_theta_base, M_phi_base, N_r_base, N_theta_base, N_phi_base)``, each
+            shaped ``(n_points, n_terms)`` for multipole orders ``1..n_terms``.
+    """
+    theta_unique, theta_index = np.unique(theta, return_inverse=True)
+    pi, tau = (table[theta_index] for table in _angular_functions(n_terms, theta_unique))
+    r_unique, r_index = np.unique(r, return_inverse=True)
+    radial = _radial_functions(n_terms, lambda0, m_index, r_unique, inside)
+    m_factor, n_factor1, n_factor2 = (table[r_index] for table in radial)
 
+    n_arr = np.arange(1, n_terms + 1, dtype=np.float64)
     sin_theta = np.sin(theta)[:, np.newaxis]
     M_theta_base = pi * m_factor
     M_phi_base = tau * m_factor
@@ -193,7 +252,7 @@ def _vsh_components_base(n_terms, lambda0, m_index, r, theta, inside):
     return M_theta_base, M_phi_base, N_r_base, N_theta_base, N_phi_base
 
 
-def e_far(lambda0, d_sphere, m_sphere, n_env, r, theta, phi):
+def e_far(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, tol=None):
     """Evaluate the scattered electric far field.
 
     Args:
@@ -204,6 +263,7 @@ def e_far(lambda0, d_sphere, m_sphere, n_env, r, theta, phi):
         r (float or ndarray): Radial observation distance.
         theta (float or ndarray): Polar angle in radians.
         phi (float or ndarray): Azimuth angle in radians.
+        tol (float or None): Accuracy wanted, passed on to ``S1_S2``.
 
     Returns:
         ndarray: Complex spherical components ``[E_r, E_theta, E_phi]`` with
@@ -214,7 +274,7 @@ def e_far(lambda0, d_sphere, m_sphere, n_env, r, theta, phi):
     jkr = 1j * 2 * np.pi * n_env * r / lambda0
     amp = np.exp(jkr) / (-jkr)
 
-    S1, S2 = S1_S2(m_rel, x, np.cos(theta), norm="wiscombe")
+    S1, S2 = S1_S2(m_rel, x, np.cos(theta), norm="wiscombe", tol=tol)
 
     E_r = np.zeros_like(S1, dtype=complex)
     E_theta = S2 * amp * np.cos(phi)
@@ -272,7 +332,7 @@ def _incident_h_spherical(lambda0, n_env, r, theta, phi, amplitude=1.0):
     return np.array([h_r, h_theta, h_phi])
 
 
-def _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole):
+def _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole, tol=None):
     """Compute Mie coefficients with consistent medium scaling.
 
     Args:
@@ -281,6 +341,7 @@ def _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole):
         m_sphere (complex): Sphere refractive index.
         n_env (float): Refractive index of the surrounding medium.
         n_pole (int): Number of terms to keep. ``0`` means automatic truncation.
+        tol (float or None): Accuracy that sets the automatic truncation.
 
     Returns:
         ndarray: Coefficients packed as ``[a, b, c, d]``.
@@ -294,19 +355,177 @@ def _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole):
         # tangential boundary mismatch falls from 1.5e-5 at the criterion to
         # 3.6e-6 with one extra order and 3.2e-6 with two, then flattens out, so
         # two is where it stops being worth more terms.
-        n_pole = wiscombe_terms(x) + 2
+        n_pole = series_terms(x, tol) + 2
+    elif tol is not None:
+        raise ValueError("tol sets the number of terms; it cannot be combined with n_pole")
     a, b, c, d = coefficients(m_rel, x, n_pole=n_pole, internal=True)
     return np.array([a, b, c, d])
 
 
-def _near_fields(abcd, lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, want_e, want_h):
+def _group_fields_vectorized(abcd, scale, lambda0, m_sphere, n_env, r, theta, phi, inside, want_e, want_h):
+    """Evaluate the scattered or internal fields of one group with NumPy.
+
+    The multipole series becomes a sum over the last axis of ``(n_points, n_terms)``
+    arrays of vector spherical harmonics, from ``_vsh_components_base``.
+
+    Args:
+        abcd (ndarray): Mie coefficients ``[a, b, c, d]``.
+        scale (ndarray): Per-order factors ``i**n (2n+1) / (n (n+1))``.
+        lambda0 (float): Vacuum wavelength.
+        m_sphere (complex): Sphere refractive index.
+        n_env (float): Refractive index of the surrounding medium.
+        r (ndarray): Radial coordinates, all on one side of the surface.
+        theta (ndarray): Polar angles in radians.
+        phi (ndarray): Azimuth angles in radians.
+        inside (bool): True when the points lie inside the sphere.
+        want_e (bool): Compute the electric field.
+        want_h (bool): Compute the magnetic field.
+
+    Returns:
+        tuple[ndarray or None, ndarray or None]: ``(E, H)`` in spherical components,
+            each shaped ``(3, n_points)`` or None when not requested.
+    """
+    a, b, c, d = abcd
+    n_terms = len(a)
+
+    # miepython coefficients follow the n-ik convention and are conjugated
+    # internally; use conjugated sphere index so internal fields are consistent.
+    m_index = np.conjugate(m_sphere) if inside else n_env
+    M_the_base, M_phi_base, N_r_base, N_the_base, N_phi_base = _vsh_components_base(
+        n_terms, lambda0, m_index, r, theta, inside
+    )
+
+    cos_phi = np.cos(phi)[:, np.newaxis]
+    sin_phi = np.sin(phi)[:, np.newaxis]
+    zero = np.zeros_like(M_the_base, dtype=np.complex128)
+
+    e_group = h_group = None
+    if want_e:
+        # the electric field pairs the odd magnetic modes with the even electric ones
+        M_odd_rad, M_odd_the, M_odd_phi = zero, cos_phi * M_the_base, -sin_phi * M_phi_base
+        N_even_rad, N_even_the, N_even_phi = (
+            cos_phi * N_r_base,
+            cos_phi * N_the_base,
+            -sin_phi * N_phi_base,
+        )
+        if inside:
+            e_rad = _sum_two_scaled_terms(scale, c, M_odd_rad, 1.0 + 0.0j, d, N_even_rad, -1.0j)
+            e_the = _sum_two_scaled_terms(scale, c, M_odd_the, 1.0 + 0.0j, d, N_even_the, -1.0j)
+            e_phi = _sum_two_scaled_terms(scale, c, M_odd_phi, 1.0 + 0.0j, d, N_even_phi, -1.0j)
+        else:
+            e_rad = _sum_two_scaled_terms(scale, a, N_even_rad, 1.0j, b, M_odd_rad, -1.0 + 0.0j)
+            e_the = _sum_two_scaled_terms(scale, a, N_even_the, 1.0j, b, M_odd_the, -1.0 + 0.0j)
+            e_phi = _sum_two_scaled_terms(scale, a, N_even_phi, 1.0j, b, M_odd_phi, -1.0 + 0.0j)
+        e_group = np.array([e_rad, e_the, e_phi])
+
+    if want_h:
+        # and the magnetic field the other way round
+        M_even_rad, M_even_the, M_even_phi = zero, -sin_phi * M_the_base, -cos_phi * M_phi_base
+        N_odd_rad, N_odd_the, N_odd_phi = (
+            sin_phi * N_r_base,
+            sin_phi * N_the_base,
+            cos_phi * N_phi_base,
+        )
+        if inside:
+            m_rel = np.conjugate(m_sphere / n_env)
+            h_rad = m_rel * _sum_two_scaled_terms(scale, d, M_even_rad, -1.0 + 0.0j, c, N_odd_rad, -1.0j)
+            h_the = m_rel * _sum_two_scaled_terms(scale, d, M_even_the, -1.0 + 0.0j, c, N_odd_the, -1.0j)
+            h_phi = m_rel * _sum_two_scaled_terms(scale, d, M_even_phi, -1.0 + 0.0j, c, N_odd_phi, -1.0j)
+        else:
+            h_rad = _sum_two_scaled_terms(scale, b, N_odd_rad, 1.0j, a, M_even_rad, 1.0 + 0.0j)
+            h_the = _sum_two_scaled_terms(scale, b, N_odd_the, 1.0j, a, M_even_the, 1.0 + 0.0j)
+            h_phi = _sum_two_scaled_terms(scale, b, N_odd_phi, 1.0j, a, M_even_phi, 1.0 + 0.0j)
+        h_group = np.array([h_rad, h_the, h_phi])
+
+    return e_group, h_group
+
+
+def _series_weights(abcd, scale, m_sphere, n_env, inside):
+    """Return the medium and the per-order weights of the field series on one side.
+
+    With z_n the radial function of the side, f1 = z_n / rho and f2 = (rho z_n)' / rho,
+    the fields are::
+
+        E_r = cos(phi) sum alpha n(n+1) sin(theta) pi f1
+        E_theta = cos(phi) sum (alpha tau f2 + beta pi z_n)
+        E_phi = -sin(phi) sum (alpha pi f2 + beta tau z_n)
+        H_r = sin(phi) sum gamma n(n+1) sin(theta) pi f1
+        H_theta = sin(phi) sum (gamma tau f2 - delta pi z_n)
+        H_phi = cos(phi) sum (gamma pi f2 - delta tau z_n)
+
+    Args:
+        abcd (ndarray): Mie coefficients ``[a, b, c, d]``.
+        scale (ndarray): Per-order factors ``i**n (2n+1) / (n (n+1))``.
+        m_sphere (complex): Sphere refractive index.
+        n_env (float): Refractive index of the surrounding medium.
+        inside (bool): True for the points inside the sphere.
+
+    Returns:
+        tuple[complex, tuple[ndarray, ...]]: the index of the medium and the
+            contiguous complex weights ``(alpha, beta, gamma, delta)``.
+    """
+    a, b, c, d = abcd
+    if inside:
+        m_index = np.conjugate(m_sphere)
+        m_rel = np.conjugate(m_sphere / n_env)
+        weights = (-1j * scale * d, scale * c, -1j * m_rel * scale * c, -m_rel * scale * d)
+    else:
+        m_index = n_env
+        weights = (1j * scale * a, -scale * b, 1j * scale * b, scale * a)
+    return m_index, tuple(np.ascontiguousarray(w, dtype=np.complex128) for w in weights)
+
+
+def _group_fields_compiled(abcd, scale, lambda0, m_sphere, n_env, r, theta, phi, inside, want_e, want_h):
+    """Evaluate the scattered or internal fields of one group with ``near_field``.
+
+    The kernel takes the coefficients already combined with the scale factors and
+    the signs of the field expansions, and runs the series point by point, so no
+    ``(n_points, n_terms)`` array is made.
+
+    Args:
+        abcd (ndarray): Mie coefficients ``[a, b, c, d]``.
+        scale (ndarray): Per-order factors ``i**n (2n+1) / (n (n+1))``.
+        lambda0 (float): Vacuum wavelength.
+        m_sphere (complex): Sphere refractive index.
+        n_env (float): Refractive index of the surrounding medium.
+        r (ndarray): Radial coordinates, all on one side of the surface.
+        theta (ndarray): Polar angles in radians.
+        phi (ndarray): Azimuth angles in radians.
+        inside (bool): True when the points lie inside the sphere.
+        want_e (bool): Compute the electric field.
+        want_h (bool): Compute the magnetic field.
+
+    Returns:
+        tuple[ndarray or None, ndarray or None]: ``(E, H)`` in spherical components,
+            each shaped ``(3, n_points)`` or None when not requested.
+    """
+    m_index, (alpha, beta, gamma, delta) = _series_weights(abcd, scale, m_sphere, n_env, inside)
+    k = np.complex128(2 * np.pi * m_index / lambda0)
+
+    e_group = np.empty((3, r.size if want_e else 0), dtype=np.complex128)
+    h_group = np.empty((3, r.size if want_h else 0), dtype=np.complex128)
+    near_field(alpha, beta, gamma, delta, k, r, theta, phi, bool(inside), e_group, h_group)
+    return (e_group if want_e else None), (h_group if want_h else None)
+
+
+def _near_fields(
+    abcd, lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, want_e, want_h, max_memory=None
+):
     """Evaluate the near fields at every requested point.
 
-    The points are split once into those inside the sphere and those outside, and each
-    group is evaluated as a batch.  That grouping is what makes the work vectorizable:
-    the two sides use different radial functions and different media, but within a
-    side every point does the same arithmetic, so the multipole series becomes a sum
-    over the last axis of a ``(n_points, n_terms)`` array.
+    The points are split into those inside the sphere and those outside, and each
+    group is evaluated as a batch.  The two sides use different radial functions and
+    different media, but within a side every point does the same arithmetic.  With
+    numba the compiled ``near_field`` kernel sums the series point by point;
+    without it the series becomes a sum over the last axis of ``(n_points, n_terms)``
+    arrays, which NumPy evaluates for the whole group at once.
+
+    Those arrays hold about ``NEAR_FIELD_BYTES`` bytes per point and order, so a
+    large grid around a large sphere can need more memory than the machine has.
+    ``max_memory`` bounds them: the points are taken in consecutive blocks small
+    enough to fit, each split into its two sides and written into the output
+    before the next.  Every point is summed exactly as it would be in one batch,
+    so the fields do not depend on the block size.
 
     Args:
         abcd (ndarray): Mie coefficients ``[a, b, c, d]``.
@@ -320,14 +539,14 @@ def _near_fields(abcd, lambda0, d_sphere, m_sphere, n_env, r, theta, phi, includ
         include_incident (bool): Include incident field outside the sphere.
         want_e (bool): Compute the electric field.
         want_h (bool): Compute the magnetic field.
+        max_memory (int or None): Bytes for the working arrays of one block of
+            points.  ``None`` evaluates all the points in one block.
 
     Returns:
         tuple[ndarray or None, ndarray or None]: ``(E, H)`` in spherical components,
             each shaped ``(3,) + broadcast_shape`` or None when not requested.
     """
-    a, b, c, d = abcd
-
-    n_terms = len(a)
+    n_terms = len(abcd[0])
     nn = np.arange(1, n_terms + 1)
     scale = 1j**nn * (2 * nn + 1) / ((nn + 1) * nn)
 
@@ -344,69 +563,34 @@ def _near_fields(abcd, lambda0, d_sphere, m_sphere, n_env, r, theta, phi, includ
     e_out = np.empty((3, r_flat.size), dtype=complex) if want_e else None
     h_out = np.empty((3, r_flat.size), dtype=complex) if want_h else None
 
-    is_inside = r_flat < d_sphere / 2
-    for inside in (True, False):
-        group = is_inside if inside else ~is_inside
-        if not group.any():
-            continue
-
-        # miepython coefficients follow the n-ik convention and are conjugated
-        # internally; use conjugated sphere index so internal fields are consistent.
-        m_index = np.conjugate(m_sphere) if inside else n_env
-        M_the_base, M_phi_base, N_r_base, N_the_base, N_phi_base = _vsh_components_base(
-            n_terms, lambda0, m_index, r_flat[group], theta_flat[group], inside
-        )
-
-        cos_phi = np.cos(phi_flat[group])[:, np.newaxis]
-        sin_phi = np.sin(phi_flat[group])[:, np.newaxis]
-        zero = np.zeros_like(M_the_base, dtype=np.complex128)
-
-        if want_e:
-            # the electric field pairs the odd magnetic modes with the even electric ones
-            M_odd_rad, M_odd_the, M_odd_phi = zero, cos_phi * M_the_base, -sin_phi * M_phi_base
-            N_even_rad, N_even_the, N_even_phi = (
-                cos_phi * N_r_base,
-                cos_phi * N_the_base,
-                -sin_phi * N_phi_base,
-            )
-            if inside:
-                e_rad = _sum_two_scaled_terms(scale, c, M_odd_rad, 1.0 + 0.0j, d, N_even_rad, -1.0j)
-                e_the = _sum_two_scaled_terms(scale, c, M_odd_the, 1.0 + 0.0j, d, N_even_the, -1.0j)
-                e_phi = _sum_two_scaled_terms(scale, c, M_odd_phi, 1.0 + 0.0j, d, N_even_phi, -1.0j)
-            else:
-                e_rad = _sum_two_scaled_terms(scale, a, N_even_rad, 1.0j, b, M_odd_rad, -1.0 + 0.0j)
-                e_the = _sum_two_scaled_terms(scale, a, N_even_the, 1.0j, b, M_odd_the, -1.0 + 0.0j)
-                e_phi = _sum_two_scaled_terms(scale, a, N_even_phi, 1.0j, b, M_odd_phi, -1.0 + 0.0j)
-                if include_incident:
-                    e_i = _incident_e_spherical(lambda0, n_env, r_flat[group], theta_flat[group], phi_flat[group])
-                    e_rad += e_i[0]
-                    e_the += e_i[1]
-                    e_phi += e_i[2]
-            e_out[:, group] = np.array([e_rad, e_the, e_phi])
-
-        if want_h:
-            # and the magnetic field the other way round
-            M_even_rad, M_even_the, M_even_phi = zero, -sin_phi * M_the_base, -cos_phi * M_phi_base
-            N_odd_rad, N_odd_the, N_odd_phi = (
-                sin_phi * N_r_base,
-                sin_phi * N_the_base,
-                cos_phi * N_phi_base,
+    if max_memory is None:
+        block = max(r_flat.size, 1)
+    else:
+        block = max(1, int(max_memory) // (NEAR_FIELD_BYTES * n_terms))
+
+    evaluate = _group_fields_compiled if USE_JIT else _group_fields_vectorized
+    for start in range(0, r_flat.size, block):
+        points = slice(start, start + block)
+        r_block, theta_block, phi_block = r_flat[points], theta_flat[points], phi_flat[points]
+        is_inside = r_block < d_sphere / 2
+        for inside in (True, False):
+            group = is_inside if inside else ~is_inside
+            if not group.any():
+                continue
+
+            r_group, theta_group, phi_group = r_block[group], theta_block[group], phi_block[group]
+            e_group, h_group = evaluate(
+                abcd, scale, lambda0, m_sphere, n_env, r_group, theta_group, phi_group, inside, want_e, want_h
             )
-            if inside:
-                m_rel = np.conjugate(m_sphere / n_env)
-                h_rad = m_rel * _sum_two_scaled_terms(scale, d, M_even_rad, -1.0 + 0.0j, c, N_odd_rad, -1.0j)
-                h_the = m_rel * _sum_two_scaled_terms(scale, d, M_even_the, -1.0 + 0.0j, c, N_odd_the, -1.0j)
-                h_phi = m_rel * _sum_two_scaled_terms(scale, d, M_even_phi, -1.0 + 0.0j, c, N_odd_phi, -1.0j)
-            else:
-                h_rad = _sum_two_scaled_terms(scale, b, N_odd_rad, 1.0j, a, M_even_rad, 1.0 + 0.0j)
-                h_the = _sum_two_scaled_terms(scale, b, N_odd_the, 1.0j, a, M_even_the, 1.0 + 0.0j)
-                h_phi = _sum_two_scaled_terms(scale, b, N_odd_phi, 1.0j, a, M_even_phi, 1.0 + 0.0j)
-                if include_incident:
-                    h_i = _incident_h_spherical(lambda0, n_env, r_flat[group], theta_flat[group], phi_flat[group])
-                    h_rad += h_i[0]
-                    h_the += h_i[1]
-                    h_phi += h_i[2]
-            h_out[:, group] = np.array([h_rad, h_the, h_phi])
+            if include_incident and not inside:
+                if want_e:
+                    e_group += _incident_e_spherical(lambda0, n_env, r_group, theta_group, phi_group)
+                if want_h:
+                    h_group += _incident_h_spherical(lambda0, n_env, r_group, theta_group, phi_group)
+            if want_e:
+                e_out[:, points][:, group] = e_group
+            if want_h:
+                h_out[:, points][:, group] = h_group
 
     e_final = e_out.reshape((3,) + shape) if want_e else None
     h_final = h_out.reshape((3,) + shape) if want_h else None
@@ -429,7 +613,20 @@ def _spherical_components_to_cartesian(field_sph, r, theta, phi):
     return np.array([fx, fy, fz])
 
 
-def e_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident=True, n_pole=0, abcd=None):
+def e_near(
+    lambda0,
+    d_sphere,
+    m_sphere,
+    n_env,
+    r,
+    theta,
+    phi,
+    include_incident=True,
+    n_pole=0,
+    abcd=None,
+    tol=None,
+    max_memory=None,
+):
     """Calculate the electric field in and around a sphere.
 
     Args:
@@ -445,14 +642,22 @@ def e_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident=T
             two more than Wiscombe's criterion, which converges the near field at
             the sphere surface roughly five times closer than the criterion alone.
         abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
-            If provided, ``n_pole`` is ignored.
+            If provided, ``n_pole`` and ``tol`` are ignored.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+        max_memory (int or None): Bytes allowed for the working arrays.  The
+            points are evaluated in blocks that fit, each written into the
+            result before the next; the fields are the same whatever the size.
+            ``None`` evaluates all the points at once.
 
     Returns:
         ndarray: Spherical electric components ``[E_r, E_theta, E_phi]`` with
             shape ``(3, ...)``.
     """
     if abcd is None:
-        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole)
+        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole, tol)
 
     return _near_fields(
         abcd,
@@ -466,10 +671,24 @@ def e_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident=T
         include_incident,
         want_e=True,
         want_h=False,
+        max_memory=max_memory,
     )[0]
 
 
-def h_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident=True, n_pole=0, abcd=None):
+def h_near(
+    lambda0,
+    d_sphere,
+    m_sphere,
+    n_env,
+    r,
+    theta,
+    phi,
+    include_incident=True,
+    n_pole=0,
+    abcd=None,
+    tol=None,
+    max_memory=None,
+):
     """Calculate the magnetic field in and around a sphere.
 
     Args:
@@ -485,14 +704,22 @@ def h_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident=T
             two more than Wiscombe's criterion, which converges the near field at
             the sphere surface roughly five times closer than the criterion alone.
         abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
-            If provided, ``n_pole`` is ignored.
+            If provided, ``n_pole`` and ``tol`` are ignored.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+        max_memory (int or None): Bytes allowed for the working arrays.  The
+            points are evaluated in blocks that fit, each written into the
+            result before the next; the fields are the same whatever the size.
+            ``None`` evaluates all the points at once.
 
     Returns:
         ndarray: Spherical magnetic components ``[H_r, H_theta, H_phi]`` with
             shape ``(3, ...)``.
     """
     if abcd is None:
-        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole)
+        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole, tol)
 
     return _near_fields(
         abcd,
@@ -506,6 +733,7 @@ def h_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident=T
         include_incident,
         want_e=False,
         want_h=True,
+        max_memory=max_memory,
     )[1]
 
 
@@ -520,6 +748,8 @@ def eh_near(
     include_incident=True,
     n_pole=0,
     abcd=None,
+    tol=None,
+    max_memory=None,
 ):
     """Calculate electric and magnetic fields in and around a sphere.
 
@@ -536,14 +766,22 @@ def eh_near(
             two more than Wiscombe's criterion, which converges the near field at
             the sphere surface roughly five times closer than the criterion alone.
         abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
-            If provided, ``n_pole`` is ignored.
+            If provided, ``n_pole`` and ``tol`` are ignored.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+        max_memory (int or None): Bytes allowed for the working arrays.  The
+            points are evaluated in blocks that fit, each written into the
+            result before the next; the fields are the same whatever the size.
+            ``None`` evaluates all the points at once.
 
     Returns:
         tuple[ndarray, ndarray]: Tuple ``(E, H)`` in spherical components,
             each with shape ``(3, ...)``.
     """
     if abcd is None:
-        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole)
+        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole, tol)
 
     return _near_fields(
         abcd,
@@ -557,6 +795,7 @@ def eh_near(
         include_incident,
         want_e=True,
         want_h=True,
+        max_memory=max_memory,
     )
 
 
@@ -571,6 +810,8 @@ def e_near_cartesian(
     include_incident=True,
     n_pole=0,
     abcd=None,
+    tol=None,
+    max_memory=None,
 ):
     """Calculate electric near field in Cartesian coordinates.
 
@@ -587,12 +828,20 @@ def e_near_cartesian(
             two more than Wiscombe's criterion, which converges the near field at
             the sphere surface roughly five times closer than the criterion alone.
         abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+        max_memory (int or None): Bytes allowed for the working arrays.  The
+            points are evaluated in blocks that fit, each written into the
+            result before the next; the fields are the same whatever the size.
+            ``None`` evaluates all the points at once.
 
     Returns:
         ndarray: Cartesian electric components ``[E_x, E_y, E_z]``.
     """
     r, theta, phi = cartesian_to_spherical(x, y, z)
-    e_sph = e_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, n_pole, abcd)
+    e_sph = e_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, n_pole, abcd, tol, max_memory)
     return _spherical_components_to_cartesian(e_sph, r, theta, phi)
 
 
@@ -607,6 +856,8 @@ def h_near_cartesian(
     include_incident=True,
     n_pole=0,
     abcd=None,
+    tol=None,
+    max_memory=None,
 ):
     """Calculate magnetic near field in Cartesian coordinates.
 
@@ -623,12 +874,20 @@ def h_near_cartesian(
             two more than Wiscombe's criterion, which converges the near field at
             the sphere surface roughly five times closer than the criterion alone.
         abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+        max_memory (int or None): Bytes allowed for the working arrays.  The
+            points are evaluated in blocks that fit, each written into the
+            result before the next; the fields are the same whatever the size.
+            ``None`` evaluates all the points at once.
 
     Returns:
         ndarray: Cartesian magnetic components ``[H_x, H_y, H_z]``.
     """
     r, theta, phi = cartesian_to_spherical(x, y, z)
-    h_sph = h_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, n_pole, abcd)
+    h_sph = h_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, n_pole, abcd, tol, max_memory)
     return _spherical_components_to_cartesian(h_sph, r, theta, phi)
 
 
@@ -643,6 +902,8 @@ def eh_near_cartesian(
     include_incident=True,
     n_pole=0,
     abcd=None,
+    tol=None,
+    max_memory=None,
 ):
     """Calculate electric and magnetic near fields in Cartesian coordinates.
 
@@ -659,13 +920,114 @@ def eh_near_cartesian(
             two more than Wiscombe's criterion, which converges the near field at
             the sphere surface roughly five times closer than the criterion alone.
         abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+        max_memory (int or None): Bytes allowed for the working arrays.  The
+            points are evaluated in blocks that fit, each written into the
+            result before the next; the fields are the same whatever the size.
+            ``None`` evaluates all the points at once.
 
     Returns:
         tuple[ndarray, ndarray]: Tuple ``(E_xyz, H_xyz)`` where each array is
             ``[x, y, z]`` components.
     """
     r, theta, phi = cartesian_to_spherical(x, y, z)
-    e_sph, h_sph = eh_near(lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, n_pole, abcd)
+    e_sph, h_sph = eh_near(
+        lambda0, d_sphere, m_sphere, n_env, r, theta, phi, include_incident, n_pole, abcd, tol, max_memory
+    )
     e_xyz = _spherical_components_to_cartesian(e_sph, r, theta, phi)
     h_xyz = _spherical_components_to_cartesian(h_sph, r, theta, phi)
     return e_xyz, h_xyz
+
+
+def eh_near_grid(
+    lambda0,
+    d_sphere,
+    m_sphere,
+    n_env,
+    r,
+    theta,
+    phi,
+    include_incident=True,
+    n_pole=0,
+    abcd=None,
+    tol=None,
+):
+    """Calculate electric and magnetic fields on a spherical grid.
+
+    The grid holds every combination of the radii ``r``, the polar angles ``theta``
+    and the azimuths ``phi``.  Each field component is a product of a radial
+    function, an angular function of theta summed over the orders with it, and
+    ``cos(phi)`` or ``sin(phi)``.  So the radial functions are computed once per
+    radius, pi_n and tau_n once per polar angle, and the sums over orders are
+    matrix products of the two tables.  The work grows as
+    ``N_r * N_theta * (n_terms + N_phi)`` rather than as
+    ``N_r * N_theta * N_phi * n_terms`` for the same points given to `eh_near`.
+
+    Args:
+        lambda0 (float): Vacuum wavelength.
+        d_sphere (float): Sphere diameter.
+        m_sphere (complex): Sphere refractive index.
+        n_env (float): Refractive index of the surrounding medium.
+        r (float or ndarray): 1-D array of radial coordinates.
+        theta (float or ndarray): 1-D array of polar angles in radians.
+        phi (float or ndarray): 1-D array of azimuth angles in radians.
+        include_incident (bool): Include incident field for points outside sphere.
+        n_pole (int): Number of multipole terms to keep. ``0`` (the default) keeps
+            two more than Wiscombe's criterion, which converges the near field at
+            the sphere surface roughly five times closer than the criterion alone.
+        abcd (ndarray or None): Optional precomputed coefficients ``[a, b, c, d]``.
+            If provided, ``n_pole`` and ``tol`` are ignored.
+        tol (float or None): Accuracy wanted.  The series is cut after
+            ``series_terms(x, tol)`` orders plus the same two extra orders, so a
+            loose tolerance keeps fewer orders and a tight one more.  It cannot
+            be combined with ``n_pole``.
+
+    Returns:
+        tuple[ndarray, ndarray]: Tuple ``(E, H)`` in spherical components, each
+            with shape ``(3, len(r), len(theta), len(phi))``.
+    """
+    r, theta, phi = (np.atleast_1d(np.asarray(v, dtype=float)) for v in (r, theta, phi))
+    if r.ndim != 1 or theta.ndim != 1 or phi.ndim != 1:
+        raise ValueError("r, theta and phi must each be one-dimensional")
+    if abcd is None:
+        abcd = _coefficients_abcd(lambda0, d_sphere, m_sphere, n_env, n_pole, tol)
+
+    n_terms = len(abcd[0])
+    nn = np.arange(1, n_terms + 1)
+    scale = 1j**nn * (2 * nn + 1) / ((nn + 1) * nn)
+
+    pi, tau = _angular_functions(n_terms, theta)
+    pi, tau = pi.T.astype(np.complex128), tau.T.astype(np.complex128)
+    pi_r = nn[:, np.newaxis] * (nn[:, np.newaxis] + 1.0) * np.sin(theta) * pi
+
+    # the (r, theta) planes of E_r, E_theta, E_phi, H_r, H_theta, H_phi without phi
+    planes = np.empty((6, r.size, theta.size), dtype=np.complex128)
+    is_inside = r < d_sphere / 2
+    for inside in (True, False):
+        rows = is_inside if inside else ~is_inside
+        if not rows.any():
+            continue
+        m_index, (alpha, beta, gamma, delta) = _series_weights(abcd, scale, m_sphere, n_env, inside)
+        z_n, f1, f2 = _radial_functions(n_terms, lambda0, m_index, r[rows], inside)
+        alpha_f2, beta_z, gamma_f2, delta_z = alpha * f2, beta * z_n, gamma * f2, delta * z_n
+        planes[0, rows] = (alpha * f1) @ pi_r
+        planes[1, rows] = alpha_f2 @ tau + beta_z @ pi
+        planes[2, rows] = alpha_f2 @ pi + beta_z @ tau
+        planes[3, rows] = (gamma * f1) @ pi_r
+        planes[4, rows] = gamma_f2 @ tau - delta_z @ pi
+        planes[5, rows] = gamma_f2 @ pi - delta_z @ tau
+
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    azimuthal = np.array([cos_phi, cos_phi, -sin_phi, sin_phi, sin_phi, cos_phi])
+    fields = planes[:, :, :, np.newaxis] * azimuthal[:, np.newaxis, np.newaxis, :]
+    e_grid, h_grid = fields[:3], fields[3:]
+
+    if include_incident and not is_inside.all():
+        r_out = r[~is_inside][:, np.newaxis, np.newaxis]
+        theta_col, phi_row = theta[:, np.newaxis], phi[np.newaxis, :]
+        e_grid[:, ~is_inside] += _incident_e_spherical(lambda0, n_env, r_out, theta_col, phi_row)
+        h_grid[:, ~is_inside] += _incident_h_spherical(lambda0, n_env, r_out, theta_col, phi_row)
+    return e_grid, h_grid
@@ -0,0 +1,459 @@
+"""
+Refractive indices of materials, as functions of wavelength.
+
+Every index here is a ``Dispersion``: a function of the vacuum wavelength in
+microns that gives the complex index with the sign convention used everywhere else
+in ``miepython``, m = n - ik.  It can be passed as ``m`` to ``efficiencies`` and
+``intensities``, which call it at their wavelengths, or to ``spectrum``::
+
+    import numpy as np
+    import miepython as mie
+    import miepython.materials as mm
+
+    gold = mm.material("gold")
+    lambda0 = np.linspace(0.4, 0.8, 201)                # microns
+    qext, qsca, qback, g = mie.efficiencies(gold, 0.1, lambda0)
+    spec = mie.spectrum(gold, 0.1, gold.lambda_min, gold.lambda_max)
+
+    silica = mm.Sellmeier([0.6961663, 0.4079426, 0.8974794], [0.0684043**2, 0.1162414**2, 9.896161**2])
+    ipar, iper = mie.intensities(silica, 1.0, 0.6328, np.linspace(-1, 1, 181))
+
+Tables
+------
+
+The package carries measured indices of gold and of water.  ``material`` reads one
+of them and returns a ``Material`` that interpolates it.  The bundled tables are
+
+    ``"gold"``   Johnson and Christy, Phys. Rev. B 6, 4370 (1972), 0.19-1.94 µm
+    ``"water"``  Segelstein, M.S. Thesis, University of Missouri-Kansas City (1981),
+                 0.01 µm-10 m
+
+``read_table`` takes any other file in the same tab-separated form: a table of
+wavelength, n and k, or a table of wavelength and n followed by one of wavelength
+and k, as ``refractiveindex.info`` writes them.  Lines that are not numbers
+(citations, column headings) are skipped, and a heading after a block of numbers
+starts the next table.
+
+Between the measured wavelengths n and k are interpolated linearly.  Outside them
+the index is unknown, and asking for it is a ValueError rather than a guess.
+
+A table is parsed once per process and kept, and every ``Material`` made from it
+shares its arrays, which are therefore read-only.  With ``sidecar=True`` the parsed
+table is also saved as a ``.npy`` file beside the text file and read from there
+next time, which for the 1261 rows of the water table is about twenty times
+faster than parsing them.  A sidecar older than its text file is ignored and
+rewritten, and one that cannot be written, because the package is installed
+where the user may not write, is simply not kept.
+
+Formulas
+--------
+
+``Sellmeier``, ``Cauchy`` and ``DrudeLorentz`` evaluate the usual dispersion
+formulas with wavelengths in microns and, for ``DrudeLorentz``, energies in eV.
+Each is a few NumPy operations over the whole grid, which for 10**5 wavelengths
+take between one and ten milliseconds, a few percent of the time the spheres
+themselves take even with numba.
+Outside the range its coefficients were fitted to, a formula is evaluated all the
+same; it is up to the caller to stay inside it.
+
+Each ``Dispersion`` remembers the last grid it was called with and returns the
+same read-only array when called with an equal grid again, so a sweep over
+diameters at fixed wavelengths evaluates the index once.
+"""
+
+import abc
+import os
+
+import numpy as np
+
+__all__ = ("material", "read_table", "Dispersion", "Material", "Sellmeier", "Cauchy", "DrudeLorentz", "MATERIALS")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# the bundled tables, by the name ``material`` knows them by
+MATERIALS = {
+    "gold": "Johnson.txt",
+    "water": "segelstein81_index.txt",
+}
+
+# photon energy times vacuum wavelength [eV µm]
+HC = 1.239841984
+
+# parsed tables, by absolute path
+_tables = {}
+
+
+class Dispersion(abc.ABC):
+    """The complex index of refraction of a material as a function of wavelength."""
+
+    _last = None
+
+    @abc.abstractmethod
+    def index(self, lambda0):
+        """
+        Return the complex index of refraction.
+
+        Args:
+            lambda0: vacuum wavelengths [µm]
+
+        Returns:
+            m: n - ik, with the shape of lambda0
+        """
+
+    def __call__(self, lambda0):
+        """
+        Return the complex index of refraction, reusing the last result for the same grid.
+
+        Args:
+            lambda0: vacuum wavelengths [µm]
+
+        Returns:
+            m: n - ik, with the shape of lambda0
+        """
+        lambda0 = np.asarray(lambda0, dtype=np.float64)
+        if np.any(lambda0 <= 0):
+            raise ValueError("wavelengths must be positive")
+        if lambda0.ndim == 0:
+            return self.index(lambda0)[()]
+
+        last = self._last
+        if last is not None and last[0].shape == lambda0.shape and np.array_equal(last[0], lambda0):
+            return last[1]
+        m = np.asarray(self.index(lambda0), dtype=np.complex128)
+        m.flags.writeable = False
+        self._last = (lambda0.copy(), m)
+        return m
+
+
+class Material(Dispersion):
+    """
+    A tabulated complex index of refraction.
+
+    Attributes:
+        name: what the table is of
+        wavelength: the increasing vacuum wavelengths of the table [µm]
+        n: the real part of the index at each
+        k: the imaginary part of the index at each, positive for absorption
+    """
+
+    def __init__(self, name, wavelength, n, k):
+        """
+        Create a material from its measured index.
+
+        Args:
+            name: what the table is of
+            wavelength: the increasing vacuum wavelengths [µm]
+            n: the real part of the index at each
+            k: the imaginary part of the index at each, positive for absorption
+        """
+        self.name = name
+        self.wavelength = np.asarray(wavelength, dtype=np.float64)
+        self.n = np.asarray(n, dtype=np.float64)
+        self.k = np.asarray(k, dtype=np.float64)
+        if self.wavelength.ndim != 1 or len(self.wavelength) < 2:
+            raise ValueError("a material needs a table of at least two wavelengths")
+        if self.n.shape != self.wavelength.shape or self.k.shape != self.wavelength.shape:
+            raise ValueError("wavelength, n and k must have the same length")
+        if self.wavelength[0] <= 0 or np.any(np.diff(self.wavelength) <= 0):
+            raise ValueError("the wavelengths must be positive and increasing")
+
+    def __repr__(self):
+        """Return the name and range of the table."""
+        return "Material(%s, %d wavelengths from %g to %g)" % (
+            self.name,
+            len(self.wavelength),
+            self.lambda_min,
+            self.lambda_max,
+        )
+
+    @property
+    def lambda_min(self):
+        """The shortest wavelength in the table [µm]."""
+        return self.wavelength[0]
+
+    @property
+    def lambda_max(self):
+        """The longest wavelength in the table [µm]."""
+        return self.wavelength[-1]
+
+    def index(self, lambda0):
+        """
+        Interpolate the complex index of refraction.
+
+        Args:
+            lambda0: vacuum wavelengths inside the table [µm]
+
+        Returns:
+            m: n - ik, with the shape of lambda0
+        """
+        if np.any(lambda0 < self.lambda_min) or np.any(lambda0 > self.lambda_max):
+            raise ValueError("%s is tabulated only from %g to %g µm" % (self.name, self.lambda_min, self.lambda_max))
+        n = np.interp(lambda0, self.wavelength, self.n)
+        k = np.interp(lambda0, self.wavelength, self.k)
+        return n - 1j * k
+
+
+def _coefficients(name, values):
+    """Return coefficients as a 1-D float array, refusing an empty list."""
+    values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    if values.ndim != 1 or len(values) == 0:
+        raise ValueError("%s must be a non-empty list of numbers" % name)
+    return values
+
+
+class Sellmeier(Dispersion):
+    """
+    The Sellmeier formula, n**2 = 1 + sum B_i lambda**2 / (lambda**2 - C_i).
+
+    Just short of a resonant wavelength the sum is negative, and the index there
+    is purely imaginary, -i sqrt(-n**2), rather than nan.
+
+    Attributes:
+        B: the strength of each term [-]
+        C: the square of each term's resonant wavelength [µm²]
+        k: a constant imaginary part, positive for absorption
+    """
+
+    def __init__(self, B, C, k=0.0):
+        """
+        Create a Sellmeier index.
+
+        Args:
+            B: the strength of each term [-]
+            C: the square of each term's resonant wavelength [µm²]
+            k: (optional) a constant imaginary part, positive for absorption
+        """
+        self.B = _coefficients("B", B)
+        self.C = _coefficients("C", C)
+        self.k = float(k)
+        if len(self.B) != len(self.C):
+            raise ValueError("B and C must have the same length")
+
+    def __repr__(self):
+        """Return the coefficients."""
+        return "Sellmeier(B=%s, C=%s, k=%g)" % (self.B.tolist(), self.C.tolist(), self.k)
+
+    def index(self, lambda0):
+        """
+        Return the complex index of refraction.
+
+        Args:
+            lambda0: vacuum wavelengths [µm]
+
+        Returns:
+            m: n - ik, with the shape of lambda0
+        """
+        lambda2 = lambda0**2
+        n2 = np.ones_like(lambda2)
+        for b, c in zip(self.B, self.C):
+            n2 += b * lambda2 / (lambda2 - c)
+        # the root of a negative n**2 is imaginary; conjugated, it is n - ik with k > 0
+        return np.conj(np.sqrt(n2.astype(np.complex128))) - 1j * self.k
+
+
+class Cauchy(Dispersion):
+    """
+    Cauchy's formula, n = A_0 + A_1 / lambda**2 + A_2 / lambda**4 + ...
+
+    Attributes:
+        A: the coefficient of each power of 1/lambda**2 [µm to that power]
+        k: a constant imaginary part, positive for absorption
+    """
+
+    def __init__(self, A, k=0.0):
+        """
+        Create a Cauchy index.
+
+        Args:
+            A: the coefficient of each power of 1/lambda**2, starting with the constant
+            k: (optional) a constant imaginary part, positive for absorption
+        """
+        self.A = _coefficients("A", A)
+        self.k = float(k)
+
+    def __repr__(self):
+        """Return the coefficients."""
+        return "Cauchy(A=%s, k=%g)" % (self.A.tolist(), self.k)
+
+    def index(self, lambda0):
+        """
+        Return the complex index of refraction.
+
+        Args:
+            lambda0: vacuum wavelengths [µm]
+
+        Returns:
+            m: n - ik, with the shape of lambda0
+        """
+        u = 1 / lambda0**2
+        n = np.full_like(u, self.A[-1])
+        for a in self.A[-2::-1]:
+            n = n * u + a
+        return n - 1j * self.k
+
+
+class DrudeLorentz(Dispersion):
+    """
+    A Drude term for the free electrons and Lorentz oscillators for the bound ones.
+
+    The permittivity at photon energy E is::
+
+        eps = eps_inf - E_p**2 / (E**2 + i gamma E)
+                      + sum strength_j E_j**2 / (E_j**2 - E**2 - i gamma_j E)
+
+    and the index is its square root, conjugated to n - ik.
+
+    Attributes:
+        eps_inf: the permittivity at energies above all the terms [-]
+        E_p: the plasma energy of the free electrons, zero for none [eV]
+        gamma: the damping of the free electrons [eV]
+        oscillators: rows of strength [-], energy [eV] and damping [eV]
+    """
+
+    def __init__(self, eps_inf, E_p, gamma, oscillators=()):
+        """
+        Create a Drude-Lorentz index.
+
+        Args:
+            eps_inf: the permittivity at energies above all the terms [-]
+            E_p: the plasma energy of the free electrons, zero for none [eV]
+            gamma: the damping of the free electrons [eV]
+            oscillators: (optional) (strength, energy, damping) for each Lorentz term
+        """
+        self.eps_inf = float(eps_inf)
+        self.E_p = float(E_p)
+        self.gamma = float(gamma)
+        self.oscillators = np.asarray(oscillators, dtype=np.float64).reshape(-1, 3)
+        if self.gamma < 0 or np.any(self.oscillators[:, 1:] < 0):
+            raise ValueError("energies and dampings must not be negative")
+
+    def __repr__(self):
+        """Return the parameters."""
+        return "DrudeLorentz(eps_inf=%g, E_p=%g, gamma=%g, %d oscillators)" % (
+            self.eps_inf,
+            self.E_p,
+            self.gamma,
+            len(self.oscillators),
+        )
+
+    def permittivity(self, lambda0):
+        """
+        Return the complex permittivity, with a positive imaginary part for absorption.
+
+        Args:
+            lambda0: vacuum wavelengths [µm]
+
+        Returns:
+            eps: with the shape of lambda0
+        """
+        energy = HC / np.asarray(lambda0, dtype=np.float64)
+        eps = np.full(energy.shape, self.eps_inf, dtype=np.complex128)
+        if self.E_p != 0:
+            eps -= self.E_p**2 / (energy * (energy + 1j * self.gamma))
+        for strength, e_j, gamma_j in self.oscillators:
+            eps += strength * e_j**2 / (e_j**2 - energy * (energy + 1j * gamma_j))
+        return eps
+
+    def index(self, lambda0):
+        """
+        Return the complex index of refraction.
+
+        Args:
+            lambda0: vacuum wavelengths [µm]
+
+        Returns:
+            m: n - ik, with the shape of lambda0
+        """
+        return np.conj(np.sqrt(self.permittivity(lambda0)))
+
+
+def _parse(path):
+    """Return the wavelength, n and k columns of a text table as one (3, N) array."""
+    blocks = []
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            try:
+                rows.append([float(value) for value in fields])
+            except ValueError:
+                if rows:
+                    blocks.append(np.array(rows))
+                    rows = []
+    if rows:
+        blocks.append(np.array(rows))
+
+    shapes = [block.shape[1] if block.ndim == 2 else 0 for block in blocks]
+    if shapes == [3]:
+        table = blocks[0].T
+    elif shapes == [2, 2] and np.array_equal(blocks[0][:, 0], blocks[1][:, 0]):
+        table = np.array([blocks[0][:, 0], blocks[0][:, 1], blocks[1][:, 1]])
+    else:
+        raise ValueError(
+            "%s holds neither a table of wavelength, n and k nor tables of n and k at the same wavelengths" % path
+        )
+    return table
+
+
+def _sidecar_path(path):
+    """Return the name of the binary copy of a text table."""
+    return os.path.splitext(path)[0] + ".npy"
+
+
+def _load(path, sidecar):
+    """Return the parsed table, from the sidecar when it is current."""
+    npy = _sidecar_path(path)
+    if sidecar and os.path.exists(npy) and os.path.getmtime(npy) >= os.path.getmtime(path):
+        return np.load(npy)
+
+    table = _parse(path)
+    if sidecar:
+        # write under another name first so a reader never sees half a file
+        temporary = "%s.%d.tmp" % (npy, os.getpid())
+        try:
+            with open(temporary, "wb") as f:
+                np.save(f, table)
+            os.replace(temporary, npy)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+    return table
+
+
+def read_table(path, name=None, sidecar=False):
+    """
+    Read a table of refractive indices.
+
+    Args:
+        path: a text file of wavelengths in microns, n and k
+        name: (optional) what the table is of, by default the file's name
+        sidecar: (optional) keep a binary copy beside the file for the next process
+
+    Returns:
+        a ``Material`` that interpolates the table
+    """
+    path = os.path.abspath(path)
+    if path not in _tables:
+        _tables[path] = _load(path, sidecar)
+        _tables[path].flags.writeable = False
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+    return Material(name, *_tables[path])
+
+
+def material(name, sidecar=False):
+    """
+    Return the refractive index of a material whose table ships with miepython.
+
+    Args:
+        name: one of the keys of ``MATERIALS``
+        sidecar: (optional) keep a binary copy beside the table for the next process
+
+    Returns:
+        a ``Material`` that interpolates the table
+    """
+    if name not in MATERIALS:
+        raise ValueError("no table for %r; the tables are %s" % (name, ", ".join(sorted(MATERIALS))))
+    return read_table(os.path.join(DATA_DIR, MATERIALS[name]), name, sidecar)
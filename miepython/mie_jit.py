@@ -3,17 +3,36 @@ Low-level Mie calculations that use numba.
 """
 
 import numpy as np
-from numba import njit, complex128, float64, int64, boolean
+from numba import njit, prange, complex128, float64, int64, boolean
 
 __all__ = (
     "_D_calc_nb",
     "_an_bn_nb",
+    "_an_bn_into_nb",
+    "_batch_order_nb",
+    "_efficiencies_batch_nb",
+    "_efficiencies_parallel_nb",
     "_cn_dn_nb",
     "_pi_tau_nb",
+    "_pi_tau_table_nb",
+    "_mirrored_pairs_nb",
+    "_near_field_nb",
+    "_qext_qsca_from_ab_nb",
     "_S1_S2_nb",
+    "_S1_S2_batch_nb",
+    "_S1_S2_efficiencies_nb",
+    "_S1_S2_from_ab_nb",
+    "_series_terms_nb",
+    "_efficiencies_from_ab_nb",
+    "_efficiencies_streaming_nb",
     "_single_sphere_nb",
+    "_single_sphere_from_ab_nb",
+    "_single_sphere_tol_ws_nb",
+    "_single_sphere_ws_nb",
     "_small_conducting_sphere_nb",
     "_small_sphere_nb",
+    "_workspace_nb",
+    "_workspace_order_nb",
 )
 
 
@@ -127,6 +146,43 @@ def _psi_downwards_nb(z, nstop):
     return psi[: nstop + 1]
 
 
+@njit((float64, int64, float64[:]), cache=True)
+def _psi_real_into_nb(x, nstop, psi):
+    """
+    Compute psi_0(x)..psi_nstop(x) for a real argument into a buffer.
+
+    The same Miller recurrence as ``_psi_downwards_nb``, kept real and written into
+    a buffer the caller owns.  The recurrence starts above nstop, so the buffer
+    must hold the orders it starts from as well; ``_workspace_nb`` sizes it.  Entries past nstop are left unnormalized.
+
+    Args:
+        x: the size parameter, greater than zero
+        nstop: highest order needed
+        psi: buffer that gets psi_k(x) for k=0 to nstop
+    """
+    n_start = int(max(float(nstop), x)) + 25 + int(1.5 * np.sqrt(x))
+    if len(psi) < n_start + 2:
+        raise ValueError("the psi workspace needs " + str(n_start + 2) + " entries")
+
+    psi[n_start + 1] = 0.0
+    psi[n_start] = 1e-50
+    for n in range(n_start, 0, -1):
+        psi[n - 1] = (2 * n + 1) / x * psi[n] - psi[n + 1]
+        if abs(psi[n - 1]) > 1e200:  # keep the growing tail in range
+            for k in range(n - 1, n_start + 2):
+                psi[k] /= 1e200
+
+    sin_x = np.sin(x)
+    psi_0 = sin_x
+    psi_1 = sin_x / x - np.cos(x)
+    if abs(psi_1) > abs(psi_0):
+        scale = psi_1 / psi[1]
+    else:
+        scale = psi_0 / psi[0]
+    for k in range(nstop + 1):
+        psi[k] *= scale
+
+
 @njit((complex128, int64), cache=True)
 def _D_calc_down_nb(z, N):
     """
@@ -182,35 +238,115 @@ def _D_calc_nb(m, x, N):
     return _D_calc_down_nb(np.complex128(m * x), N)
 
 
-# Lazily compiled, unlike the kernels around it, so that n_pole can carry the same
-# default as ``_an_bn_py``: numba rejects an omitted argument against an eager
-# signature, which used to make ``an_bn(m, x)`` work with the JIT off and raise
-# TypeError with it on.
-@njit(cache=True)
-def _an_bn_nb(m, x, n_pole=0):
+@njit((float64, float64), cache=True)
+def _series_terms_nb(x, tol):
     """
-    Compute arrays of Mie coefficients a_n and b_n for a sphere.
+    Return the number of orders that sums the series of a sphere to within tol.
 
-    When n_pole=0, the routine estimates the size of the arrays based on Wiscombe's
-    formula. The length of the arrays is chosen so that the error when the series
-    is summed is around 1e-6.
+    Past order x the coefficients die off faster than exponentially, over a
+    number of orders that grows like x**(1/3), so the count keeps Wiscombe's
+    form with a coefficient that grows with the digits asked for.  The constant
+    was fitted, with a margin, to the last order at which qext, qsca, qback and
+    g of random spheres up to x = 2000 still changed by tol.
 
-    If n_pole>0, then the arrays hold exactly n_pole terms, orders 1 to n_pole.
-    This is useful when trying to isolate the behavior of a particular multipole.
+    Args:
+        x: the size parameter of the sphere
+        tol: the accuracy wanted, 0 for Wiscombe's count
 
-    To support resonance calculations, one can specify the number of terms
-    to be calculated.  In general, using too few or too many terms increases the
-    error rate.  So if you specify the number of terms be aware that you are
-    playing with fire.
+    Returns:
+        the number of terms, so orders 1 through the returned value
+    """
+    x = max(x, 0.0)
+    if tol <= 0:
+        return int(x + 4.05 * x**0.33333 + 2.0)
+    return int(x + 1.6 * np.sqrt(np.log(1.0 / tol)) * x**0.33333 + 2.0)
+
+
+@njit((float64, int64), cache=True)
+def _workspace_order_nb(x, n_pole):
+    """
+    Return the order a workspace needs for a sphere of size x.
+
+    The series runs through Wiscombe's n_terms, or n_pole orders when that is
+    given, and Miller's recurrence for psi_n starts above both n_terms and x, so
+    the order covers whichever is larger.  It grows with x, so a workspace for
+    the largest sphere of a batch serves all the others.
+
+    Args:
+        x: the size parameter of the sphere
+        n_pole: the number of terms, 0 for Wiscombe's estimate
+
+    Returns:
+        the n_max to pass to ``_workspace_nb``
+    """
+    x = max(x, 0.0)
+    if n_pole == 0:
+        n_terms = int(x + 4.05 * x**0.33333 + 2.0)
+    else:
+        n_terms = n_pole
+    return max(n_terms, int(x) + 1)
+
+
+@njit((float64, int64, float64), cache=True)
+def _batch_order_nb(x_max, n_pole, tol):
+    """
+    Return the order a workspace needs for every sphere of a batch.
+
+    Args:
+        x_max: the largest size parameter in the batch
+        n_pole: the multipole isolated, 0 for the full series
+        tol: the accuracy the full series is summed to, 0 for Wiscombe's count
+
+    Returns:
+        the n_max to pass to ``_workspace_nb``
+    """
+    n_max = _workspace_order_nb(x_max, n_pole)
+    if n_pole == 0 and tol > 0:
+        n_max = max(n_max, _series_terms_nb(x_max, tol))
+    return n_max
+
+
+@njit((int64,), cache=True)
+def _workspace_nb(n_max):
+    """
+    Allocate the buffers the Mie series of any sphere up to order n_max needs.
+
+    Args:
+        n_max: the largest ``_workspace_order_nb`` the buffers will be used for
+
+    Returns:
+        psi: float64 buffer for the Riccati-Bessel functions psi_n(x)
+        D: complex128 buffer for the logarithmic derivatives D_n(mx)
+        a: complex128 buffer for the coefficients a_n
+        b: complex128 buffer for the coefficients b_n
+    """
+    psi = np.empty(n_max + 27 + int(1.5 * np.sqrt(n_max)), dtype=np.float64)
+    D = np.empty(n_max + 2, dtype=np.complex128)
+    a = np.empty(n_max, dtype=np.complex128)
+    b = np.empty(n_max, dtype=np.complex128)
+    return psi, D, a, b
+
+
+@njit((complex128, float64, int64, float64[:], complex128[:], complex128[:], complex128[:]), cache=True)
+def _an_bn_into_nb(m, x, n_pole, psi, D, a, b):
+    """
+    Compute the Mie coefficients a_n and b_n into buffers the caller owns.
+
+    ``_an_bn_nb`` with the arrays passed in rather than allocated, so a loop over
+    spheres can reuse one set from ``_workspace_nb``.  The first n_terms entries
+    of a and b get the coefficients; psi and D are scratch space.
 
     Args:
         m: the complex index of refraction of the sphere
         x: the size parameter of the sphere
         n_pole: the number of An and Bn terms (0 does autosizing)
+        psi: float64 workspace, large enough for x and n_pole
+        D: complex128 workspace from the same call
+        a: gets the coefficients a_n, one entry per order
+        b: gets the coefficients b_n
 
     Returns:
-        a, b: arrays of Mie coefficents An and Bn, one entry per order,
-        with no padding.  ``_cn_dn`` returns the same number of terms.
+        n_terms: the number of orders filled in
     """
     # make sure sign of imaginary part is negative
     m_re = m.real
@@ -225,10 +361,12 @@ def _an_bn_nb(m, x, n_pole=0):
     else:
         n_terms = n_pole
 
-    a = np.zeros(n_terms, dtype=np.complex128)
-    b = np.zeros(n_terms, dtype=np.complex128)
+    if len(a) < n_terms or len(b) < n_terms or len(D) < n_terms + 2:
+        raise ValueError("the workspace holds too few orders for " + str(n_terms) + " terms")
     if x <= 0:
-        return a, b
+        a[:n_terms] = 0
+        b[:n_terms] = 0
+        return n_terms
 
     # group the arithmetic exactly as _an_bn_py does: multiplying by a precomputed
     # 1/x here and dividing by x there differed by one ulp, which the recurrences
@@ -241,7 +379,7 @@ def _an_bn_nb(m, x, n_pole=0):
     # n stays below x, which is all Wiscombe's truncation needs, but its relative
     # accuracy is already down to about 1e-6 at n = n_terms and it collapses
     # completely past that, so a caller asking for extra orders used to get noise.
-    psi = _psi_downwards_nb(np.complex128(x), n_terms).real
+    _psi_real_into_nb(x, n_terms, psi)
 
     # chi is the growing solution, so its upwards recurrence is the stable one.
     # Building xi as psi + i*chi keeps xi exactly consistent with the psi above,
@@ -250,16 +388,17 @@ def _an_bn_nb(m, x, n_pole=0):
     chi_n = cos_x * inv_x + sin_x
 
     if m.real > 0.0:
-        D = _D_calc_nb(m, x, n_terms + 2)
+        # D[n] is D_n(mx); _D_calc_nb would return it shifted down by one
+        _D_downwards(np.complex128(m * x), n_terms + 2, D)
 
         for n in range(1, n_terms + 1):
             n_over_x = n * inv_x
             xi_nm1 = psi[n - 1] + 1j * chi_nm1
             xi_n = psi[n] + 1j * chi_n
-            temp = D[n - 1] / m + n_over_x
-            a[n - 1] = (temp * psi[n] - psi[n - 1]) / (temp * xi_n - xi_nm1)
-            temp = D[n - 1] * m + n_over_x
-            b[n - 1] = (temp * psi[n] - psi[n - 1]) / (temp * xi_n - xi_nm1)
+            temp = D[n] / m + n_over_x
+            a[n - 1] = np.conjugate((temp * psi[n] - psi[n - 1]) / (temp * xi_n - xi_nm1))
+            temp = D[n] * m + n_over_x
+            b[n - 1] = np.conjugate((temp * psi[n] - psi[n - 1]) / (temp * xi_n - xi_nm1))
             chi = (2 * n + 1) * inv_x * chi_n - chi_nm1
             chi_nm1 = chi_n
             chi_n = chi
@@ -269,13 +408,48 @@ def _an_bn_nb(m, x, n_pole=0):
             n_over_x = n * inv_x
             xi_nm1 = psi[n - 1] + 1j * chi_nm1
             xi_n = psi[n] + 1j * chi_n
-            a[n - 1] = (n_over_x * psi[n] - psi[n - 1]) / (n_over_x * xi_n - xi_nm1)
-            b[n - 1] = psi[n] / xi_n
+            a[n - 1] = np.conjugate((n_over_x * psi[n] - psi[n - 1]) / (n_over_x * xi_n - xi_nm1))
+            b[n - 1] = np.conjugate(psi[n] / xi_n)
             chi = (2 * n + 1) * inv_x * chi_n - chi_nm1
             chi_nm1 = chi_n
             chi_n = chi
 
-    return np.conjugate(a), np.conjugate(b)
+    return n_terms
+
+
+# Lazily compiled, unlike the kernels around it, so that n_pole can carry the same
+# default as ``_an_bn_py``: numba rejects an omitted argument against an eager
+# signature, which used to make ``an_bn(m, x)`` work with the JIT off and raise
+# TypeError with it on.
+@njit(cache=True)
+def _an_bn_nb(m, x, n_pole=0):
+    """
+    Compute arrays of Mie coefficients a_n and b_n for a sphere.
+
+    When n_pole=0, the routine estimates the size of the arrays based on Wiscombe's
+    formula. The length of the arrays is chosen so that the error when the series
+    is summed is around 1e-6.
+
+    If n_pole>0, then the arrays hold exactly n_pole terms, orders 1 to n_pole.
+    This is useful when trying to isolate the behavior of a particular multipole.
+
+    To support resonance calculations, one can specify the number of terms
+    to be calculated.  In general, using too few or too many terms increases the
+    error rate.  So if you specify the number of terms be aware that you are
+    playing with fire.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        n_pole: the number of An and Bn terms (0 does autosizing)
+
+    Returns:
+        a, b: arrays of Mie coefficents An and Bn, one entry per order,
+        with no padding.  ``_cn_dn`` returns the same number of terms.
+    """
+    psi, D, a, b = _workspace_nb(_workspace_order_nb(x, n_pole))
+    n_terms = _an_bn_into_nb(m, x, n_pole, psi, D, a, b)
+    return a[:n_terms], b[:n_terms]
 
 
 # No kernel in this module uses fastmath.  It implies LLVM's nnan and ninf, which
@@ -386,26 +560,52 @@ def _pi_tau_nb(mu, pi, tau):
     tau[n_terms - 1] = n_terms * mu * pi[n_terms - 1] - (n_terms + 1) * pi_nm2
 
 
-@njit((complex128, float64, float64[:], int64), cache=True)
-def _S1_S2_nb(m, x, mu, n_pole):
+@njit((float64[:],), cache=True)
+def _mirrored_pairs_nb(mu):
     """
-    Calculate the scattering amplitude functions for spheres.
+    Count the mirrored angle pairs in a grid that is symmetric about mu = 0.
 
-    The amplitude functions have been normalized so that when integrated
-    over all 4*pi solid angles, the integral will be qext*pi*x**2.
+    A grid is symmetric when reversing it negates every angle, which is what
+    ``np.linspace(-1, 1, N)`` and ``np.cos(np.linspace(0, np.pi, N))`` give.
+    Neither is exact to the last bit, so a pair may miss by a few units in the
+    last place of 1.
 
-    The units are weird, sr**(-0.5)
+    Args:
+        mu: array of angles, cos(theta)
+
+    Returns:
+        the number of pairs mu[k], mu[N-1-k] with k < N//2, or 0 when the grid is
+        not symmetric
+    """
+    nangles = len(mu)
+    for k in range(nangles // 2):
+        # four units of machine epsilon, the spacing of doubles just below 1
+        if abs(mu[k] + mu[nangles - 1 - k]) > 4 * 2.220446049250313e-16:
+            return 0
+    return nangles // 2
+
+
+@njit((complex128[:], complex128[:], float64[:], int64), cache=True)
+def _S1_S2_from_ab_nb(a, b, mu, n_pole):
+    """
+    Sum the scattering amplitudes from Mie coefficients already computed.
+
+    pi_n(-mu) = (-1)**(n+1) pi_n(mu) and tau_n(-mu) = (-1)**n tau_n(mu), so on a
+    grid that is symmetric about mu = 0 the amplitudes at mu[k] and at its mirror
+    image mu[N-1-k] come from one evaluation of pi_n and tau_n: the series splits
+    into the terms that keep their sign under mu -> -mu and the terms that flip,
+    and the two amplitudes are their sum and their difference.  Any other grid is
+    summed one angle at a time.
 
     Args:
-        m: the complex index of refraction of the sphere
-        x: the size parameter of the sphere
+        a: Mie coefficients a_n for the full series, one entry per order
+        b: Mie coefficients b_n for the full series, one entry per order
         mu: array of angles, cos(theta), to calculate scattering amplitudes
         n_pole: return n_pole term from series (default=0 means include all terms)
 
     Returns:
         S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)]
     """
-    a, b = _an_bn_nb(m, x, 0)
     N = len(a)
     if n_pole < 0 or n_pole > N:
         raise ValueError("n_pole must be 0 (all terms) or a multipole order in 1.." + str(N))
@@ -421,8 +621,34 @@ def _S1_S2_nb(m, x, mu, n_pole):
 
     # zero-based arrays: multipole order n lives at index n-1
     j = n_pole - 1
+    first = 0 if n_pole == 0 else j
+    last = N if n_pole == 0 else n_pole
 
-    for k in range(nangles):
+    n_pairs = _mirrored_pairs_nb(mu)
+    for k in range(n_pairs):
+        _pi_tau_nb(mu[k], pi, tau)
+        keep1 = 0.0 + 0.0j
+        flip1 = 0.0 + 0.0j
+        keep2 = 0.0 + 0.0j
+        flip2 = 0.0 + 0.0j
+        for i in range(first, last):
+            si = scale[i]
+            if i % 2 == 0:  # odd order: pi_n keeps its sign, tau_n flips
+                keep1 += si * pi[i] * a[i]
+                flip1 += si * tau[i] * b[i]
+                keep2 += si * pi[i] * b[i]
+                flip2 += si * tau[i] * a[i]
+            else:
+                flip1 += si * pi[i] * a[i]
+                keep1 += si * tau[i] * b[i]
+                flip2 += si * pi[i] * b[i]
+                keep2 += si * tau[i] * a[i]
+        S1[k] = keep1 + flip1
+        S2[k] = keep2 + flip2
+        S1[nangles - 1 - k] = keep1 - flip1
+        S2[nangles - 1 - k] = keep2 - flip2
+
+    for k in range(n_pairs, nangles - n_pairs):
         _pi_tau_nb(mu[k], pi, tau)
         if n_pole == 0:
             s1 = 0.0 + 0.0j
@@ -440,6 +666,29 @@ def _S1_S2_nb(m, x, mu, n_pole):
     return np.conjugate(S1), np.conjugate(S2)
 
 
+@njit((complex128, float64, float64[:], int64), cache=True)
+def _S1_S2_nb(m, x, mu, n_pole):
+    """
+    Calculate the scattering amplitude functions for spheres.
+
+    The amplitude functions have been normalized so that when integrated
+    over all 4*pi solid angles, the integral will be qext*pi*x**2.
+
+    The units are weird, sr**(-0.5)
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        mu: array of angles, cos(theta), to calculate scattering amplitudes
+        n_pole: return n_pole term from series (default=0 means include all terms)
+
+    Returns:
+        S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)]
+    """
+    a, b = _an_bn_nb(m, x, 0)
+    return _S1_S2_from_ab_nb(a, b, mu, n_pole)
+
+
 @njit((complex128, float64), cache=True)
 def _small_conducting_sphere_nb(_m, x):
     """
@@ -526,10 +775,189 @@ def _small_sphere_nb(m, x):
     return qext, qsca, qback, g
 
 
-@njit((complex128, float64, int64, boolean), cache=True)
-def _single_sphere_nb(m, x, n_pole, e_field):
+@njit((complex128, float64, complex128[:], complex128[:]), cache=True)
+def _efficiencies_from_ab_nb(m, x, a, b):
     """
-    Calculate the efficiencies for a single sphere (both m and x are scalars).
+    Sum the efficiencies of the full Mie series from coefficients already computed.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        a: Mie coefficients a_n for the full series, one entry per order
+        b: Mie coefficients b_n for the full series, one entry per order
+
+    Returns:
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+        qback: the backscatter efficiency
+        g: the average cosine of the scattering phase function
+    """
+    x2 = x * x
+    n_terms = len(a)
+    qext_acc = 0.0
+    qsca_acc = 0.0
+    qback_acc = 0.0 + 0.0j
+    g_acc = 0.0
+
+    for i in range(n_terms):
+        ni = i + 1
+        cn = 2.0 * ni + 1.0
+
+        ai = a[i]
+        bi = b[i]
+        ai_re = ai.real
+        ai_im = ai.imag
+        bi_re = bi.real
+        bi_im = bi.imag
+
+        qext_acc += cn * (ai_re + bi_re)
+
+        if m.imag != 0.0:
+            qsca_acc += cn * (ai_re * ai_re + ai_im * ai_im + bi_re * bi_re + bi_im * bi_im)
+
+        # (-1)^n with n starting from 1.
+        sign = -1.0 if (ni % 2) == 1 else 1.0
+        qback_acc += sign * cn * (ai - bi)
+
+        if i < n_terms - 1:
+            aip1 = a[i + 1]
+            bip1 = b[i + 1]
+            c1n = ni * (ni + 2.0) / (ni + 1.0)
+            c2n = cn / ni / (ni + 1.0)
+            g_acc += c1n * (ai * np.conjugate(aip1) + bi * np.conjugate(bip1)).real
+            g_acc += c2n * (ai * np.conjugate(bi)).real
+
+    qext = 2.0 * qext_acc / x2
+
+    if m.imag == 0.0:
+        qsca = qext
+    else:
+        qsca = 2.0 * qsca_acc / x2
+
+    qback = np.abs(qback_acc) ** 2 / x2
+    g = 4.0 * g_acc / qsca / x2
+
+    return qext, qsca, qback, g
+
+
+@njit((complex128, float64, int64, float64[:], complex128[:]), cache=True)
+def _efficiencies_streaming_nb(m, x, n_terms, psi, D):
+    """
+    Sum the efficiencies of the full Mie series without storing a_n and b_n.
+
+    ``_an_bn_nb`` followed by ``_efficiencies_from_ab_nb`` allocates the two
+    coefficient arrays and the psi_n and D_n arrays behind them for every sphere.
+    Here each a_n, b_n is formed with the same arithmetic, added into the sums and
+    dropped, keeping only the previous pair for the asymmetry term that couples
+    neighbouring orders.  psi_n and D_n come from downwards recurrences, so they
+    still need buffers of about x entries, but those are passed in and one pair
+    from ``_workspace_nb`` serves a whole sweep.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere, greater than zero
+        n_terms: the number of orders to sum, 0 for Wiscombe's count
+        psi: float64 workspace from ``_workspace_nb``, large enough for x
+        D: complex128 workspace from the same call
+
+    Returns:
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+        qback: the backscatter efficiency
+        g: the average cosine of the scattering phase function
+    """
+    # make sure sign of imaginary part is negative
+    m_re = m.real
+    m_im = m.imag
+    if m_im > 0.0:
+        m_im = -m_im
+    m = complex(m_re, m_im)
+
+    if n_terms == 0:
+        n_terms = int(x + 4.05 * x**0.33333 + 2.0)
+    if len(D) < n_terms + 2:
+        raise ValueError("the D workspace needs " + str(n_terms + 2) + " entries")
+    _psi_real_into_nb(x, n_terms, psi)
+
+    inv_x = 1.0 / x
+    sin_x = np.sin(x)
+    cos_x = np.cos(x)
+    chi_nm1 = cos_x
+    chi_n = cos_x * inv_x + sin_x
+
+    # D[n] is D_n(mx), which _an_bn_nb reads as D[n - 1] from _D_calc_nb
+    dielectric = m.real > 0.0
+    if dielectric:
+        _D_downwards(np.complex128(m * x), n_terms + 2, D)
+
+    qext_acc = 0.0
+    qsca_acc = 0.0
+    qback_acc = 0.0 + 0.0j
+    g_acc = 0.0
+    a_prev = 0.0 + 0.0j
+    b_prev = 0.0 + 0.0j
+
+    for n in range(1, n_terms + 1):
+        n_over_x = n * inv_x
+        xi_nm1 = psi[n - 1] + 1j * chi_nm1
+        xi_n = psi[n] + 1j * chi_n
+        if dielectric:
+            temp = D[n] / m + n_over_x
+            an = (temp * psi[n] - psi[n - 1]) / (temp * xi_n - xi_nm1)
+            temp = D[n] * m + n_over_x
+            bn = (temp * psi[n] - psi[n - 1]) / (temp * xi_n - xi_nm1)
+        else:
+            an = (n_over_x * psi[n] - psi[n - 1]) / (n_over_x * xi_n - xi_nm1)
+            bn = psi[n] / xi_n
+        an = np.conjugate(an)
+        bn = np.conjugate(bn)
+        chi = (2 * n + 1) * inv_x * chi_n - chi_nm1
+        chi_nm1 = chi_n
+        chi_n = chi
+
+        cn = 2.0 * n + 1.0
+        qext_acc += cn * (an.real + bn.real)
+        if m.imag != 0.0:
+            qsca_acc += cn * (an.real * an.real + an.imag * an.imag + bn.real * bn.real + bn.imag * bn.imag)
+
+        # (-1)^n with n starting from 1.
+        sign = -1.0 if (n % 2) == 1 else 1.0
+        qback_acc += sign * cn * (an - bn)
+
+        if n > 1:
+            k = n - 1
+            c1n = k * (k + 2.0) / (k + 1.0)
+            c2n = (2.0 * k + 1.0) / k / (k + 1.0)
+            g_acc += c1n * (a_prev * np.conjugate(an) + b_prev * np.conjugate(bn)).real
+            g_acc += c2n * (a_prev * np.conjugate(b_prev)).real
+        a_prev = an
+        b_prev = bn
+
+    x2 = x * x
+    qext = 2.0 * qext_acc / x2
+
+    if m.imag == 0.0:
+        qsca = qext
+    else:
+        qsca = 2.0 * qsca_acc / x2
+
+    qback = np.abs(qback_acc) ** 2 / x2
+    g = 4.0 * g_acc / qsca / x2
+
+    return qext, qsca, qback, g
+
+
+@njit(
+    (complex128, float64, int64, boolean, float64[:], complex128[:], complex128[:], complex128[:]),
+    cache=True,
+)
+def _single_sphere_ws_nb(m, x, n_pole, e_field, psi, D, a, b):
+    """
+    Calculate the efficiencies for a single sphere using the caller's workspace.
+
+    The full series goes through ``_efficiencies_streaming_nb`` in psi and D, and
+    one multipole through ``_an_bn_into_nb`` in all four buffers, so a batch that
+    sizes them once for its largest sphere allocates nothing per sphere.
 
     Args:
         m: the complex index of refraction of the sphere
@@ -538,6 +966,10 @@ def _single_sphere_nb(m, x, n_pole, e_field):
         e_field: selects which multipole of order n_pole contributes, the
             electric one a_n (True) or the magnetic one b_n (False).
             Ignored when n_pole == 0.
+        psi: float64 workspace from ``_workspace_nb``, large enough for x and n_pole
+        D: complex128 workspace from the same call
+        a: complex128 workspace from the same call
+        b: complex128 workspace from the same call
 
     Returns:
         qext: the total extinction efficiency
@@ -565,58 +997,15 @@ def _single_sphere_nb(m, x, n_pole, e_field):
     if abs(m.real) < 1e-8 and abs(m.imag) < 1e-8:
         m = 1 - 10000j
 
-    a, b = _an_bn_nb(m, x, n_pole)
-    x2 = x * x
-
     if n_pole == 0:
-        n_terms = len(a)
-        qext_acc = 0.0
-        qsca_acc = 0.0
-        qback_acc = 0.0 + 0.0j
-        g_acc = 0.0
-
-        for i in range(n_terms):
-            ni = i + 1
-            cn = 2.0 * ni + 1.0
-
-            ai = a[i]
-            bi = b[i]
-            ai_re = ai.real
-            ai_im = ai.imag
-            bi_re = bi.real
-            bi_im = bi.imag
-
-            qext_acc += cn * (ai_re + bi_re)
-
-            if m.imag != 0.0:
-                qsca_acc += cn * (ai_re * ai_re + ai_im * ai_im + bi_re * bi_re + bi_im * bi_im)
-
-            # (-1)^n with n starting from 1.
-            sign = -1.0 if (ni % 2) == 1 else 1.0
-            qback_acc += sign * cn * (ai - bi)
-
-            if i < n_terms - 1:
-                aip1 = a[i + 1]
-                bip1 = b[i + 1]
-                c1n = ni * (ni + 2.0) / (ni + 1.0)
-                c2n = cn / ni / (ni + 1.0)
-                g_acc += c1n * (ai * np.conjugate(aip1) + bi * np.conjugate(bip1)).real
-                g_acc += c2n * (ai * np.conjugate(bi)).real
-
-        qext = 2.0 * qext_acc / x2
-
-        if m.imag == 0.0:
-            qsca = qext
-        else:
-            qsca = 2.0 * qsca_acc / x2
-
-        qback = np.abs(qback_acc) ** 2 / x2
-        g = 4.0 * g_acc / qsca / x2
+        qext, qsca, qback, g = _efficiencies_streaming_nb(m, x, 0, psi, D)
 
     else:
         # isolate one multipole: the electric term a_n or the magnetic term b_n
+        n_terms = _an_bn_into_nb(m, x, n_pole, psi, D, a, b)
+        x2 = x * x
         cn = 2.0 * n_pole + 1
-        coeff = a[-1] if e_field else b[-1]
+        coeff = a[n_terms - 1] if e_field else b[n_terms - 1]
         qext = 2.0 * cn * coeff.real / x2
         # the (-1)**n_pole and the sign of b_n drop out of the modulus
         qback = np.abs(cn * coeff) ** 2 / x2
@@ -629,3 +1018,463 @@ def _single_sphere_nb(m, x, n_pole, e_field):
         g = 0.0
 
     return qext, qsca, qback, g
+
+
+@njit((complex128, float64, float64, float64[:], complex128[:], complex128[:], complex128[:]), cache=True)
+def _single_sphere_tol_ws_nb(m, x, tol, psi, D, a, b):
+    """
+    Calculate the efficiencies of a sphere with the series summed to within tol.
+
+    The series runs through ``_series_terms_nb(x, tol)`` orders.  Small dielectric
+    spheres are summed too rather than handed to the small-sphere formula, whose
+    error near its limit of validity is far above the tighter tolerances.
+    Spheres with no size or a matched index, and small conducting spheres, take
+    the same branches as in ``_single_sphere_ws_nb``.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        tol: the accuracy wanted, greater than zero
+        psi: float64 workspace from ``_workspace_nb``, large enough for x and tol
+        D: complex128 workspace from the same call
+        a: complex128 workspace from the same call
+        b: complex128 workspace from the same call
+
+    Returns:
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+        qback: the backscatter efficiency
+        g: the average cosine of the scattering phase function
+    """
+    matched = abs(m.real - 1) <= 1e-8 and abs(m.imag) < 1e-8
+    if x <= 0 or matched or (m.real == 0 and x < 0.1):
+        return _single_sphere_ws_nb(m, x, 0, True, psi, D, a, b)
+
+    # sometimes m=0 is used to signal perfectly conducting sphere
+    if abs(m.real) < 1e-8 and abs(m.imag) < 1e-8:
+        m = 1 - 10000j
+    return _efficiencies_streaming_nb(m, x, _series_terms_nb(x, tol), psi, D)
+
+
+@njit((complex128, float64, int64, boolean), cache=True)
+def _single_sphere_nb(m, x, n_pole, e_field):
+    """
+    Calculate the efficiencies for a single sphere (both m and x are scalars).
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects which multipole of order n_pole contributes, the
+            electric one a_n (True) or the magnetic one b_n (False).
+            Ignored when n_pole == 0.
+
+    Returns:
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+        qback: the backscatter efficiency
+        g: the average cosine of the scattering phase function
+    """
+    psi, D, a, b = _workspace_nb(_workspace_order_nb(x, n_pole))
+    return _single_sphere_ws_nb(m, x, n_pole, e_field, psi, D, a, b)
+
+
+@njit((complex128, float64, complex128[:], complex128[:]), cache=True)
+def _single_sphere_from_ab_nb(m, x, a, b):
+    """
+    Calculate the efficiencies the way ``_single_sphere_nb`` would, given a_n and b_n.
+
+    Spheres that ``_single_sphere_nb`` hands to a closed form or to a substitute
+    index still get their efficiencies from it; every other sphere sums the series
+    from the coefficients passed in, so they are not computed a second time.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        a: Mie coefficients a_n for the full series
+        b: Mie coefficients b_n for the full series
+
+    Returns:
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+        qback: the backscatter efficiency
+        g: the average cosine of the scattering phase function
+    """
+    closed_form = (
+        x <= 0
+        or (abs(m.real - 1) <= 1e-8 and abs(m.imag) < 1e-8)
+        or (m.real == 0 and x < 0.1)
+        or (m.real > 0.0 and np.abs(m) * x < 0.1)
+        or (abs(m.real) < 1e-8 and abs(m.imag) < 1e-8)
+    )
+    if closed_form:
+        return _single_sphere_nb(m, x, 0, True)
+    return _efficiencies_from_ab_nb(m, x, a, b)
+
+
+@njit((complex128, float64, complex128[:], complex128[:]), cache=True)
+def _qext_qsca_from_ab_nb(m, x, a, b):
+    """
+    Calculate qext and qsca the way ``_single_sphere_nb`` would, given a_n and b_n.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        a: Mie coefficients a_n for the full series
+        b: Mie coefficients b_n for the full series
+
+    Returns:
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+    """
+    qext, qsca, _, _ = _single_sphere_from_ab_nb(m, x, a, b)
+    return qext, qsca
+
+
+@njit((complex128, float64, float64[:], int64), cache=True)
+def _S1_S2_efficiencies_nb(m, x, mu, n_pole):
+    """
+    Calculate the scattering amplitudes and the efficiencies that normalize them.
+
+    ``_S1_S2_nb`` followed by ``_single_sphere_nb`` computes the Mie coefficients
+    twice.  This computes them once and sums both series from them, so the results
+    are the same as the two calls.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        mu: array of angles, cos(theta), to calculate scattering amplitudes
+        n_pole: return n_pole term from series (default=0 means include all terms)
+
+    Returns:
+        S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)]
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+    """
+    a, b = _an_bn_nb(m, x, 0)
+    S1, S2 = _S1_S2_from_ab_nb(a, b, mu, n_pole)
+    qext, qsca = _qext_qsca_from_ab_nb(m, x, a, b)
+    return S1, S2, qext, qsca
+
+
+@njit((float64[:], int64), cache=True)
+def _pi_tau_table_nb(mu, n_max):
+    """
+    Tabulate the angular functions pi_n and tau_n for every angle at once.
+
+    Row k holds what ``_pi_tau_nb(mu[k], pi, tau)`` fills in, orders 1 through
+    n_max, so one table serves every sphere whose series is no longer than n_max.
+
+    Args:
+        mu: array of angles, cos(theta)
+        n_max: number of orders to tabulate, at least one
+
+    Returns:
+        pi, tau: arrays of shape (len(mu), n_max)
+    """
+    n_angles = len(mu)
+    pi = np.empty((n_angles, n_max))
+    tau = np.empty((n_angles, n_max))
+    for k in range(n_angles):
+        _pi_tau_nb(mu[k], pi[k], tau[k])
+    return pi, tau
+
+
+@njit(
+    (
+        complex128[:],
+        float64[:],
+        float64[:, :],
+        float64[:, :],
+        int64,
+        float64,
+        complex128[:, :],
+        complex128[:, :],
+        float64[:, :],
+    ),
+    cache=True,
+)
+def _S1_S2_batch_nb(m, x, pi, tau, n_pole, tol, S1, S2, q):
+    """
+    Fill in the scattering amplitudes and normalizing efficiencies of many spheres.
+
+    The angular functions depend on mu and the order but not on the sphere, so
+    they come in as one table, from ``_pi_tau_table_nb``, long enough for the
+    longest series in the batch, and every sphere's amplitudes are summed from it.
+    The coefficients go into one workspace sized for the largest sphere.
+
+    Args:
+        m: array of complex indices of refraction, one per sphere
+        x: array of size parameters, the same length as m
+        pi: pi_n tabulated as (n_angles, n_max), shared by every sphere
+        tau: tau_n tabulated the same way
+        n_pole: return n_pole term from series (default=0 means include all terms)
+        tol: the accuracy the series is summed to, 0 for Wiscombe's count
+        S1: gets filled with S1, shape (len(x), n_angles)
+        S2: gets filled with S2, shape (len(x), n_angles)
+        q: gets filled with qext, qsca, qback and g, shape (4, len(x))
+    """
+    n_angles, n_max = pi.shape
+    if len(x) == 0:
+        return
+    psi, D, a_ws, b_ws = _workspace_nb(_batch_order_nb(np.max(x), 0, tol))
+    for i, x_i in enumerate(x):
+        n_terms = _series_terms_nb(x_i, tol) if tol > 0 else 0
+        N = _an_bn_into_nb(m[i], x_i, n_terms, psi, D, a_ws, b_ws)
+        a = a_ws[:N]
+        b = b_ws[:N]
+        if n_pole < 0 or n_pole > N:
+            raise ValueError("n_pole must be 0 (all terms) or a multipole order in 1.." + str(N))
+
+        # with a tolerance a sphere is normalized by its own series, as
+        # _single_sphere_tol_ws_nb sums it, rather than by a closed form
+        matched = abs(m[i].real - 1) <= 1e-8 and abs(m[i].imag) < 1e-8
+        small_conductor = m[i].real == 0 and x_i < 0.1
+        conductor = abs(m[i].real) < 1e-8 and abs(m[i].imag) < 1e-8
+        if tol > 0 and x_i > 0 and not (matched or small_conductor or conductor):
+            q[0, i], q[1, i], q[2, i], q[3, i] = _efficiencies_from_ab_nb(m[i], x_i, a, b)
+        else:
+            q[0, i], q[1, i], q[2, i], q[3, i] = _single_sphere_from_ab_nb(m[i], x_i, a, b)
+
+        # a sphere of no size has a series of zeros, which may be longer than the table
+        if x_i <= 0:
+            S1[i, :] = 0
+            S2[i, :] = 0
+            continue
+        if N > n_max:
+            raise ValueError("the angular table holds " + str(n_max) + " orders but the series needs " + str(N))
+
+        j = n_pole - 1
+        for k in range(n_angles):
+            if n_pole == 0:
+                s1 = 0.0 + 0.0j
+                s2 = 0.0 + 0.0j
+                for n in range(N):
+                    sn = (2.0 * (n + 1) + 1.0) / ((n + 2.0) * (n + 1))
+                    s1 += sn * (pi[k, n] * a[n] + tau[k, n] * b[n])
+                    s2 += sn * (tau[k, n] * a[n] + pi[k, n] * b[n])
+            else:
+                sj = (2.0 * n_pole + 1.0) / ((n_pole + 1.0) * n_pole)
+                s1 = sj * (pi[k, j] * a[j] + tau[k, j] * b[j])
+                s2 = sj * (tau[k, j] * a[j] + pi[k, j] * b[j])
+            S1[i, k] = np.conjugate(s1)
+            S2[i, k] = np.conjugate(s2)
+
+
+@njit((complex128[:], float64[:], int64, boolean, float64, float64[:, :]), cache=True)
+def _efficiencies_batch_nb(m, x, n_pole, e_field, tol, out):
+    """
+    Calculate the efficiencies for every sphere in a batch.
+
+    The loop over spheres runs inside the compiled code, so a long sweep pays the
+    interpreter and dispatch overhead once rather than once per sphere, and the
+    series buffers are allocated once, for the largest sphere, and reused.
+
+    Args:
+        m: array of complex indices of refraction, one per sphere
+        x: array of size parameters, the same length as m
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects the electric (True) or magnetic (False) multipole
+        tol: the accuracy the full series is summed to, 0 for Wiscombe's count.
+            Ignored when n_pole is not 0.
+        out: gets filled with qext, qsca, qback and g, shape (4, len(x))
+    """
+    if len(x) == 0:
+        return
+    psi, D, a, b = _workspace_nb(_batch_order_nb(np.max(x), n_pole, tol))
+    for i, x_i in enumerate(x):
+        if n_pole == 0 and tol > 0:
+            qext, qsca, qback, g = _single_sphere_tol_ws_nb(m[i], x_i, tol, psi, D, a, b)
+        else:
+            qext, qsca, qback, g = _single_sphere_ws_nb(m[i], x_i, n_pole, e_field, psi, D, a, b)
+        out[0, i] = qext
+        out[1, i] = qsca
+        out[2, i] = qback
+        out[3, i] = g
+
+
+@njit(
+    (complex128[:], float64[:], int64, boolean, float64, int64[:], int64[:], float64[:, :]),
+    parallel=True,
+    cache=True,
+)
+def _efficiencies_parallel_nb(m, x, n_pole, e_field, tol, order, bounds, out):
+    """
+    Calculate the efficiencies for every sphere in a batch on several threads.
+
+    The spheres arrive already dealt into chunks: chunk c is made of spheres
+    ``order[bounds[c]:bounds[c+1]]``.  The ``prange`` runs over the chunks, so
+    numba's static schedule hands each thread whole chunks and the balance is
+    whatever the caller built into them.  Every sphere writes only its own column
+    of ``out``, so the results land in the original order, and every chunk has its
+    own series buffers, so the threads share nothing.  The caller sets the number
+    of threads with ``numba.set_num_threads``.
+
+    Args:
+        m: array of complex indices of refraction, one per sphere
+        x: array of size parameters, the same length as m
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects the electric (True) or magnetic (False) multipole
+        tol: the accuracy the full series is summed to, 0 for Wiscombe's count.
+            Ignored when n_pole is not 0.
+        order: permutation of the sphere indices, grouped by chunk
+        bounds: start of each chunk in ``order``, plus one final entry ``len(order)``
+        out: gets filled with qext, qsca, qback and g, shape (4, len(x))
+    """
+    for c in prange(len(bounds) - 1):  # pylint: disable=not-an-iterable
+        x_max = 0.0
+        for k in range(bounds[c], bounds[c + 1]):
+            x_max = max(x_max, x[order[k]])
+        psi, D, a, b = _workspace_nb(_batch_order_nb(x_max, n_pole, tol))
+        for k in range(bounds[c], bounds[c + 1]):
+            i = order[k]
+            if n_pole == 0 and tol > 0:
+                qext, qsca, qback, g = _single_sphere_tol_ws_nb(m[i], x[i], tol, psi, D, a, b)
+            else:
+                qext, qsca, qback, g = _single_sphere_ws_nb(m[i], x[i], n_pole, e_field, psi, D, a, b)
+            out[0, i] = qext
+            out[1, i] = qsca
+            out[2, i] = qback
+            out[3, i] = g
+
+
+@njit(
+    (
+        complex128[:],
+        complex128[:],
+        complex128[:],
+        complex128[:],
+        complex128,
+        float64[:],
+        float64[:],
+        float64[:],
+        boolean,
+        complex128[:, :],
+        complex128[:, :],
+    ),
+    cache=True,
+)
+def _near_field_nb(alpha, beta, gamma, delta, k, r, theta, phi, inside, E, H):
+    """
+    Sum the multipole series of the near fields at every point of a batch.
+
+    Every point lies on the same side of the sphere surface, where the wavenumber
+    is k.  The coefficients arrive already multiplied by each order's scale factor
+    i**n (2n+1)/(n(n+1)): alpha and beta weight the vector harmonics N_e1n and
+    M_o1n that make up the electric field, gamma and delta weight N_o1n and M_e1n
+    in the magnetic field.  Outside the sphere alpha, beta, gamma and delta are the
+    scaled i a_n, -b_n, i b_n and a_n; inside they are -i d_n, c_n, and -i c_n and
+    -d_n times the relative index.
+
+    Each point runs the angular functions pi_n and tau_n and the radial functions
+    up the orders by recurrence alongside the sums, so no table over points and
+    orders is ever built.  Outside the sphere the radial function is h_n(kr), whose
+    upwards recurrence is stable.  Inside it is j_n(kr), with psi_n = psi_(n-1) /
+    (D_n + n/kr) built on the downwards recurrence for D_n one order ahead, and near
+    the centre, where that fails, the first three terms of its power series.  The
+    derivative of kr z_n is formed from the neighbouring orders and the poles are
+    nudged to cos(theta) = 0.999999, as ``field._radial_functions`` and
+    ``field._vsh_components_base`` do.
+
+    Args:
+        alpha: scaled coefficients of N_e1n in E, one per order
+        beta: scaled coefficients of M_o1n in E
+        gamma: scaled coefficients of N_o1n in H
+        delta: scaled coefficients of M_e1n in H
+        k: the wavenumber where the points are, complex inside an absorbing sphere
+        r: radial coordinate of each point
+        theta: polar angle of each point
+        phi: azimuth of each point
+        inside: True when the points lie inside the sphere
+        E: gets [E_r, E_theta, E_phi], shape (3, len(r)), or shape (3, 0) to skip it
+        H: gets [H_r, H_theta, H_phi] the same way
+    """
+    n_terms = len(alpha)
+    want_e = E.shape[1] > 0
+    want_h = H.shape[1] > 0
+    D = np.zeros(n_terms + 2, dtype=np.complex128)
+    for i, r_i in enumerate(r):
+        mu = np.cos(theta[i])
+        if mu >= 1.0:
+            mu = 0.999999
+        if mu <= -1.0:
+            mu = -0.999999
+        sin_theta = np.sin(theta[i])
+
+        z = k * r_i
+        small = inside and abs(z) < 0.01
+        psi_prev = 0j
+        psi_cur = 0j
+        h_prev = 0j
+        h_cur = 0j
+        u = 0j
+        if small:
+            u = 1 / 3 + 0j
+        elif inside:
+            _D_downwards(z, n_terms + 2, D)
+            psi_prev = np.sin(z)
+            psi_cur = psi_prev / (D[1] + 1 / z)
+        else:
+            h_prev = -1j * np.exp(1j * z) / z
+            h_cur = -np.exp(1j * z) * (z + 1j) / (z * z)
+
+        e_r = e_theta = e_phi = 0j
+        h_r = h_theta = h_phi = 0j
+        pi_nm1 = 0.0
+        pi_n = 1.0
+        for n in range(1, n_terms + 1):
+            tau_n = n * mu * pi_n - (n + 1) * pi_nm1
+
+            # the radial function, (radial function)/kr, and psi_n'/kr or xi_n'/kr
+            if small:
+                t1 = -z * z / (2 * (2 * n + 3))
+                t2 = z**4 / (8 * (2 * n + 3) * (2 * n + 5))
+                f1 = u * (1 + t1 + t2)
+                zn = z * f1
+                f2 = u * ((n + 1) + (n + 3) * t1 + (n + 5) * t2)
+                u = u * z / (2 * n + 3)
+            elif inside:
+                # (kr j_n)' = (psi_(n-1) + j_n - psi_(n+1)) / 2, the mean of the
+                # two recurrences, stays accurate where j_n and 1/D_n vanish
+                psi_next = psi_cur / (D[n + 1] + (n + 1) / z)
+                zn = psi_cur / z
+                f1 = zn / z
+                f2 = 0.5 * (psi_prev + zn - psi_next) / z
+                psi_prev = psi_cur
+                psi_cur = psi_next
+            else:
+                zn = h_cur
+                f1 = h_cur / z
+                f2 = h_prev - n * h_cur / z
+                h_next = (2 * n + 1) / z * h_cur - h_prev
+                h_prev = h_cur
+                h_cur = h_next
+
+            n_r = n * (n + 1) * sin_theta * pi_n * f1
+            n_theta = tau_n * f2
+            n_phi = pi_n * f2
+            m_theta = pi_n * zn
+            m_phi = tau_n * zn
+            if want_e:
+                e_r += alpha[n - 1] * n_r
+                e_theta += alpha[n - 1] * n_theta + beta[n - 1] * m_theta
+                e_phi += alpha[n - 1] * n_phi + beta[n - 1] * m_phi
+            if want_h:
+                h_r += gamma[n - 1] * n_r
+                h_theta += gamma[n - 1] * n_theta - delta[n - 1] * m_theta
+                h_phi += gamma[n - 1] * n_phi - delta[n - 1] * m_phi
+
+            pi_next = ((2 * n + 1) * mu * pi_n - (n + 1) * pi_nm1) / n
+            pi_nm1 = pi_n
+            pi_n = pi_next
+
+        cos_phi = np.cos(phi[i])
+        sin_phi = np.sin(phi[i])
+        if want_e:
+            E[0, i] = cos_phi * e_r
+            E[1, i] = cos_phi * e_theta
+            E[2, i] = -sin_phi * e_phi
+        if want_h:
+            H[0, i] = sin_phi * h_r
+            H[1, i] = sin_phi * h_theta
+            H[2, i] = cos_phi * h_phi
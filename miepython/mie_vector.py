@@ -0,0 +1,508 @@
+"""
+Low-level Mie calculations vectorized across spheres with NumPy.
+
+``mie_nojit`` transcribes the numba kernels one sphere and one order at a time,
+which is the right shape for numba and the wrong one for the interpreter: an array
+sweep without numba spends nearly all of its time dispatching scalar arithmetic.
+The functions here run the same recurrences -- Lentz's continued fraction and the
+downwards recurrence for D_n(mx), Miller's downwards recurrence for psi_n(x), and
+the a_n, b_n formulas -- with every order step applied to a whole block of spheres
+at once.
+
+A block holds spheres that need similar numbers of terms.  Arrays are padded to
+the block's largest order, and the entries past a sphere's own truncation are
+masked to zero, so a padded order contributes nothing to any of the sums.  Each
+sphere still starts its recurrences at the order the scalar code would use, which
+keeps the results within a few units in the last place of ``_single_sphere_py``.
+
+Spheres that the scalar code hands to a closed form -- no size, a matched index,
+the small-sphere and small conducting-sphere limits -- take the same branches
+here, through vectorized copies of those formulas.
+"""
+
+import numpy as np
+
+from .mie_nojit import _an_bn_py, _mirrored_pairs_py, _qext_qsca_from_ab_py
+
+__all__ = ("_efficiencies_batch_vec", "_S1_S2_efficiencies_vec", "_S1_S2_from_ab_vec")
+
+# largest number of complex values in one padded (orders, spheres) array
+BLOCK_ELEMENTS = 2**20
+
+# most spheres in one block; beyond this a longer vector buys nothing
+BLOCK_SPHERES = 1024
+
+
+def _Lentz_Dn_vec(z, N):
+    """
+    Compute D_N(z) by Lentz's continued fraction for an array of arguments.
+
+    Every element iterates until its own ratio has converged, exactly as
+    ``_Lentz_Dn`` would for that element alone.
+
+    Args:
+        z: array of complex arguments
+        N: array of orders, one per argument
+
+    Returns:
+        array of logarithmic derivatives D_N(z)
+    """
+    zinv = 2.0 / z
+    alpha = (N + 0.5) * zinv
+    aj = -(N + 1.5) * zinv
+    alpha_j1 = aj + 1 / alpha
+    alpha_j2 = aj.copy()
+    ratio = alpha_j1 / alpha_j2
+    runratio = alpha * ratio
+
+    active = np.flatnonzero(np.abs(np.abs(ratio) - 1.0) > 1e-12)
+    while active.size:
+        aj[active] = zinv[active] - aj[active]
+        alpha_j1[active] = 1.0 / alpha_j1[active] + aj[active]
+        alpha_j2[active] = 1.0 / alpha_j2[active] + aj[active]
+        ratio[active] = alpha_j1[active] / alpha_j2[active]
+        zinv[active] *= -1
+        runratio[active] *= ratio[active]
+        active = active[np.abs(np.abs(ratio[active]) - 1.0) > 1e-12]
+
+    return -N / z + runratio
+
+
+def _D_downwards_vec(z, N, n_max):
+    """
+    Compute D_1(z)..D_n_max(z) for an array of arguments by downwards recurrence.
+
+    Args:
+        z: array of complex arguments
+        N: array of starting orders, each at least n_max for the spheres that need it
+        n_max: number of orders to return
+
+    Returns:
+        array shaped (n_max, len(z)) with D_n(z) in row n-1
+    """
+    D = np.zeros((n_max, len(z)), dtype=np.complex128)
+    last_D = _Lentz_Dn_vec(z, N)
+    for n in range(int(N.max()), 1, -1):
+        n_over_z = n / z
+        last_D = np.where(n <= N, n_over_z - 1.0 / (last_D + n_over_z), last_D)
+        if n - 1 <= n_max:
+            D[n - 2] = last_D
+    return D
+
+
+def _psi_downwards_vec(x, nstop):
+    """
+    Compute psi_0(x)..psi_nstop(x) for an array of arguments.
+
+    Miller's algorithm as in ``_psi_downwards_py``: each sphere seeds the
+    recurrence at its own starting order, runs it downwards, and is scaled
+    against whichever of psi_0 or psi_1 is larger.  Complex arguments are
+    handled as there, with the starting order taken from ``|x|``.
+
+    Args:
+        x: array of nonzero arguments, usually positive size parameters
+        nstop: array of the highest order needed for each sphere
+
+    Returns:
+        array shaped (max(nstop)+1, len(x)) with psi_k(x) in row k
+    """
+    abs_x = np.abs(x)
+    n_start = np.maximum(nstop, abs_x).astype(np.int64) + 25 + (1.5 * np.sqrt(abs_x)).astype(np.int64)
+    top = int(n_start.max())
+    columns = np.arange(len(x))
+
+    psi = np.zeros((top + 2, len(x)), dtype=np.result_type(x, np.float64))
+    psi[n_start, columns] = 1e-50
+    for n in range(top, 0, -1):
+        psi[n - 1] = np.where(n <= n_start, (2 * n + 1) / x * psi[n] - psi[n + 1], psi[n - 1])
+        big = np.abs(psi[n - 1]) > 1e200  # keep the growing tail in range
+        if big.any():
+            psi[n - 1 :, big] /= 1e200
+
+    psi = psi[: int(nstop.max()) + 1]
+    psi_0 = np.sin(x)
+    psi_1 = psi_0 / x - np.cos(x)
+    # the recurrence can land exactly on zero at the seed that is not chosen
+    with np.errstate(divide="ignore", invalid="ignore"):
+        psi *= np.where(np.abs(psi_1) > np.abs(psi_0), psi_1 / psi[1], psi_0 / psi[0])
+    return psi
+
+
+def _spherical_bessel_table_vec(z, n_max, outgoing=False):
+    """
+    Tabulate j_n(z), or h_n(z) for outgoing waves, at orders 0..n_max.
+
+    Each order comes from a recurrence run in its stable direction over the
+    whole array of arguments at once.  j_n is psi_n(z) / z with psi_n from
+    Miller's downwards recurrence, which suits the decaying solution for any
+    order and for complex z.  For h_n = j_n + i y_n the argument must be real,
+    and y_n = -chi_n(x) / x comes from the upwards recurrence for chi_n, the
+    growing solution, as in ``_an_bn_vec``.
+
+    Args:
+        z: array of nonzero arguments, positive and real when outgoing
+        n_max: highest order needed, at least 1
+        outgoing: return h_n rather than j_n
+
+    Returns:
+        array shaped (len(z), n_max+1) with order k in column k
+    """
+    psi = _psi_downwards_vec(z, np.full(len(z), n_max))
+    if outgoing:
+        chi = np.empty((n_max + 1, len(z)))
+        chi[0] = np.cos(z)
+        chi[1] = chi[0] / z + np.sin(z)
+        for k in range(1, n_max):
+            chi[k + 1] = (2 * k + 1) / z * chi[k] - chi[k - 1]
+        psi = psi - 1j * chi
+    return (psi / z).T
+
+
+def _an_bn_vec(m, x, n_terms):
+    """
+    Compute the Mie coefficients a_n and b_n for a block of spheres.
+
+    Args:
+        m: array of complex indices of refraction
+        x: array of positive size parameters
+        n_terms: array of the number of orders for each sphere
+
+    Returns:
+        a, b: arrays shaped (max(n_terms), len(x)), zero past each sphere's n_terms
+    """
+    m = np.where(m.imag > 0, np.conj(m), m)
+    n_max = int(n_terms.max())
+    n = np.arange(1, n_max + 1, dtype=np.float64)[:, np.newaxis]
+    inside = n <= n_terms
+
+    inv_x = 1.0 / x
+    n_over_x = n * inv_x
+    dielectric = m.real > 0.0
+
+    # a small sphere padded out to its neighbours' orders overflows chi and
+    # underflows psi there, which is harmless because those orders are masked
+    with np.errstate(all="ignore"):
+        psi = _psi_downwards_vec(x, n_terms)
+
+        # chi is the growing solution, so its upwards recurrence is the stable one
+        chi = np.empty((n_max + 1, len(x)))
+        chi[0] = np.cos(x)
+        chi[1] = chi[0] * inv_x + np.sin(x)
+        for k in range(1, n_max):
+            chi[k + 1] = (2 * k + 1) * inv_x * chi[k] - chi[k - 1]
+        xi = psi + 1j * chi
+
+        D = _D_downwards_vec(np.where(dielectric, m * x, 1.0), n_terms + 2, n_max)
+        temp = np.where(dielectric, D / m + n_over_x, n_over_x)
+        a = (temp * psi[1:] - psi[:-1]) / (temp * xi[1:] - xi[:-1])
+        temp = D * m + n_over_x
+        b = np.where(dielectric, (temp * psi[1:] - psi[:-1]) / (temp * xi[1:] - xi[:-1]), psi[1:] / xi[1:])
+
+    a = np.where(inside, np.conjugate(a), 0.0)
+    b = np.where(inside, np.conjugate(b), 0.0)
+    return a, b
+
+
+def _small_conducting_sphere_vec(x):
+    """
+    Calculate the efficiencies of small conducting spheres, as ``_small_conducting_sphere_py``.
+
+    Args:
+        x: array of size parameters
+
+    Returns:
+        qext, qsca, qback, g: arrays of efficiencies
+    """
+    x2 = x**2
+    ahat1 = 1j * (2.0 / 3.0 * (1 - 0.2 * x2)) / ((1 - 0.5 * x2) + 2.0j / 3.0 * x**3)
+    bhat1 = 1j * ((x2 - 10.0) / 30.0) / ((1 + 0.5 * x2) - 1j * x**3 / 3.0)
+    ahat2 = 1j * (x2 / 30.0)
+    bhat2 = -1j * (x2 / 45.0)
+
+    qsca = x**4 * (6 * np.abs(ahat1) ** 2 + 6 * np.abs(bhat1) ** 2 + 10 * np.abs(ahat2) ** 2 + 10 * np.abs(bhat2) ** 2)
+    qext = qsca
+    g = ahat1.imag * (ahat2.imag + bhat1.imag)
+    g += bhat2.imag * (5.0 / 9.0 * ahat2.imag + bhat1.imag)
+    g += ahat1.real * bhat1.real
+    g *= 6 * x**4 / qsca
+
+    qback = 9 * x**4 * np.abs(ahat1 - bhat1 - 5 / 3 * (ahat2 - bhat2)) ** 2
+    return qext, qsca, qback, g
+
+
+def _small_sphere_vec(m, x):
+    """
+    Calculate the efficiencies of small spheres, as ``_small_sphere_py``.
+
+    Args:
+        m: array of complex indices of refraction
+        x: array of size parameters
+
+    Returns:
+        qext, qsca, qback, g: arrays of efficiencies
+    """
+    m2 = m * m
+    x2 = x * x
+
+    D = m2 + 2 + (1 - 0.7 * m2) * x2
+    D -= (8 * m**4 - 385 * m2 + 350) * x**4 / 1400.0
+    D += 2j * (m2 - 1) * x**3 * (1 - 0.1 * x2) / 3
+    ahat1 = 2j * (m2 - 1) / 3 * (1 - 0.1 * x2 + (4 * m2 + 5) * x**4 / 1400) / D
+
+    bhat1 = 1j * x2 * (m2 - 1) / 45 * (1 + (2 * m2 - 5) / 70 * x2)
+    bhat1 /= 1 - (2 * m2 - 5) / 30 * x2
+
+    ahat2 = 1j * x2 * (m2 - 1) / 15 * (1 - x2 / 14)
+    ahat2 /= 2 * m2 + 3 - (2 * m2 - 7) / 14 * x2
+
+    T = np.abs(ahat1) ** 2 + np.abs(bhat1) ** 2 + 5 / 3 * np.abs(ahat2) ** 2
+    temp = ahat2 + bhat1
+    g = (ahat1 * temp.conjugate()).real / T
+
+    qsca = 6 * x**4 * T
+    qext = np.where(m.imag == 0, qsca, 6 * x * (ahat1 + bhat1 + 5 * ahat2 / 3).real)
+
+    sback = 1.5 * x**3 * (ahat1 - bhat1 - 5 * ahat2 / 3)
+    qback = 4 * np.abs(sback) ** 2 / x2
+    return qext, qsca, qback, g
+
+
+def _series_efficiencies_vec(m, x, n_terms, n_pole, e_field):
+    """
+    Sum the Mie series for a block of spheres, as ``_single_sphere_py`` does.
+
+    Args:
+        m: array of complex indices of refraction
+        x: array of positive size parameters
+        n_terms: array of the number of orders for each sphere
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects the electric (True) or magnetic (False) multipole
+
+    Returns:
+        qext, qsca, qback, g: arrays of efficiencies
+    """
+    a, b = _an_bn_vec(m, x, n_terms)
+    x2 = x * x
+
+    if n_pole:
+        cn = 2.0 * n_pole + 1
+        coeff = a[n_pole - 1] if e_field else b[n_pole - 1]
+        qext = 2.0 * cn * coeff.real / x2
+        qback = np.abs(cn * coeff) ** 2 / x2
+        qsca = np.where(m.imag < 0, 2.0 * cn * np.abs(coeff) ** 2 / x2, qext)
+        return qext, qsca, qback, np.zeros_like(x)
+
+    n = np.arange(1, len(a) + 1, dtype=np.float64)[:, np.newaxis]
+    cn = 2.0 * n + 1.0
+    alt = np.where(n % 2 == 0, 1.0, -1.0)
+
+    qext = 2.0 * np.sum(cn * (a.real + b.real), axis=0) / x2
+    a_abs2 = a.real**2 + a.imag**2
+    b_abs2 = b.real**2 + b.imag**2
+    qsca = np.where(m.imag == 0, qext, 2.0 * np.sum(cn * (a_abs2 + b_abs2), axis=0) / x2)
+    qback = np.abs(np.sum(alt * cn * (a - b), axis=0)) ** 2 / x2
+
+    # the padding is zero, so a_n a*_{n+1} vanishes by itself at each sphere's
+    # last order, but a_n b*_n does not and the scalar sum stops short of it
+    c1n = n * (n + 2.0) / (n + 1.0)
+    c2n = cn / n / (n + 1.0)
+    asy1 = c1n[:-1] * (a[:-1] * a[1:].conjugate() + b[:-1] * b[1:].conjugate()).real
+    asy2 = np.where(n[:-1] < n_terms, c2n[:-1] * (a[:-1] * b[:-1].conjugate()).real, 0.0)
+    g = 4.0 * np.sum(asy1 + asy2, axis=0) / qsca / x2
+    return qext, qsca, qback, g
+
+
+def _efficiencies_batch_vec(m, x, n_pole, e_field, tol, out):
+    """
+    Calculate the efficiencies for every sphere in a batch, block by block.
+
+    The same contract as ``_efficiencies_batch_py``.  The spheres that need the
+    full series are sorted by their number of terms and cut into blocks, so that
+    little of each padded array is wasted and no array grows beyond
+    ``BLOCK_ELEMENTS`` entries.
+
+    Args:
+        m: array of complex indices of refraction, one per sphere
+        x: array of size parameters, the same length as m
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects the electric (True) or magnetic (False) multipole
+        tol: the accuracy the full series is summed to, 0 for Wiscombe's count.
+            Ignored when n_pole is not 0.
+        out: gets filled with qext, qsca, qback and g, shape (4, len(x))
+    """
+    m = np.asarray(m, dtype=np.complex128)
+    x = np.asarray(x, dtype=np.float64)
+    out[:] = 0.0
+
+    # the same cases, in the same order, as _single_sphere_py
+    todo = x > 0
+    todo &= ~((np.abs(m.real - 1) <= 1e-8) & (np.abs(m.imag) < 1e-8))
+
+    if n_pole == 0:
+        small = todo & (m.real == 0) & (x < 0.1)
+        out[:, small] = _small_conducting_sphere_vec(x[small])
+        todo &= ~small
+
+    # a tolerance sums the series of small dielectric spheres too, as
+    # _single_sphere_tol_ws_py does
+    if n_pole == 0 and tol <= 0:
+        small = todo & (m.real > 0) & (np.abs(m) * x < 0.1)
+        out[:, small] = _small_sphere_vec(m[small], x[small])
+        todo &= ~small
+
+    series = np.flatnonzero(todo)
+    if series.size == 0:
+        return
+
+    # sometimes m=0 is used to signal perfectly conducting sphere
+    m_series = m[series]
+    conducting = (np.abs(m_series.real) < 1e-8) & (np.abs(m_series.imag) < 1e-8)
+    m_series[conducting] = 1 - 10000j
+    x_series = x[series]
+
+    if n_pole == 0 and tol > 0:
+        n_terms = (x_series + 1.6 * np.sqrt(np.log(1.0 / tol)) * x_series**0.33333 + 2.0).astype(np.int64)
+    elif n_pole == 0:
+        n_terms = (x_series + 4.05 * x_series**0.33333 + 2.0).astype(np.int64)
+    else:
+        n_terms = np.full(series.size, n_pole, dtype=np.int64)
+
+    by_terms = np.argsort(n_terms, kind="stable")
+    start = 0
+    while start < series.size:
+        size = min(BLOCK_SPHERES, series.size - start)
+        while size > 1 and n_terms[by_terms[start + size - 1]] * size > BLOCK_ELEMENTS:
+            size //= 2
+        block = by_terms[start : start + size]
+        efficiencies = _series_efficiencies_vec(m_series[block], x_series[block], n_terms[block], n_pole, e_field)
+        out[:, series[block]] = efficiencies
+        start += size
+
+
+# memory, in bytes, for the blocks of pi_n and tau_n in the dense amplitude sum
+S1_S2_MEMORY = 64 * 2**20
+
+
+def _pi_tau_block_vec(mu, n_orders):
+    """Return pi_n and tau_n as (orders, angles) arrays, one order per step."""
+    pi = np.empty((n_orders, len(mu)))
+    tau = np.empty((n_orders, len(mu)))
+    pi_nm2 = np.zeros(len(mu))
+    pi[0] = 1
+    for n in range(1, n_orders):
+        tau[n - 1] = n * mu * pi[n - 1] - (n + 1) * pi_nm2
+        pi[n] = ((2 * n + 1) * mu * pi[n - 1] - (n + 1) * pi_nm2) / n
+        pi_nm2 = pi[n - 1]
+    tau[n_orders - 1] = n_orders * mu * pi[n_orders - 1] - (n_orders + 1) * pi_nm2
+    return pi, tau
+
+
+def _S1_S2_from_ab_vec(a, b, mu, n_pole, max_memory=S1_S2_MEMORY):
+    """
+    Sum the scattering amplitudes as dense matrix products over blocks of angles.
+
+    For a block of angles pi_n and tau_n are tabulated as (orders, angles)
+    arrays, and the amplitudes become
+
+        S1 = Pi^T (s a) + Tau^T (s b),    S2 = Tau^T (s a) + Pi^T (s b)
+
+    with s the per-order scale factors.  The real and imaginary parts of s a and
+    s b are the four columns of one real matrix, so each block costs real
+    matrix-matrix products, which NumPy hands to BLAS.
+
+    On a grid symmetric about mu = 0 only the first half is tabulated.  The odd
+    and even orders are multiplied separately, and the amplitudes at the mirror
+    images follow from the parity of pi_n and tau_n, as in ``_S1_S2_from_ab_py``.
+
+    Args:
+        a: Mie coefficients a_n for the full series, one entry per order
+        b: Mie coefficients b_n for the full series, one entry per order
+        mu: array of angles, cos(theta), to calculate scattering amplitudes
+        n_pole: return n_pole term from series (default=0 means include all terms)
+        max_memory: bytes to spend on the two tables; blocks of angles are sized
+            to fit, with at least one angle per block
+
+    Returns:
+        S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)]
+    """
+    N = len(a)
+    if n_pole < 0 or n_pole > N:
+        raise ValueError("n_pole must be 0 (all terms) or a multipole order in 1.." + str(N))
+
+    n = np.arange(1, N + 1, dtype=np.float64)
+    scale = (2.0 * n + 1.0) / ((n + 1.0) * n)
+    coeffs = np.empty((N, 4))
+    coeffs[:, 0] = (scale * a).real
+    coeffs[:, 1] = (scale * a).imag
+    coeffs[:, 2] = (scale * b).real
+    coeffs[:, 3] = (scale * b).imag
+
+    # one multipole only needs the recurrence up to its own order
+    if n_pole > 0:
+        coeffs[: n_pole - 1] = 0
+        coeffs = coeffs[:n_pole]
+    n_orders = len(coeffs)
+
+    nangles = len(mu)
+    S1 = np.empty(nangles, dtype=np.complex128)
+    S2 = np.empty(nangles, dtype=np.complex128)
+    n_pairs = _mirrored_pairs_py(mu)
+    block = max(1, int(max_memory) // (2 * 8 * n_orders))
+
+    # mirrored pairs: rows of odd orders n = 1, 3, ... sit at even indices
+    for start in range(0, n_pairs, block):
+        stop = min(start + block, n_pairs)
+        pi, tau = _pi_tau_block_vec(mu[start:stop], n_orders)
+        p_odd = pi[0::2].T @ coeffs[0::2]
+        p_even = pi[1::2].T @ coeffs[1::2]
+        t_odd = tau[0::2].T @ coeffs[0::2]
+        t_even = tau[1::2].T @ coeffs[1::2]
+        s1_keep = p_odd[:, 0:2] + t_even[:, 2:4]
+        s1_flip = t_odd[:, 2:4] + p_even[:, 0:2]
+        s2_keep = p_odd[:, 2:4] + t_even[:, 0:2]
+        s2_flip = t_odd[:, 0:2] + p_even[:, 2:4]
+        mirror = slice(nangles - 1 - start, nangles - 1 - stop, -1)
+        S1[start:stop] = _as_complex(s1_keep + s1_flip)
+        S2[start:stop] = _as_complex(s2_keep + s2_flip)
+        S1[mirror] = _as_complex(s1_keep - s1_flip)
+        S2[mirror] = _as_complex(s2_keep - s2_flip)
+
+    # whatever is left: the middle angle of a mirrored grid, or every angle of another
+    for start in range(n_pairs, nangles - n_pairs, block):
+        stop = min(start + block, nangles - n_pairs)
+        pi, tau = _pi_tau_block_vec(mu[start:stop], n_orders)
+        p = pi.T @ coeffs
+        t = tau.T @ coeffs
+        S1[start:stop] = _as_complex(p[:, 0:2] + t[:, 2:4])
+        S2[start:stop] = _as_complex(t[:, 0:2] + p[:, 2:4])
+
+    return np.conjugate(S1), np.conjugate(S2)
+
+
+def _as_complex(pairs):
+    """Join an (n, 2) array of real and imaginary parts into n complex values."""
+    return pairs[:, 0] + 1j * pairs[:, 1]
+
+
+def _S1_S2_efficiencies_vec(m, x, mu, n_pole):
+    """
+    Calculate the scattering amplitudes and the efficiencies that normalize them.
+
+    The same as ``_S1_S2_efficiencies_py``, with the amplitudes summed by
+    ``_S1_S2_from_ab_vec`` rather than one angle at a time.
+
+    Args:
+        m: the complex index of refraction of the sphere
+        x: the size parameter of the sphere
+        mu: array of angles, cos(theta), to calculate scattering amplitudes
+        n_pole: return n_pole term from series (default=0 means include all terms)
+
+    Returns:
+        S1, S2: the scattering amplitudes at each angle mu [sr**(-0.5)]
+        qext: the total extinction efficiency
+        qsca: the scattering efficiency
+    """
+    a, b = _an_bn_py(m, x, 0)
+    S1, S2 = _S1_S2_from_ab_vec(a, b, mu, n_pole)
+    qext, qsca = _qext_qsca_from_ab_py(m, x, a, b)
+    return S1, S2, qext, qsca
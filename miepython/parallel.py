@@ -0,0 +1,344 @@
+"""
+Spread very large sweeps over worker processes.
+
+Threads (the ``threads`` argument of ``efficiencies_mx``) stop helping once a sweep
+outgrows one machine's numba pool, or when the work is something other than the
+batch efficiencies.  For populations of 1e8 to 1e9 spheres this module splits the
+input into shards and hands them to a ``ProcessPoolExecutor``::
+
+    import numpy as np
+    import miepython.parallel as mp
+
+    m = np.full(10_000_000, 1.5 - 0.001j)
+    x = np.geomspace(0.1, 100, 10_000_000)
+    qext, qsca, qback, g = mp.efficiencies_mx(m, x, workers=8)
+
+Nothing large crosses a process boundary.  The inputs are copied once into
+``multiprocessing.shared_memory`` blocks, every worker writes its shard of the
+results straight into a shared output block, and only block names and index ranges
+are pickled.  The returned arrays are views of that output block, which is released
+when the last of them is garbage collected.
+
+Workers are started with ``forkserver`` where the platform has it and ``spawn``
+elsewhere, never with a plain ``fork``: a process that has loaded the multi-threaded
+numba kernels hangs on exit after forking.  Either way a script that uses this
+module needs the usual ``if __name__ == "__main__":`` guard.  Each worker process
+compiles nothing: an initializer evaluates one tiny sphere so that numba loads its
+cached kernels once, when the worker starts, rather than in the middle of the first
+shard.  Pass ``progress`` to hear about each finished shard;
+it is called in the calling process as ``progress(done, total)`` with the number of
+spheres completed so far.
+
+``workers=0`` runs the same shards one after another in the calling process,
+without a pool, which is handy for debugging a worker-side failure.
+
+Importing
+---------
+
+This module is *not* imported with the package, because
+``multiprocessing.shared_memory`` is missing on some platforms the rest of
+``miepython`` supports, JupyterLite among them.  Ask for it by name::
+
+    import miepython.parallel as mp
+"""
+
+import multiprocessing
+import os
+import sys
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from . import core
+
+__all__ = (
+    "efficiencies_mx",
+    "coefficients",
+    "S1_S2",
+)
+
+# shards per worker when shard_size is not given: enough that a slow shard does
+# not leave the other workers idle at the end, few enough that scheduling is cheap
+SHARDS_PER_WORKER = 4
+
+# how worker processes are started; see the module docstring for why not fork
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# blocks a worker has attached, by name, so that one attach serves every shard
+_ATTACHED = {}
+
+
+def _create_block(shape, dtype):
+    """Allocate a shared-memory block and an array over it.
+
+    NumPy does not keep the block's buffer exported, so closing the block under a
+    live array would leave the array pointing at unmapped memory.  Every view of
+    the array keeps the array alive, so the block is closed when the array goes.
+    """
+    dtype = np.dtype(dtype)
+    n_bytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    block = shared_memory.SharedMemory(create=True, size=n_bytes)
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    weakref.finalize(array, block.close)
+    return block, array
+
+
+def _attach_untracked(name):
+    """Attach to a block without telling the resource tracker, from Python 3.13."""
+    return shared_memory.SharedMemory(name=name, track=False)  # pylint: disable=unexpected-keyword-arg
+
+
+def _attach_unregistered(name):
+    """Attach to a block without registering it with the resource tracker.
+
+    Before 3.13 attaching registers the block with the resource tracker the
+    workers share with the parent, as if the worker owned it, and the parent's
+    own unlink then finds the registration gone.  The parent is the owner, so
+    keep the worker from registering at all.
+    """
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _attach(name):
+    """Attach to a block created by the parent, once per worker process."""
+    block = _ATTACHED.get(name)
+    if block is not None:
+        return block
+
+    if sys.version_info >= (3, 13):
+        block = _attach_untracked(name)
+    else:
+        block = _attach_unregistered(name)
+
+    _ATTACHED[name] = block
+    return block
+
+
+def _worker_shard(kind, specs, start, stop, options):
+    """Attach to the shared blocks named in a task and compute its shard.
+
+    A task carries block names rather than arrays, so it pickles to a few hundred
+    bytes whatever the shard size.
+    """
+    arrays = [np.ndarray(shape, dtype=dtype, buffer=_attach(name).buf) for name, shape, dtype in specs]
+    return _run_shard(kind, arrays, start, stop, options)
+
+
+def _warm_up():
+    """Load the cached numba kernels once, when a worker starts."""
+    core.efficiencies_mx(np.array([1.5 - 0.01j, 1.5]), np.array([1.0, 2.0]))
+    core.coefficients(1.5 - 0.01j, 1.0)
+    core.S1_S2(1.5 - 0.01j, 1.0, np.array([0.0, 1.0]))
+
+
+def _run_shard(kind, arrays, start, stop, options):
+    """Compute spheres ``start:stop`` and write them into the shared output.
+
+    Args:
+        kind: "efficiencies", "coefficients" or "S1_S2"
+        arrays: the m, x and output arrays
+        start: first sphere of the shard
+        stop: one past the last sphere of the shard
+        options: keyword arguments for the underlying ``miepython.core`` call
+
+    Returns:
+        the number of spheres computed
+    """
+    m_all, x_all, out = arrays
+    m = m_all[start:stop]
+    x = x_all[start:stop]
+
+    if kind == "efficiencies":
+        out[:, start:stop] = core.efficiencies_mx(m, x, **options)
+    elif kind == "coefficients":
+        out[:, start:stop] = core.coefficients(m, x, **options)
+    else:
+        out[:, start:stop] = core.S1_S2(m, x, options["mu"], options["norm"], options["n_pole"])
+
+    return stop - start
+
+
+def _sweep(kind, m, x, out_shape, out_dtype, options, workers, shard_size, progress):
+    """Run a sharded sweep and return an array over the shared output block.
+
+    Args:
+        kind: "efficiencies", "coefficients" or "S1_S2"
+        m: complex index of refraction, scalar or array
+        x: size parameter, scalar or array
+        out_shape: shape of the output, given the number of spheres
+        out_dtype: dtype of the output
+        options: keyword arguments for the underlying ``miepython.core`` call
+        workers: number of processes, None for ``os.cpu_count()``, 0 for none
+        shard_size: spheres per task, None to pick one from ``workers``
+        progress: optional ``progress(done, total)`` callback
+
+    Returns:
+        the output array, a view of shared memory
+    """
+    m = np.asarray(m, dtype=np.complex128)
+    x = np.asarray(x, dtype=np.float64)
+    if m.ndim > 1 or x.ndim > 1:
+        raise ValueError("m and x must be scalars or one-dimensional arrays")
+    if m.ndim == 1 and x.ndim == 1 and m.size != x.size:
+        raise RuntimeError("m and x arrays must be same length")
+
+    n = max(m.size if m.ndim else 0, x.size if x.ndim else 0)
+    if n == 0:
+        raise ValueError("at least one of m and x must be a non-empty array")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError("workers must be 0 (run in this process) or a positive count, not %r" % (workers,))
+    if shard_size is None:
+        shard_size = -(-n // (max(workers, 1) * SHARDS_PER_WORKER))
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least one sphere, not %r" % (shard_size,))
+
+    blocks = []
+    try:
+        m_block, m_shared = _create_block((n,), np.complex128)
+        blocks.append(m_block)
+        x_block, x_shared = _create_block((n,), np.float64)
+        blocks.append(x_block)
+        out_block, out = _create_block(out_shape(n), out_dtype)
+        blocks.append(out_block)
+
+        m_shared[:] = m
+        x_shared[:] = x
+        arrays = (m_shared, x_shared, out)
+        shards = [(start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+
+        done = 0
+        if workers == 0:
+            for start, stop in shards:
+                done += _run_shard(kind, arrays, start, stop, options)
+                if progress is not None:
+                    progress(done, n)
+        else:
+            specs = [(block.name, array.shape, array.dtype.str) for block, array in zip(blocks, arrays)]
+            context = multiprocessing.get_context(START_METHOD)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_warm_up) as pool:
+                futures = [pool.submit(_worker_shard, kind, specs, start, stop, options) for start, stop in shards]
+                try:
+                    for future in as_completed(futures):
+                        done += future.result()
+                        if progress is not None:
+                            progress(done, n)
+                except BaseException:
+                    # do not make the caller wait for shards nobody will read
+                    for future in futures:
+                        future.cancel()
+                    raise
+    except BaseException:
+        # a traceback frame may still hold a view, so only the names go now
+        for block in blocks:
+            block.unlink()
+        raise
+
+    # The names are removed now, so nothing can leak even if the caller holds on
+    # to the results forever.  Each mapping lives until the last view of it goes.
+    for block in blocks:
+        block.unlink()
+    return out
+
+
+def efficiencies_mx(m, x, n_pole=0, e_field=True, workers=None, shard_size=None, progress=None):
+    """
+    Compute the efficiencies of a very large population on worker processes.
+
+    Each shard is handed to ``miepython.efficiencies_mx`` in a worker, so the
+    results are those of one call of that function over the whole input.
+
+    Args:
+        m: complex index of refraction, a scalar or an array matching x
+        x: size parameter, a scalar or an array matching m
+        n_pole: a non-zero value returns the contribution by the n_pole multipole
+        e_field: selects the electric (True) or magnetic (False) multipole
+        workers: number of processes; None uses ``os.cpu_count()`` and 0 runs the
+            shards in this process
+        shard_size: spheres per task; None gives each worker about four shards
+        progress: optional callable, called as ``progress(done, total)`` in this
+            process whenever a shard finishes
+
+    Returns:
+        qext, qsca, qback, g: arrays of efficiencies, one entry per sphere
+
+    Examples:
+        >>> import numpy as np
+        >>> import miepython.parallel as mp
+        >>> qext, qsca, qback, g = mp.efficiencies_mx(1.5, np.array([1.0, 2.0, 3.0]), workers=0)
+        >>> np.round(qext, 6)
+        array([0.215098, 1.798418, 3.418056])
+    """
+    options = {"n_pole": n_pole, "e_field": e_field}
+    out = _sweep("efficiencies", m, x, lambda n: (4, n), np.float64, options, workers, shard_size, progress)
+    qext, qsca, qback, g = out
+    return qext, qsca, qback, g
+
+
+def coefficients(m, x, n_pole, internal=False, workers=None, shard_size=None, progress=None):
+    """
+    Compute the Mie coefficients of a very large population on worker processes.
+
+    The array form of ``miepython.coefficients`` needs a fixed number of orders per
+    sphere, and so does this: ``n_pole`` must be positive.
+
+    Args:
+        m: complex index of refraction, a scalar or an array matching x
+        x: size parameter, a scalar or an array matching m
+        n_pole: number of orders to return for every sphere
+        internal: also return c_n and d_n for the field inside the sphere
+        workers: number of processes; None uses ``os.cpu_count()`` and 0 runs the
+            shards in this process
+        shard_size: spheres per task; None gives each worker about four shards
+        progress: optional callable, called as ``progress(done, total)`` in this
+            process whenever a shard finishes
+
+    Returns:
+        ndarray: ``[a, b]``, or ``[a, b, c, d]`` when ``internal`` is True, shaped
+            ``(2, n_spheres, n_pole)`` or ``(4, n_spheres, n_pole)``
+    """
+    if n_pole <= 0:
+        raise RuntimeError("when m or x is an array then n_pole must be >0")
+    n_sets = 4 if internal else 2
+    options = {"n_pole": n_pole, "internal": internal}
+    return _sweep(
+        "coefficients", m, x, lambda n: (n_sets, n, n_pole), np.complex128, options, workers, shard_size, progress
+    )
+
+
+def S1_S2(m, x, mu, norm="albedo", n_pole=0, workers=None, shard_size=None, progress=None):
+    """
+    Compute scattering amplitudes for a very large population on worker processes.
+
+    Every sphere is evaluated on the same angles ``mu``, which are small enough to
+    send to each worker with the task.
+
+    Args:
+        m: complex index of refraction, a scalar or an array matching x
+        x: size parameter, a scalar or an array matching m
+        mu: the angles, cos(theta), shared by every sphere
+        norm: (optional) string describing scattering function normalization
+        n_pole: isolate a single multipole order (default=0 means include all terms)
+        workers: number of processes; None uses ``os.cpu_count()`` and 0 runs the
+            shards in this process
+        shard_size: spheres per task; None gives each worker about four shards
+        progress: optional callable, called as ``progress(done, total)`` in this
+            process whenever a shard finishes
+
+    Returns:
+        S1, S2: amplitude arrays shaped ``(n_spheres, n_angles)`` [sr**(-0.5)]
+    """
+    mu = np.atleast_1d(np.asarray(mu, dtype=np.float64))
+    options = {"mu": mu, "norm": norm, "n_pole": n_pole}
+    out = _sweep("S1_S2", m, x, lambda n: (2, n, mu.size), np.complex128, options, workers, shard_size, progress)
+    s1, s2 = out
+    return s1, s2
@@ -0,0 +1,227 @@
+"""
+Efficiencies over a range of wavelengths, sampled where the spectrum needs it.
+
+A fixed grid of wavelengths misses narrow resonances or, made fine enough to
+catch them, wastes almost all of its points on the smooth stretches between.
+``spectrum`` places its samples adaptively and returns a ``Spectrum`` that holds
+them and interpolates between them::
+
+    import numpy as np
+    import miepython as mie
+
+    spec = mie.spectrum(1.5, 5.0, 0.4, 0.8, tol=1e-3)
+    print(spec.calls, "spheres solved")
+    qext, qsca, qback, g = spec(np.linspace(0.4, 0.8, 2001))
+
+The index may depend on wavelength: pass a function of the vacuum wavelength
+instead of a number.  It is called with an array of wavelengths.
+
+Sampling starts from a grid on which the size parameter changes by at most a half
+between neighbours.  Every interval is then tested by computing the sphere at its
+midpoint and comparing with the value predicted there by cubic interpolation
+through the four nearest samples.  An interval whose midpoint misses ``tol`` is
+split and both halves are tested again.  The midpoint becomes a sample either way,
+so no sphere is computed twice.
+
+Resonances narrower than the grid can fall between two samples without moving
+either, so the midpoint test alone cannot be trusted with them.  The Mie
+coefficients give them away.  As the wavelength increases through a resonance of
+order n, a_n (or b_n) passes through its largest value and its imaginary part
+changes from positive to negative; passing through zero it changes the other way.
+An interval whose ends show the first kind of change, with both ends still on the
+far side of the resonance from its peak, is split whatever its midpoint says,
+unless the resonance is too weak to change qext by ``tol``.
+
+The errors are relative for qext and qsca and absolute for g.  qback is measured
+relative to itself, or to qext where it is the smaller, since its deep minima
+matter no more than the rest of the spectrum.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from . import core
+from ._backend import an_bn_block
+from .util import _lagrange_stencil
+
+__all__ = ("spectrum", "Spectrum")
+
+# the largest change of size parameter between the starting samples
+STEP_X = 0.5
+
+# intervals narrower than this fraction of the wavelength are never split
+MIN_WIDTH = 1e-12
+
+
+class Spectrum(namedtuple("Spectrum", ["wavelength", "qext", "qsca", "qback", "g", "calls"])):
+    """
+    Efficiencies sampled over a range of wavelengths.
+
+    Attributes:
+        wavelength: the increasing vacuum wavelengths that were sampled
+        qext: the extinction efficiency at each
+        qsca: the scattering efficiency at each
+        qback: the backscatter efficiency at each
+        g: the average cosine of the phase function at each
+        calls: the number of spheres solved, one per sample
+    """
+
+    __slots__ = ()
+
+    def __call__(self, wavelength):
+        """
+        Interpolate the efficiencies at other wavelengths.
+
+        Args:
+            wavelength: vacuum wavelengths inside the sampled range
+
+        Returns:
+            qext, qsca, qback, g: with the shape of wavelength
+        """
+        wavelength = np.asarray(wavelength, dtype=np.float64)
+        if np.any(wavelength < self.wavelength[0]) or np.any(wavelength > self.wavelength[-1]):
+            raise ValueError("wavelengths must lie between %g and %g" % (self.wavelength[0], self.wavelength[-1]))
+        values = _interpolate(self.wavelength, np.column_stack(self[1:5]), wavelength.ravel())
+        return tuple(values[:, i].reshape(wavelength.shape) for i in range(4))
+
+
+def _interpolate(nodes, values, t):
+    """Return the cubic interpolant of values, one row per node, at t."""
+    first, weights = _lagrange_stencil(nodes, t)
+    stencil = first[:, np.newaxis] + np.arange(weights.shape[1])
+    return np.einsum("ij,ijk->ik", weights, values[stencil])
+
+
+def _errors(approx, exact):
+    """Return the largest error of each row, measured as the efficiencies' tolerance is."""
+    qext = np.where(exact[:, 0] > 0, exact[:, 0], np.inf)
+    qsca = np.where(exact[:, 1] > 0, exact[:, 1], np.inf)
+    qback = np.maximum(qext, exact[:, 2])
+    difference = np.abs(approx - exact)
+    relative = [difference[:, 0] / qext, difference[:, 1] / qsca, difference[:, 2] / qback, difference[:, 3]]
+    return np.max(np.column_stack(relative), axis=1)
+
+
+class _Samples:
+    """The spheres solved so far, kept in order of wavelength."""
+
+    def __init__(self, m_of_lambda, d, n_env, n_max):
+        self.m_of_lambda = m_of_lambda
+        self.d = d
+        self.n_env = n_env
+        self.wavelength = np.empty(0)
+        self.values = np.empty((0, 4))
+        self.coefficients = np.empty((0, 2, n_max), dtype=np.complex128)
+        self.x = np.empty(0)
+
+    def solve(self, wavelength):
+        """Return the efficiencies, a_n, b_n and size parameter at each wavelength."""
+        m = self.m_of_lambda(wavelength) if callable(self.m_of_lambda) else self.m_of_lambda
+        m = np.broadcast_to(np.asarray(m, dtype=np.complex128), wavelength.shape) / self.n_env
+        m = np.where(m.imag > 0, np.conj(m), m)
+        x = np.pi * self.d * self.n_env / wavelength
+
+        # the efficiencies come from the batch kernels, threads and closed forms
+        # included, exactly as efficiencies_mx gives them; the coefficients that
+        # reveal the resonances come from one pass over the whole block
+        values = np.column_stack(core.efficiencies_mx(m, x))
+        n_terms = (x + 4.05 * x**0.33333 + 2.0).astype(np.int64)
+        a, b = an_bn_block(m, x, np.minimum(n_terms, self.coefficients.shape[2]))
+        coefficients = np.zeros((len(wavelength), 2, self.coefficients.shape[2]), dtype=np.complex128)
+        coefficients[:, 0, : len(a)] = a.T
+        coefficients[:, 1, : len(b)] = b.T
+        return values, coefficients, x
+
+    def add(self, wavelength):
+        """Solve the spheres at new wavelengths and return their efficiencies."""
+        values, coefficients, x = self.solve(wavelength)
+        order = np.argsort(np.concatenate([self.wavelength, wavelength]), kind="stable")
+        self.wavelength = np.concatenate([self.wavelength, wavelength])[order]
+        self.values = np.concatenate([self.values, values])[order]
+        self.coefficients = np.concatenate([self.coefficients, coefficients])[order]
+        self.x = np.concatenate([self.x, x])[order]
+        return values
+
+    def unresolved(self, tol):
+        """
+        Return which intervals between samples hide part of a resonance.
+
+        An interval qualifies when, for some a_n or b_n, the imaginary part goes
+        from positive to negative across it while both ends are still more
+        imaginary than real, that is further from the peak than its half width.
+        A resonance that cannot change qext by tol is ignored: the coefficients
+        trace a circle through zero whose diameter |c|**2/Re(c) is the height of
+        the peak.
+        """
+        left, right = self.coefficients[:-1], self.coefficients[1:]
+        crossing = (left.imag > 0) & (right.imag < 0)
+        outside = (np.abs(left.imag) > left.real) & (np.abs(right.imag) > right.real)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            height = np.maximum(np.abs(left) ** 2 / left.real, np.abs(right) ** 2 / right.real)
+        height = np.where(np.isfinite(height), height, 1.0)
+        n = np.arange(1, self.coefficients.shape[2] + 1)
+        x2 = np.minimum(self.x[:-1], self.x[1:]) ** 2
+        qext = np.minimum(self.values[:-1, 0], self.values[1:, 0])
+        change = 2 * (2 * n + 1) * height / x2[:, np.newaxis, np.newaxis]
+        strong = change > tol * qext[:, np.newaxis, np.newaxis]
+        return np.any(crossing & outside & strong, axis=(1, 2))
+
+
+def spectrum(m_of_lambda, d, lambda_min, lambda_max, tol=1e-3, n_env=1.0, max_calls=100_000):
+    """
+    Sample the efficiencies of a sphere adaptively over a range of wavelengths.
+
+    Args:
+        m_of_lambda: the complex index of refraction of the sphere, or a function
+            returning it for an array of vacuum wavelengths [-]
+        d: the diameter of the sphere                      [same units as lambda0]
+        lambda_min: the shortest vacuum wavelength          [same units as d]
+        lambda_max: the longest vacuum wavelength           [same units as d]
+        tol: (optional) the largest error allowed when interpolating between samples
+        n_env: real index of medium around sphere, optional.
+        max_calls: (optional) the most spheres to solve before a RuntimeError
+
+    Returns:
+        a ``Spectrum`` holding the samples; calling it interpolates them
+    """
+    if not 0 < lambda_min < lambda_max:
+        raise ValueError("wavelengths must satisfy 0 < lambda_min < lambda_max")
+    if d <= 0:
+        raise ValueError("d must be positive, not %r" % d)
+    if not 0 < tol < 1:
+        raise ValueError("tol must be between 0 and 1, not %r" % tol)
+    x_max = np.pi * d * n_env / lambda_min
+    x_min = np.pi * d * n_env / lambda_max
+    n_start = max(17, int(np.ceil((x_max - x_min) / STEP_X)) + 1)
+
+    samples = _Samples(m_of_lambda, d, n_env, core.wiscombe_terms(x_max))
+    samples.add(np.linspace(lambda_min, lambda_max, n_start))
+    untested = np.ones(n_start - 1, dtype=bool)
+
+    while np.any(untested):
+        left = samples.wavelength[:-1][untested]
+        right = samples.wavelength[1:][untested]
+        middle = (left + right) / 2
+        if len(samples.wavelength) + len(middle) > max_calls:
+            raise RuntimeError(
+                "the spectrum did not reach tol=%g within max_calls=%d; the resonances are too "
+                "many or too narrow" % (tol, max_calls)
+            )
+        predicted = _interpolate(samples.wavelength, samples.values, middle)
+        missed = _errors(predicted, samples.add(middle)) > tol
+
+        # each interval tested is now two; both are tested again if its midpoint missed
+        tested = np.flatnonzero(untested)
+        first_half = tested + np.arange(len(tested))
+        untested = samples.unresolved(tol)
+        untested[first_half] |= missed
+        untested[first_half + 1] |= missed
+
+        # an interval much wider than its neighbour interpolates from a lopsided stencil
+        width = np.diff(samples.wavelength)
+        untested[:-1] |= width[:-1] > 2 * width[1:]
+        untested[1:] |= width[1:] > 2 * width[:-1]
+        untested &= np.diff(samples.wavelength) > MIN_WIDTH * samples.wavelength[1:]
+
+    return Spectrum(samples.wavelength, *samples.values.T, len(samples.wavelength))
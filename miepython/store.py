@@ -0,0 +1,383 @@
+"""
+Keep Mie results on disk between runs.
+
+A ``MieStore`` is a file of efficiencies and scattering amplitudes, one record per
+sphere, that outlives the process that computed them.  Asking it for a grid of
+spheres computes only the ones it does not hold yet, appends them, and answers
+the rest from the file::
+
+    import numpy as np
+    import miepython.store as ms
+
+    store = ms.MieStore("droplets.mie", mu=np.linspace(-1, 1, 181))
+    x = np.linspace(1, 100, 1000)
+    qext, qsca, qback, g = store.efficiencies_mx(1.33 - 1e-8j, x)
+    s1, s2 = store.S1_S2(1.33 - 1e-8j, x)
+
+Every record holds the four efficiencies and, when the store was created with
+angles, S1 and S2 at those angles with the store's normalization.  The angles
+and the normalization are fixed when the file is created.  Spheres are matched
+exactly on m and x; an index with a positive imaginary part is stored as its
+conjugate, as everywhere else in ``miepython``.
+
+The file is opened with ``np.memmap``, so ``lookup`` returns read-only views of
+the mapped file rather than copies, and a grid lookup copies only the records
+it gathers.
+
+File layout
+-----------
+
+All numbers are little-endian and every block starts on an 8-byte boundary::
+
+    header      64 bytes: magic b"MIESTORE", version, number of angles,
+                committed length in bytes, normalization name
+    mu          float64 per angle
+    segment     count, then an index of count rows (m.real, m.imag, x) and
+                count contiguous records of 4 + 4 * len(mu) float64
+    segment     ...
+
+A record is qext, qsca, qback and g, then S1 and S2 as interleaved real and
+imaginary parts, so each can be viewed as complex128 without a copy.
+
+Several processes
+-----------------
+
+The file only ever grows, and the header's committed length says how much of it
+is valid.  A writer appends a whole segment past that length, flushes it to
+disk, and only then advances the length.  A reader maps no further than the
+committed length, so it never sees a partly written segment, and what it has
+mapped is never rewritten.  Any number of processes can therefore read while
+another writes; ``refresh`` picks up segments appended since the last look.
+
+Writers take an exclusive ``fcntl.flock`` on the file while appending, and
+drop spheres another writer stored in the meantime.  Windows has no
+``fcntl``: there, readers are still safe but only one process may write.
+"""
+
+import importlib
+import importlib.util
+import os
+
+import numpy as np
+
+from . import core
+
+__all__ = ("MieStore",)
+
+MAGIC = b"MIESTORE"
+VERSION = 1
+
+_HEADER = np.dtype(
+    [("magic", "S8"), ("version", "<u4"), ("n_mu", "<u4"), ("length", "<u8"), ("norm", "S16"), ("reserved", "V24")]
+)
+_SEGMENT = np.dtype([("count", "<u8"), ("reserved", "<u8")])
+
+# byte offset of the committed length within the header
+_LENGTH_OFFSET = _HEADER.fields["length"][1]
+
+# Windows has no fcntl; there writers are not serialized (see the module docstring)
+fcntl = importlib.import_module("fcntl") if importlib.util.find_spec("fcntl") else None
+
+
+def _read_length(f):
+    """Return the committed length from the header of an open store."""
+    f.seek(_LENGTH_OFFSET)
+    return int(np.frombuffer(f.read(8), dtype="<u8")[0])
+
+
+class MieStore:
+    """
+    Mie efficiencies and amplitudes for many spheres, kept in a file.
+
+    Attributes:
+        path: the file holding the results
+        mu: the angles, cos(theta), of the stored amplitudes (read-only)
+        norm: the normalization of the stored amplitudes
+    """
+
+    def __init__(self, path, mu=None, norm=None):
+        """
+        Open a store, creating the file if it does not exist.
+
+        Args:
+            path: the file to use
+            mu: (optional) the angles to keep S1 and S2 at.  A new store without
+                them holds only efficiencies.  For an existing file they must be
+                the angles it was created with, or omitted.
+            norm: (optional) the normalization of S1 and S2, as for
+                ``miepython.S1_S2``; "albedo" for a new store.  For an existing
+                file it must match, or be omitted.
+
+        Examples:
+            >>> import os, tempfile
+            >>> import numpy as np
+            >>> from miepython.store import MieStore
+            >>> path = os.path.join(tempfile.mkdtemp(), "example.mie")
+            >>> store = MieStore(path, mu=np.array([-1.0, 0.0, 1.0]))
+            >>> qext, qsca, qback, g = store.efficiencies_mx(1.5, [1.0, 2.0])
+            >>> print(f"{qext[1]:.6f}")
+            1.798418
+            >>> reopened = MieStore(path)
+            >>> len(reopened), len(reopened.mu)
+            (2, 3)
+        """
+        self.path = os.fspath(path)
+        if mu is not None:
+            mu = np.atleast_1d(np.asarray(mu, dtype=np.float64))
+            if mu.ndim != 1:
+                raise ValueError("the angles of a MieStore must be a scalar or a one-dimensional array")
+
+        if not os.path.exists(self.path):
+            self._create(np.empty(0) if mu is None else mu, "albedo" if norm is None else norm)
+
+        with open(self.path, "rb") as f:
+            raw = f.read(_HEADER.itemsize)
+            header = np.frombuffer(raw.ljust(_HEADER.itemsize, b"\0"), dtype=_HEADER)
+            if len(raw) != _HEADER.itemsize or header["magic"][0] != MAGIC:
+                raise ValueError("%s is not a miepython store" % self.path)
+            if header["version"][0] != VERSION:
+                raise ValueError("%s is a version %d store, not %d" % (self.path, header["version"][0], VERSION))
+            n_mu = int(header["n_mu"][0])
+            self.mu = np.frombuffer(f.read(8 * n_mu), dtype="<f8").astype(np.float64)
+            self.norm = header["norm"][0].decode("ascii")
+        self.mu.flags.writeable = False
+
+        if mu is not None and (mu.shape != self.mu.shape or np.any(mu != self.mu)):
+            raise ValueError("%s holds amplitudes at different angles" % self.path)
+        if norm is not None and norm != self.norm:
+            raise ValueError("%s holds amplitudes normalized by %r, not %r" % (self.path, self.norm, norm))
+
+        self._start = _HEADER.itemsize + 8 * n_mu
+        self._record = 4 + 4 * n_mu
+        self._length = 0
+        self._rows = {}
+        self._records = []
+        self.refresh()
+
+    def _create(self, mu, norm):
+        """Write the header of a new, empty store."""
+        if len(norm.encode("ascii")) > 16:
+            raise ValueError("the normalization name %r is too long to store" % norm)
+        header = np.zeros(1, dtype=_HEADER)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["n_mu"] = len(mu)
+        header["length"] = _HEADER.itemsize + 8 * len(mu)
+        header["norm"] = norm.encode("ascii")
+        # The header is written in full under another name and then linked into
+        # place, so the store appears complete or not at all.  Linking never
+        # replaces a file: if another process got there first, use its file.
+        temporary = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(temporary, "wb") as f:
+                f.write(header.tobytes())
+                f.write(mu.astype("<f8").tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(temporary, self.path)
+        except FileExistsError:
+            pass
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def refresh(self):
+        """Map any segments that other writers have committed since the last look."""
+        with open(self.path, "rb") as f:
+            length = _read_length(f)
+        if length <= max(self._length, self._start):
+            self._length = max(self._length, self._start)
+            return
+
+        # map only the new segments: every segment view keeps its map alive, so
+        # mapping the whole file on each refresh would pile up copies of it
+        start = max(self._length, self._start)
+        mapped = np.memmap(self.path, dtype=np.uint8, mode="r", offset=start, shape=(length - start,))
+        offset = 0
+        while offset < length - start:
+            count = int(mapped[offset : offset + 8].view("<u8")[0])
+            offset += _SEGMENT.itemsize
+            index = mapped[offset : offset + 24 * count].view("<f8").reshape(count, 3)
+            offset += 24 * count
+            records = mapped[offset : offset + 8 * self._record * count].view("<f8").reshape(count, self._record)
+            offset += 8 * self._record * count
+
+            segment = len(self._records)
+            self._records.append(records)
+            for row, key in enumerate(index.tolist()):
+                self._rows[tuple(key)] = (segment, row)
+        self._length = length
+
+    def __len__(self):
+        """Return the number of spheres held."""
+        return len(self._rows)
+
+    def __contains__(self, sphere):
+        """Return whether the store holds the sphere ``(m, x)``."""
+        m, x = sphere
+        return _key(m, x) in self._rows
+
+    def __repr__(self):
+        """Describe the file and what it holds."""
+        return "MieStore(%r, %d spheres, %d angles)" % (self.path, len(self), len(self.mu))
+
+    def lookup(self, m, x):
+        """
+        Return the stored results for one sphere without copying them.
+
+        Args:
+            m: the complex index of refraction of the sphere
+            x: the size parameter of the sphere
+
+        Returns:
+            efficiencies, S1, S2: read-only views of the mapped file, the first
+            holding qext, qsca, qback and g and the other two one amplitude per angle
+
+        Raises:
+            KeyError: the sphere is not in the store
+        """
+        key = _key(m, x)
+        if key not in self._rows:
+            self.refresh()
+        segment, row = self._rows[key]
+        record = self._records[segment][row]
+        n_mu = len(self.mu)
+        s1 = record[4 : 4 + 2 * n_mu].view(np.complex128)
+        s2 = record[4 + 2 * n_mu :].view(np.complex128)
+        return record[:4], s1, s2
+
+    def update(self, m, x):
+        """
+        Compute and append every sphere of a grid that the store lacks.
+
+        Args:
+            m: the index of refraction, or an array of them
+            x: the size parameter, or an array of them; m and x are broadcast
+                together into the grid
+
+        Returns:
+            the number of spheres appended
+        """
+        keys = _grid_keys(m, x)[1]
+        missing = list(dict.fromkeys(key for key in keys if key not in self._rows))
+        if not missing:
+            return 0
+
+        records = self._compute(missing)
+
+        with open(self.path, "r+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                # another writer may have stored some of them while these were computed
+                self.refresh()
+                fresh = [i for i, key in enumerate(missing) if key not in self._rows]
+                if fresh:
+                    self._append(f, np.array(missing)[fresh], records[fresh])
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+        self.refresh()
+        return len(fresh)
+
+    def _compute(self, keys):
+        """Return the records for a list of sphere keys."""
+        keys = np.array(keys)
+        m = keys[:, 0] + 1j * keys[:, 1]
+        x = keys[:, 2].copy()
+        n_mu = len(self.mu)
+
+        records = np.empty((len(keys), self._record))
+        records[:, :4] = np.transpose(core.efficiencies_mx(m, x))
+        if n_mu > 0:
+            s1, s2 = core.S1_S2(m, x, self.mu, norm=self.norm)
+            records[:, 4 : 4 + 2 * n_mu] = s1.view(np.float64)
+            records[:, 4 + 2 * n_mu :] = s2.view(np.float64)
+        return records
+
+    def _append(self, f, index, records):
+        """Write one segment past the committed length, then commit it."""
+        length = _read_length(f)
+        segment = np.zeros(1, dtype=_SEGMENT)
+        segment["count"] = len(index)
+
+        f.seek(length)
+        f.write(segment.tobytes())
+        f.write(index.astype("<f8").tobytes())
+        f.write(records.astype("<f8").tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+        # only now can readers see it
+        f.seek(_LENGTH_OFFSET)
+        f.write(np.array([length + _segment_bytes(len(index), self._record)], dtype="<u8").tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _gather(self, m, x):
+        """Return the records of a grid, computing any that are missing, and its shape."""
+        self.update(m, x)
+        shape, keys = _grid_keys(m, x)
+        out = np.empty((len(keys), self._record))
+        for i, key in enumerate(keys):
+            segment, row = self._rows[key]
+            out[i] = self._records[segment][row]
+        return out, shape
+
+    def efficiencies_mx(self, m, x):
+        """
+        Return the efficiencies for a grid of spheres, as ``miepython.efficiencies_mx``.
+
+        Args:
+            m: the index of refraction, or an array of them
+            x: the size parameter, or an array of them; m and x are broadcast
+                together into the grid
+
+        Returns:
+            qext, qsca, qback, g: arrays with the broadcast shape of m and x
+        """
+        records, shape = self._gather(m, x)
+        qext, qsca, qback, g = (records[:, i].reshape(shape) for i in range(4))
+        return qext, qsca, qback, g
+
+    def S1_S2(self, m, x):
+        """
+        Return the amplitudes for a grid of spheres at the store's angles.
+
+        Args:
+            m: the index of refraction, or an array of them
+            x: the size parameter, or an array of them; m and x are broadcast
+                together into the grid
+
+        Returns:
+            S1, S2: arrays with the broadcast shape of m and x plus one axis for
+            the angles, normalized by the store's ``norm``
+        """
+        n_mu = len(self.mu)
+        if n_mu == 0:
+            raise ValueError("%s was created without angles and holds no amplitudes" % self.path)
+        records, shape = self._gather(m, x)
+        s1 = records[:, 4 : 4 + 2 * n_mu].copy().view(np.complex128)
+        s2 = records[:, 4 + 2 * n_mu :].copy().view(np.complex128)
+        return s1.reshape(shape + (n_mu,)), s2.reshape(shape + (n_mu,))
+
+
+def _segment_bytes(count, record):
+    """Return the size of a segment of count records of record float64 each."""
+    return _SEGMENT.itemsize + 8 * count * (3 + record)
+
+
+def _key(m, x):
+    """Return the index key of one sphere: n-ik rather than n+ik, and no -0.0."""
+    m = complex(m)
+    if m.imag > 0:
+        m = m.conjugate()
+    return (m.real + 0.0, m.imag + 0.0, float(x) + 0.0)
+
+
+def _grid_keys(m, x):
+    """Return the broadcast shape of m and x and the key of every sphere in it."""
+    m, x = np.broadcast_arrays(np.asarray(m, dtype=np.complex128), np.asarray(x, dtype=np.float64))
+    keys = [_key(mm, xx) for mm, xx in zip(m.ravel().tolist(), x.ravel().tolist())]
+    return m.shape, keys
@@ -0,0 +1,344 @@
+"""
+Tabulated efficiencies for inner loops that can trade accuracy for speed.
+
+An inversion or retrieval code may ask for the efficiencies of millions of
+spheres per iteration, all inside a known range of m and x, and be content with
+a relative error of 1e-4.  ``build_table`` samples the exact efficiencies on a
+grid over that range, refines the grid until cubic interpolation meets the
+requested tolerance, and returns an ``EfficiencyTable`` that evaluates whole
+arrays at once::
+
+    from miepython.surrogate import build_table
+
+    table = build_table(x_range=(0.1, 5), n_range=(1.3, 1.6), k_range=(0.001, 0.1))
+    qext, qsca, qback, g = table(m, x)
+    print(table.report)
+
+The grid is a tensor product over log10 x, the real part n of the index and
+log10(k + k_floor), where m = n - ik.  The offset ``k_floor`` lets the range of k
+start at zero.  Interpolation is local cubic Lagrange on four neighbouring nodes
+along each axis, applied to log10 of qext, qsca and qback, which keeps their
+power-law behaviour for small spheres, and to g itself.
+
+Refinement works one axis at a time.  The table is compared with the exact
+efficiencies at the midpoint of every interval along that axis, at every node
+of the other two, and each interval whose midpoint misses the tolerance is
+split.  Those exact values are the new nodes, so no sphere is computed twice.
+This repeats until a pass over all three axes splits nothing.
+
+The midpoint checks bound the error only on those lines, not between them, so
+the table is then checked at random points of the whole range.  If any misses
+the tolerance, refinement resumes with half the target error, and the check is
+repeated at new random points.  The last check is kept as ``table.report`` and
+prints as a short table.  qext and qsca are checked
+for relative error and g, a cosine, for absolute error.  qback is checked for
+relative error too, except in its deep minima, where the error is measured
+against qsca instead.
+
+The resonances of large, weakly absorbing spheres are too narrow for any
+practical table.  Over such a range refinement stops at ``max_points`` with a
+RuntimeError rather than returning a table that misses the tolerance.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from . import core
+from .util import _lagrange_stencil
+
+__all__ = ("build_table", "EfficiencyTable", "ValidationReport")
+
+# the efficiencies below this are treated as this, so that their logarithm exists
+Q_FLOOR = 1e-300
+
+# spheres per block when evaluating; each gathers 256 values, so this is 16 MiB
+BLOCK_POINTS = 2**13
+
+QUANTITIES = ("qext", "qsca", "qback", "g")
+
+
+class ValidationReport(namedtuple("ValidationReport", ["n_samples", "tol", "max_error", "p99_error"])):
+    """
+    How an ``EfficiencyTable`` compares with the exact efficiencies at random points.
+
+    Attributes:
+        n_samples: the number of random spheres checked
+        tol: the tolerance the table was built for
+        max_error: the largest error seen, one per quantity (qext, qsca, qback, g)
+        p99_error: the 99th percentile of the error, one per quantity
+    """
+
+    __slots__ = ()
+
+    @property
+    def passed(self):
+        """Return whether every error seen was within the tolerance."""
+        return bool(np.all(np.asarray(self.max_error) <= self.tol))
+
+    def __str__(self):
+        """Lay the errors out one quantity per line."""
+        lines = [
+            "%d random spheres against efficiencies_mx, tolerance %.1e: %s"
+            % (self.n_samples, self.tol, "passed" if self.passed else "FAILED"),
+            "           max error   99th percentile",
+        ]
+        for name, worst, p99 in zip(QUANTITIES, self.max_error, self.p99_error):
+            kind = "absolute" if name == "g" else "relative"
+            lines.append("%-6s %12.2e %12.2e   (%s)" % (name, worst, p99, kind))
+        return "\n".join(lines)
+
+
+class EfficiencyTable:
+    """
+    Efficiencies interpolated from a table of exact values.
+
+    Attributes:
+        nodes: the grid along log10 x, n and log10(k + k_floor)
+        k_floor: the offset that lets k reach zero on a logarithmic axis
+        tol: the tolerance the table was refined to
+        report: the ``ValidationReport`` made when the table was built
+    """
+
+    def __init__(self, nodes, values, k_floor, tol):
+        """
+        Wrap tabulated values.
+
+        Args:
+            nodes: three increasing arrays, the grid along each axis
+            values: array of shape (len(nodes[0]), len(nodes[1]), len(nodes[2]), 4)
+                holding log10 qext, log10 qsca, log10 qback and g
+            k_floor: the offset added to k before its logarithm is taken
+            tol: the tolerance the table was refined to
+        """
+        self.nodes = tuple(np.asarray(axis, dtype=np.float64) for axis in nodes)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.k_floor = float(k_floor)
+        self.tol = float(tol)
+        self.report = None
+
+    @property
+    def n_points(self):
+        """The number of tabulated spheres."""
+        return self.values.shape[0] * self.values.shape[1] * self.values.shape[2]
+
+    def __repr__(self):
+        """Give the grid size along each axis."""
+        shape = self.values.shape[:3]
+        return "EfficiencyTable(%d x %d x %d nodes, tol=%.1e)" % (shape + (self.tol,))
+
+    def _coordinates(self, m, x):
+        """Return the grid coordinates of each sphere, flattened, and their shape."""
+        m, x = np.broadcast_arrays(np.asarray(m, dtype=np.complex128), np.asarray(x, dtype=np.float64))
+        shape = m.shape
+        m = m.ravel()
+        x = x.ravel()
+        if np.any(x <= 0):
+            raise ValueError("an EfficiencyTable covers positive size parameters only")
+        k = np.abs(m.imag)
+        coords = (np.log10(x), m.real.copy(), np.log10(k + self.k_floor))
+        for name, axis, values in zip(("x", "m.real", "m.imag"), self.nodes, coords):
+            # a little slack, so that the ends of the range survive the logarithm
+            slack = 1e-12 * max(1.0, abs(axis[0]), abs(axis[-1]))
+            if np.any(values < axis[0] - slack) or np.any(values > axis[-1] + slack):
+                raise ValueError("%s is outside the range of this table" % name)
+        return coords, shape
+
+    def _interpolate(self, coords):
+        """Return the interpolated log10 qext, log10 qsca, log10 qback and g, shape (n, 4)."""
+        (i0, wi), (j0, wj), (l0, wl) = [_lagrange_stencil(axis, values) for axis, values in zip(self.nodes, coords)]
+        # every sphere's 4x4x4 block of neighbours in one gather, then one contraction
+        stencil = (wi.shape[1], wj.shape[1], wl.shape[1])
+        windows = np.lib.stride_tricks.sliding_window_view(self.values, stencil, axis=(0, 1, 2))
+        block = windows[i0, j0, l0].reshape(len(i0), 4, -1)
+        weights = wi[:, :, np.newaxis, np.newaxis] * wj[:, np.newaxis, :, np.newaxis] * wl[:, np.newaxis, np.newaxis, :]
+        return np.einsum("nqk,nk->nq", block, weights.reshape(len(i0), -1))
+
+    def __call__(self, m, x):
+        """
+        Return the interpolated efficiencies of spheres inside the table's range.
+
+        Args:
+            m: the complex index of refraction, or an array of them
+            x: the size parameter, or an array of them; m and x are broadcast together
+
+        Returns:
+            qext, qsca, qback, g: arrays with the broadcast shape of m and x
+        """
+        coords, shape = self._coordinates(m, x)
+        out = np.empty((len(coords[0]), 4))
+        for start in range(0, len(out), BLOCK_POINTS):
+            stop = start + BLOCK_POINTS
+            out[start:stop] = self._interpolate([axis[start:stop] for axis in coords])
+        out[:, :3] = 10 ** out[:, :3]
+        qext, qsca, qback, g = (out[:, i].reshape(shape) for i in range(4))
+        return qext, qsca, qback, g
+
+    def validate(self, n_samples=10000, seed=0):
+        """
+        Compare the table with the exact efficiencies at random spheres.
+
+        The spheres are drawn uniformly over the table's axes, that is uniformly
+        in log10 x, n and log10(k + k_floor).
+
+        Args:
+            n_samples: (optional) the number of spheres to check
+            seed: (optional) seed for the random generator, so reports can be reproduced
+
+        Returns:
+            a ``ValidationReport``
+        """
+        if n_samples == 0:
+            return ValidationReport(0, self.tol, (0.0,) * 4, (0.0,) * 4)
+
+        rng = np.random.default_rng(seed)
+        coords = [rng.uniform(axis[0], axis[-1], n_samples) for axis in self.nodes]
+        m, x = _spheres(coords, self.k_floor)
+        errors = _errors(self._interpolate(coords), _exact_values(m, x))
+        worst = errors.max(axis=0)
+        p99 = np.percentile(errors, 99, axis=0)
+        return ValidationReport(n_samples, self.tol, tuple(worst.tolist()), tuple(p99.tolist()))
+
+
+def _spheres(coords, k_floor):
+    """Turn grid coordinates back into m and x."""
+    log_x, n, log_k = coords
+    k = np.maximum(10**log_k - k_floor, 0.0)
+    return n - 1j * k, 10**log_x
+
+
+def _exact_values(m, x):
+    """Return log10 qext, log10 qsca, log10 qback and g from the exact kernels, shape (n, 4)."""
+    qext, qsca, qback, g = core.efficiencies_mx(np.asarray(m, dtype=np.complex128), np.asarray(x, dtype=np.float64))
+    values = np.empty((len(qext), 4))
+    for i, q in enumerate((qext, qsca, qback)):
+        values[:, i] = np.log10(np.maximum(q, Q_FLOOR))
+    values[:, 3] = g
+    return values
+
+
+def _errors(approx, exact):
+    """Return the relative error of qext, qsca and qback and the absolute error of g."""
+    errors = np.empty_like(exact)
+    # 10**d - 1 is the relative error that a difference d of logarithms makes
+    errors[:, :3] = np.abs(np.expm1(np.log(10.0) * (approx[:, :3] - exact[:, :3])))
+    # qback has deep minima where its relative error says little; there it is
+    # measured against qsca instead
+    errors[:, 2] *= np.minimum(1.0, 10 ** (exact[:, 2] - exact[:, 1]))
+    errors[:, 3] = np.abs(approx[:, 3] - exact[:, 3])
+    return errors
+
+
+def _axis(low, high, n_start):
+    """Return the starting nodes of one axis, a single node when its range is empty."""
+    if high < low:
+        raise ValueError("a range must be given as (low, high), not (%r, %r)" % (low, high))
+    if high == low:
+        return np.array([float(low)])
+    return np.linspace(low, high, n_start)
+
+
+def build_table(x_range, n_range, k_range=(0.0, 0.0), tol=1e-4, k_floor=1e-6, max_points=1_000_000, n_validate=10000):
+    """
+    Tabulate the efficiencies over a range of spheres, refined to a tolerance.
+
+    Args:
+        x_range: (low, high) size parameters, both positive
+        n_range: (low, high) real parts of the index of refraction
+        k_range: (optional) (low, high) of k, where m = n - ik; the default is
+            non-absorbing spheres only
+        tol: (optional) the relative error allowed in qext, qsca and qback and
+            the absolute error allowed in g
+        k_floor: (optional) offset added to k before its logarithm, below which
+            changes in k are resolved linearly rather than logarithmically
+        max_points: (optional) the most spheres the table may hold; refining
+            past it raises RuntimeError
+        n_validate: (optional) random spheres to check the table at after each
+            round of refinement; 0 trusts the midpoint checks alone
+
+    Returns:
+        an ``EfficiencyTable``, its ``report`` filled in
+
+    Examples:
+        >>> from miepython.surrogate import build_table
+        >>> table = build_table((0.1, 2.0), (1.4, 1.6), tol=1e-4, n_validate=1000)
+        >>> table.report.passed
+        True
+        >>> qext, qsca, qback, g = table(1.5, 1.0)
+        >>> print(f"{qext:.4f}")
+        0.2151
+    """
+    if x_range[0] <= 0:
+        raise ValueError("the size parameters must be positive")
+    if k_range[0] < 0:
+        raise ValueError("k must not be negative; give m as n - ik")
+
+    nodes = [
+        _axis(np.log10(x_range[0]), np.log10(x_range[1]), 5),
+        _axis(n_range[0], n_range[1], 5),
+        _axis(np.log10(k_range[0] + k_floor), np.log10(k_range[1] + k_floor), 5),
+    ]
+    mesh = np.meshgrid(*nodes, indexing="ij")
+    m, x = _spheres([axis.ravel() for axis in mesh], k_floor)
+    table = EfficiencyTable(nodes, _exact_values(m, x).reshape(mesh[0].shape + (4,)), k_floor, tol)
+
+    # Refine to a target until the random check passes, halving the target each
+    # time it does not.  Every round checks spheres of its own, so the report
+    # returned comes from spheres that did not steer the refinement.
+    target = tol
+    check = 0
+    while True:
+        refined = True
+        while refined:
+            refined = False
+            for axis in range(3):
+                if _refine_axis(table, axis, target, max_points):
+                    refined = True
+
+        table.report = table.validate(n_validate, seed=check)
+        if table.report.passed:
+            return table
+        target /= 2
+        check += 1
+
+
+def _refine_axis(table, axis, target, max_points):
+    """Split every interval along one axis whose midpoint misses the target error."""
+    nodes = table.nodes[axis]
+    if len(nodes) < 2:
+        return False
+    mids = 0.5 * (nodes[:-1] + nodes[1:])
+
+    grid = list(table.nodes)
+    grid[axis] = mids
+    mesh = np.meshgrid(*grid, indexing="ij")
+    coords = [c.ravel() for c in mesh]
+    m, x = _spheres(coords, table.k_floor)
+    exact = _exact_values(m, x)
+    errors = _errors(table._interpolate(coords), exact)  # pylint: disable=protected-access
+
+    # the worst error on each midpoint's slab across the other two axes
+    per_mid = np.moveaxis(errors.max(axis=1).reshape(mesh[0].shape), axis, 0).reshape(len(mids), -1).max(axis=1)
+    split = per_mid > target
+    if not np.any(split):
+        return False
+
+    shape = list(table.values.shape)
+    shape[axis] += int(np.count_nonzero(split))
+    n_points = shape[0] * shape[1] * shape[2]
+    if n_points > max_points:
+        raise RuntimeError(
+            "the table needs more than max_points=%d spheres to reach tol=%.1e; "
+            "narrow the ranges or loosen the tolerance" % (max_points, table.tol)
+        )
+
+    new_values = np.take(exact.reshape(mesh[0].shape + (4,)), np.flatnonzero(split), axis=axis)
+    all_nodes = np.concatenate([nodes, mids[split]])
+    order = np.argsort(all_nodes, kind="stable")
+    values = np.concatenate([table.values, new_values], axis=axis)
+
+    new_nodes = list(table.nodes)
+    new_nodes[axis] = all_nodes[order]
+    table.nodes = tuple(new_nodes)
+    table.values = np.ascontiguousarray(np.take(values, order, axis=axis))
+    return True
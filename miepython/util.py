@@ -1,4 +1,4 @@
-"""Functions to format complex numbers or arrays of complex numbers."""
+"""Functions to format complex numbers or arrays of complex numbers, and other small helpers."""
 
 import numpy as np
 
@@ -131,3 +131,23 @@ def phasor_str(z, N=2):
         s += ", "
 
     return s[:-2]
+
+
+def _lagrange_stencil(nodes, t):
+    """
+    Return the first node and the weights of the local Lagrange interpolant at t.
+
+    Each t uses the four nodes around its interval, shifted inward at the ends of
+    the axis; an axis of fewer than four nodes uses all of them.
+    """
+    n_used = min(4, len(nodes))
+    interval = np.clip(np.searchsorted(nodes, t, side="right") - 1, 0, len(nodes) - 1)
+    first = np.clip(interval - 1, 0, len(nodes) - n_used)
+    stencil = nodes[first[:, np.newaxis] + np.arange(n_used)]
+
+    weights = np.ones((len(t), n_used))
+    for j in range(n_used):
+        for i in range(n_used):
+            if i != j:
+                weights[:, j] *= (t - stencil[:, i]) / (stencil[:, j] - stencil[:, i])
+    return first, weights
@@ -17,7 +17,37 @@ Run it once per backend::
     MIEPYTHON_USE_JIT=1 python tests/benchmark_efficiencies.py
 
 ``--compare`` instead times the two kernel sets against each other in one process
-and prints the speedup quoted in the README.  ``make speed`` does all three.
+and prints the speedup quoted in the README, followed by the gain from running the
+loop over spheres inside the compiled batch kernel rather than calling
+``single_sphere`` once per element from Python, the gain the pure-python
+backend gets from its NumPy batch, which vectorizes across spheres, and the
+compiled ``S1_S2`` loop against the blocked BLAS products on 10^5 angles at
+x=500.  ``make speed`` does all three.
+
+``--scaling`` times the same N-particle sweep on 1, 2, 4, ... threads with the
+numba backend, showing how it scales across cores::
+
+    MIEPYTHON_USE_JIT=1 python tests/benchmark_efficiencies.py --scaling
+
+``--balance`` compares naive contiguous chunking with the cost-balanced chunks
+the threaded path deals out, on sizes spread over five decades.
+
+``--parity`` times ``_S1_S2`` on a grid symmetric about mu = 0, where each
+mirrored pair of angles shares one evaluation of pi_n and tau_n, against the same
+grid with one angle nudged so that every angle is summed on its own.
+
+``--memory`` measures what one large sphere costs in memory: the peak the
+coefficient arrays reach against the streaming kernel, which forms each a_n, b_n,
+adds it in and drops it, and how many arrays the numba sweep allocates now that
+its series buffers are sized once for the largest sphere.  It also times the
+pure-python kernel one sphere after another in fresh buffers and in a kept
+``MieWorkspace``, which comes out within a few percent either way.
+
+``--tol`` shows what the ``tol`` argument of ``efficiencies_mx`` trades: for
+spheres around each x it prints the number of terms, the time for the batch and
+the worst error against a converged sum, from a loose 1e-2 through Wiscombe's
+criterion to 1e-10.  The counts only shed or add a band of orders near x, so the
+relative speed changes most for small spheres and least for large ones.
 
 The file deliberately does not start with ``test_``: it used to exist as a
 ``test_jit_speed.py``/``test_nojit_speed.py`` pair whose timing ran at import,
@@ -33,12 +63,14 @@ https://github.com/scottprahl/miepython/issues/28
 """
 
 import sys
+import tracemalloc
 from time import perf_counter, time
 
 import numpy as np
+from numba.core.runtime import _nrt_python, rtsys
 
 import miepython as mie
-from miepython import mie_jit, mie_nojit
+from miepython import _backend, mie_jit, mie_nojit, mie_vector
 
 # Number of particles
 N = 100_000
@@ -118,9 +150,234 @@ def compare():
         t_nb = _median(nb_func, repeats)
         print(f"{label:<14} pure python {t_py:.4f} s   numba {t_nb:.4f} s   speedup {t_py / t_nb:.1f}x")
 
+    # efficiencies_mx used to call single_sphere once per element from Python; the
+    # batch kernel runs that loop compiled, so this is the gain an array sweep sees
+    m_nb = mvals.astype(np.complex128)
+    out = np.empty((4, n))
+    mie_jit._efficiencies_batch_nb(m_nb[:2], xvals[:2], 0, True, 0.0, out[:, :2])
+    t_loop = _median(single_nb, 3)
+    t_batch = _median(lambda: mie_jit._efficiencies_batch_nb(m_nb, xvals, 0, True, 0.0, out), 3)
+    print(f"{'batch':<14} python loop {t_loop:.4f} s   kernel {t_batch:.4f} s   speedup {t_loop / t_batch:.1f}x")
+
+    # without numba the batch runs whole-array NumPy operations, one order at a time
+    t_scalar = _median(lambda: mie_nojit._efficiencies_batch_py(m_nb, xvals, 0, True, 0.0, out), 3)
+    t_vector = _median(lambda: mie_vector._efficiencies_batch_vec(m_nb, xvals, 0, True, 0.0, out), 3)
+    print(f"{'vector':<14} pure python {t_scalar:.4f} s   numpy {t_vector:.4f} s   speedup {t_scalar / t_vector:.1f}x")
+
+    # very many angles: the compiled loop over angles against blocked BLAS products
+    mu_many = np.linspace(-1.0, 1.0, 100_001)
+    a, b = mie_nojit._an_bn_py(m_ref, 500.0, 0)
+    t_loop = _median(lambda: mie_jit._S1_S2_from_ab_nb(a, b, mu_many, 0), 3)
+    t_dense = _median(lambda: mie_vector._S1_S2_from_ab_vec(a, b, mu_many, 0), 3)
+    print(f"{'dense S1_S2':<14} numba loop  {t_loop:.4f} s   blas  {t_dense:.4f} s   speedup {t_loop / t_dense:.1f}x")
+
+
+def scaling():
+    """Time the random-particle sweep on 1, 2, 4, ... threads up to numba's pool.
+
+    This is strong scaling: the workload stays at N particles while the thread
+    count grows, so ideal behaviour halves the time at every step.  Only the
+    numba backend has threads to spread over, so the JIT must be on.
+    """
+    if not mie.USE_JIT:
+        print("thread scaling needs the numba backend; run with MIEPYTHON_USE_JIT=1")
+        return
+
+    rng = np.random.default_rng(0)
+    refr = rng.uniform(1.0, 2.0, N)
+    refi = np.exp(rng.uniform(np.log(1e-4), np.log(1.0), N))
+    x = np.exp(rng.uniform(np.log(0.01), np.log(100), N))
+    m = refr - 1j * refi
+
+    max_threads = _backend.resolve_threads(0)
+    counts = [1]
+    while counts[-1] * 2 <= max_threads:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_threads:
+        counts.append(max_threads)
+
+    # compile both kernels before timing anything
+    for threads in (1, max_threads):
+        mie.efficiencies_mx(m[:64], x[:64], threads=threads)
+
+    t_one = None
+    for threads in counts:
+        elapsed = _median(lambda t=threads: mie.efficiencies_mx(m, x, threads=t))
+        t_one = t_one or elapsed
+        speedup = t_one / elapsed
+        print(f"{threads:>4} threads  {elapsed:.3f} s   speedup {speedup:5.2f}x   efficiency {speedup / threads:.0%}")
+
+
+def balance():
+    """Compare naive contiguous chunks with cost-balanced ones on a wide size range.
+
+    With x log-uniform over 0.01 to 1000 the per-sphere work spans five decades,
+    so splitting the array into equal contiguous pieces leaves every thread
+    waiting on whichever one drew the most large spheres.  Sorting the input
+    makes that worst case explicit.  Alongside the wall time this prints the
+    load imbalance each partition predicts -- the largest chunk cost over the
+    mean -- which is meaningful even on a machine with fewer cores than threads.
+    """
+    if not mie.USE_JIT:
+        print("chunk balancing needs the numba backend; run with MIEPYTHON_USE_JIT=1")
+        return
+
+    import numba  # pylint: disable=import-outside-toplevel
+
+    n = 20_000
+    rng = np.random.default_rng(1)
+    x = np.sort(np.exp(rng.uniform(np.log(0.01), np.log(1000.0), n)))
+    m = (1.5 - 1j * np.exp(rng.uniform(np.log(1e-4), np.log(0.1), n))).astype(np.complex128)
+    cost = x + 4.05 * x**0.33333 + 27.0
+
+    threads = _backend.resolve_threads(0)
+    naive_order = np.arange(n, dtype=np.int64)
+    naive_bounds = np.linspace(0, n, threads + 1).astype(np.int64)
+    balanced_order, balanced_bounds = _backend.partition_by_cost(x, threads)
+
+    out = np.empty((4, n))
+    numba.set_num_threads(threads)
+    mie.efficiencies_mx(m[:64], x[:64], threads=threads)  # compile before timing
+    for label, order, bounds in (
+        ("naive", naive_order, naive_bounds),
+        ("balanced", balanced_order, balanced_bounds),
+    ):
+        chunk_cost = [cost[order[bounds[c] : bounds[c + 1]]].sum() for c in range(threads)]
+        imbalance = max(chunk_cost) / np.mean(chunk_cost)
+        elapsed = _median(lambda o=order, b=bounds: mie_jit._efficiencies_parallel_nb(m, x, 0, True, 0.0, o, b, out))
+        print(f"{label:<9} {threads} threads  {elapsed:.3f} s   predicted imbalance {imbalance:.2f}")
+
+
+def parity():
+    """Time the mirrored-pair shortcut in both kernel sets against the per-angle loop.
+
+    Nudging one angle by far more than rounding breaks the symmetry the kernels
+    look for, so the second grid has the same angles and the same length but is
+    summed one angle at a time.
+    """
+    m_ref, x_ref = 1.5 - 0.01j, 500.0
+    symmetric = np.linspace(-1.0, 1.0, 2001)
+    broken = symmetric.copy()
+    broken[1] += 1e-9
+
+    a, b = mie_nojit._an_bn_py(m_ref, x_ref, 0)
+    mie_jit._S1_S2_from_ab_nb(a, b, symmetric[:3], 0)  # compile before timing
+    for label, kernel in (("pure python", mie_nojit._S1_S2_from_ab_py), ("numba", mie_jit._S1_S2_from_ab_nb)):
+        t_loop = _median(lambda k=kernel: k(a, b, broken, 0))
+        t_pairs = _median(lambda k=kernel: k(a, b, symmetric, 0))
+        print(
+            f"{label:<12} per angle {t_loop:.4f} s   mirrored pairs {t_pairs:.4f} s   speedup {t_loop / t_pairs:.1f}x"
+        )
+
+
+def _peak_bytes(func):
+    """Return the most memory NumPy held at once while func ran."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def memory():
+    """Compare the memory of summing stored coefficients with the streaming kernel.
+
+    tracemalloc sees NumPy's allocations, so the pure-python kernels show the
+    peak of each route; the streaming workspace is allocated before tracing
+    starts, as a sweep would.  numba allocates through its own runtime, whose
+    counters give the number of arrays a sweep makes.
+    """
+    m_ref = 1.5 - 0.001j
+    for x_ref in (1e3, 1e4, 3e4):
+        psi, D, _, _ = mie_nojit._workspace_py(mie_nojit._workspace_order_py(x_ref, 0))
+
+        def arrays(x=x_ref):
+            a, b = mie_nojit._an_bn_py(m_ref, x, 0)
+            mie_nojit._efficiencies_from_ab_py(m_ref, x, a, b)
+
+        def streaming(x=x_ref, psi=psi, D=D):
+            mie_nojit._efficiencies_streaming_py(m_ref, x, 0, psi, D)
+
+        peak_arrays = _peak_bytes(arrays) / 2**20
+        peak_stream = _peak_bytes(streaming) / 2**20
+        workspace = (psi.nbytes + D.nbytes) / 2**20
+        print(
+            f"x={x_ref:<8.0e} peak with arrays {peak_arrays:6.2f} MiB   "
+            f"streaming {peak_stream:6.2f} MiB   reused workspace {workspace:5.2f} MiB"
+        )
+
+    # one sphere at a time from Python: fresh buffers against a kept workspace
+    ws = _backend.MieWorkspace()
+    sizes = np.linspace(5.0, 50.0, 200)
+    t_fresh = _median(lambda: [mie_nojit._single_sphere_py(m_ref, x_i, 0, True) for x_i in sizes])
+    t_kept = _median(lambda: [mie_nojit._single_sphere_ws_py(m_ref, x_i, 0, True, *ws.reserve(x_i)) for x_i in sizes])
+    print(f"pure python single_sphere  fresh buffers {t_fresh:.3f} s   MieWorkspace {t_kept:.3f} s")
+
+    # the numba sweep: count the arrays the runtime hands out
+    _nrt_python.memsys_enable_stats()  # pylint: disable=c-extension-no-member
+    rng = np.random.default_rng(0)
+    n = 500
+    x = np.exp(rng.uniform(np.log(1e2), np.log(1e5), n))
+    m = np.full(n, m_ref, dtype=np.complex128)
+    out = np.empty((4, n))
+    mie_jit._efficiencies_batch_nb(m[:2], x[:2], 0, True, 0.0, out[:, :2])
+    a, b = mie_jit._an_bn_nb(m[0], x[0], 0)
+    mie_jit._efficiencies_from_ab_nb(m[0], x[0], a, b)
+
+    def per_sphere():
+        for i in range(n):
+            a, b = mie_jit._an_bn_nb(m[i], x[i], 0)
+            mie_jit._efficiencies_from_ab_nb(m[i], x[i], a, b)
+
+    for label, func in (
+        ("arrays per sphere", per_sphere),
+        ("streaming batch", lambda: mie_jit._efficiencies_batch_nb(m, x, 0, True, 0.0, out)),
+    ):
+        before = rtsys.get_allocation_stats().alloc
+        elapsed = _median(func, 1)
+        allocs = rtsys.get_allocation_stats().alloc - before
+        print(f"{label:<18} {n} spheres, 1e2 < x < 1e5: {allocs:6d} allocations  {elapsed:.3f} s")
+
+
+def tolerance():
+    """Time efficiencies_mx with truncations from tol against the error they leave."""
+    rng = np.random.default_rng(0)
+    n = 2000
+    tolerances = (1e-2, 1e-4, None, 1e-8, 1e-10)
+    mie.efficiencies_mx(np.full(2, 1.5 - 0.01j), np.ones(2), tol=1e-3)  # compile before timing
+    print("JIT is %s" % ("enabled" if mie.USE_JIT else "not enabled"))
+    print(f"{'x':>6} {'tol':>8} {'terms':>6} {'time':>9} {'speed':>6} {'worst error':>12}")
+    for x_ref in (0.3, 3.0, 30.0, 300.0, 3000.0):
+        x = x_ref * rng.uniform(0.9, 1.1, n)
+        m = rng.uniform(1.2, 2.0, n) - 1j * np.where(rng.random(n) < 0.5, 0.0, rng.uniform(0.0, 0.1, n))
+        ref = np.array(mie.efficiencies_mx(m, x, tol=1e-15))
+        t_default = _median(lambda m=m, x=x: mie.efficiencies_mx(m, x))
+        for tol in tolerances:
+            elapsed = _median(lambda m=m, x=x, tol=tol: mie.efficiencies_mx(m, x, tol=tol))
+            q = np.array(mie.efficiencies_mx(m, x, tol=tol))
+            error = max(
+                np.max(np.abs(q[0] - ref[0]) / ref[0]),
+                np.max(np.abs(q[1] - ref[1]) / ref[1]),
+                np.max(np.abs(q[2] - ref[2]) / ref[0]),
+                np.max(np.abs(q[3] - ref[3])),
+            )
+            label = "wiscombe" if tol is None else f"{tol:.0e}"
+            terms = mie.core.series_terms(x_ref, tol)
+            print(f"{x_ref:6g} {label:>8} {terms:6d} {elapsed:8.4f}s {t_default / elapsed:5.2f}x {error:12.1e}")
+
 
 if __name__ == "__main__":
     if "--compare" in sys.argv:
         compare()
+    elif "--scaling" in sys.argv:
+        scaling()
+    elif "--balance" in sys.argv:
+        balance()
+    elif "--parity" in sys.argv:
+        parity()
+    elif "--tol" in sys.argv:
+        tolerance()
+    elif "--memory" in sys.argv:
+        memory()
     else:
         main()
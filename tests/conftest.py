@@ -38,13 +38,33 @@ KERNEL_NAMES = (
     "D_calc",
     "D_calc_down",
     "psi_downwards",
+    "psi_real_into",
     "an_bn",
+    "an_bn_into",
+    "batch_order",
     "cn_dn",
+    "efficiencies_batch",
+    "efficiencies_parallel",
     "pi_tau",
+    "pi_tau_table",
+    "mirrored_pairs",
+    "near_field",
+    "qext_qsca_from_ab",
     "S1_S2",
+    "S1_S2_batch",
+    "S1_S2_efficiencies",
+    "S1_S2_from_ab",
+    "efficiencies_from_ab",
+    "efficiencies_streaming",
     "single_sphere",
+    "single_sphere_from_ab",
+    "series_terms",
+    "single_sphere_tol_ws",
+    "single_sphere_ws",
     "small_sphere",
     "small_conducting_sphere",
+    "workspace",
+    "workspace_order",
 )
 
 # these already share a name across the two modules
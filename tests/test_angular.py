@@ -0,0 +1,90 @@
+"""Tests for ``miepython.AngularTable`` and the ``angles`` argument."""
+
+import numpy as np
+import pytest
+
+import miepython as mie
+
+MU = np.linspace(-1, 1, 13)
+
+
+class TestTable:
+    """Test building and extending the table."""
+
+    def test_rows_match_pi_tau(self):
+        """Row k holds pi_tau at mu[k], orders 1 to n_max."""
+        table = mie.AngularTable(MU, 8)
+        assert table.pi.shape == table.tau.shape == (len(MU), 8)
+        pi = np.zeros(8)
+        tau = np.zeros(8)
+        mie.pi_tau(MU[3], pi, tau)
+        np.testing.assert_array_equal(table.pi[3], pi)
+        np.testing.assert_array_equal(table.tau[3], tau)
+
+    def test_extend_only_grows(self):
+        """Asking for fewer orders keeps the longer table."""
+        table = mie.AngularTable(MU, 20)
+        table.extend(5)
+        assert table.n_max == 20
+        table.extend(30)
+        assert table.n_max == 30
+        assert repr(table) == "AngularTable(13 angles, n_max=30)"
+
+    def test_scalar_angle(self):
+        """A single angle still makes a one-row table."""
+        assert mie.AngularTable(0.5, 3).pi.shape == (1, 3)
+
+    def test_angles_are_frozen(self):
+        """The grid cannot be changed under the tabulated values."""
+        table = mie.AngularTable(MU, 3)
+        with pytest.raises(ValueError):
+            table.mu[0] = 0.0
+
+    def test_bad_arguments(self):
+        """A table needs a flat grid and at least one order."""
+        with pytest.raises(ValueError):
+            mie.AngularTable(np.ones((2, 2)), 3)
+        with pytest.raises(ValueError):
+            mie.AngularTable(MU, 0)
+
+
+class TestAnglesArgument:
+    """Test the functions that accept a table in place of mu."""
+
+    @pytest.mark.parametrize("norm", ["albedo", "qsca", "wiscombe"])
+    def test_S1_S2(self, norm):
+        """The same amplitudes as from mu, up to the order of summation."""
+        table = mie.AngularTable(MU, 4)
+        s1, s2 = mie.S1_S2(1.5 - 0.01j, 30.0, angles=table, norm=norm)
+        e1, e2 = mie.S1_S2(1.5 - 0.01j, 30.0, MU, norm=norm)
+        np.testing.assert_allclose(s1, e1, rtol=1e-12)
+        np.testing.assert_allclose(s2, e2, rtol=1e-12)
+        assert table.n_max == mie.core.wiscombe_terms(30.0)
+
+    def test_many_spheres(self):
+        """A population reuses the table the same way."""
+        table = mie.AngularTable(MU, 4)
+        m = np.array([1.5, 1.33 - 0.1j])
+        x = np.array([2.0, 0.0])
+        S1, _ = mie.S1_S2(m, x, angles=table, norm="wiscombe")
+        np.testing.assert_allclose(S1[0], mie.S1_S2(1.5, 2.0, MU, norm="wiscombe")[0], rtol=1e-12)
+        np.testing.assert_array_equal(S1[1], 0)
+
+    def test_intensities_and_phase_matrix(self):
+        """Every function built on S1_S2 passes the table through."""
+        table = mie.AngularTable(MU, 30)
+        m, x = 1.5 - 0.1j, 5.0
+        for func in (mie.i_par, mie.i_per, mie.i_unpolarized):
+            np.testing.assert_allclose(func(m, x, angles=table), func(m, x, MU), rtol=1e-12)
+        np.testing.assert_allclose(mie.phase_matrix(m, x, angles=table), mie.phase_matrix(m, x, MU), rtol=1e-12)
+        ipar, iper = mie.intensities(m, 1.0, 0.5, angles=table)
+        np.testing.assert_allclose(ipar, mie.intensities(m, 1.0, 0.5, MU)[0], rtol=1e-12)
+        np.testing.assert_allclose(iper, mie.intensities(m, 1.0, 0.5, MU)[1], rtol=1e-12)
+
+    def test_mu_or_angles(self):
+        """The angles come one way or the other, never both and never neither."""
+        table = mie.AngularTable(MU, 3)
+        with pytest.raises(ValueError):
+            mie.S1_S2(1.5, 2.0, MU, angles=table)
+        with pytest.raises(TypeError):
+            mie.S1_S2(1.5, 2.0)
@@ -17,19 +17,38 @@ import numpy as np
 import pytest
 
 import miepython
-from miepython import mie_jit, mie_nojit
+from miepython import _backend, mie_jit, mie_nojit
 
 # (label, pure-python kernel, numba kernel).  The tolerances further down sit just
 # above the worst disagreement measured over the sweep, so real drift trips them.
 KERNEL_PAIRS = [
     ("D_calc", "_D_calc_py", "_D_calc_nb"),
+    ("batch_order", "_batch_order_py", "_batch_order_nb"),
     ("an_bn", "_an_bn_py", "_an_bn_nb"),
+    ("an_bn_into", "_an_bn_into_py", "_an_bn_into_nb"),
     ("cn_dn", "_cn_dn_py", "_cn_dn_nb"),
+    ("efficiencies_batch", "_efficiencies_batch_py", "_efficiencies_batch_nb"),
+    ("efficiencies_parallel", "_efficiencies_parallel_py", "_efficiencies_parallel_nb"),
     ("pi_tau", "_pi_tau_py", "_pi_tau_nb"),
+    ("pi_tau_table", "_pi_tau_table_py", "_pi_tau_table_nb"),
+    ("mirrored_pairs", "_mirrored_pairs_py", "_mirrored_pairs_nb"),
+    ("near_field", "_near_field_py", "_near_field_nb"),
+    ("qext_qsca_from_ab", "_qext_qsca_from_ab_py", "_qext_qsca_from_ab_nb"),
     ("S1_S2", "_S1_S2_py", "_S1_S2_nb"),
+    ("S1_S2_batch", "_S1_S2_batch_py", "_S1_S2_batch_nb"),
+    ("S1_S2_efficiencies", "_S1_S2_efficiencies_py", "_S1_S2_efficiencies_nb"),
+    ("S1_S2_from_ab", "_S1_S2_from_ab_py", "_S1_S2_from_ab_nb"),
+    ("efficiencies_from_ab", "_efficiencies_from_ab_py", "_efficiencies_from_ab_nb"),
+    ("efficiencies_streaming", "_efficiencies_streaming_py", "_efficiencies_streaming_nb"),
     ("single_sphere", "_single_sphere_py", "_single_sphere_nb"),
+    ("single_sphere_from_ab", "_single_sphere_from_ab_py", "_single_sphere_from_ab_nb"),
+    ("series_terms", "_series_terms_py", "_series_terms_nb"),
+    ("single_sphere_tol_ws", "_single_sphere_tol_ws_py", "_single_sphere_tol_ws_nb"),
+    ("single_sphere_ws", "_single_sphere_ws_py", "_single_sphere_ws_nb"),
     ("small_sphere", "_small_sphere_py", "_small_sphere_nb"),
     ("small_conducting_sphere", "_small_conducting_sphere_py", "_small_conducting_sphere_nb"),
+    ("workspace", "_workspace_py", "_workspace_nb"),
+    ("workspace_order", "_workspace_order_py", "_workspace_order_nb"),
 ]
 
 INDICES = [complex(0.75, 0.0), complex(1.05, 0.0), complex(1.33, -0.01), complex(1.5, -0.5), complex(2.5, 0.0)]
@@ -117,6 +136,19 @@ def test_pi_tau_agrees():
             np.testing.assert_allclose(nb_tau, py_tau, rtol=1e-13, atol=1e-15)
 
 
+def test_efficiencies_streaming_agrees():
+    """The streaming sums match across the two backends."""
+    worst = 0.0
+    for m in INDICES:
+        for x in SIZES:
+            psi, D, _, _ = mie_nojit._workspace_py(mie_nojit._workspace_order_py(x, 0))
+            py = mie_nojit._efficiencies_streaming_py(m, x, 0, psi, D)
+            psi, D, _, _ = mie_jit._workspace_nb(mie_jit._workspace_order_nb(x, 0))
+            nb = mie_jit._efficiencies_streaming_nb(m, x, 0, psi, D)
+            worst = max(worst, worst_relative(py, nb))
+    assert worst < 1e-11, worst
+
+
 def test_s1_s2_agrees():
     """The scattering amplitudes match across the two backends."""
     mu = np.linspace(-1.0, 1.0, 21)
@@ -129,6 +161,55 @@ def test_s1_s2_agrees():
     assert worst < 1e-11, worst
 
 
+def test_s1_s2_efficiencies_agrees():
+    """The fused amplitudes and efficiencies match across the two backends."""
+    mu = np.linspace(-1.0, 1.0, 21)
+    worst = 0.0
+    for m in INDICES:
+        for x in SIZES:
+            py = mie_nojit._S1_S2_efficiencies_py(m, x, mu, 0)
+            nb = mie_jit._S1_S2_efficiencies_nb(m, x, mu, 0)
+            worst = max(worst, *(worst_relative(want, got) for want, got in zip(py, nb)))
+    assert worst < 1e-11, worst
+
+
+def test_s1_s2_batch_agrees():
+    """The many-sphere amplitudes match across the two backends."""
+    mu = np.linspace(-1.0, 1.0, 21)
+    m = np.repeat(np.array(INDICES, dtype=np.complex128), len(SIZES))
+    x = np.tile(np.array(SIZES), len(INDICES))
+    pi, tau = mie_nojit._pi_tau_table_py(mu, 80)
+    results = []
+    for kernel in (mie_nojit._S1_S2_batch_py, mie_jit._S1_S2_batch_nb):
+        S1 = np.empty((len(x), len(mu)), dtype=np.complex128)
+        S2 = np.empty_like(S1)
+        q = np.empty((4, len(x)))
+        kernel(m, x, pi, tau, 0, 0.0, S1, S2, q)
+        results.append((S1, S2, q))
+    worst = max(worst_relative(want, got) for want, got in zip(*results))
+    assert worst < 1e-11, worst
+
+
+def test_near_field_agrees():
+    """The near-field sums match across the two backends, on both sides of the surface."""
+    rng = np.random.default_rng(7)
+    r = np.concatenate([[0.0, 1e-4], rng.uniform(0.0, 3.0, 40)])
+    theta = np.concatenate([[0.0, np.pi], rng.uniform(0.0, np.pi, 40)])
+    phi = rng.uniform(-np.pi, np.pi, r.size)
+    coefficients = rng.normal(size=(4, 12)) + 1j * rng.normal(size=(4, 12))
+    worst = 0.0
+    for k, inside in ((2 * np.pi * (1.5 + 0.1j), True), (2 * np.pi + 0j, False)):
+        points = (r, theta, phi) if inside else (r + 1.0, theta, phi)
+        results = []
+        for kernel in (mie_nojit._near_field_py, mie_jit._near_field_nb):
+            E = np.empty((3, r.size), dtype=np.complex128)
+            H = np.empty_like(E)
+            kernel(*coefficients, k, *points, inside, E, H)
+            results.append((E, H))
+        worst = max(worst, *(worst_relative(want, got) for want, got in zip(*results)))
+    assert worst < 1e-12, worst
+
+
 def test_single_sphere_agrees():
     """The efficiencies match across the two backends."""
     worst = {}
@@ -147,6 +228,50 @@ def test_single_sphere_agrees():
     assert worst["g"] < 1e-11, worst
 
 
+def test_efficiencies_batch_agrees():
+    """The batch kernels match across the two backends, and match single_sphere."""
+    m = np.array([complex(m_one) for m_one in INDICES for _ in SIZES])
+    x = np.array([float(x_one) for _ in INDICES for x_one in SIZES])
+    for n_pole, e_field in ((0, True), (1, True), (2, False)):
+        py_out = np.empty((4, len(x)))
+        nb_out = np.empty((4, len(x)))
+        mie_nojit._efficiencies_batch_py(m, x, n_pole, e_field, 0.0, py_out)
+        mie_jit._efficiencies_batch_nb(m, x, n_pole, e_field, 0.0, nb_out)
+        np.testing.assert_allclose(nb_out, py_out, rtol=1e-10, atol=1e-14)
+        for i, x_i in enumerate(x):
+            np.testing.assert_array_equal(nb_out[:, i], mie_jit._single_sphere_nb(m[i], x_i, n_pole, e_field))
+
+
+def test_tolerance_batch_agrees():
+    """A series sized from a tolerance matches across the two backends."""
+    m = np.array([complex(m_one) for m_one in INDICES for _ in SIZES])
+    x = np.array([float(x_one) for _ in INDICES for x_one in SIZES])
+    for tol in (1e-2, 1e-10):
+        assert mie_nojit._series_terms_py(62.0, tol) == mie_jit._series_terms_nb(62.0, tol)
+        py_out = np.empty((4, len(x)))
+        nb_out = np.empty((4, len(x)))
+        mie_nojit._efficiencies_batch_py(m, x, 0, True, tol, py_out)
+        mie_jit._efficiencies_batch_nb(m, x, 0, True, tol, nb_out)
+        np.testing.assert_allclose(nb_out, py_out, rtol=1e-10, atol=1e-14)
+
+
+def test_efficiencies_parallel_matches_the_serial_batch():
+    """Spreading the spheres over threads must not change a single bit."""
+    rng = np.random.default_rng(3)
+    m = rng.uniform(1.1, 2.0, 300) - 1j * rng.uniform(0.0, 0.2, 300)
+    x = np.exp(rng.uniform(np.log(0.01), np.log(60.0), 300))
+    serial = np.empty((4, len(x)))
+    mie_jit._efficiencies_batch_nb(m, x, 0, True, 0.0, serial)
+    order, bounds = _backend.partition_by_cost(x, 3)
+    for kernel in (mie_jit._efficiencies_parallel_nb, mie_nojit._efficiencies_parallel_py):
+        threaded = np.empty((4, len(x)))
+        kernel(m, x, 0, True, 0.0, order, bounds, threaded)
+        np.testing.assert_allclose(threaded, serial, rtol=1e-10, atol=1e-14)
+    threaded = np.empty((4, len(x)))
+    mie_jit._efficiencies_parallel_nb(m, x, 0, True, 0.0, order, bounds, threaded)
+    np.testing.assert_array_equal(threaded, serial)
+
+
 def test_small_sphere_kernels_agree():
     """The small-sphere shortcuts match across the two backends."""
     for m in INDICES:
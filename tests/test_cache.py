@@ -0,0 +1,208 @@
+"""Tests for the opt-in cache of Mie coefficients.
+
+The cache is process-wide state, so every test that turns it on goes through the
+``cache`` fixture, which turns it off again however the test ends.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import numpy as np
+import pytest
+
+import miepython as mie
+from miepython import _backend
+from miepython.field import eh_near
+
+
+@pytest.fixture
+def cache():
+    """Turn the cache on for one test and return a function reporting on it."""
+    mie.enable_coefficient_cache()
+    yield mie.coefficient_cache_info
+    mie.disable_coefficient_cache()
+
+
+class TestSwitch:
+    """Test turning the cache on and off."""
+
+    def test_off_by_default(self):
+        """Nothing is kept unless asked for."""
+        assert mie.coefficient_cache_info() is None
+        assert _backend.get_coefficient_cache() is None
+
+    def test_disable_forgets(self, cache):
+        """Turning the cache off drops it; turning it on again starts empty."""
+        mie.coefficients(1.5, 3.0)
+        assert cache().entries == 1
+        mie.disable_coefficient_cache()
+        assert mie.coefficient_cache_info() is None
+        mie.enable_coefficient_cache()
+        assert cache().entries == 0
+
+    @pytest.mark.parametrize("kwargs", [{"max_bytes": -1}, {"x_tol": -1e-6}, {"m_tol": -1e-6}])
+    def test_rejects_negative_settings(self, kwargs):
+        """Budgets and tolerances cannot be negative."""
+        with pytest.raises(ValueError):
+            mie.enable_coefficient_cache(**kwargs)
+        assert mie.coefficient_cache_info() is None
+
+
+class TestLookups:
+    """Test that cached coefficients are the ones computed afresh."""
+
+    def test_hit_returns_the_same_coefficients(self, cache):
+        """The second call is a hit and gives identical arrays."""
+        expected = mie.coefficients(1.5 - 0.01j, 12.0, internal=True)
+        mie.enable_coefficient_cache()
+        first = mie.coefficients(1.5 - 0.01j, 12.0, internal=True)
+        second = mie.coefficients(1.5 - 0.01j, 12.0, internal=True)
+        np.testing.assert_array_equal(first, expected)
+        np.testing.assert_array_equal(second, expected)
+        info = cache()
+        assert (info.hits, info.misses, info.entries) == (2, 2, 2)
+
+    def test_returned_arrays_are_copies(self, cache):
+        """Changing a result must not change what the cache holds."""
+        a, _ = mie.coefficients(1.5, 3.0)
+        a[:] = 0
+        a, _ = mie.coefficients(1.5, 3.0)
+        assert cache().hits == 1
+        assert np.all(a != 0)
+
+    def test_conjugate_index_shares_an_entry(self, cache):
+        """n+ik is treated as n-ik, so both spellings share one entry."""
+        expected = mie.coefficients(1.5 - 0.1j, 2.0)
+        mie.enable_coefficient_cache()
+        mie.coefficients(1.5 - 0.1j, 2.0)
+        np.testing.assert_array_equal(mie.coefficients(1.5 + 0.1j, 2.0), expected)
+        assert cache().hits == 1
+
+    def test_n_pole_is_part_of_the_key(self, cache):
+        """A fixed number of terms is a different series."""
+        mie.coefficients(1.5, 3.0)
+        mie.coefficients(1.5, 3.0, n_pole=2)
+        assert cache().misses == 2
+
+    def test_array_input(self, cache):
+        """Each sphere of an array is looked up on its own."""
+        m = np.array([1.5, 1.5, 1.33 - 0.01j])
+        x = np.array([2.0, 2.0, 5.0])
+        expected = mie.coefficients(m, x, n_pole=3)
+        mie.enable_coefficient_cache()
+        np.testing.assert_array_equal(mie.coefficients(m, x, n_pole=3), expected)
+        info = cache()
+        assert (info.hits, info.misses) == (1, 2)
+
+
+class TestTolerance:
+    """Test the rounding of m and x into keys."""
+
+    def test_near_duplicates_hit(self, cache):
+        """Spheres closer than the tolerance share the rounded sphere's entry."""
+        mie.enable_coefficient_cache(x_tol=1e-6, m_tol=1e-6)
+        rounded = mie.coefficients(1.5 - 0.01j, 10.0)
+        nearby = mie.coefficients(1.5 + 2e-7 - 0.01j, 10.0 + 3e-7)
+        np.testing.assert_array_equal(nearby, rounded)
+        assert cache().hits == 1
+
+    def test_rounded_sphere_is_computed(self, cache):
+        """The first caller's exact values do not leak into the entry."""
+        mie.enable_coefficient_cache(x_tol=0.5)
+        a, _ = mie.coefficients(1.5, 3.2)
+        mie.disable_coefficient_cache()
+        expected, _ = mie.coefficients(1.5, 3.0)
+        np.testing.assert_array_equal(a, expected)
+        mie.enable_coefficient_cache()
+        assert cache().entries == 0
+
+    def test_exact_keys_by_default(self, cache):
+        """Without a tolerance the last bit counts."""
+        mie.coefficients(1.5, 10.0)
+        mie.coefficients(1.5, np.nextafter(10.0, 11.0))
+        assert cache().misses == 2
+
+
+class TestEviction:
+    """Test the byte budget."""
+
+    def test_least_recently_used_goes_first(self, cache):
+        """A recent hit protects an entry from eviction."""
+        mie.coefficients(1.5, 10.0)
+        size = cache().nbytes
+        mie.enable_coefficient_cache(max_bytes=2 * size)
+        mie.coefficients(1.5, 10.0)
+        mie.coefficients(1.5, 10.1)
+        mie.coefficients(1.5, 10.0)
+        mie.coefficients(1.5, 10.2)
+        info = cache()
+        assert (info.entries, info.evictions) == (2, 1)
+        assert info.nbytes <= info.max_bytes
+        mie.coefficients(1.5, 10.0)
+        assert cache().hits == 2
+
+    def test_oversized_series_is_not_stored(self, cache):
+        """A series bigger than the whole budget is computed and passed through."""
+        mie.enable_coefficient_cache(max_bytes=100)
+        a, _ = mie.coefficients(1.5, 50.0)
+        assert len(a) > 10
+        info = cache()
+        assert (info.misses, info.entries, info.nbytes) == (1, 0, 0)
+
+    def test_replacing_an_entry_keeps_the_size_right(self):
+        """Two threads missing on one sphere store it once."""
+        store = _backend.CoefficientCache(10**6)
+        calls = []
+
+        def racing_an_bn(m, x, n_pole):
+            # another thread stores the same sphere while this one computes
+            if not calls:
+                calls.append(1)
+                store.lookup(racing_an_bn, m, x, n_pole)
+            return _backend.an_bn(m, x, n_pole)
+
+        store.lookup(racing_an_bn, 1.5, 3.0, 0)
+        info = store.info()
+        assert (info.misses, info.entries) == (2, 1)
+        a, b = _backend.an_bn(np.complex128(1.5), 3.0, 0)
+        assert info.nbytes == a.nbytes + b.nbytes
+        store.clear()
+        assert store.info() == _backend.CacheInfo(0, 0, 0, 0, 0, 10**6)
+
+
+class TestConsumers:
+    """Test the functions that read coefficients through the cache."""
+
+    @pytest.mark.parametrize("max_memory", [None, 10**6])
+    def test_S1_S2_is_unchanged(self, max_memory):
+        """Amplitudes from cached a_n and b_n match the fused kernel."""
+        mu = np.linspace(-1, 1, 21)
+        for m, x in [(1.5 - 0.01j, 5.0), (1.5, 0.01), (0.0, 3.0), (1.33, 0.0)]:
+            expected = mie.S1_S2(m, x, mu, norm="wiscombe")
+            mie.enable_coefficient_cache()
+            try:
+                actual = mie.S1_S2(m, x, mu, norm="wiscombe", max_memory=max_memory)
+            finally:
+                mie.disable_coefficient_cache()
+            for got, want in zip(actual, expected):
+                np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-300)
+
+    def test_repeated_S1_S2_hits(self, cache):
+        """The second call for a sphere finds its a_n and b_n."""
+        mu = np.linspace(-1, 1, 21)
+        first = mie.S1_S2(1.5 - 0.01j, 5.0, mu)
+        second = mie.S1_S2(1.5 - 0.01j, 5.0, mu)
+        assert (cache().hits, cache().misses) == (1, 1)
+        np.testing.assert_array_equal(first, second)
+
+    def test_repeated_fields_hit(self, cache):
+        """Each near-field evaluation of one droplet reuses its four series."""
+        lambda0, d_sphere, m_sphere = 0.5, 1.0, 1.33
+        eh_near(lambda0, d_sphere, m_sphere, 1.0, 0.8, np.pi / 3, 0.2)
+        second = eh_near(lambda0, d_sphere, m_sphere, 1.0, 0.3, np.pi / 4, 0.1)
+        info = cache()
+        assert (info.hits, info.misses) == (2, 2)
+        mie.disable_coefficient_cache()
+        expected = eh_near(lambda0, d_sphere, m_sphere, 1.0, 0.3, np.pi / 4, 0.1)
+        mie.enable_coefficient_cache()
+        for got, want in zip(second, expected):
+            np.testing.assert_array_equal(got, want)
@@ -0,0 +1,243 @@
+"""Tests for the averages over size distributions in ``miepython.distribution``."""
+
+# pylint: disable=protected-access
+
+import math
+
+import numpy as np
+import pytest
+
+import miepython as mie
+import miepython.distribution as md
+
+M = 1.5 - 0.01j
+LAMBDA0 = 0.5
+
+
+def moments(distribution, powers, tol=1e-10):
+    """Return the moments of the distribution's diameters, integrated as the module does."""
+    return md._integrate(
+        lambda d: np.column_stack([d**p for p in powers]), distribution, np.abs, tol, max_intervals=2000
+    )
+
+
+def brute_force(m, distribution, lambda0, t):
+    """Return the ensemble efficiencies by the trapezoidal rule over log-diameters t."""
+    d = np.exp(t)
+    weight = distribution.pdf(d) * d * np.pi * d**2 / 4
+    qext, qsca, qback, g = mie.efficiencies_mx(np.full(len(d), m), np.pi * d / lambda0, tol=1e-10)
+    area = np.trapezoid(weight, t)
+    csca = np.trapezoid(weight * qsca, t)
+    return (
+        np.trapezoid(weight * qext, t) / area,
+        csca / area,
+        np.trapezoid(weight * qback, t) / area,
+        np.trapezoid(weight * qsca * g, t) / csca,
+    )
+
+
+class TestQuadrature:
+    """Test the Gauss-Kronrod pair and the adaptive integration."""
+
+    def test_rules_are_exact_for_polynomials(self):
+        """Kronrod integrates degree 22 exactly and Gauss degree 13."""
+        for power in range(23):
+            exact = (1 - (-1) ** (power + 1)) / (power + 1)
+            assert np.sum(md.KRONROD_WEIGHTS * md.NODES**power) == pytest.approx(exact, abs=1e-14)
+            if power <= 13:
+                assert np.sum(md.GAUSS_WEIGHTS * md.NODES**power) == pytest.approx(exact, abs=1e-14)
+        assert np.sum(md.GAUSS_WEIGHTS * md.NODES**14) != pytest.approx(2 / 15, abs=1e-6)
+
+    @pytest.mark.parametrize(
+        "distribution",
+        [
+            md.LogNormal(1.0, 1.8),
+            md.Gamma(10.0, 0.1),
+            md.Gamma(1.0, 0.45),
+            md.Tabulated([1, 2, 4], [1, 3, 0]),
+            md.Histogram([1, 2, 3], [2, 5]),
+        ],
+    )
+    def test_distributions_are_normalized(self, distribution):
+        """Every density integrates to one, tails included."""
+        assert moments(distribution, [0])[0] == pytest.approx(1, rel=1e-10)
+
+    def test_lognormal_moments(self):
+        """The mean diameter of a log-normal is d_median exp(s**2/2)."""
+        s = math.log(1.8)
+        assert moments(md.LogNormal(2.0, 1.8), [1])[0] == pytest.approx(2.0 * math.exp(s**2 / 2), rel=1e-10)
+
+    def test_gamma_effective_diameter_and_variance(self):
+        """d_eff and v_eff come back from the moments of the density."""
+        m2, m3, m4 = moments(md.Gamma(10.0, 0.1), [2, 3, 4])
+        d_eff = m3 / m2
+        assert d_eff == pytest.approx(10.0, rel=1e-10)
+        assert (m4 - 2 * d_eff * m3 + d_eff**2 * m2) / (d_eff**2 * m2) == pytest.approx(0.1, rel=1e-8)
+
+    def test_tabulated_and_histogram(self):
+        """A flat table and a single bin describe the same spheres."""
+        flat = md.efficiencies(M, md.Tabulated([1.0, 2.0], [3.0, 3.0]), LAMBDA0)
+        binned = md.efficiencies(M, md.Histogram([1.0, 2.0], [7]), LAMBDA0)
+        np.testing.assert_allclose(flat, binned, rtol=1e-6)
+
+    def test_interval_budget(self):
+        """An integral that cannot be finished is an error, not a poor answer."""
+        with pytest.raises(RuntimeError, match="max_intervals"):
+            md.efficiencies(M, md.LogNormal(1.0, 2.0), LAMBDA0, max_intervals=10)
+
+
+class TestEfficiencies:
+    """Test the ensemble efficiencies against direct sums over the spheres."""
+
+    def test_against_brute_force(self):
+        """Adaptive quadrature agrees with a fine trapezoidal sum."""
+        distribution = md.LogNormal(1.0, 1.6)
+        s = math.log(1.6)
+        t = np.linspace(-8 * s, 10 * s, 200001)
+        expected = brute_force(1.33 - 0.001j, distribution, LAMBDA0, t)
+        actual = md.efficiencies(1.33 - 0.001j, distribution, LAMBDA0)
+        np.testing.assert_allclose(actual, expected, rtol=2e-6)
+
+    def test_narrow_distribution_is_one_sphere(self):
+        """A very narrow distribution has the efficiencies of its median sphere."""
+        actual = md.efficiencies(M, md.LogNormal(0.5, 1.00001), LAMBDA0)
+        np.testing.assert_allclose(actual, mie.efficiencies(M, 0.5, LAMBDA0), rtol=1e-6)
+
+    def test_cross_sections(self):
+        """The cross sections are the efficiencies times the mean area."""
+        distribution = md.LogNormal(0.5, 1.5)
+        area = np.pi / 4 * 0.5**2 * math.exp(2 * math.log(1.5) ** 2)
+        qext, qsca, qback, g = md.efficiencies(M, distribution, LAMBDA0)
+        cext, csca, cback, g_c = md.cross_sections(M, distribution, LAMBDA0)
+        np.testing.assert_allclose([cext, csca, cback], np.array([qext, qsca, qback]) * area, rtol=1e-6)
+        assert g_c == g
+
+    def test_matched_index(self):
+        """Spheres that match their surroundings do nothing to the light."""
+        assert md.efficiencies(1.33, md.Gamma(1.0, 0.2), LAMBDA0, n_env=1.33) == (0.0, 0.0, 0.0, 0.0)
+        assert md.cross_sections(1.33, md.Gamma(1.0, 0.2), LAMBDA0, n_env=1.33) == (0.0, 0.0, 0.0, 0.0)
+
+    def test_environment(self):
+        """Spheres in water are spheres of index m/n_env at wavelength lambda0/n_env."""
+        distribution = md.Gamma(1.0, 0.2)
+        in_water = md.efficiencies(M, distribution, LAMBDA0, n_env=1.33)
+        scaled = md.efficiencies(M / 1.33, distribution, LAMBDA0 / 1.33)
+        np.testing.assert_allclose(in_water, scaled, rtol=1e-12)
+
+    def test_tolerance(self):
+        """A looser tolerance is cheaper and still met."""
+        distribution = md.LogNormal(1.0, 1.6)
+        exact = md.efficiencies(1.33 - 0.001j, distribution, LAMBDA0, tol=1e-8)
+        loose = md.efficiencies(1.33 - 0.001j, distribution, LAMBDA0, tol=1e-3)
+        np.testing.assert_allclose(loose, exact, rtol=1e-3)
+        for tol in (0, 1, -1e-3):
+            with pytest.raises(ValueError, match="tol"):
+                md.efficiencies(1.33, distribution, LAMBDA0, tol=tol)
+
+
+class TestPhaseMatrix:
+    """Test the ensemble phase matrix."""
+
+    def test_integral_is_the_albedo(self):
+        """With norm='albedo' the phase function integrates to the ensemble albedo."""
+        distribution = md.LogNormal(0.5, 1.5)
+        mu = np.linspace(-1, 1, 4001)
+        qext, qsca, _, g = md.efficiencies(M, distribution, LAMBDA0)
+        p11 = md.phase_matrix(M, distribution, LAMBDA0, mu)[0, 0]
+        assert 2 * np.pi * np.trapezoid(p11, mu) == pytest.approx(qsca / qext, rel=1e-5)
+        assert 2 * np.pi * np.trapezoid(p11 * mu, mu) / (qsca / qext) == pytest.approx(g, rel=1e-5)
+
+    def test_narrow_distribution_is_one_sphere(self):
+        """Every element of a very narrow distribution's matrix is that of its median sphere."""
+        mu = np.array([-1, -0.3, 0.5, 1])
+        for norm in ("albedo", "one", "4pi", "qsca", "qext", "bohren", "wiscombe"):
+            actual = md.phase_matrix(M, md.LogNormal(0.5, 1.00001), LAMBDA0, mu, norm=norm)
+            expected = mie.phase_matrix(M, np.pi, mu, norm=norm)
+            np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-12)
+
+    def test_mean_of_unnormalized_matrices(self):
+        """Unnormalized, the matrix of a histogram is the mean over its bins."""
+        histogram = md.Histogram([0.2, 0.4, 0.6], [1, 3])
+        mu = np.linspace(-1, 1, 5)
+        actual = md.phase_matrix(M, histogram, LAMBDA0, mu, norm="wiscombe", tol=1e-8)
+        expected = 0
+        for low, high, fraction in [(0.2, 0.4, 0.25), (0.4, 0.6, 0.75)]:
+            d = np.linspace(low, high, 2001)
+            matrices = mie.phase_matrix(M, np.pi * d / LAMBDA0, mu, norm="wiscombe")
+            expected = expected + fraction * np.trapezoid(matrices, d, axis=0) / (high - low)
+        np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-12)
+
+    def test_one_solve_per_sphere(self, monkeypatch):
+        """The efficiencies come from the same solve as the amplitudes, not a second one."""
+        mu = np.linspace(-1, 1, 5)
+        expected = md.phase_matrix(M, md.Gamma(0.5, 0.2), LAMBDA0, mu)
+
+        def second_solve(*_args, **_kwargs):
+            raise AssertionError("the spheres were solved again")
+
+        monkeypatch.setattr(md.core, "efficiencies_mx", second_solve)
+        monkeypatch.setattr(md.core, "S1_S2", second_solve)
+        np.testing.assert_array_equal(md.phase_matrix(M, md.Gamma(0.5, 0.2), LAMBDA0, mu), expected)
+
+    def test_conjugate_index(self):
+        """An index with a positive imaginary part is the same absorbing sphere."""
+        mu = np.linspace(-1, 1, 5)
+        np.testing.assert_array_equal(
+            md.phase_matrix(np.conj(M), md.Gamma(0.5, 0.2), LAMBDA0, mu),
+            md.phase_matrix(M, md.Gamma(0.5, 0.2), LAMBDA0, mu),
+        )
+
+    def test_scalar_angle(self):
+        """A single angle gives a 4x4 matrix."""
+        assert md.phase_matrix(M, md.Gamma(0.5, 0.2), LAMBDA0, 0.3).shape == (4, 4)
+
+
+class TestValidation:
+    """Test the checks on the distributions."""
+
+    @pytest.mark.parametrize(
+        "make",
+        [
+            lambda: md.LogNormal(0.0, 1.5),
+            lambda: md.LogNormal(1.0, 1.0),
+            lambda: md.Gamma(-1.0, 0.1),
+            lambda: md.Gamma(1.0, 0.5),
+            lambda: md.Tabulated([1.0], [1.0]),
+            lambda: md.Tabulated([0.0, 1.0], [1.0, 1.0]),
+            lambda: md.Tabulated([2.0, 1.0], [1.0, 1.0]),
+            lambda: md.Tabulated([1.0, 2.0], [1.0, -1.0]),
+            lambda: md.Tabulated([1.0, 2.0], [0.0, 0.0]),
+            lambda: md.Histogram([1.0, 2.0], [1.0, 1.0]),
+            lambda: md.Histogram([1.0, 2.0], [0.0]),
+        ],
+    )
+    def test_bad_parameters(self, make):
+        """Parameters that describe no distribution are refused."""
+        with pytest.raises(ValueError):
+            make()
+
+    def test_pdf_outside_the_table(self):
+        """Tables and histograms hold no spheres beyond their ends."""
+        for distribution in (md.Tabulated([1, 2], [1, 1]), md.Histogram([1, 2], [1])):
+            np.testing.assert_array_equal(distribution.pdf(np.array([0.5, 1.5, 3.0])), [0, 1, 0])
+
+    def test_base_class_is_abstract(self):
+        """A distribution must say what its density is and where it starts."""
+
+        class NoBreakpoints(md.SizeDistribution):  # pylint: disable=abstract-method
+            """A density with nowhere to start integrating."""
+
+            def pdf(self, d):
+                return np.ones_like(d)
+
+        with pytest.raises(TypeError, match="abstract"):
+            md.SizeDistribution()  # pylint: disable=abstract-class-instantiated
+        with pytest.raises(TypeError, match="breakpoints"):
+            NoBreakpoints()  # pylint: disable=abstract-class-instantiated
+
+    def test_repr(self):
+        """Each distribution names its parameters."""
+        assert repr(md.LogNormal(1, 2)) == "LogNormal(d_median=1, sigma_g=2)"
+        assert repr(md.Gamma(10, 0.1)) == "Gamma(d_eff=10, v_eff=0.1)"
+        assert repr(md.Tabulated([1, 2], [1, 1])) == "Tabulated(2 diameters from 1 to 2)"
+        assert repr(md.Histogram([1, 2, 3], [1, 1])) == "Histogram(2 bins from 1 to 3)"
@@ -20,14 +20,22 @@ import pytest
 # every module in the package; those without examples simply report zero
 MODULES = [
     "miepython.core",
+    "miepython.angular",
     "miepython.field",
     "miepython.util",
     "miepython.vsh",
     "miepython.bessel",
     "miepython.rayleigh",
     "miepython.monte_carlo",
+    "miepython.parallel",
+    "miepython.store",
+    "miepython.surrogate",
+    "miepython.distribution",
+    "miepython.spectral",
+    "miepython.materials",
     "miepython.mie_nojit",
     "miepython.mie_jit",
+    "miepython.mie_vector",
     "miepython._backend",
 ]
 
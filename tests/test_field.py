@@ -1,8 +1,13 @@
 """Test for electric field calculations."""
 
+import tracemalloc
+
 import pytest
 import numpy as np
+from scipy.optimize import brentq
+from scipy.special import spherical_jn
 import miepython as mie
+from miepython import field
 from miepython.field import (
     e_near,
     e_far,
@@ -11,10 +16,11 @@ from miepython.field import (
     e_near_cartesian,
     h_near_cartesian,
     eh_near_cartesian,
+    eh_near_grid,
     _coefficients_abcd,
 )
-from miepython.bessel import d_riccati_bessel_h1, spherical_h1
-from miepython.core import wiscombe_terms
+from miepython.bessel import d_riccati_bessel_h1, d_riccati_bessel_jn, spherical_h1
+from miepython.core import series_terms, wiscombe_terms
 from miepython.util import spherical_vector_to_cartesian
 
 
@@ -508,6 +514,34 @@ def test_cartesian_wrappers_take_a_term_count_too():
     np.testing.assert_array_equal(h_exp, h_def)
 
 
+def test_tolerance_sets_the_term_count():
+    """A tolerance picks the count series_terms gives, with the same extra orders."""
+    theta, phi = _angles()
+    r = np.full_like(theta, 1.4)
+    args = (FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV, r, theta, phi)
+    x = np.pi * FIELD_D * FIELD_N_ENV / FIELD_LAMBDA0
+    for tol in (1e-2, 1e-10):
+        explicit = series_terms(x, tol) + EXTRA_FIELD_ORDERS
+        np.testing.assert_array_equal(e_near(*args, tol=tol), e_near(*args, n_pole=explicit))
+        np.testing.assert_array_equal(h_near(*args, tol=tol), h_near(*args, n_pole=explicit))
+        np.testing.assert_array_equal(eh_near(*args, tol=tol)[1], h_near(*args, n_pole=explicit))
+
+    u = np.linspace(-1.3, 1.3, 5)
+    grid = (u, np.zeros_like(u), u[::-1])
+    cartesian = (FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV, *grid)
+    explicit = series_terms(x, 1e-3) + EXTRA_FIELD_ORDERS
+    np.testing.assert_array_equal(e_near_cartesian(*cartesian, tol=1e-3), e_near_cartesian(*cartesian, n_pole=explicit))
+    np.testing.assert_array_equal(h_near_cartesian(*cartesian, tol=1e-3), h_near_cartesian(*cartesian, n_pole=explicit))
+    e_tol, _ = eh_near_cartesian(*cartesian, tol=1e-3)
+    np.testing.assert_array_equal(e_tol, e_near_cartesian(*cartesian, n_pole=explicit))
+
+    far = e_far(FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV, 1e3, theta, phi, tol=1e-10)
+    np.testing.assert_allclose(far, e_far(FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV, 1e3, theta, phi), atol=1e-9)
+
+    with pytest.raises(ValueError, match="n_pole"):
+        e_near(*args, n_pole=4, tol=1e-3)
+
+
 class TestBatchedEvaluation:
     """Test the vectorized point evaluation against the guarantees it has to keep.
 
@@ -585,20 +619,254 @@ class TestBatchedEvaluation:
         np.testing.assert_array_equal(e_both, e_near(*self.ARGS, r, theta, phi))
         np.testing.assert_array_equal(h_both, h_near(*self.ARGS, r, theta, phi))
 
+    def test_shared_radii_and_angles_are_evaluated_once(self, monkeypatch):
+        """The NumPy path computes each distinct r and theta once and changes nothing by it."""
+        sizes = {}
+
+        def counting(name):
+            original = getattr(field, name)
+
+            def wrapper(n_terms, *args):
+                sizes.setdefault(name, []).append(args[-2].size if name == "_radial_functions" else args[0].size)
+                return original(n_terms, *args)
 
-def test_the_inlined_riccati_derivative_matches_bessel_py():
-    """``_vsh_components_base`` writes out ``d_riccati_bessel_h1`` to reuse cached values.
+            return wrapper
 
-    Evaluating h1 once over orders 0..n+1 and slicing is far cheaper than four
-    separate scipy calls, but it means the formula for xi'_n now lives in two places.
-    This is the test that stops them drifting: the inlined expression must agree with
-    ``bessel.d_riccati_bessel_h1`` exactly, not approximately.
+        r = np.array([0.2, 0.3, 0.2, 0.3, 0.2, 1.5, 1.5, 2.0])
+        theta = np.array([0.5, 0.5, 1.0, 1.0, 0.5, 0.5, 2.0, 0.5])
+        phi = np.linspace(-3.0, 3.0, r.size)
+        monkeypatch.setattr(field, "USE_JIT", False)
+        monkeypatch.setattr(field, "_angular_functions", counting("_angular_functions"))
+        monkeypatch.setattr(field, "_radial_functions", counting("_radial_functions"))
+        batch_e, batch_h = eh_near(*self.ARGS, r, theta, phi)
+        assert sizes == {"_angular_functions": [2, 2], "_radial_functions": [2, 2]}
+        for k in range(r.size):
+            one_e, one_h = eh_near(*self.ARGS, r[k], theta[k], phi[k])
+            np.testing.assert_array_equal(batch_e[:, k], one_e)
+            np.testing.assert_array_equal(batch_h[:, k], one_h)
+
+
+class TestCompiledKernel:
+    """Test the point-by-point ``near_field`` kernel against the NumPy evaluation.
+
+    With numba the fields come from ``near_field``, which runs the radial and
+    angular recurrences for one point at a time; without it they come from
+    ``(n_points, n_terms)`` tables filled by the same recurrences.  Both are
+    reachable on either backend, so they are compared directly.
     """
-    n_terms = 6
-    n_int = np.arange(1, n_terms + 1, dtype=np.int64)
-    rho = np.array([0.3, 1.0, 4.5, 12.0, 40.0])[:, np.newaxis]
 
-    h_all = spherical_h1(np.arange(0, n_terms + 2, dtype=np.int64), rho)
-    inlined = 0.5 * (rho * h_all[:, 0:n_terms] + h_all[:, 1 : n_terms + 1] - rho * h_all[:, 2 : n_terms + 2])
+    @staticmethod
+    def both(m_sphere, d_sphere, r, theta, phi, inside, want_e=True, want_h=True):
+        """Return the group fields from the vectorized and the compiled evaluation."""
+        abcd = _coefficients_abcd(FIELD_LAMBDA0, d_sphere, m_sphere, FIELD_N_ENV, 0)
+        nn = np.arange(1, abcd.shape[1] + 1)
+        scale = 1j**nn * (2 * nn + 1) / ((nn + 1) * nn)
+        args = (abcd, scale, FIELD_LAMBDA0, m_sphere, FIELD_N_ENV, r, theta, phi, inside, want_e, want_h)
+        return field._group_fields_vectorized(*args), field._group_fields_compiled(*args)
+
+    @pytest.mark.parametrize("m_sphere, d_sphere", [(1.5 - 0.05j, 1.0), (0.2 - 3j, 0.2), (1.33, 12.0), (0.75, 0.5)])
+    def test_agrees_with_the_vectorized_fields(self, m_sphere, d_sphere):
+        """Inside, outside, at the poles and on the surface the two evaluations agree."""
+        rng = np.random.default_rng(3)
+        theta = np.concatenate([[0.0, np.pi, np.pi / 2], rng.uniform(0, np.pi, 60)])
+        phi = rng.uniform(-np.pi, np.pi, theta.size)
+        radius = d_sphere / 2
+        # inside, including both sides of the switch to the power series at |m k r| = 0.01
+        near_centre = 0.01 / (2 * np.pi * abs(m_sphere) / FIELD_LAMBDA0) * np.array([0.5, 1 - 1e-6, 1 + 1e-6])
+        r_in = np.concatenate([[radius * (1 - 1e-9)], near_centre, rng.uniform(0, radius, theta.size - 4)])
+        r_out = np.concatenate([[radius], rng.uniform(radius, 4 * radius, theta.size - 1)])
+        for inside, r in ((True, r_in), (False, r_out)):
+            vectorized, compiled = self.both(m_sphere, d_sphere, r, theta, phi, inside)
+            for want, got in zip(vectorized, compiled):
+                np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-12 * np.max(np.abs(want)))
+
+    @pytest.mark.parametrize("n", [1, 2, 5, 10, 20])
+    def test_agrees_at_a_zero_of_j_n(self, n):
+        """Where j_n vanishes and D_n has its pole, order n alone still agrees."""
+        m_sphere = 1.33
+        rho = np.linspace(n + 0.5, 3 * n + 5, 2000)
+        j_n = spherical_jn(n, rho)
+        i = np.flatnonzero(np.sign(j_n[:-1]) != np.sign(j_n[1:]))[0]
+        zero = brentq(lambda t: spherical_jn(n, t), rho[i], rho[i + 1], xtol=1e-15)
+        abcd = np.zeros((4, n + 2), dtype=complex)
+        abcd[2:, n - 1] = 1  # c_n and d_n only
+        nn = np.arange(1, n + 3)
+        scale = 1j**nn * (2 * nn + 1) / ((nn + 1) * nn)
+        r = zero / (2 * np.pi * m_sphere / FIELD_LAMBDA0) * np.array([1 - 1e-6, 1, 1 + 1e-6])
+        theta = np.array([0.3, 0.8, 2.0])
+        phi = np.array([0.3, -1.0, 2.5])
+        args = (abcd, scale, FIELD_LAMBDA0, m_sphere, FIELD_N_ENV, r, theta, phi, True, True, True)
+        vectorized = field._group_fields_vectorized(*args)
+        compiled = field._group_fields_compiled(*args)
+        for want, got in zip(vectorized, compiled):
+            np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-12 * np.max(np.abs(want)))
+
+    def test_continuous_at_the_centre(self):
+        """The power series near the centre meets the recurrence it stands in for."""
+        k = 2 * np.pi * abs(FIELD_M) / FIELD_LAMBDA0
+        r = 0.01 / k * np.array([1 - 1e-7, 1 + 1e-7])
+        theta = np.full(2, 0.7)
+        phi = np.full(2, 0.4)
+        _, (e_field, h_field) = self.both(FIELD_M, FIELD_D, r, theta, phi, True)
+        np.testing.assert_allclose(e_field[:, 0], e_field[:, 1], rtol=1e-8)
+        np.testing.assert_allclose(h_field[:, 0], h_field[:, 1], rtol=1e-8)
+
+    def test_at_the_centre(self):
+        """At the centre only the dipole term survives, and the field is finite."""
+        theta = np.array([0.5, 1.0, 2.0])
+        _, (e_field, h_field) = self.both(FIELD_M, FIELD_D, np.zeros(3), theta, np.zeros(3), True)
+        assert np.all(np.isfinite(e_field)) and np.all(np.isfinite(h_field))
+        cartesian = np.array(spherical_vector_to_cartesian(*e_field, 0.0, theta, 0.0))
+        np.testing.assert_allclose(cartesian, cartesian[:, :1] * np.ones(3), rtol=1e-12, atol=1e-15)
+
+    def test_one_field_alone(self):
+        """Asking for one field leaves it exactly as it is when both are computed."""
+        r = np.array([0.2, 0.4])
+        theta = np.array([0.3, 2.0])
+        phi = np.array([1.0, -1.0])
+        _, (e_both, h_both) = self.both(FIELD_M, FIELD_D, r, theta, phi, True)
+        _, (e_only, h_none) = self.both(FIELD_M, FIELD_D, r, theta, phi, True, want_h=False)
+        _, (e_none, h_only) = self.both(FIELD_M, FIELD_D, r, theta, phi, True, want_e=False)
+        assert h_none is None and e_none is None
+        np.testing.assert_array_equal(e_only, e_both)
+        np.testing.assert_array_equal(h_only, h_both)
+
+
+class TestMemoryBudget:
+    """Test that ``max_memory`` bounds the working arrays without changing the fields."""
+
+    ARGS = (1.0, 1.0, 1.5 - 0.01j, 1.0)  # lambda0, d_sphere, m_sphere, n_env
+
+    @pytest.mark.parametrize("max_memory", [1, 20_000, 10**6])
+    def test_blocks_change_nothing(self, max_memory):
+        """One point per block, a few blocks or one block: the fields are identical."""
+        rng = np.random.default_rng(8)
+        x, y, z = (rng.uniform(-1.5, 1.5, size=(7, 9)) for _ in range(3))
+        whole = eh_near_cartesian(*self.ARGS, x, y, z)
+        blocked = eh_near_cartesian(*self.ARGS, x, y, z, max_memory=max_memory)
+        np.testing.assert_array_equal(blocked[0], whole[0])
+        np.testing.assert_array_equal(blocked[1], whole[1])
+
+    def test_every_entry_point_takes_it(self):
+        """The single-field and Cartesian calls pass the budget along."""
+        r = np.array([0.2, 0.7, 1.4])
+        theta = np.array([0.3, 1.2, 2.5])
+        phi = np.array([0.1, -0.8, 2.0])
+        np.testing.assert_array_equal(
+            e_near(*self.ARGS, r, theta, phi, max_memory=1), e_near(*self.ARGS, r, theta, phi)
+        )
+        np.testing.assert_array_equal(
+            h_near(*self.ARGS, r, theta, phi, max_memory=1), h_near(*self.ARGS, r, theta, phi)
+        )
+        np.testing.assert_array_equal(
+            e_near_cartesian(*self.ARGS, r, theta, phi, max_memory=1), e_near_cartesian(*self.ARGS, r, theta, phi)
+        )
+        np.testing.assert_array_equal(
+            h_near_cartesian(*self.ARGS, r, theta, phi, max_memory=1), h_near_cartesian(*self.ARGS, r, theta, phi)
+        )
+
+    def test_the_working_arrays_stay_within_the_budget(self):
+        """Beyond the output itself, little more than the budget is ever held."""
+        r = np.linspace(0.1, 3.0, 20_000)
+        theta = np.linspace(0.0, np.pi, r.size)
+        phi = np.zeros_like(r)
+        tracemalloc.start()
+        try:
+            eh_near(*self.ARGS, r, theta, phi, max_memory=2**20)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        output = 2 * 3 * 16 * r.size
+        assert peak < output + 4 * 2**20
+
+
+class TestGrid:
+    """Test ``eh_near_grid`` against the same points listed for ``eh_near``."""
+
+    @staticmethod
+    def listed(args, r, theta, phi, **kwargs):
+        """Return the fields of eh_near on the points of the grid."""
+        rr, tt, pp = np.meshgrid(r, theta, phi, indexing="ij")
+        return eh_near(*args, rr, tt, pp, **kwargs)
+
+    @pytest.mark.parametrize("m_sphere, d_sphere", [(1.5 - 0.05j, 1.0), (0.2 - 3j, 0.2), (1.33, 6.0)])
+    @pytest.mark.parametrize("include_incident", [True, False])
+    def test_agrees_with_the_listed_points(self, m_sphere, d_sphere, include_incident):
+        """Inside, outside, at the centre and at both poles the grid gives the same fields."""
+        args = (FIELD_LAMBDA0, d_sphere, m_sphere, FIELD_N_ENV)
+        r = np.linspace(0.0, 2 * d_sphere, 13)
+        theta = np.linspace(0.0, np.pi, 9)
+        phi = np.linspace(-np.pi, np.pi, 7)
+        grid = eh_near_grid(*args, r, theta, phi, include_incident=include_incident)
+        listed = self.listed(args, r, theta, phi, include_incident=include_incident)
+        for got, want in zip(grid, listed):
+            assert got.shape == (3, 13, 9, 7)
+            np.testing.assert_allclose(got, want, rtol=0, atol=1e-12 * np.max(np.abs(want)))
+
+    def test_term_count_and_coefficients(self):
+        """n_pole, tol and abcd choose the series as they do for eh_near."""
+        args = (FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV)
+        r, theta, phi = np.array([0.2, 0.9]), np.array([0.4, 2.0]), np.array([0.3])
+        abcd = _coefficients_abcd(*args, 3)
+        for kwargs in ({"n_pole": 3}, {"tol": 1e-3}, {"abcd": abcd}):
+            grid = eh_near_grid(*args, r, theta, phi, **kwargs)
+            listed = self.listed(args, r, theta, phi, **kwargs)
+            np.testing.assert_allclose(grid[0], listed[0], rtol=1e-12)
+            np.testing.assert_allclose(grid[1], listed[1], rtol=1e-12)
+
+    def test_scalars_become_axes_of_one(self):
+        """A single value of any coordinate still has its axis."""
+        e_grid, h_grid = eh_near_grid(FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV, 0.8, [0.1, 0.5, 1.0], 0.0)
+        assert e_grid.shape == h_grid.shape == (3, 1, 3, 1)
+
+    def test_coordinates_must_be_vectors(self):
+        """A meshgrid is not a grid specification."""
+        r = np.ones((2, 2))
+        with pytest.raises(ValueError, match="one-dimensional"):
+            eh_near_grid(FIELD_LAMBDA0, FIELD_D, FIELD_M, FIELD_N_ENV, r, [0.5], [0.0])
+
+
+class TestRadialFunctions:
+    """Test the recurrence tables of the NumPy path against ``miepython.bessel``.
+
+    The field path fills all orders of j_n or h_n in one pass of the recurrences in
+    ``mie_vector`` and forms (rho z_n)' from the neighbouring orders; ``bessel``
+    calls scipy order by order.  Near the centre the series takes over.
+    """
 
-    np.testing.assert_array_equal(inlined, d_riccati_bessel_h1(n_int, rho))
+    N_TERMS = 30
+
+    def test_outside_matches_scipy(self):
+        """h_n, h_n/rho and xi_n'/rho, from below rho to far above the highest order."""
+        r = np.array([0.05, 0.16, 0.7, 2.0, 6.4, 30.0])
+        rho = (2 * np.pi * r)[:, np.newaxis]
+        n = np.arange(1, self.N_TERMS + 1)
+        m_factor, n_factor1, n_factor2 = field._radial_functions(self.N_TERMS, 1.0, 1.0, r, False)
+        np.testing.assert_allclose(m_factor, spherical_h1(n, rho), rtol=1e-12)
+        np.testing.assert_allclose(n_factor1, spherical_h1(n, rho) / rho, rtol=1e-12)
+        np.testing.assert_allclose(n_factor2, d_riccati_bessel_h1(n, rho) / rho, rtol=1e-12)
+
+    @pytest.mark.parametrize("m_index", [1.5 + 0.1j, 0.2 + 3j, 1.33, 4.0 + 0.01j])
+    def test_inside_matches_scipy(self, m_index):
+        """j_n, j_n/rho and psi_n'/rho of a complex argument, past the series."""
+        r = np.array([0.002, 0.05, 0.3, 1.0, 3.3])
+        rho = (2 * np.pi * m_index * r)[:, np.newaxis]
+        n = np.arange(1, self.N_TERMS + 1)
+        m_factor, n_factor1, n_factor2 = field._radial_functions(self.N_TERMS, 1.0, m_index, r, True)
+        np.testing.assert_allclose(m_factor, spherical_jn(n, rho), rtol=1e-12)
+        np.testing.assert_allclose(n_factor1, spherical_jn(n, rho) / rho, rtol=1e-12)
+        np.testing.assert_allclose(n_factor2, d_riccati_bessel_jn(n, rho) / rho, rtol=1e-12)
+
+    def test_series_meets_the_recurrence(self):
+        """Either side of |rho| = 0.01 the two give the same factors."""
+        m_index = 1.5 + 0.1j
+        r = 0.01 / (2 * np.pi * abs(m_index)) * np.array([1 - 1e-14, 1 + 1e-14])
+        for factor in field._radial_functions(self.N_TERMS, 1.0, m_index, r, True):
+            np.testing.assert_allclose(factor[0, :6], factor[1, :6], rtol=1e-12)
+
+    def test_the_centre(self):
+        """At rho = 0 only the dipole survives in j_n/rho and (rho j_n)'/rho."""
+        m_factor, n_factor1, n_factor2 = field._radial_functions(4, 1.0, 1.5, np.zeros(1), True)
+        np.testing.assert_array_equal(m_factor, 0)
+        np.testing.assert_array_equal(n_factor1, [[1 / 3, 0, 0, 0]])
+        np.testing.assert_array_equal(n_factor2, [[2 / 3, 0, 0, 0]])
@@ -15,6 +15,11 @@ from reference import basic_abcd, bohren_ab, pyscatt_ab, pyscatt_cd, slow_cn_dn
 from miepython.util import cs
 
 
+def buffers(kernels, x, n_pole=0):
+    """Return a fresh workspace large enough for a sphere of size x."""
+    return kernels.workspace(kernels.workspace_order(x, n_pole))
+
+
 class TestElectricMagneticMultipoles:
     """Test the e_field selector between electric (a_n) and magnetic (b_n) multipoles."""
 
@@ -467,3 +472,266 @@ class TestKernelEdges:
         # only 3e-4 and the same 6e-8 of absorption is 2e-4 of it.
         qext, qsca = as_zero[0], as_zero[1]
         assert 0 <= qext - qsca < 1e-6
+
+
+class TestFusedAmplitudesAndEfficiencies:
+    """Test the kernel that sums S1, S2, qext and qsca from one set of a_n, b_n."""
+
+    @pytest.mark.parametrize(
+        "m, x",
+        [
+            (1.5 - 0.01j, 3.0),  # the series
+            (1.33, 62.0),
+            (0.75, 10.0),
+            (1.5, 0.01),  # small sphere closed form
+            (0.0 - 0.1j, 0.05),  # small conducting sphere
+            (1.0 + 0.0j, 2.0),  # matched to its surroundings
+            (0.0, 3.0),  # shorthand for a perfect conductor
+            (1.5, 0.0),  # no sphere at all
+        ],
+    )
+    def test_same_as_two_separate_calls(self, kernels, m, x):
+        """Every branch of single_sphere gives the efficiencies it gave before."""
+        mu = np.linspace(-1, 1, 9)
+        S1, S2, qext, qsca = kernels.S1_S2_efficiencies(complex(m), x, mu, 0)
+        expected_s1, expected_s2 = kernels.S1_S2(complex(m), x, mu, 0)
+        expected = kernels.single_sphere(complex(m), x, 0, True)
+        np.testing.assert_array_equal(S1, expected_s1)
+        np.testing.assert_array_equal(S2, expected_s2)
+        np.testing.assert_allclose([qext, qsca], expected[:2], rtol=1e-14, atol=1e-300)
+
+    def test_one_multipole_keeps_the_full_efficiencies(self, kernels):
+        """n_pole isolates one order of the amplitudes, not of their normalization."""
+        mu = np.linspace(-1, 1, 5)
+        S1, _, qext, qsca = kernels.S1_S2_efficiencies(1.5 - 0.1j, 4.0, mu, 2)
+        np.testing.assert_array_equal(S1, kernels.S1_S2(1.5 - 0.1j, 4.0, mu, 2)[0])
+        np.testing.assert_allclose([qext, qsca], kernels.single_sphere(1.5 - 0.1j, 4.0, 0, True)[:2], rtol=1e-14)
+
+    def test_single_sphere_unchanged_by_the_split(self, kernels):
+        """The efficiency sum moved into its own kernel without changing a bit."""
+        m, x = 1.5 - 0.01j, 20.0
+        a, b = kernels.an_bn(m, x, 0)
+        assert kernels.efficiencies_from_ab(m, x, a, b) == kernels.single_sphere(m, x, 0, True)
+
+
+class TestManySpheres:
+    """Test the kernels that share one table of pi_n and tau_n across spheres."""
+
+    def test_table_rows_match_pi_tau(self, kernels):
+        """Row k is what pi_tau fills in for mu[k]."""
+        mu = np.linspace(-1, 1, 7)
+        pi_table, tau_table = kernels.pi_tau_table(mu, 12)
+        assert pi_table.shape == tau_table.shape == (7, 12)
+        for k, mu_k in enumerate(mu):
+            pi = np.zeros(12)
+            tau = np.zeros(12)
+            kernels.pi_tau(mu_k, pi, tau)
+            np.testing.assert_array_equal(pi_table[k], pi)
+            np.testing.assert_array_equal(tau_table[k], tau)
+
+    @pytest.mark.parametrize("n_pole", [0, 1, 3])
+    def test_batch_matches_one_sphere_at_a_time(self, kernels, n_pole):
+        """Series of different lengths share the table without reaching past their own."""
+        m = np.array([1.5 - 0.01j, 1.33, 0.75, 1.5, 0.0, 1.0, 2.0 - 1j], dtype=np.complex128)
+        x = np.array([3.0, 62.0, 10.0, 0.05, 2.0, 5.0, 0.0])
+        mu = np.linspace(-1, 1, 9)
+        S1 = np.empty((len(x), len(mu)), dtype=np.complex128)
+        S2 = np.empty_like(S1)
+        q = np.empty((4, len(x)))
+        if n_pole > 2:  # the empty sphere has a two-term series
+            m, x, S1, S2, q = m[:-1], x[:-1], S1[:-1], S2[:-1], q[:, :-1]
+        pi, tau = kernels.pi_tau_table(mu, 80)
+        kernels.S1_S2_batch(m, x, pi, tau, n_pole, 0.0, S1, S2, q)
+        for i, (m_one, x_one) in enumerate(zip(m, x)):
+            s1, s2, qext, qsca = kernels.S1_S2_efficiencies(m_one, x_one, mu, n_pole)
+            np.testing.assert_allclose(S1[i], s1, rtol=1e-13, atol=1e-300)
+            np.testing.assert_allclose(S2[i], s2, rtol=1e-13, atol=1e-300)
+            assert (q[0, i], q[1, i]) == (qext, qsca)
+            np.testing.assert_allclose(q[:, i], kernels.single_sphere(m_one, x_one, 0, True), rtol=1e-12)
+
+    def test_batch_rejects_orders_past_a_series(self, kernels):
+        """Every sphere must have the order n_pole asks for."""
+        m = np.array([1.5, 1.5], dtype=np.complex128)
+        x = np.array([20.0, 0.5])
+        pi, tau = kernels.pi_tau_table(np.array([0.0, 1.0]), 40)
+        S1 = np.empty((2, 2), dtype=np.complex128)
+        with pytest.raises(ValueError):
+            kernels.S1_S2_batch(m, x, pi, tau, 10, 0.0, S1, S1.copy(), np.empty((4, 2)))
+
+    def test_batch_rejects_a_table_too_short(self, kernels):
+        """Summing a truncated series would be silently wrong."""
+        pi, tau = kernels.pi_tau_table(np.array([0.0, 1.0]), 10)
+        S1 = np.empty((1, 2), dtype=np.complex128)
+        with pytest.raises(ValueError):
+            kernels.S1_S2_batch(
+                np.array([1.5 + 0j]), np.array([20.0]), pi, tau, 0, 0.0, S1, S1.copy(), np.empty((4, 1))
+            )
+
+    def test_empty_batches(self, kernels):
+        """No spheres means no workspace to size and nothing to fill in."""
+        m = np.empty(0, dtype=np.complex128)
+        x = np.empty(0)
+        out = np.empty((4, 0))
+        kernels.efficiencies_batch(m, x, 0, True, 0.0, out)
+        kernels.efficiencies_parallel(m, x, 0, True, 0.0, np.empty(0, dtype=np.int64), np.zeros(2, dtype=np.int64), out)
+        pi, tau = kernels.pi_tau_table(np.array([0.0, 1.0]), 10)
+        S1 = np.empty((0, 2), dtype=np.complex128)
+        kernels.S1_S2_batch(m, x, pi, tau, 0, 0.0, S1, S1.copy(), np.empty((4, 0)))
+
+
+class TestMirroredAngles:
+    """Test the shortcut that sums mu and -mu from one evaluation of pi_n, tau_n."""
+
+    @pytest.mark.parametrize(
+        "mu, pairs",
+        [
+            (np.linspace(-1, 1, 101), 50),
+            (np.linspace(-1, 1, 100), 50),
+            (np.cos(np.linspace(0, np.pi, 181)), 90),
+            (np.linspace(-1, 1, 101) ** 3, 50),
+            (np.linspace(-1, 0.5, 101), 0),
+            (np.linspace(1, -1, 9), 4),
+            (np.array([0.3]), 0),
+            (np.array([], dtype=float), 0),
+        ],
+    )
+    def test_detects_symmetric_grids(self, kernels, mu, pairs):
+        """Grids that reverse into their own negatives, rounding and all."""
+        assert kernels.mirrored_pairs(mu) == pairs
+
+    def test_nearly_symmetric_is_not_symmetric(self, kernels):
+        """One angle off by more than rounding turns the shortcut off."""
+        mu = np.linspace(-1, 1, 11)
+        mu[2] += 1e-12
+        assert kernels.mirrored_pairs(mu) == 0
+
+    @pytest.mark.parametrize("n_pole", [-1, 30])
+    def test_orders_outside_the_series(self, kernels, n_pole):
+        """The mirrored grid does not skip the check on n_pole."""
+        a, b = kernels.an_bn(1.5 - 0.01j, 5.0, 0)
+        with pytest.raises(ValueError):
+            kernels.S1_S2_from_ab(a, b, np.linspace(-1, 1, 5), n_pole)
+
+    @pytest.mark.parametrize("n_pole", [0, 1, 2, 5])
+    def test_same_amplitudes_as_one_angle_at_a_time(self, kernels, n_pole):
+        """Sums and differences of the kept and flipped terms give both halves."""
+        m, x = 1.5 - 0.01j, 25.0
+        mu = np.linspace(-1, 1, 41)
+        a, b = kernels.an_bn(m, x, 0)
+        S1, S2 = kernels.S1_S2_from_ab(a, b, mu, n_pole)
+        for k, mu_k in enumerate(mu):
+            s1, s2 = kernels.S1_S2_from_ab(a, b, np.array([mu_k]), n_pole)
+            assert abs(S1[k] - s1[0]) <= 1e-12 * np.max(np.abs(S1))
+            assert abs(S2[k] - s2[0]) <= 1e-12 * np.max(np.abs(S2))
+
+
+class TestStreamingEfficiencies:
+    """Test the kernel that sums the series without keeping a_n and b_n."""
+
+    @pytest.mark.parametrize(
+        "m, x",
+        [
+            (1.5 - 0.01j, 3.0),
+            (1.33, 62.0),
+            (0.75, 10.0),
+            (2.0 - 1.0j, 20.0),
+            (1.5 + 0.1j, 5.0),  # n+ik is taken as n-ik
+            (0.0 - 2.0j, 4.0),  # the branch for a purely imaginary index
+            (1.0 - 10000j, 3.0),
+            (1.5 - 0.001j, 1500.0),
+        ],
+    )
+    def test_same_as_the_coefficient_arrays(self, kernels, m, x):
+        """Each a_n, b_n is the one an_bn would have stored."""
+        psi, D, _, _ = buffers(kernels, x)
+        a, b = kernels.an_bn(complex(m), x, 0)
+        expected = kernels.efficiencies_from_ab(complex(m), x, a, b)
+        actual = kernels.efficiencies_streaming(complex(m), x, 0, psi, D)
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_one_workspace_serves_smaller_spheres(self, kernels):
+        """Buffers sized for the largest sphere work for every smaller one."""
+        psi, D, _, _ = buffers(kernels, 100.0)
+        for x in (0.2, 3.0, 50.0, 100.0):
+            own = kernels.efficiencies_streaming(1.5 - 0.01j, x, 0, *buffers(kernels, x)[:2])
+            assert kernels.efficiencies_streaming(1.5 - 0.01j, x, 0, psi, D) == own
+
+    def test_short_workspace(self, kernels):
+        """Buffers for a smaller sphere are refused rather than overrun."""
+        psi, D, _, _ = buffers(kernels, 10.0)
+        big_psi, big_D, _, _ = buffers(kernels, 20.0)
+        with pytest.raises(ValueError, match="psi"):
+            kernels.efficiencies_streaming(1.5, 20.0, 0, psi, big_D)
+        with pytest.raises(ValueError, match="D workspace"):
+            kernels.efficiencies_streaming(1.5, 20.0, 0, big_psi, D)
+
+    @pytest.mark.parametrize("x,nstop", [(1e-3, 100), (0.5, 10), (40.0, 60)])
+    def test_real_psi_matches_psi_downwards(self, kernels, x, nstop):
+        """The real recurrence into a buffer is the complex one's real part."""
+        psi, _, _, _ = buffers(kernels, x, nstop)
+        kernels.psi_real_into(x, nstop, psi)
+        expected = kernels.psi_downwards(np.complex128(x), nstop).real
+        np.testing.assert_allclose(psi[: nstop + 1], expected, rtol=1e-12, atol=1e-300)
+
+
+class TestToleranceKernels:
+    """Test the kernels that size the series from an accuracy."""
+
+    def test_zero_tolerance_is_wiscombe(self, kernels):
+        """tol=0 is the default series, in both the count and the workspace."""
+        for x in (0.0, 0.3, 20.0, 500.0):
+            assert kernels.series_terms(x, 0.0) == int(x + 4.05 * x**0.33333 + 2.0)
+            assert kernels.batch_order(x, 0, 0.0) == kernels.workspace_order(x, 0)
+            assert kernels.batch_order(x, 3, 1e-12) == kernels.workspace_order(x, 3)
+        assert kernels.batch_order(20.0, 0, 1e-12) == kernels.series_terms(20.0, 1e-12)
+
+    def test_explicit_number_of_terms(self, kernels):
+        """The streaming sum through n_terms orders is the sum of that many a_n, b_n."""
+        m, x = complex(1.5, -0.01), 10.0
+        psi, D, _, _ = buffers(kernels, x, 40)
+        for n_terms in (5, 20, 40):
+            a, b = kernels.an_bn(m, x, n_terms)
+            expected = kernels.efficiencies_from_ab(m, x, a, b)
+            np.testing.assert_allclose(kernels.efficiencies_streaming(m, x, n_terms, psi, D), expected, rtol=1e-12)
+
+    @pytest.mark.parametrize("m, x", [(1.5, 0.05), (1.5 - 0.01j, 3.0), (0.0 - 2.0j, 4.0), (0.0, 5.0)])
+    def test_series_through_the_counted_orders(self, kernels, m, x):
+        """Every sphere with a series, small or not, is summed through series_terms orders."""
+        tol = 1e-9
+        psi, D, a, b = kernels.workspace(kernels.batch_order(x, 0, tol))
+        actual = kernels.single_sphere_tol_ws(complex(m), x, tol, psi, D, a, b)
+        m_series = 1 - 10000j if m == 0 else complex(m)
+        a, b = kernels.an_bn(m_series, x, kernels.series_terms(x, tol))
+        np.testing.assert_allclose(actual, kernels.efficiencies_from_ab(m_series, x, a, b), rtol=1e-12)
+
+    @pytest.mark.parametrize("m, x", [(1.5, 0.0), (1.0, 3.0), (0.0, 0.05), (0.0 - 3.0j, 0.02)])
+    def test_closed_forms_that_stay(self, kernels, m, x):
+        """No size, a matched index and small conducting spheres are not series."""
+        psi, D, a, b = buffers(kernels, 1.0)
+        actual = kernels.single_sphere_tol_ws(complex(m), x, 1e-9, psi, D, a, b)
+        assert actual == kernels.single_sphere(complex(m), x, 0, True)
+
+    def test_batches(self, kernels):
+        """The batch kernels apply the tolerance to every sphere and normalize by the same series."""
+        m = np.array([1.5 - 0.01j, 1.33, 1.5, 0.0, 1.0], dtype=np.complex128)
+        x = np.array([3.0, 62.0, 0.05, 0.05, 2.0])
+        tol = 1e-7
+        out = np.empty((4, len(x)))
+        kernels.efficiencies_batch(m, x, 0, True, tol, out)
+        psi, D, a, b = kernels.workspace(kernels.batch_order(62.0, 0, tol))
+        for i, x_i in enumerate(x):
+            np.testing.assert_array_equal(out[:, i], kernels.single_sphere_tol_ws(m[i], x_i, tol, psi, D, a, b))
+
+        order = np.arange(len(x), dtype=np.int64)
+        threaded = np.empty_like(out)
+        kernels.efficiencies_parallel(m, x, 0, True, tol, order, np.array([0, 2, 5], dtype=np.int64), threaded)
+        np.testing.assert_array_equal(threaded, out)
+
+        mu = np.linspace(-1, 1, 5)
+        pi, tau = kernels.pi_tau_table(mu, 100)
+        S1 = np.empty((len(x), len(mu)), dtype=np.complex128)
+        q = np.empty((4, len(x)))
+        kernels.S1_S2_batch(m, x, pi, tau, 0, tol, S1, S1.copy(), q)
+        np.testing.assert_allclose(q, out, rtol=1e-12)
+        a, b = kernels.an_bn(m[1], x[1], kernels.series_terms(x[1], tol))
+        np.testing.assert_allclose(S1[1], kernels.S1_S2_from_ab(a, b, mu, 0)[0], rtol=1e-12)
@@ -0,0 +1,314 @@
+"""Tests for the refractive indices of ``miepython.materials``."""
+
+# pylint: disable=protected-access,redefined-outer-name
+
+import builtins
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pytest
+
+import miepython as mie
+import miepython.materials as mm
+
+
+@pytest.fixture
+def water_copy(tmp_path, monkeypatch):
+    """Return a private copy of the water table, parsed afresh."""
+    monkeypatch.setattr(mm, "_tables", {})
+    path = tmp_path / "water.txt"
+    shutil.copy(os.path.join(mm.DATA_DIR, mm.MATERIALS["water"]), path)
+    return path
+
+
+class TestTables:
+    """Test that the bundled tables are read as published."""
+
+    def test_gold(self):
+        """Johnson and Christy's n and k come from two blocks at the same wavelengths."""
+        gold = mm.material("gold")
+        assert len(gold.wavelength) == 49
+        assert (gold.lambda_min, gold.lambda_max) == (0.1879, 1.937)
+        assert (gold.n[0], gold.k[0]) == (1.28, 1.188)
+        assert (gold.n[-1], gold.k[-1]) == (0.92, 13.78)
+
+    def test_water(self):
+        """Segelstein's table follows a citation and a heading."""
+        water = mm.material("water")
+        assert len(water.wavelength) == 1261
+        assert (water.lambda_min, water.lambda_max) == (1e-2, 1e7)
+        assert water(0.5).real == pytest.approx(1.339, abs=1e-3)
+        assert 0 < -water(0.5).imag < 1e-8
+
+    def test_parsed_once(self):
+        """The same table is not read twice in one process, and cannot be changed by accident."""
+        gold = mm.material("gold")
+        assert np.shares_memory(gold.wavelength, mm.material("gold").wavelength)
+        with pytest.raises(ValueError):
+            gold.n[0] = 2.0
+
+    def test_unknown_material(self):
+        """The error lists the tables there are."""
+        with pytest.raises(ValueError, match="gold, water"):
+            mm.material("unobtainium")
+
+    def test_three_columns(self, tmp_path):
+        """A single table of wavelength, n and k is read as well."""
+        path = tmp_path / "glass.txt"
+        path.write_text("wl\tn\tk\n0.4\t1.5\t0.01\n0.8\t1.4\t0.02\n", encoding="utf-8")
+        glass = mm.read_table(path)
+        assert glass.name == "glass"
+        assert glass(0.6) == pytest.approx(1.45 - 0.015j)
+
+    @pytest.mark.parametrize(
+        "text",
+        ["wl\tn\n0.4\t1.5\n0.8\t1.4\n", "wl\tn\n0.4\t1.5\n0.8\t1.4\nwl\tk\n0.4\t0.1\n0.9\t0.2\n", "no numbers\n"],
+    )
+    def test_unreadable(self, tmp_path, text):
+        """A table without k at every wavelength is refused."""
+        path = tmp_path / "bad.txt"
+        path.write_text(text, encoding="utf-8")
+        with pytest.raises(ValueError, match="neither"):
+            mm.read_table(path)
+
+
+class TestInterpolation:
+    """Test the index between the measured wavelengths."""
+
+    def test_at_the_measurements(self):
+        """At a measured wavelength the index is the measurement, with m = n - ik."""
+        gold = mm.material("gold")
+        np.testing.assert_array_equal(gold(gold.wavelength), gold.n - 1j * gold.k)
+
+    def test_shapes(self):
+        """The index has the shape of the wavelengths."""
+        gold = mm.material("gold")
+        assert gold(np.full((2, 3), 0.5)).shape == (2, 3)
+        assert np.shape(gold(0.5)) == ()
+
+    def test_outside_the_table(self):
+        """The index is never extrapolated."""
+        gold = mm.material("gold")
+        with pytest.raises(ValueError, match="gold"):
+            gold(np.array([0.5, 2.0]))
+
+    def test_feeds_efficiencies_and_spectrum(self):
+        """A material is an index for efficiencies and a function of wavelength for spectrum."""
+        gold = mm.material("gold")
+        spec = mie.spectrum(gold, 0.1, 0.4, 0.8)
+        lambda0 = spec.wavelength[::5]
+        expected = mie.efficiencies(gold(lambda0), 0.1, lambda0)
+        np.testing.assert_allclose(np.array(spec[1:5])[:, ::5], expected, rtol=1e-12)
+
+    @pytest.mark.parametrize(
+        "wavelength, n, k",
+        [
+            ([0.5], [1.5], [0.0]),
+            ([0.5, 0.4], [1.5, 1.5], [0, 0]),
+            ([0.4, 0.5], [1.5], [0, 0]),
+            ([0, 1], [1, 1], [0, 0]),
+        ],
+    )
+    def test_bad_tables(self, wavelength, n, k):
+        """Tables that cannot be interpolated are refused."""
+        with pytest.raises(ValueError):
+            mm.Material("bad", wavelength, n, k)
+
+    def test_repr(self):
+        """A material names its table and its range."""
+        assert repr(mm.material("gold")) == "Material(gold, 49 wavelengths from 0.1879 to 1.937)"
+
+
+class TestSidecar:
+    """Test the binary copy kept beside a table."""
+
+    def test_written_and_used(self, water_copy, monkeypatch):
+        """The second process reads the sidecar instead of the text."""
+        first = mm.read_table(water_copy, sidecar=True)
+        assert (water_copy.parent / "water.npy").exists()
+
+        monkeypatch.setattr(mm, "_tables", {})
+        monkeypatch.setattr(mm, "_parse", lambda path: pytest.fail("parsed %s again" % path))
+        second = mm.read_table(water_copy, sidecar=True)
+        np.testing.assert_array_equal(first.wavelength, second.wavelength)
+        np.testing.assert_array_equal(first.k, second.k)
+
+    def test_not_written_by_default(self, water_copy):
+        """Without asking, nothing is written beside the table."""
+        mm.read_table(water_copy)
+        assert os.listdir(water_copy.parent) == ["water.txt"]
+
+    def test_stale_sidecar(self, water_copy, monkeypatch):
+        """A sidecar older than its table is replaced."""
+        np.save(water_copy.parent / "water.npy", np.zeros((3, 2)))
+        os.utime(water_copy.parent / "water.npy", (0, 0))
+        water = mm.read_table(water_copy, sidecar=True)
+        assert len(water.wavelength) == 1261
+
+        monkeypatch.setattr(mm, "_tables", {})
+        assert len(mm.read_table(water_copy, sidecar=True).wavelength) == 1261
+
+    def test_unwritable_directory(self, water_copy, monkeypatch):
+        """A sidecar that cannot be written is not kept, and nothing is left behind."""
+
+        def refuse(src, dst):
+            raise PermissionError(dst)
+
+        monkeypatch.setattr(os, "replace", refuse)
+        water = mm.read_table(water_copy, sidecar=True)
+        assert len(water.wavelength) == 1261
+        assert os.listdir(water_copy.parent) == ["water.txt"]
+
+    def test_read_only_install(self, water_copy, monkeypatch):
+        """When the sidecar cannot even be opened, the table still loads and no file appears."""
+
+        def read_only(file, mode="r", encoding=None):
+            if "w" in mode:
+                raise PermissionError(file)
+            return builtins.open(file, mode, encoding=encoding)
+
+        monkeypatch.setattr(mm, "open", read_only, raising=False)
+        water = mm.read_table(water_copy, sidecar=True)
+        assert len(water.wavelength) == 1261
+        assert os.listdir(water_copy.parent) == ["water.txt"]
+
+
+# Malitson's fused silica, Daimon's water and a free-electron gold
+SILICA = mm.Sellmeier([0.6961663, 0.4079426, 0.8974794], [0.0684043**2, 0.1162414**2, 9.896161**2])
+WATER = mm.Sellmeier(
+    [5.666959820e-1, 1.731900098e-1, 2.095951857e-2, 1.125228406e-1],
+    [5.084151894e-3, 1.818488474e-2, 2.625439472e-2, 1.073842352e1],
+)
+GOLD = mm.DrudeLorentz(9.5, 8.95, 0.069)
+
+
+class TestFormulas:
+    """Test the dispersion formulas against published values and by hand."""
+
+    def test_silica(self):
+        """Fused silica has n = 1.4585 at the helium d line."""
+        assert SILICA(0.5876) == pytest.approx(1.4585, abs=1e-4)
+
+    def test_water_against_the_table(self):
+        """Daimon's formula and Segelstein's older compilation agree across the visible."""
+        lambda0 = np.linspace(0.4, 0.7, 7)
+        np.testing.assert_allclose(WATER(lambda0).real, mm.material("water")(lambda0).real, atol=1e-2)
+
+    def test_sellmeier_past_a_pole(self):
+        """Just short of a resonance n**2 < 0, and the index is imaginary rather than nan."""
+        sellmeier = mm.Sellmeier([1.0, 0.5], [0.01, 100.0])
+        lambda0 = np.array([0.0999, 0.09, 0.05, 9.9, 9.99])
+        n2 = 1 + lambda0**2 / (lambda0**2 - 0.01) + 0.5 * lambda0**2 / (lambda0**2 - 100.0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            m = sellmeier(lambda0)
+        assert np.all(np.isfinite(m))
+        assert np.all(n2[:2] < 0) and n2[2] > 0 and np.all(n2[3:] < 0)
+        np.testing.assert_allclose(m**2, n2, rtol=1e-12)
+        assert np.all(m.imag <= 0)
+        assert np.all(mie.efficiencies(m, 0.5, lambda0)[0] > 0)
+
+    def test_cauchy(self):
+        """Cauchy's formula is a polynomial in 1/lambda**2."""
+        cauchy = mm.Cauchy([1.5, 0.004, 1e-4], k=0.01)
+        assert cauchy(0.5) == pytest.approx(1.5 + 0.004 / 0.25 + 1e-4 / 0.0625 - 0.01j)
+
+    def test_drude(self):
+        """Below the plasma energy a metal's permittivity is negative, and it absorbs."""
+        drude = mm.DrudeLorentz(1.0, 9.0, 0.05)
+        energy = mm.HC / 0.8
+        eps = drude.permittivity(0.8)
+        assert eps == pytest.approx(1 - 81 / (energy**2 + 0.05j * energy))
+        assert eps.real < 0 < eps.imag
+        m = drude(0.8)
+        assert m == pytest.approx(np.conj(np.sqrt(eps)))
+        assert m.imag < 0 < m.real
+
+    def test_lorentz(self):
+        """A single oscillator adds its strength to the static permittivity."""
+        lorentz = mm.DrudeLorentz(2.0, 0.0, 0.0, [(1.5, 10.0, 0.1)])
+        assert lorentz.permittivity(1e5) == pytest.approx(3.5, rel=1e-6)
+        assert lorentz.permittivity(1e-5) == pytest.approx(2.0, rel=1e-6)
+
+    def test_gold_like_drude_lorentz(self):
+        """A Drude model of gold tracks Johnson and Christy in the red and near infrared."""
+        lambda0 = np.linspace(0.7, 1.2, 6)
+        np.testing.assert_allclose(GOLD(lambda0), mm.material("gold")(lambda0), rtol=0.15)
+
+    @pytest.mark.parametrize(
+        "make",
+        [
+            lambda: mm.Sellmeier([1.0, 2.0], [0.01]),
+            lambda: mm.Sellmeier([], []),
+            lambda: mm.Cauchy([]),
+            lambda: mm.DrudeLorentz(1.0, 9.0, -0.1),
+            lambda: mm.DrudeLorentz(1.0, 9.0, 0.1, [(1.0, -2.0, 0.1)]),
+            lambda: mm.DrudeLorentz(1.0, 9.0, 0.1, [(1.0, 2.0)]),
+        ],
+    )
+    def test_bad_parameters(self, make):
+        """Parameters that describe no formula are refused."""
+        with pytest.raises(ValueError):
+            make()
+
+    def test_repr(self):
+        """Each formula names its parameters."""
+        assert repr(mm.Cauchy([1.5, 0.004])) == "Cauchy(A=[1.5, 0.004], k=0)"
+        assert repr(mm.Sellmeier([1.0], [0.01], k=0.1)) == "Sellmeier(B=[1.0], C=[0.01], k=0.1)"
+        assert (
+            repr(mm.DrudeLorentz(1, 9, 0.05, [(1, 2, 3)]))
+            == "DrudeLorentz(eps_inf=1, E_p=9, gamma=0.05, 1 oscillators)"
+        )
+
+    def test_base_class_is_abstract(self):
+        """A dispersion must say what its index is."""
+
+        class NoIndex(mm.Dispersion):  # pylint: disable=abstract-method
+            """A material with no index."""
+
+        with pytest.raises(TypeError, match="abstract"):
+            mm.Dispersion()  # pylint: disable=abstract-class-instantiated
+        with pytest.raises(TypeError, match="index"):
+            NoIndex()  # pylint: disable=abstract-class-instantiated
+
+
+class TestAsIndex:
+    """Test dispersions in place of m and the reuse of a grid."""
+
+    def test_efficiencies(self):
+        """A dispersion is called at the wavelengths, in vacuum, of efficiencies."""
+        lambda0 = np.linspace(0.4, 0.8, 11)
+        expected = mie.efficiencies(WATER(lambda0), 1.0, lambda0, n_env=1.2)
+        np.testing.assert_array_equal(mie.efficiencies(WATER, 1.0, lambda0, n_env=1.2), expected)
+        assert mie.efficiencies(WATER, 1.0, 0.5) == mie.efficiencies(WATER(0.5), 1.0, 0.5)
+
+    def test_intensities(self):
+        """And at the wavelength of intensities."""
+        mu = np.linspace(-1, 1, 5)
+        expected = mie.intensities(GOLD(0.6), 0.1, 0.6, mu)
+        np.testing.assert_array_equal(mie.intensities(GOLD, 0.1, 0.6, mu), expected)
+
+    def test_same_grid_is_reused(self):
+        """An equal grid returns the earlier, read-only, result."""
+        cauchy = mm.Cauchy([1.5, 0.004])
+        first = cauchy(np.linspace(0.4, 0.8, 101))
+        assert cauchy(np.linspace(0.4, 0.8, 101)) is first
+        assert not first.flags.writeable
+        assert cauchy(np.linspace(0.4, 0.8, 102)) is not first
+
+    def test_changed_grid_is_not_reused(self):
+        """Changing the grid in place is noticed."""
+        cauchy = mm.Cauchy([1.5, 0.004])
+        lambda0 = np.linspace(0.4, 0.8, 101)
+        first = cauchy(lambda0)
+        lambda0[50] = 0.45
+        second = cauchy(lambda0)
+        assert second[50] == pytest.approx(cauchy(0.45))
+        assert second[50] != first[50]
+
+    def test_wavelengths_must_be_positive(self):
+        """A negative wavelength is a mistake, not a place to evaluate a formula."""
+        with pytest.raises(ValueError, match="positive"):
+            SILICA(np.array([0.5, -0.5]))
@@ -10,6 +10,8 @@ import numpy as np
 import pytest
 
 import miepython as mie
+from miepython import _backend
+from miepython.core import normalization_factor
 
 
 class TestNonAbsorbing:
@@ -444,6 +446,102 @@ class TestAngleScattering:
         ph = mie.i_unpolarized(m, x, mu)
         assert ph[1] == pytest.approx(0.1169791, abs=1e-5)
 
+    @pytest.mark.parametrize("norm", ["albedo", "one", "4pi", "qext"])
+    def test_normalized_by_the_efficiencies_of_the_same_sphere(self, norm):
+        """S1_S2 takes qext and qsca from its own pass; the values are unchanged."""
+        m, x = 1.5 - 0.1j, 4.0
+        mu = np.linspace(-1, 1, 7)
+        S1, S2 = mie.S1_S2(m, x, mu, norm=norm)
+        raw1, raw2 = mie.S1_S2(m, x, mu, norm="wiscombe")
+        factor = normalization_factor(m, x, norm)
+        np.testing.assert_allclose(S1, raw1 / factor, rtol=1e-14)
+        np.testing.assert_allclose(S2, raw2 / factor, rtol=1e-14)
+
+
+class TestManySpheres:
+    """Test S1_S2 and the functions built on it with arrays of m and x."""
+
+    M = np.array([1.5 - 0.01j, 1.33 + 0.1j, 0.0, 2.0 - 1.0j])
+    X = np.array([3.0, 40.0, 1.0, 0.5])
+    MU = np.linspace(-1, 1, 11)
+
+    @pytest.mark.parametrize("norm", ["albedo", "one", "4pi", "qext", "qsca", "bohren", "wiscombe"])
+    def test_rows_match_single_spheres(self, norm):
+        """Each row is the amplitude of one sphere, normalized on its own."""
+        S1, S2 = mie.S1_S2(self.M, self.X, self.MU, norm=norm)
+        assert S1.shape == S2.shape == (len(self.X), len(self.MU))
+        for i, (m, x) in enumerate(zip(self.M, self.X)):
+            s1, s2 = mie.S1_S2(m, x, self.MU, norm=norm)
+            np.testing.assert_allclose(S1[i], s1, rtol=1e-12)
+            np.testing.assert_allclose(S2[i], s2, rtol=1e-12)
+
+    def test_scalar_partner_is_broadcast(self):
+        """One index for many sizes, or one size for many indices."""
+        S1, _ = mie.S1_S2(1.5, self.X, self.MU)
+        np.testing.assert_allclose(S1[1], mie.S1_S2(1.5, self.X[1], self.MU)[0], rtol=1e-12)
+        S1, _ = mie.S1_S2(self.M, 2.0, 0.5)
+        assert S1.shape == (len(self.M), 1)
+
+    def test_multipole(self):
+        """n_pole picks the same order out of every sphere."""
+        S1, _ = mie.S1_S2(self.M, self.X, self.MU, norm="wiscombe", n_pole=2)
+        np.testing.assert_allclose(S1[0], mie.S1_S2(self.M[0], self.X[0], self.MU, norm="wiscombe", n_pole=2)[0])
+
+    def test_intensities_and_phase_matrix(self):
+        """The functions built on S1_S2 gain a leading sphere axis."""
+        unpolarized = mie.i_unpolarized(self.M, self.X, self.MU)
+        np.testing.assert_allclose(unpolarized[3], mie.i_unpolarized(self.M[3], self.X[3], self.MU), rtol=1e-12)
+
+        phase = mie.phase_matrix(self.M, self.X, self.MU)
+        assert phase.shape == (len(self.X), 4, 4, len(self.MU))
+        np.testing.assert_allclose(phase[1], mie.phase_matrix(self.M[1], self.X[1], self.MU), rtol=1e-12)
+        assert mie.phase_matrix(self.M, self.X, 0.5).shape == (len(self.X), 4, 4)
+
+    def test_mismatched_lengths(self):
+        """Two arrays must pair up, as for efficiencies_mx."""
+        with pytest.raises(RuntimeError):
+            mie.S1_S2(self.M, self.X[:2], self.MU)
+
+    def test_two_dimensional_input(self):
+        """Only flat populations are accepted."""
+        with pytest.raises(ValueError):
+            mie.S1_S2(1.5, np.ones((2, 2)), self.MU)
+
+
+class TestDenseAmplitudes:
+    """Test S1_S2 with a memory budget for its tables of pi_n and tau_n."""
+
+    MU = np.linspace(-1, 1, 801)
+
+    @pytest.mark.parametrize("n_pole", [0, 3])
+    def test_one_sphere(self, n_pole):
+        """The budget changes how the sum is done, not what it gives."""
+        s1, s2 = mie.S1_S2(1.5 - 0.01j, 60.0, self.MU, n_pole=n_pole, max_memory=20_000)
+        e1, e2 = mie.S1_S2(1.5 - 0.01j, 60.0, self.MU, n_pole=n_pole)
+        np.testing.assert_allclose(s1, e1, rtol=1e-11, atol=1e-13 * np.max(np.abs(e1)))
+        np.testing.assert_allclose(s2, e2, rtol=1e-11, atol=1e-13 * np.max(np.abs(e2)))
+
+    def test_closed_form_normalization(self):
+        """Small spheres still take qext and qsca from the closed forms."""
+        s1, _ = mie.S1_S2(1.5, 0.01, self.MU, max_memory=1)
+        np.testing.assert_allclose(s1, mie.S1_S2(1.5, 0.01, self.MU)[0], rtol=1e-12)
+
+    def test_many_spheres_in_blocks_of_angles(self):
+        """Arrays of spheres work through the angles a block at a time."""
+        m = np.array([1.5 - 0.01j, 1.33, 2.0 - 1j])
+        x = np.array([3.0, 40.0, 0.5])
+        S1, S2 = mie.S1_S2(m, x, self.MU, max_memory=16 * 50 * 100)
+        E1, E2 = mie.S1_S2(m, x, self.MU)
+        np.testing.assert_array_equal(S1, E1)
+        np.testing.assert_array_equal(S2, E2)
+
+    def test_no_angles(self):
+        """An empty grid gives empty rows rather than an endless loop."""
+        S1, _ = mie.S1_S2(np.array([1.5, 1.33]), 2.0, [], max_memory=100)
+        assert S1.shape == (2, 0)
+        S1, _ = mie.S1_S2(np.array([1.5, 1.33]), 2.0, [])
+        assert S1.shape == (2, 0)
+
 
 class TestMiePhaseMatrix:
     """Test cases for mie phase matrix behavior."""
@@ -917,6 +1015,32 @@ class TestArrayDispatchAndErrors:
             for got, expected in zip((qext[i], qsca[i], qback[i], g[i]), want):
                 assert got == pytest.approx(expected, rel=1e-13)
 
+    def test_efficiencies_mx_batch_matches_scalar_calls_exactly(self):
+        """The compiled batch runs the same kernel, so nothing may differ at all.
+
+        Without numba the batch is vectorized across spheres instead, which sums
+        the series in another order, so there it only has to agree to rounding --
+        and the isolated multipoles of the smallest spheres, some 1e-29, amplify
+        that rounding to a few parts in 1e10.
+        """
+        rng = np.random.default_rng(7)
+        m_arr = rng.uniform(1.1, 2.0, 50) - 1j * rng.uniform(0.0, 0.1, 50)
+        x_arr = np.exp(rng.uniform(np.log(0.01), np.log(80.0), 50))
+        for n_pole, e_field in ((0, True), (2, True), (2, False)):
+            batch = mie.efficiencies_mx(m_arr, x_arr, n_pole=n_pole, e_field=e_field)
+            for i, x_one in enumerate(x_arr):
+                single = mie.efficiencies_mx(m_arr[i], x_one, n_pole=n_pole, e_field=e_field)
+                if mie.USE_JIT:
+                    np.testing.assert_array_equal(np.array(batch)[:, i], single)
+                else:
+                    np.testing.assert_allclose(np.array(batch)[:, i], single, rtol=1e-8)
+
+    def test_efficiencies_mx_accepts_lists_and_integer_sizes(self):
+        """Plain sequences are converted to the arrays the batch kernel expects."""
+        by_list = mie.efficiencies_mx([1.5 - 0.01j, 1.5 + 0.01j], [2, 3])
+        by_array = mie.efficiencies_mx(np.array([1.5 - 0.01j, 1.5 - 0.01j]), np.array([2.0, 3.0]))
+        np.testing.assert_array_equal(by_list, by_array)
+
     def test_unknown_normalization_is_rejected(self):
         """A misspelt normalization must list the valid choices."""
         with pytest.raises(ValueError, match="normalization must be one of"):
@@ -965,3 +1089,171 @@ class TestArrayDispatchAndErrors:
         assert mie.phase_matrix(1.5, 2.0, 0.5).shape == (4, 4)
         assert mie.phase_matrix(1.5, 2.0, np.array([0.5])).shape == (4, 4)
         assert mie.phase_matrix(1.5, 2.0, np.linspace(-1, 1, 5)).shape == (4, 4, 5)
+
+
+class TestThreads:
+    """Test the thread-count control on the batch efficiencies."""
+
+    @pytest.mark.parametrize("threads", [None, 0, 1, 2, 64])
+    def test_thread_count_does_not_change_the_answer(self, threads):
+        """Every sphere is independent, so the results are identical however they are dealt out."""
+        rng = np.random.default_rng(11)
+        m_arr = rng.uniform(1.1, 2.0, 200) - 1j * rng.uniform(0.0, 0.1, 200)
+        x_arr = np.exp(rng.uniform(np.log(0.01), np.log(60.0), 200))
+        serial = mie.efficiencies_mx(m_arr, x_arr, threads=1)
+        np.testing.assert_array_equal(mie.efficiencies_mx(m_arr, x_arr, threads=threads), serial)
+
+    def test_efficiencies_passes_the_thread_count_through(self):
+        """The physical-units wrapper accepts the same argument."""
+        d = np.array([0.5, 1.0, 2.0])
+        np.testing.assert_array_equal(mie.efficiencies(1.5, d, 0.6, threads=2), mie.efficiencies(1.5, d, 0.6))
+
+    def test_environment_variable_sets_the_default(self, monkeypatch):
+        """MIEPYTHON_NUM_THREADS is read when threads is omitted."""
+        monkeypatch.setenv("MIEPYTHON_NUM_THREADS", "0")
+        assert _backend.resolve_threads() == _backend.resolve_threads(0)
+        monkeypatch.delenv("MIEPYTHON_NUM_THREADS")
+        assert _backend.resolve_threads() == 1
+
+    def test_never_more_than_the_backend_has(self):
+        """A request beyond numba's pool is clamped rather than raising."""
+        assert 1 <= _backend.resolve_threads(10_000) == _backend.resolve_threads(0)
+        if not mie.USE_JIT:
+            assert _backend.resolve_threads(0) == 1
+
+    @pytest.mark.parametrize("threads", [-1, "many", 1.5j])
+    def test_bad_thread_counts_are_rejected(self, threads):
+        """A negative or non-numeric count is a mistake worth reporting."""
+        with pytest.raises(ValueError, match="thread count"):
+            mie.efficiencies_mx(np.array([1.5, 1.4]), np.array([1.0, 2.0]), threads=threads)
+
+    def test_bad_environment_variable_is_rejected(self, monkeypatch):
+        """And so is a misspelt environment variable."""
+        monkeypatch.setenv("MIEPYTHON_NUM_THREADS", "four")
+        with pytest.raises(ValueError, match="thread count"):
+            mie.efficiencies_mx(np.array([1.5, 1.4]), np.array([1.0, 2.0]))
+
+    @pytest.mark.parametrize("n_chunks", [1, 2, 3, 8])
+    def test_partition_covers_every_sphere_once(self, n_chunks):
+        """The chunks are a permutation, so every result lands in its own slot."""
+        x_arr = np.exp(np.random.default_rng(5).uniform(np.log(0.01), np.log(1000.0), 1001))
+        order, bounds = _backend.partition_by_cost(x_arr, n_chunks)
+        assert len(bounds) == n_chunks + 1
+        assert bounds[0] == 0 and bounds[-1] == len(x_arr)
+        np.testing.assert_array_equal(np.sort(order), np.arange(len(x_arr)))
+
+    def test_partition_balances_a_log_uniform_population(self):
+        """Naive contiguous chunks can be wildly uneven; dealt chunks are not."""
+        x_arr = np.sort(np.exp(np.random.default_rng(5).uniform(np.log(0.01), np.log(1000.0), 4000)))
+        order, bounds = _backend.partition_by_cost(x_arr, 4)
+        loads = [np.sum(x_arr[order[bounds[c] : bounds[c + 1]]] + 27.0) for c in range(4)]
+        naive = [np.sum(chunk + 27.0) for chunk in np.array_split(x_arr, 4)]
+        assert max(naive) / min(naive) > 10
+        assert max(loads) / min(loads) < 1.01
+
+    def test_partition_handles_fewer_spheres_than_chunks(self):
+        """Some chunks are simply empty."""
+        order, bounds = _backend.partition_by_cost(np.array([3.0, 1.0]), 4)
+        np.testing.assert_array_equal(np.sort(order), [0, 1])
+        np.testing.assert_array_equal(np.diff(bounds) >= 0, True)
+
+
+class TestTolerance:
+    """Test series truncated to an accuracy rather than by Wiscombe's criterion."""
+
+    def reference(self, m, x):
+        """Return the efficiencies summed well past convergence."""
+        return np.array(mie.efficiencies_mx(m, x, tol=1e-15))
+
+    def test_terms_follow_the_tolerance(self):
+        """A loose tolerance needs fewer terms than Wiscombe's criterion and a tight one more."""
+        for x in (0.5, 10.0, 300.0):
+            assert mie.core.series_terms(x) == mie.core.wiscombe_terms(x)
+            assert mie.core.series_terms(x, 1e-2) <= mie.core.wiscombe_terms(x) < mie.core.series_terms(x, 1e-10)
+        assert mie.core.series_terms(10.0, 1e-2) < mie.core.wiscombe_terms(10.0)
+
+    @pytest.mark.parametrize("tol", [1e-2, 1e-4, 1e-6, 1e-8])
+    def test_efficiencies_meet_the_tolerance(self, tol):
+        """qext, qsca and qback relative to qext, and g, are all within tol of the converged sum."""
+        rng = np.random.default_rng(16)
+        m = rng.uniform(1.1, 3.0, 60) - 1j * np.where(rng.random(60) < 0.5, 0.0, rng.uniform(0, 0.5, 60))
+        x = np.exp(rng.uniform(np.log(0.05), np.log(400.0), 60))
+        ref = self.reference(m, x)
+        qext, qsca, qback, g = mie.efficiencies_mx(m, x, tol=tol)
+        assert np.all(np.abs(qext - ref[0]) < tol * ref[0])
+        assert np.all(np.abs(qsca - ref[1]) < tol * ref[1])
+        assert np.all(np.abs(qback - ref[2]) < tol * ref[0])
+        assert np.all(np.abs(g - ref[3]) < tol)
+
+    def test_small_spheres_are_summed(self):
+        """The small-sphere formula is good to about 1e-6 at its limit; the series is exact."""
+        m, x = 1.33 - 1e-6j, 0.074
+        exact = mie.efficiencies_mx(m, x, n_pole=0)
+        summed = mie.efficiencies_mx(m, x, tol=1e-12)
+        a, b = mie.an_bn(np.complex128(m), x, mie.core.series_terms(x, 1e-12))
+        x2 = x * x
+        n = np.arange(1, len(a) + 1)
+        assert summed[0] == pytest.approx(2 * np.sum((2 * n + 1) * (a + b).real) / x2, rel=1e-14)
+        assert abs(exact[0] - summed[0]) > 1e-7 * summed[0]
+
+    @pytest.mark.parametrize("m, x", [(0.0, 0.05), (0.0, 3.0), (1.0, 2.0), (1.5, 0.0)])
+    def test_special_spheres(self, m, x):
+        """No size, a matched index and conducting spheres keep their usual branches."""
+        np.testing.assert_allclose(mie.efficiencies_mx(m, x, tol=1e-8), mie.efficiencies_mx(m, x), atol=1e-8)
+
+    def test_scalars_and_arrays_agree(self):
+        """One sphere gives floats, and the same numbers as in an array."""
+        m = np.array([1.5 - 0.01j, 1.33])
+        x = np.array([3.0, 40.0])
+        one = mie.efficiencies_mx(m[1], x[1], tol=1e-3)
+        assert isinstance(one[0], float)
+        np.testing.assert_allclose(one, np.array(mie.efficiencies_mx(m, x, tol=1e-3))[:, 1], rtol=1e-13)
+
+    def test_threads_do_not_change_the_answer(self):
+        """A tolerance is honoured on every thread."""
+        rng = np.random.default_rng(2)
+        m = rng.uniform(1.1, 2.0, 100) - 0.01j
+        x = np.exp(rng.uniform(np.log(0.01), np.log(60.0), 100))
+        serial = mie.efficiencies_mx(m, x, tol=1e-3, threads=1)
+        np.testing.assert_array_equal(mie.efficiencies_mx(m, x, tol=1e-3, threads=4), serial)
+
+    @pytest.mark.parametrize("tol", [1e-2, 1e-6, 1e-10])
+    def test_amplitudes_meet_the_tolerance(self, tol):
+        """S1 and S2 are within tol of the largest amplitude, one sphere or many."""
+        mu = np.linspace(-1, 1, 41)
+        m = np.array([1.5 - 0.01j, 1.33, 2.0 - 1j])
+        x = np.array([3.0, 150.0, 0.05])
+        ref1, ref2 = mie.S1_S2(m, x, mu, tol=1e-15)
+        s1, s2 = mie.S1_S2(m, x, mu, tol=tol)
+        for i, (m_i, x_i) in enumerate(zip(m, x)):
+            largest = max(np.abs(ref1[i]).max(), np.abs(ref2[i]).max())
+            assert np.abs(s1[i] - ref1[i]).max() < tol * largest
+            assert np.abs(s2[i] - ref2[i]).max() < tol * largest
+            one1, one2 = mie.S1_S2(m_i, x_i, mu, tol=tol)
+            np.testing.assert_array_equal(one1, s1[i])
+            np.testing.assert_array_equal(one2, s2[i])
+
+    def test_amplitudes_are_normalized_by_their_own_series(self):
+        """With norm='qext' the amplitudes integrate to the qext of the same series."""
+        mu = np.linspace(-1, 1, 2001)
+        m, x = 1.5, 0.08
+        s1, s2 = mie.S1_S2(m, x, mu, norm="one", tol=1e-12)
+        integral = 2 * np.pi * np.trapezoid((np.abs(s1) ** 2 + np.abs(s2) ** 2) / 2, mu)
+        assert integral == pytest.approx(1.0, rel=1e-6)
+        table = mie.AngularTable(mu, 4)
+        np.testing.assert_array_equal(mie.S1_S2(m, x, angles=table, tol=1e-12)[0], s1)
+
+    @pytest.mark.parametrize("tol", [0, -1e-3, 1.0, 2.0])
+    def test_bad_tolerances(self, tol):
+        """A tolerance is a fraction between 0 and 1."""
+        with pytest.raises(ValueError, match="tol"):
+            mie.efficiencies_mx(1.5, 2.0, tol=tol)
+        with pytest.raises(ValueError, match="tol"):
+            mie.core.series_terms(2.0, tol)
+
+    def test_tolerance_with_one_multipole(self):
+        """A single multipole has no series to truncate."""
+        with pytest.raises(ValueError, match="n_pole"):
+            mie.efficiencies_mx(1.5, 2.0, n_pole=1, tol=1e-3)
+        with pytest.raises(ValueError, match="n_pole"):
+            mie.S1_S2(1.5, 2.0, [0.0, 1.0], n_pole=1, tol=1e-3)
@@ -0,0 +1,187 @@
+"""Test the NumPy batch that replaces the scalar loop when numba is off.
+
+``mie_vector`` has to give the answers ``_single_sphere_py`` gives, sphere by
+sphere, however the spheres are mixed: every regime the scalar code branches on
+is represented below, in one batch, so the masks that route spheres to the closed
+forms and the padding of the series are both exercised.
+
+The vectorized sums add the orders in a different sequence from ``np.dot``, so the
+comparison is a tight relative tolerance rather than equality.
+"""
+
+# pylint: disable=protected-access
+
+import numpy as np
+import pytest
+from scipy.special import spherical_jn, spherical_yn
+
+from miepython import _backend, mie_nojit, mie_vector
+
+# one sphere per branch of _single_sphere_py, then a few ordinary ones
+EDGE_M = np.array(
+    [1.5, 1.5, 1.0 + 1e-10j, 0.0, 0.0, 0.0, 1.5 - 0.1j, 1.5 + 0.1j, 0.1 - 3j, 0.75, 1.33 - 0.01j, 2.5],
+    dtype=np.complex128,
+)
+EDGE_X = np.array([0.0, -1.0, 3.0, 0.05, 3.0, 0.0, 0.05, 2.0, 4.0, 10.0, 62.0, 1000.0])
+
+
+def scalar_batch(m, x, n_pole=0, e_field=True):
+    """Return the efficiencies from the scalar loop."""
+    out = np.empty((4, len(x)))
+    mie_nojit._efficiencies_batch_py(m, x, n_pole, e_field, 0.0, out)
+    return out
+
+
+def vector_batch(m, x, n_pole=0, e_field=True):
+    """Return the efficiencies from the vectorized batch."""
+    out = np.empty((4, len(x)))
+    mie_vector._efficiencies_batch_vec(m, x, n_pole, e_field, 0.0, out)
+    return out
+
+
+def random_population(n, seed):
+    """Return indices and size parameters spread over the usual ranges."""
+    rng = np.random.default_rng(seed)
+    m = rng.uniform(1.01, 3.0, n) - 1j * 10 ** rng.uniform(-6, 0, n)
+    m[::5] = m[::5].real
+    x = np.geomspace(0.01, 300, n)
+    rng.shuffle(x)
+    return m, x
+
+
+def test_every_regime_in_one_batch():
+    """Closed forms, matched and empty spheres and full series, mixed together."""
+    np.testing.assert_allclose(vector_batch(EDGE_M, EDGE_X), scalar_batch(EDGE_M, EDGE_X), rtol=1e-11, atol=1e-300)
+
+
+def test_random_population():
+    """Spheres arrive unsorted; the results come back in their original places."""
+    m, x = random_population(500, 4)
+    np.testing.assert_allclose(vector_batch(m, x), scalar_batch(m, x), rtol=1e-10, atol=1e-300)
+
+
+@pytest.mark.parametrize("n_pole, e_field", [(1, True), (2, False), (5, True)])
+def test_single_multipole(n_pole, e_field):
+    """One multipole, electric or magnetic, skips the closed forms."""
+    m, x = random_population(60, 5)
+    x += 0.1
+    np.testing.assert_allclose(vector_batch(m, x, n_pole, e_field), scalar_batch(m, x, n_pole, e_field), rtol=1e-9)
+
+
+def test_tiny_sphere_multipole_rescales_psi():
+    """Miller's recurrence for a tiny x overflows unless the tail is rescaled."""
+    m = np.array([1.5 - 0.01j, 1.33])
+    x = np.array([1e-8, 2e-8])
+    np.testing.assert_allclose(vector_batch(m, x, 2, True), scalar_batch(m, x, 2, True), rtol=1e-6)
+
+
+def test_nothing_needs_the_series():
+    """A batch of closed-form spheres never reaches the recurrences."""
+    m = np.array([1.5, 0.0, 1.0])
+    x = np.array([0.01, 0.05, 5.0])
+    np.testing.assert_allclose(vector_batch(m, x), scalar_batch(m, x), rtol=1e-13, atol=1e-300)
+
+
+def test_blocks_do_not_change_the_answer(monkeypatch):
+    """Cutting the population into many small blocks gives the same numbers.
+
+    Not to the last bit: NumPy's SIMD sin and cos can round differently at the
+    ragged end of an array, and the blocks move where that end falls.
+    """
+    m, x = random_population(200, 6)
+    whole = vector_batch(m, x)
+    monkeypatch.setattr(mie_vector, "BLOCK_SPHERES", 16)
+    monkeypatch.setattr(mie_vector, "BLOCK_ELEMENTS", 500)
+    np.testing.assert_allclose(vector_batch(m, x), whole, rtol=1e-13)
+
+
+def test_lentz_matches_the_scalar_continued_fraction():
+    """Every element iterates to its own convergence."""
+    z = np.array([0.5 + 0.01j, 3.0 - 1.0j, 40.0 - 0.001j, 1.0 - 10000j])
+    N = np.array([5, 12, 60, 3])
+    expected = [mie_nojit._Lentz_Dn(z_one, n_one) for z_one, n_one in zip(z, N)]
+    np.testing.assert_allclose(mie_vector._Lentz_Dn_vec(z, N), expected, rtol=1e-14)
+
+
+def test_psi_matches_miller_recurrence():
+    """Each column is psi_k(x) from _psi_downwards_py, zero-padded to the longest."""
+    x = np.array([0.3, 7.0, 55.0])
+    nstop = np.array([4, 14, 70])
+    psi = mie_vector._psi_downwards_vec(x, nstop)
+    for j, (x_one, n_one) in enumerate(zip(x, nstop)):
+        expected = mie_nojit._psi_downwards_py(np.complex128(x_one), n_one).real
+        np.testing.assert_allclose(psi[: n_one + 1, j], expected, rtol=1e-12, atol=1e-15)
+
+
+def test_bessel_table_matches_scipy():
+    """j_n of complex and h_n of real arguments at every order, each from its own recurrence."""
+    z = np.array([0.01 - 0.001j, 0.5 - 0.05j, 3.0 - 0.3j, 30.0 - 3.0j, 1.5 - 20.0j, 100.0 - 1.0j, 20.0])
+    x = np.array([0.01, 0.3, 1.0, 5.0, 30.0, 200.0])
+    n = np.arange(41)
+    j_table = mie_vector._spherical_bessel_table_vec(z, 40)
+    h_table = mie_vector._spherical_bessel_table_vec(x, 40, outgoing=True)
+    assert j_table.shape == (len(z), 41) and h_table.shape == (len(x), 41)
+    np.testing.assert_allclose(j_table, spherical_jn(n, z[:, np.newaxis]), rtol=1e-12)
+    h_scipy = spherical_jn(n, x[:, np.newaxis]) + 1j * spherical_yn(n, x[:, np.newaxis])
+    np.testing.assert_allclose(h_table, h_scipy, rtol=1e-12)
+
+
+def test_psi_takes_complex_arguments():
+    """The vector Miller recurrence matches the scalar one off the real axis too."""
+    z = np.array([0.3 - 0.01j, 7.0 - 2.0j, 55.0 - 0.5j])
+    nstop = np.array([4, 14, 70])
+    psi = mie_vector._psi_downwards_vec(z, nstop)
+    for j, (z_one, n_one) in enumerate(zip(z, nstop)):
+        expected = mie_nojit._psi_downwards_py(z_one, n_one)
+        np.testing.assert_allclose(psi[: n_one + 1, j], expected, rtol=1e-12, atol=1e-15)
+
+
+def test_pure_python_backend_uses_it():
+    """Array sweeps without numba go through the vectorized batch."""
+    if _backend.USE_JIT:
+        assert _backend.efficiencies_batch.__name__ == "_efficiencies_batch_nb"
+    else:
+        assert _backend.efficiencies_batch is mie_vector._efficiencies_batch_vec
+
+
+@pytest.mark.parametrize(
+    "mu",
+    [np.linspace(-1, 1, 101), np.linspace(-1, 1, 100), np.linspace(-1, 0.3, 57), np.array([0.2]), np.array([])],
+    ids=["mirrored-odd", "mirrored-even", "lopsided", "one", "none"],
+)
+@pytest.mark.parametrize("n_pole", [0, 1, 4])
+def test_dense_amplitudes_match_the_angle_loop(mu, n_pole):
+    """Matrix products give the amplitudes of _S1_S2_from_ab_py, mirrored or not."""
+    a, b = mie_nojit._an_bn_py(1.5 - 0.01j, 40.0, 0)
+    expected = mie_nojit._S1_S2_from_ab_py(a, b, mu, n_pole)
+    for max_memory in (mie_vector.S1_S2_MEMORY, 3000, 1):
+        actual = mie_vector._S1_S2_from_ab_vec(a, b, mu, n_pole, max_memory)
+        for got, want in zip(actual, expected):
+            np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-14 * np.max(np.abs(want), initial=0))
+
+
+def test_dense_rejects_missing_orders():
+    """n_pole past the end of the series is an error, as in the angle loop."""
+    a, b = mie_nojit._an_bn_py(1.5, 2.0, 0)
+    with pytest.raises(ValueError):
+        mie_vector._S1_S2_from_ab_vec(a, b, np.array([0.0]), len(a) + 1)
+
+
+def test_dense_fused_kernel_matches_the_scalar_one():
+    """Amplitudes and normalizing efficiencies, as from _S1_S2_efficiencies_py."""
+    mu = np.linspace(-1, 1, 31)
+    keep = EDGE_X >= 0
+    for m, x in zip(EDGE_M[keep], EDGE_X[keep]):
+        s1, s2, qext, qsca = mie_vector._S1_S2_efficiencies_vec(m, x, mu, 0)
+        e1, e2, e_qext, e_qsca = mie_nojit._S1_S2_efficiencies_py(m, x, mu, 0)
+        np.testing.assert_allclose(s1, e1, rtol=1e-12, atol=1e-300)
+        np.testing.assert_allclose(s2, e2, rtol=1e-12, atol=1e-300)
+        assert (qext, qsca) == (e_qext, e_qsca)
+
+
+def test_pure_python_amplitudes_use_it():
+    """Without numba, S1_S2 sums through the dense matrix products."""
+    if _backend.USE_JIT:
+        assert _backend._S1_S2_efficiencies.__name__ == "_S1_S2_efficiencies_nb"
+    else:
+        assert _backend._S1_S2_efficiencies is mie_vector._S1_S2_efficiencies_vec
@@ -1,9 +1,9 @@
 """Test that miepython imports and behaves sensibly without SciPy.
 
-``miepython/__init__.py`` catches a missing SciPy, substitutes placeholders for
-the near-field functions, and lets everything else import as usual.  That branch
-is what keeps the package usable in JupyterLite, where SciPy is an extra
-download, so it is worth testing rather than assuming.
+``miepython/__init__.py`` catches a missing SciPy, leaves ``miepython.vsh``
+unbound, and lets everything else import as usual, the near fields included.
+That branch is what keeps the package usable in JupyterLite, where SciPy is an
+extra download, so it is worth testing rather than assuming.
 
 The tests here re-import the package with an import hook that hides a module.
 Every one restores ``sys.modules`` exactly, so the copy other test files already
@@ -14,6 +14,7 @@ import contextlib
 import importlib
 import sys
 
+import numpy as np
 import pytest
 
 import miepython
@@ -27,6 +28,7 @@ NEAR_FIELD_NAMES = (
     "e_near_cartesian",
     "h_near_cartesian",
     "eh_near_cartesian",
+    "eh_near_grid",
 )
 
 
@@ -75,32 +77,21 @@ def test_package_imports_without_scipy():
         assert len(s1) == len(s2) == 2
 
 
-@pytest.mark.parametrize("name", NEAR_FIELD_NAMES)
-def test_near_field_placeholder_explains_itself(name):
-    """Each near-field entry point is replaced by something that says why."""
+def test_near_fields_work_without_scipy():
+    """The field path runs its own recurrences, so it gives the same fields without SciPy."""
+    args = (1.0, 1.0, 1.5 - 0.1j, 1.0, [0.0, 0.2, 0.5, 1.5], 0.7, 0.3)
+    with_scipy = miepython.eh_near(*args)
     with reimported_without("scipy") as mie_noscipy:
-        placeholder = getattr(mie_noscipy, name)
-        assert placeholder.__name__ == name
-        assert placeholder.__qualname__ == name
-        assert "scipy" in placeholder.__doc__
-
-        with pytest.raises(ModuleNotFoundError) as excinfo:
-            placeholder()
-        message = str(excinfo.value)
-        assert "scipy" in message
-        # the original ImportError is chained on, so the real cause stays visible
-        assert isinstance(excinfo.value.__cause__, ModuleNotFoundError)
-
-
-def test_placeholders_accept_any_arguments():
-    """They must fail on the missing dependency, not on a signature mismatch."""
-    with reimported_without("scipy") as mie_noscipy:
-        with pytest.raises(ModuleNotFoundError, match="scipy"):
-            mie_noscipy.e_near(1.0, 1.0, 1.5 + 0j, 1.0, 1.5, 0.5, 0.0, include_incident=True)
+        for name in NEAR_FIELD_NAMES:
+            assert getattr(mie_noscipy, name).__module__ == "miepython.field", name
+        without_scipy = mie_noscipy.eh_near(*args)
+        assert "scipy" not in sys.modules
+    np.testing.assert_array_equal(without_scipy[0], with_scipy[0])
+    np.testing.assert_array_equal(without_scipy[1], with_scipy[1])
 
 
 def test_with_scipy_present_the_real_functions_are_exported():
-    """The healthy path must bind the actual implementations."""
+    """The package binds the implementations in ``miepython.field`` itself."""
     for name in NEAR_FIELD_NAMES:
         assert getattr(miepython, name) is getattr(miepython_field, name), name
 
@@ -0,0 +1,208 @@
+"""Tests for the process-pool sweeps in ``miepython.parallel``.
+
+Every shard is computed by the ``miepython.core`` function it stands in for, so the
+checks compare against one in-process call over the whole input.  They allow for
+rounding in the last bit only: without numba the efficiencies are vectorized, and
+NumPy's SIMD functions can round an element differently depending on where it falls
+in the array.  The
+pool tests use two workers on purpose: enough to exercise the shared blocks and
+out-of-order completion, few enough to stay quick on a one-core CI runner.  Each
+pool pays for starting fresh interpreters, so most checks run with ``workers=0``.
+
+Code that normally runs inside a worker (attaching, the warm-up initializer) is
+also called directly, so that it is covered by an in-process coverage run.
+"""
+
+# pylint: disable=protected-access
+
+import gc
+import types
+
+import numpy as np
+import pytest
+
+import miepython as mie
+import miepython.parallel as mp
+
+M = np.array([1.5 - 0.01j, 1.33, 2.0 - 1.0j, 1.5, 1.2 - 0.1j, 3.0, 1.5 - 0.001j])
+X = np.array([0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 0.05])
+MU = np.linspace(-1, 1, 7)
+
+
+class TestEfficiencies:
+    """Test the sharded efficiencies against miepython.efficiencies_mx."""
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_matches_core(self, workers):
+        """Sharding must not change the answer."""
+        expected = mie.efficiencies_mx(M, X)
+        actual = mp.efficiencies_mx(M, X, workers=workers, shard_size=2)
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_scalar_m_is_broadcast(self):
+        """A scalar index applies to every sphere."""
+        expected = mie.efficiencies_mx(1.5, X)
+        actual = mp.efficiencies_mx(1.5, X, workers=0)
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_multipole(self):
+        """n_pole and e_field reach the worker."""
+        expected = mie.efficiencies_mx(M, X, n_pole=1, e_field=False)
+        actual = mp.efficiencies_mx(M, X, n_pole=1, e_field=False, workers=0, shard_size=3)
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_results_outlive_the_call(self):
+        """The returned arrays stay valid after the blocks are unlinked."""
+        qext = mp.efficiencies_mx(M, X, workers=0)[0]
+        gc.collect()
+        np.testing.assert_allclose(qext, mie.efficiencies_mx(M, X)[0], rtol=1e-12)
+
+
+class TestOtherKinds:
+    """Test coefficients and S1_S2 against their miepython counterparts."""
+
+    @pytest.mark.parametrize("internal, workers", [(False, 0), (True, 2)])
+    def test_coefficients(self, internal, workers):
+        """The array form of miepython.coefficients, one row per sphere."""
+        expected = mie.coefficients(M, X, n_pole=3, internal=internal)
+        actual = mp.coefficients(M, X, 3, internal=internal, workers=workers, shard_size=3)
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_coefficients_need_n_pole(self):
+        """A fixed number of orders is the only way to stack spheres."""
+        with pytest.raises(RuntimeError):
+            mp.coefficients(M, X, 0)
+
+    def test_S1_S2(self):
+        """One row of amplitudes per sphere, on the shared angles."""
+        s1, s2 = mp.S1_S2(M, X, MU, norm="wiscombe", workers=0, shard_size=4)
+        assert s1.shape == (len(X), len(MU))
+        for i, (m, x) in enumerate(zip(M, X)):
+            e1, e2 = mie.S1_S2(m, x, MU, norm="wiscombe")
+            np.testing.assert_allclose(s1[i], e1, rtol=1e-12)
+            np.testing.assert_allclose(s2[i], e2, rtol=1e-12)
+
+
+class TestProgressAndErrors:
+    """Test progress reports, validation and cleanup after a failure."""
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_progress_counts_every_sphere(self, workers):
+        """Reports rise with each shard and end at the total."""
+        calls = []
+        mp.efficiencies_mx(
+            M, X, workers=workers, shard_size=3, progress=lambda done, total: calls.append((done, total))
+        )
+        assert len(calls) == 3
+        assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+        assert calls[-1] == (len(X), len(X))
+
+    def test_mismatched_lengths(self):
+        """The m and x arrays must pair up."""
+        with pytest.raises(RuntimeError):
+            mp.efficiencies_mx(M, X[:3], workers=0)
+
+    def test_two_dimensional_input(self):
+        """Only flat populations are sharded."""
+        with pytest.raises(ValueError):
+            mp.efficiencies_mx(1.5, np.ones((2, 2)), workers=0)
+
+    def test_nothing_to_do(self):
+        """Two scalars are not a population."""
+        with pytest.raises(ValueError):
+            mp.efficiencies_mx(1.5, 1.0, workers=0)
+
+    def test_negative_workers(self):
+        """Zero means in-process, below zero means nothing."""
+        with pytest.raises(ValueError, match="workers"):
+            mp.efficiencies_mx(M, X, workers=-1)
+
+    def test_empty_shards(self):
+        """A shard holds at least one sphere."""
+        with pytest.raises(ValueError, match="shard_size"):
+            mp.efficiencies_mx(M, X, workers=0, shard_size=0)
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_failure_in_a_shard_propagates(self, workers):
+        """The error surfaces in the caller; the shared blocks are released."""
+        options = {"n_pole": 0, "internal": False}
+        with pytest.raises(RuntimeError):
+            mp._sweep("coefficients", M, X, lambda n: (2, n, 1), np.complex128, options, workers, 2, None)
+
+    def test_failure_while_results_are_still_viewed(self, monkeypatch):
+        """A view kept alive past the failure must not hide the original error."""
+        kept = []
+
+        def failing_shard(_kind, arrays, _start, _stop, _options):
+            kept.append(arrays[2])
+            raise ZeroDivisionError("shard failed")
+
+        monkeypatch.setattr(mp, "_run_shard", failing_shard)
+        with pytest.raises(ZeroDivisionError, match="shard failed"):
+            mp.efficiencies_mx(M, X, workers=0)
+        assert np.all(kept[0] == 0)
+
+    def test_default_worker_count(self):
+        """None asks for one process per core."""
+        qext = mp.efficiencies_mx(M[:2], X[:2])[0]
+        np.testing.assert_allclose(qext, mie.efficiencies_mx(M[:2], X[:2])[0], rtol=1e-12)
+
+
+class TestWorkerSide:
+    """Test the worker-side helpers in this process."""
+
+    def test_worker_shard_attaches_by_name(self):
+        """A task names its blocks; the worker rebuilds the arrays from them."""
+        blocks = []
+        try:
+            arrays = []
+            for shape, dtype, values in [((7,), np.complex128, M), ((7,), np.float64, X), ((4, 7), np.float64, 0)]:
+                block, array = mp._create_block(shape, dtype)
+                array[...] = values
+                blocks.append(block)
+                arrays.append(array)
+            specs = [(block.name, array.shape, array.dtype.str) for block, array in zip(blocks, arrays)]
+            assert mp._worker_shard("efficiencies", specs, 2, 5, {}) == 3
+            assert mp._attach(blocks[0].name) is mp._attach(blocks[0].name)
+            np.testing.assert_allclose(arrays[2][:, 2:5], mie.efficiencies_mx(M[2:5], X[2:5]), rtol=1e-12)
+            assert np.all(arrays[2][:, :2] == 0)
+        finally:
+            arrays = None
+            for block in blocks:
+                attached = mp._ATTACHED.pop(block.name)
+                attached.close()
+                block.close()
+                block.unlink()
+
+    def test_attach_before_python_3_13(self, monkeypatch):
+        """Older Pythons attach without registering with the resource tracker."""
+        monkeypatch.setattr(mp, "sys", types.SimpleNamespace(version_info=(3, 12)))
+        block, _ = mp._create_block((1,), np.float64)
+        try:
+            attached = mp._attach(block.name)
+            assert attached.name == block.name
+            attached.close()
+        finally:
+            mp._ATTACHED.pop(block.name, None)
+            block.close()
+            block.unlink()
+
+    def test_attach_from_python_3_13(self, monkeypatch):
+        """Newer Pythons ask SharedMemory itself not to track the block."""
+        calls = []
+
+        def shared_memory_stub(**kwargs):
+            calls.append(kwargs)
+            return types.SimpleNamespace(name=kwargs["name"])
+
+        monkeypatch.setattr(mp, "sys", types.SimpleNamespace(version_info=(3, 13)))
+        monkeypatch.setattr(mp.shared_memory, "SharedMemory", shared_memory_stub)
+        try:
+            assert mp._attach("psm_stub").name == "psm_stub"
+        finally:
+            mp._ATTACHED.pop("psm_stub", None)
+        assert calls == [{"name": "psm_stub", "track": False}]
+
+    def test_warm_up(self):
+        """The initializer just evaluates a few tiny spheres."""
+        mp._warm_up()
@@ -0,0 +1,144 @@
+"""Tests for the adaptively sampled spectra of ``miepython.spectral``."""
+
+# pylint: disable=protected-access,redefined-outer-name
+
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import miepython as mie
+from miepython import spectral
+
+
+@pytest.fixture(scope="module")
+def whispering():
+    """Return the spectrum of a clear sphere over a range holding a very narrow mode."""
+    return mie.spectrum(1.5, 4.0, 0.4, 0.45, tol=1e-3)
+
+
+def worst_error(spec, m, d, n=20001):
+    """Return the largest error of the interpolated spectrum against exact values."""
+    wavelength = np.linspace(spec.wavelength[0], spec.wavelength[-1], n)
+    m = m(wavelength) if callable(m) else np.full(n, complex(m))
+    exact = np.array(mie.efficiencies_mx(m, np.pi * d / wavelength))
+    approx = np.array(spec(wavelength))
+    error = np.abs(approx - exact)
+    error[2] /= np.maximum(exact[0], exact[2])
+    error[:2] /= exact[:2]
+    return error.max()
+
+
+class TestAccuracy:
+    """Test that the interpolated spectrum meets its tolerance."""
+
+    @pytest.mark.parametrize("m, d", [(1.5 - 0.001j, 2.0), (0.2 - 3j, 0.2), (1.33, 0.5)])
+    def test_between_samples(self, m, d):
+        """Anywhere between the samples the interpolant is within tol."""
+        spec = mie.spectrum(m, d, 0.4, 0.8, tol=1e-3)
+        assert worst_error(spec, m, d) < 1e-3
+        assert spec.calls == len(spec.wavelength)
+
+    @pytest.mark.parametrize("m, d", [(1.5 - 0.01j, 1.0), (1.5, 0.01), (0.0, 0.01)])
+    def test_samples_are_exact(self, m, d):
+        """The samples are what efficiencies_mx gives, closed forms for tiny spheres included."""
+        spec = mie.spectrum(m, d, 0.4, 0.8)
+        expected = mie.efficiencies_mx(np.full(spec.calls, m, dtype=complex), np.pi * d / spec.wavelength)
+        np.testing.assert_array_equal(spec[1:5], expected)
+        assert spec.wavelength[0] == 0.4
+        assert spec.wavelength[-1] == 0.8
+        assert np.all(np.diff(spec.wavelength) > 0)
+
+    def test_index_depending_on_wavelength(self):
+        """The index may be a function of the vacuum wavelength, and the sphere may be in water."""
+
+        def m_glass(wavelength):
+            return 1.5 + 0.004 / wavelength**2 - 1e-3j
+
+        spec = mie.spectrum(m_glass, 1.0, 0.4, 0.8, tol=1e-3, n_env=1.33)
+        wavelength = spec.wavelength[::7]
+        expected = mie.efficiencies(m_glass(wavelength), 1.0, wavelength, n_env=1.33)
+        np.testing.assert_allclose(np.array(spec[1:5])[:, ::7], expected, rtol=1e-12)
+
+    def test_tolerance_sets_the_cost(self):
+        """A tighter tolerance costs more spheres and is met."""
+        loose = mie.spectrum(0.2 - 3j, 0.2, 0.3, 1.0, tol=1e-2)
+        tight = mie.spectrum(0.2 - 3j, 0.2, 0.3, 1.0, tol=1e-5)
+        assert loose.calls < tight.calls
+        assert worst_error(tight, 0.2 - 3j, 0.2) < 1e-5
+
+
+class TestResonances:
+    """Test that narrow resonances are found rather than stepped over."""
+
+    def test_resonance_between_midpoints(self, whispering):
+        """A whispering-gallery mode far narrower than the starting grid is resolved."""
+        assert worst_error(whispering, 1.5, 4.0, n=100001) < 1e-3
+        assert np.min(np.diff(whispering.wavelength)) < 1e-7
+
+    def test_the_peak_is_sampled(self, whispering):
+        """Some sample in the finest stretch sits within the half width of the peak."""
+        i = np.argmin(np.diff(whispering.wavelength))
+        samples = spectral._Samples(1.5, 4.0, 1.0, 40)
+        samples.add(whispering.wavelength[i - 3 : i + 4])
+        c = samples.coefficients
+        assert np.any(c.real > np.abs(c.imag)) and np.max(np.abs(c)) > 0.7
+
+    def test_coefficients_of_each_sample(self):
+        """Each sample keeps a_n and b_n of its own sphere, zero past its series."""
+        wavelength = np.array([0.4, 0.6, 0.8])
+        samples = spectral._Samples(1.5 - 0.01j, 4.0, 1.0, mie.core.wiscombe_terms(np.pi * 4.0 / 0.4))
+        samples.add(wavelength)
+        for i, x in enumerate(np.pi * 4.0 / wavelength):
+            a, b = mie.coefficients(1.5 - 0.01j, x)
+            np.testing.assert_allclose(samples.coefficients[i, 0, : len(a)], a, rtol=1e-10)
+            np.testing.assert_allclose(samples.coefficients[i, 1, : len(b)], b, rtol=1e-10)
+            assert not np.any(samples.coefficients[i, :, len(a) :])
+
+    def test_without_the_coefficients_it_is_missed(self, monkeypatch):
+        """The midpoint test alone steps over the same mode."""
+        monkeypatch.setattr(spectral._Samples, "unresolved", lambda self, tol: np.zeros(len(self.x) - 1, bool))
+        spec = mie.spectrum(1.5, 4.0, 0.4, 0.45, tol=1e-3)
+        assert worst_error(spec, 1.5, 4.0, n=100001) > 0.1
+
+
+class TestInterface:
+    """Test the checks and the shapes."""
+
+    def test_interpolation_shapes(self):
+        """The interpolant takes the shape of its argument."""
+        spec = mie.spectrum(1.5, 0.5, 0.4, 0.8)
+        qext, _, _, g = spec(np.array([[0.45, 0.5], [0.6, 0.7]]))
+        assert qext.shape == g.shape == (2, 2)
+        assert spec(0.5)[0].shape == ()
+
+    def test_sign_of_the_imaginary_part(self):
+        """n+ik is the same sphere as n-ik."""
+        plus, minus = mie.spectrum(1.5 + 0.01j, 1.0, 0.4, 0.8), mie.spectrum(1.5 - 0.01j, 1.0, 0.4, 0.8)
+        np.testing.assert_array_equal(plus.wavelength, minus.wavelength)
+        np.testing.assert_array_equal(plus.qback, minus.qback)
+
+    def test_outside_the_range(self):
+        """The spectrum never extrapolates."""
+        spec = mie.spectrum(1.5, 0.5, 0.4, 0.8)
+        with pytest.raises(ValueError):
+            spec(0.3)
+
+    @pytest.mark.parametrize(
+        "args", [(1.5, 1.0, 0.8, 0.4), (1.5, 1.0, 0.0, 0.4), (1.5, 0.0, 0.4, 0.8), (1.5, 1.0, 0.4, 0.8, 0.0)]
+    )
+    def test_bad_arguments(self, args):
+        """Empty ranges, sizes and tolerances are refused."""
+        with pytest.raises(ValueError):
+            mie.spectrum(*args)
+
+    def test_call_budget(self):
+        """A spectrum that needs more spheres than allowed is an error."""
+        with pytest.raises(RuntimeError, match="max_calls"):
+            mie.spectrum(1.5, 4.0, 0.4, 0.45, max_calls=100)
+
+    def test_surrogate_is_not_loaded(self):
+        """The spectra share their interpolation weights through util, not the surrogate."""
+        code = "import sys, miepython.spectral; assert 'miepython.surrogate' not in sys.modules"
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,302 @@
+"""Tests for the on-disk store of Mie results in ``miepython.store``.
+
+Every store lives in pytest's ``tmp_path``.  Two ``MieStore`` objects on one file
+stand in for two processes, since each keeps its own map and index; one test
+also writes from a real second interpreter.
+"""
+
+# pylint: disable=protected-access,redefined-outer-name
+
+import contextlib
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import miepython as mie
+import miepython.store as ms
+
+MU = np.linspace(-1, 1, 7)
+M = np.array([1.5 - 0.01j, 1.33, 2.0 - 1.0j])
+X = np.array([0.5, 2.0, 10.0])
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Return the name of a store file that does not exist yet."""
+    return tmp_path / "results.mie"
+
+
+class TestResults:
+    """Test that stored results are what miepython computes."""
+
+    def test_efficiencies(self, path):
+        """A grid from the store matches efficiencies_mx."""
+        store = ms.MieStore(path, mu=MU)
+        actual = store.efficiencies_mx(M, X)
+        np.testing.assert_allclose(actual, mie.efficiencies_mx(M, X), rtol=1e-12)
+
+    def test_amplitudes(self, path):
+        """S1 and S2 are stored with the store's normalization."""
+        store = ms.MieStore(path, mu=MU, norm="wiscombe")
+        s1, s2 = store.S1_S2(M, X)
+        e1, e2 = mie.S1_S2(M, X, MU, norm="wiscombe")
+        np.testing.assert_allclose(s1, e1, rtol=1e-12)
+        np.testing.assert_allclose(s2, e2, rtol=1e-12)
+
+    def test_grids_broadcast(self, path):
+        """The grid is m and x broadcast together, and the results take its shape."""
+        store = ms.MieStore(path, mu=MU)
+        qext = store.efficiencies_mx(M[:, np.newaxis], X)[0]
+        assert qext.shape == (3, 3)
+        assert len(store) == 9
+        np.testing.assert_allclose(qext[2], mie.efficiencies_mx(np.full(3, M[2]), X)[0], rtol=1e-12)
+        s1, _ = store.S1_S2(M[:, np.newaxis], X)
+        assert s1.shape == (3, 3, len(MU))
+
+    def test_scalars(self, path):
+        """One sphere gives zero-dimensional efficiencies."""
+        qext, _, _, _ = ms.MieStore(path).efficiencies_mx(1.5, 2.0)
+        assert qext.shape == ()
+        assert qext == mie.efficiencies_mx(1.5, 2.0)[0]
+
+    def test_lookup_is_a_view_of_the_file(self, path):
+        """One sphere's results come straight from the mapped file."""
+        store = ms.MieStore(path, mu=MU)
+        store.update(M, X)
+        efficiencies, s1, _ = store.lookup(M[1], X[1])
+        assert np.shares_memory(efficiencies, store._records[0])
+        assert not efficiencies.flags.writeable
+        np.testing.assert_allclose(s1, mie.S1_S2(M[1], X[1], MU)[0], rtol=1e-12)
+
+    def test_missing_sphere(self, path):
+        """A lookup never computes."""
+        store = ms.MieStore(path, mu=MU)
+        with pytest.raises(KeyError):
+            store.lookup(1.5, 2.0)
+
+    def test_no_angles(self, path):
+        """A store created without angles holds only efficiencies."""
+        store = ms.MieStore(path)
+        store.efficiencies_mx(M, X)
+        with pytest.raises(ValueError):
+            store.S1_S2(M, X)
+
+
+class TestUpdates:
+    """Test that only missing spheres are computed and appended."""
+
+    def test_only_missing_spheres_are_added(self, path):
+        """Repeats within a grid and spheres already held are skipped."""
+        store = ms.MieStore(path, mu=MU)
+        assert store.update(M, X) == 3
+        assert store.update(np.append(M, 1.2), np.append(X, 3.0)) == 1
+        assert store.update([1.5, 1.5], [4.0, 4.0]) == 1
+        assert store.update(M, X) == 0
+        assert len(store) == 5
+        assert (M[0], X[0]) in store
+        assert (1.5, 5.0) not in store
+
+    def test_conjugate_index_is_the_same_sphere(self, path):
+        """n+ik is stored as n-ik."""
+        store = ms.MieStore(path)
+        store.update(1.5 - 0.1j, 2.0)
+        assert (1.5 + 0.1j, 2.0) in store
+        assert store.update(1.5 + 0.1j, 2.0) == 0
+
+    def test_results_survive_reopening(self, path):
+        """A new process finds what an earlier one computed."""
+        ms.MieStore(path, mu=MU, norm="qext").update(M, X)
+        store = ms.MieStore(path)
+        assert (len(store), store.norm) == (3, "qext")
+        np.testing.assert_array_equal(store.mu, MU)
+        np.testing.assert_allclose(store.S1_S2(M, X)[0], mie.S1_S2(M, X, MU, norm="qext")[0], rtol=1e-12)
+
+    def test_file_grows_by_one_segment(self, path):
+        """Each update appends one segment and commits its length."""
+        store = ms.MieStore(path, mu=MU)
+        empty = path.stat().st_size
+        store.update(M, X)
+        assert path.stat().st_size == empty + ms._segment_bytes(3, 4 + 4 * len(MU))
+        with open(path, "rb") as f:
+            assert ms._read_length(f) == path.stat().st_size
+
+
+class TestSeveralProcesses:
+    """Test readers and writers that share one file."""
+
+    def test_reader_sees_new_segments_after_refresh(self, path):
+        """Another writer's segment appears once the reader looks again."""
+        reader = ms.MieStore(path, mu=MU)
+        writer = ms.MieStore(path)
+        writer.update(M, X)
+        assert len(reader) == 0
+        reader.refresh()
+        assert len(reader) == 3
+        reader.lookup(M[0], X[0])
+
+    def test_refresh_maps_only_new_segments(self, path):
+        """Each refresh maps the bytes committed since the last one, not the whole file."""
+        reader = ms.MieStore(path, mu=MU)
+        writer = ms.MieStore(path)
+        for m, x in zip(M, X):
+            before = path.stat().st_size
+            writer.update(m, x)
+            reader.refresh()
+            mapped = reader._records[-1]
+            while isinstance(mapped.base, np.ndarray):
+                mapped = mapped.base
+            assert mapped.offset == before
+            assert mapped.size == path.stat().st_size - before
+        np.testing.assert_array_equal(reader.lookup(M[1], X[1])[0], writer.lookup(M[1], X[1])[0])
+
+    def test_lookup_refreshes_before_giving_up(self, path):
+        """A sphere another process stored is found without an explicit refresh."""
+        reader = ms.MieStore(path, mu=MU)
+        ms.MieStore(path).update(M, X)
+        np.testing.assert_allclose(reader.lookup(M[2], X[2])[0], mie.efficiencies_mx(M[2], X[2]), rtol=1e-12)
+
+    def test_uncommitted_bytes_are_ignored(self, path):
+        """A segment written past the committed length, as by a crashed writer, is invisible."""
+        store = ms.MieStore(path, mu=MU)
+        store.update(M[:1], X[:1])
+        with open(path, "ab") as f:
+            f.write(b"\xff" * 100)
+        other = ms.MieStore(path)
+        assert len(other) == 1
+        other.update(M, X)
+        store.refresh()
+        assert len(store) == 3
+
+    def test_concurrent_writer_is_not_duplicated(self, path, monkeypatch):
+        """Spheres stored by another writer during the computation are dropped."""
+        store = ms.MieStore(path, mu=MU)
+        compute = store._compute
+
+        def racing_compute(keys):
+            ms.MieStore(path).update(M[:2], X[:2])
+            return compute(keys)
+
+        monkeypatch.setattr(store, "_compute", racing_compute)
+        assert store.update(M, X) == 1
+        assert store.update(M, X) == 0
+        assert len(store) == 3
+        assert path.stat().st_size == (
+            store._start + ms._segment_bytes(2, store._record) + ms._segment_bytes(1, store._record)
+        )
+
+    def test_concurrent_writer_stored_everything(self, path, monkeypatch):
+        """Nothing is appended when the other writer got every sphere first."""
+        store = ms.MieStore(path)
+        compute = store._compute
+
+        def racing_compute(keys):
+            ms.MieStore(path).update(M, X)
+            return compute(keys)
+
+        monkeypatch.setattr(store, "_compute", racing_compute)
+        assert store.update(M, X) == 0
+        assert len(store) == 3
+
+    def test_writer_in_another_interpreter(self, path):
+        """A second process appends while this one holds the file open."""
+        reader = ms.MieStore(path, mu=MU)
+        reader.update(M[:1], X[:1])
+        code = "import sys, miepython.store as ms\nms.MieStore(sys.argv[1]).update([1.5, 1.33], [3.0, 4.0])\n"
+        subprocess.run([sys.executable, "-c", code, str(path)], check=True)
+        reader.refresh()
+        assert (1.33, 4.0) in reader
+        assert len(reader) == 3
+
+    def test_creation_race(self, path, monkeypatch):
+        """Two processes creating one store both end up using the first file."""
+        ms.MieStore(path, mu=MU)
+        monkeypatch.setattr(ms.os.path, "exists", lambda _: False)
+        store = ms.MieStore(path)
+        np.testing.assert_array_equal(store.mu, MU)
+
+    def test_a_new_store_appears_complete(self, path, monkeypatch):
+        """The file has its whole header from the moment its name exists."""
+        sizes = []
+        link = os.link
+
+        def checking_link(src, dst):
+            sizes.append(os.path.getsize(src))
+            link(src, dst)
+
+        monkeypatch.setattr(ms.os, "link", checking_link)
+        ms.MieStore(path, mu=MU)
+        assert sizes == [ms._HEADER.itemsize + 8 * len(MU)]
+        assert os.listdir(path.parent) == [path.name]
+
+    def test_simultaneous_creation(self, path):
+        """Interpreters opening one new store at once all read the same header."""
+        code = "import sys, miepython.store as ms\nprint(len(ms.MieStore(sys.argv[1], mu=[-1.0, 0.0, 1.0]).mu))\n"
+        with contextlib.ExitStack() as stack:
+            start = [sys.executable, "-c", code, str(path)]
+            runs = [stack.enter_context(subprocess.Popen(start, stdout=subprocess.PIPE)) for _ in range(4)]
+            outputs = [run.communicate()[0] for run in runs]
+        assert [run.returncode for run in runs] == [0] * 4
+        assert outputs == [b"3\n"] * 4
+        assert os.listdir(path.parent) == [path.name]
+
+    def test_without_fcntl(self, path, monkeypatch):
+        """Where there are no advisory locks a single writer still works."""
+        monkeypatch.setattr(ms, "fcntl", None)
+        store = ms.MieStore(path)
+        assert store.update(M, X) == 3
+
+
+class TestValidation:
+    """Test the checks on opening a store."""
+
+    def test_different_angles(self, path):
+        """Amplitudes cannot be reinterpreted at other angles."""
+        ms.MieStore(path, mu=MU)
+        with pytest.raises(ValueError, match="angles"):
+            ms.MieStore(path, mu=MU[:-1])
+        with pytest.raises(ValueError, match="angles"):
+            ms.MieStore(path, mu=MU + 0.1)
+        ms.MieStore(path, mu=MU)
+
+    def test_different_normalization(self, path):
+        """Nor with another normalization."""
+        ms.MieStore(path, mu=MU)
+        with pytest.raises(ValueError, match="albedo"):
+            ms.MieStore(path, norm="wiscombe")
+
+    def test_two_dimensional_angles(self, path):
+        """The angles are a flat list."""
+        with pytest.raises(ValueError):
+            ms.MieStore(path, mu=np.zeros((2, 2)))
+
+    def test_long_normalization_name(self, path):
+        """The header has room for sixteen characters."""
+        with pytest.raises(ValueError):
+            ms.MieStore(path, norm="x" * 17)
+
+    def test_not_a_store(self, path):
+        """Any other file is refused."""
+        path.write_bytes(b"not a store")
+        with pytest.raises(ValueError, match="not a miepython store"):
+            ms.MieStore(path)
+        path.write_bytes(b"\0" * 100)
+        with pytest.raises(ValueError, match="not a miepython store"):
+            ms.MieStore(path)
+
+    def test_other_version(self, path):
+        """A future layout is refused rather than misread."""
+        ms.MieStore(path)
+        data = bytearray(path.read_bytes())
+        data[8] = ms.VERSION + 1
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError, match="version"):
+            ms.MieStore(path)
+
+    def test_repr(self, path):
+        """The repr names the file and what is in it."""
+        store = ms.MieStore(path, mu=MU)
+        store.update(1.5, 1.0)
+        assert repr(store) == "MieStore(%r, 1 spheres, 7 angles)" % str(path)
@@ -0,0 +1,132 @@
+"""Tests for the interpolated efficiency tables in ``miepython.surrogate``.
+
+The tables are built over small ranges so that the module's tests stay quick;
+the refinement and the checks are the same whatever the range.
+"""
+
+# pylint: disable=protected-access,redefined-outer-name
+
+import numpy as np
+import pytest
+
+import miepython as mie
+from miepython import surrogate
+
+TOL = 1e-4
+
+
+@pytest.fixture(scope="module")
+def table():
+    """Return a table over a modest range of absorbing and clear spheres."""
+    return surrogate.build_table((0.1, 3.0), (1.33, 1.6), (0.0, 0.01), tol=TOL, n_validate=2000)
+
+
+def relative_errors(table, m, x):
+    """Return the errors of the table at spheres m, x, as the report measures them."""
+    approx = np.column_stack(table(m, x))
+    approx[:, :3] = np.log10(approx[:, :3])
+    return surrogate._errors(approx, surrogate._exact_values(m, x))
+
+
+class TestAccuracy:
+    """Test the table against the exact efficiencies."""
+
+    def test_report_passes(self, table):
+        """The random spheres checked at build time all met the tolerance."""
+        assert table.report.passed
+        assert table.report.n_samples == 2000
+        assert max(table.report.max_error) <= TOL
+
+    def test_fresh_random_spheres(self, table):
+        """Spheres the build never saw are within the tolerance too."""
+        rng = np.random.default_rng(12)
+        m = rng.uniform(1.33, 1.6, 3000) - 1j * rng.uniform(0, 0.01, 3000)
+        x = np.exp(rng.uniform(np.log(0.1), np.log(3.0), 3000))
+        assert np.max(relative_errors(table, m, x)) <= TOL
+
+    def test_nodes_are_exact(self, table):
+        """At a tabulated sphere the interpolant returns the tabulated value."""
+        x = 10 ** table.nodes[0][7]
+        m = table.nodes[1][3] - 1j * (10 ** table.nodes[2][-1] - table.k_floor)
+        np.testing.assert_allclose(table(m, x), mie.efficiencies_mx(m, x), rtol=1e-12)
+
+    def test_ends_of_the_range(self, table):
+        """The corners of the range are inside the table."""
+        qext, _, _, _ = table(np.array([1.33, 1.6 - 0.01j]), np.array([0.1, 3.0]))
+        np.testing.assert_allclose(qext, mie.efficiencies_mx(np.array([1.33, 1.6 - 0.01j]), [0.1, 3.0])[0], rtol=TOL)
+
+    def test_report_can_be_reproduced(self, table):
+        """The same seed checks the same spheres."""
+        assert table.validate(500, seed=3) == table.validate(500, seed=3)
+        assert table.validate(0).max_error == (0.0, 0.0, 0.0, 0.0)
+
+
+class TestEvaluation:
+    """Test the shapes and checks of table lookups."""
+
+    def test_broadcasting(self, table):
+        """The arguments broadcast together, and many spheres go through in blocks."""
+        x = np.linspace(0.2, 2.5, 3 * surrogate.BLOCK_POINTS + 5)
+        qext, qsca, qback, g = table(1.5 - 0.001j, x)
+        assert qext.shape == qsca.shape == qback.shape == g.shape == x.shape
+        qext, _, _, _ = table(np.array([[1.4], [1.5]]), np.array([1.0, 2.0, 3.0]))
+        assert qext.shape == (2, 3)
+
+    def test_scalar(self, table):
+        """One sphere gives zero-dimensional results."""
+        qext, _, _, g = table(1.5, 1.0)
+        assert qext.shape == g.shape == ()
+
+    def test_conjugate_index(self, table):
+        """n+ik is the same sphere as n-ik."""
+        assert table(1.5 + 0.005j, 1.0) == table(1.5 - 0.005j, 1.0)
+
+    @pytest.mark.parametrize("m, x", [(1.5, 3.5), (1.5, 0.05), (1.2, 1.0), (1.5 - 0.1j, 1.0), (1.5, 0.0)])
+    def test_outside_the_range(self, table, m, x):
+        """The table never extrapolates."""
+        with pytest.raises(ValueError):
+            table(m, x)
+
+    def test_report_and_repr(self, table):
+        """Both name what a reader needs to judge the table."""
+        text = str(table.report)
+        assert "passed" in text
+        assert text.count("\n") == 5
+        assert repr(table).startswith("EfficiencyTable(")
+        assert table.n_points == np.prod([len(axis) for axis in table.nodes])
+
+
+class TestBuilding:
+    """Test the refinement and its limits."""
+
+    def test_fixed_index(self):
+        """An axis of one node is not interpolated along."""
+        table = surrogate.build_table((0.5, 2.0), (1.5, 1.5), tol=1e-3, n_validate=200)
+        assert [len(axis) for axis in table.nodes[1:]] == [1, 1]
+        np.testing.assert_allclose(table(1.5, 1.3)[0], mie.efficiencies_mx(1.5, 1.3)[0], rtol=1e-3)
+        assert table.report.passed
+
+    def test_refinement_follows_the_tolerance(self):
+        """A tighter tolerance needs more nodes."""
+        loose = surrogate.build_table((0.5, 2.0), (1.5, 1.5), tol=1e-2, n_validate=0)
+        tight = surrogate.build_table((0.5, 2.0), (1.5, 1.5), tol=1e-5, n_validate=0)
+        assert len(tight.nodes[0]) > len(loose.nodes[0])
+        assert np.all(np.diff(tight.nodes[0]) > 0)
+
+    def test_point_budget(self):
+        """A range the budget cannot cover is an error, not a poor table."""
+        with pytest.raises(RuntimeError, match="max_points"):
+            surrogate.build_table((0.1, 20.0), (1.33, 1.6), tol=1e-6, max_points=2000)
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"x_range": (0.0, 1.0), "n_range": (1.5, 1.6)},
+            {"x_range": (2.0, 1.0), "n_range": (1.5, 1.6)},
+            {"x_range": (0.1, 1.0), "n_range": (1.5, 1.6), "k_range": (-0.1, 0.0)},
+        ],
+    )
+    def test_bad_ranges(self, kwargs):
+        """Ranges run low to high, over positive x and non-negative k."""
+        with pytest.raises(ValueError):
+            surrogate.build_table(**kwargs)
@@ -85,6 +85,19 @@ class TestCartesianToSpherical:
         np.testing.assert_allclose(zz, z, atol=1e-12)
 
 
+class TestLagrangeStencil:
+    """Test the local interpolation weights shared by the surrogate and the spectra."""
+
+    def test_stencil_is_exact_for_cubics(self):
+        """Four-point Lagrange weights reproduce a cubic on uneven nodes."""
+        nodes = np.array([0.0, 0.3, 0.5, 1.2, 1.3, 2.0])
+        t = np.linspace(0, 2, 41)
+        first, weights = util._lagrange_stencil(nodes, t)
+        cubic = 1 - 2 * nodes + nodes**3
+        approx = np.sum(weights * cubic[first[:, np.newaxis] + np.arange(4)], axis=1)
+        np.testing.assert_allclose(approx, 1 - 2 * t + t**3, atol=1e-12)
+
+
 class TestBackendGuard:
     """Test that the active backend matches what the test files require.
 
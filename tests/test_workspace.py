@@ -0,0 +1,83 @@
+"""Tests for the reusable series buffers in ``miepython._backend``."""
+
+import numpy as np
+import pytest
+
+import miepython as mie
+from miepython import _backend
+
+
+class TestGrowth:
+    """Test that the buffers grow when needed and only then."""
+
+    def test_starts_at_the_requested_order(self):
+        """The buffers hold n_max orders of a_n and b_n from the start."""
+        ws = _backend.MieWorkspace(10)
+        assert ws.n_max == 10
+        assert len(ws.a) == len(ws.b) == 10
+        assert len(ws.D) == 12
+        assert ws.nbytes == ws.psi.nbytes + 3 * 16 * 10 + 2 * 16
+        assert repr(ws) == "MieWorkspace(n_max=10, %d bytes)" % ws.nbytes
+
+    def test_buffers_that_fit_are_kept(self):
+        """A smaller sphere is computed in the buffers already there."""
+        ws = _backend.MieWorkspace()
+        first = ws.reserve(20.0)
+        second = ws.reserve(3.0)
+        assert all(a is b for a, b in zip(first, second))
+
+    def test_growth_is_geometric(self):
+        """A slightly larger sphere grows the buffers by half; a much larger one to fit."""
+        ws = _backend.MieWorkspace(100)
+        ws.reserve(100.0)
+        assert ws.n_max == 150
+        ws.reserve(1000.0)
+        assert ws.n_max == _backend.workspace_order(1000.0, 0)
+
+    def test_fixed_number_of_terms(self):
+        """n_pole orders can be more than Wiscombe's count."""
+        ws = _backend.MieWorkspace()
+        _, _, a, _ = ws.reserve(1.0, n_pole=40)
+        assert len(a) >= 40
+
+    def test_negative_order(self):
+        """There is no such thing as a negative number of orders."""
+        with pytest.raises(ValueError):
+            _backend.MieWorkspace(-1)
+
+
+class TestResults:
+    """Test that computing in a workspace changes nothing."""
+
+    @pytest.mark.parametrize(
+        "m, x, n_pole",
+        [(1.5 - 0.01j, 3.0, 0), (1.33, 62.0, 0), (0.0, 3.0, 0), (1.5, 0.01, 0), (1.5 - 0.1j, 4.0, 2), (1.5, 5.0, 9)],
+    )
+    def test_same_as_single_sphere(self, m, x, n_pole):
+        """Every branch gives the efficiencies of a fresh allocation."""
+        ws = _backend.MieWorkspace()
+        for e_field in (True, False):
+            expected = _backend.single_sphere(complex(m), x, n_pole, e_field)
+            assert ws.single_sphere(complex(m), x, n_pole, e_field) == expected
+
+    def test_one_workspace_for_a_sweep(self):
+        """Spheres of any size in any order share one workspace."""
+        ws = _backend.MieWorkspace()
+        x = np.array([5.0, 80.0, 0.5, 30.0, 200.0, 1.0])
+        qext = [ws.single_sphere(1.5 - 0.01j, x_i, 0, True)[0] for x_i in x]
+        np.testing.assert_allclose(qext, mie.efficiencies_mx(np.full(6, 1.5 - 0.01j), x)[0], rtol=1e-13)
+
+    def test_an_bn_into(self):
+        """The coefficients land in the first n_terms entries of a and b."""
+        ws = _backend.MieWorkspace(200)
+        n_terms = _backend.an_bn_into(np.complex128(1.5 - 0.01j), 10.0, 0, ws.psi, ws.D, ws.a, ws.b)
+        a, b = mie.an_bn(np.complex128(1.5 - 0.01j), 10.0, 0)
+        assert n_terms == len(a)
+        np.testing.assert_array_equal(ws.a[:n_terms], a)
+        np.testing.assert_array_equal(ws.b[:n_terms], b)
+
+    def test_buffers_too_small(self):
+        """A kernel refuses buffers it would run off the end of."""
+        ws = _backend.MieWorkspace(3)
+        with pytest.raises(ValueError, match="workspace"):
+            _backend.an_bn_into(np.complex128(1.5), 10.0, 0, ws.psi, ws.D, ws.a, ws.b)